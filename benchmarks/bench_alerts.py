@@ -0,0 +1,105 @@
+"""Per-tick cost of alert rule evaluation at production scale.
+
+    python -m benchmarks.bench_alerts --processes 1000 --processes 10000 --rules 8 --output alerts.json
+
+Each tick a share of the synthetic connection summary and bandwidth rows
+changes (``--churn``) and :meth:`~netmonitor.alerts.AlertEngine.evaluate`
+runs every rule over them. Rules mix every metric, hysteresis, ``for``,
+cooldowns and a ``where``; thresholds are set so a few processes fire and
+resolve while the run goes on, as on a real host, while most processes stay
+well below every threshold.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from benchmarks.bench_pipeline import _git_commit
+from benchmarks.synthproc import NAMES
+from netmonitor.alerts import AlertEngine, parse_rule
+from netmonitor.records import BandwidthRow, ConnectionRow
+
+RULES = [
+    "conns > 400 clear 350",
+    "close_wait >= 40 for 3",
+    "tcp > 300 cooldown 30s",
+    "remote_hosts > 120",
+    "bytes > 8M clear 6M for 2",
+    "sent > 4M where name~'^(nginx|envoy)'",
+    "recv > 4M cooldown 1m",
+    "udp > 50",
+]
+
+
+def make_rows(processes: int, rng: random.Random):
+    connections, bandwidth = [], []
+    for i in range(processes):
+        pid, name = 1000 + i, NAMES[i % len(NAMES)]
+        total = int(2000 / (i + 1) ** 0.6) + rng.randrange(5)
+        row = ConnectionRow(pid, name, total, total, rng.randrange(3), max(1, total // 4), "10.0.0.1", f"E:{total}")
+        # A few processes leak CLOSE_WAIT sockets; the rest hold a handful.
+        row.close_wait = min(total, rng.randrange(60) if i % 500 == 0 else rng.randrange(4))
+        connections.append(row)
+        rate = int(64 * 1024 ** 2 / (i + 1)) + rng.randrange(4096)
+        bandwidth.append(BandwidthRow(pid, name, rate // 2, rate - rate // 2, rate))
+    return connections, bandwidth
+
+
+def churn(connections, bandwidth, share: float, rng: random.Random):
+    """New rows for ``share`` of the processes, as the collectors hand over each tick."""
+    connections, bandwidth = list(connections), list(bandwidth)
+    for i in rng.sample(range(len(connections)), int(len(connections) * share)):
+        old = connections[i]
+        total = max(0, old.total + rng.randrange(-40, 41))
+        row = ConnectionRow(old.pid, old.name, total, total, old.udp, max(1, total // 4), "10.0.0.1", f"E:{total}")
+        row.close_wait = min(total, max(0, old.close_wait + rng.randrange(-5, 6)))
+        connections[i] = row
+        old = bandwidth[i]
+        rate = max(0, int(old.total * rng.uniform(0.7, 1.3)))
+        bandwidth[i] = BandwidthRow(old.pid, old.name, rate // 2, rate - rate // 2, rate)
+    return connections, bandwidth
+
+
+def run(processes: int, rules: int = 8, ticks: int = 50, share: float = 0.1) -> dict:
+    rng = random.Random(processes)
+    engine = AlertEngine([parse_rule(text) for text in (RULES * (rules // len(RULES) + 1))[:rules]])
+    connections, bandwidth = make_rows(processes, rng)
+    times = []
+    for tick in range(ticks):
+        connections, bandwidth = churn(connections, bandwidth, share, rng)
+        start = time.perf_counter()
+        engine.evaluate(connections, bandwidth, now=float(tick))
+        times.append(time.perf_counter() - start)
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "p95_ms": round(sorted(times)[int(len(times) * 0.95) - 1] * 1000, 3),
+        "max_ms": round(max(times) * 1000, 3),
+        "fired": engine.fired, "resolved": engine.resolved, "firing": engine.firing,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, action="append", help="Processes per tick (repeatable; default 1000, 5000 and 10000).")
+    parser.add_argument("--rules", type=int, default=8)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--churn", type=float, default=0.1, help="Share of processes whose rows change per tick.")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for processes in args.processes or [1000, 5000, 10000]:
+        result = results[f"processes={processes}"] = run(processes, args.rules, args.ticks, args.churn)
+        print(f"{processes:>7} processes, {args.rules} rules: median {result['median_ms']:.3f} ms, "
+              f"p95 {result['p95_ms']:.3f} ms, max {result['max_ms']:.3f} ms "
+              f"({result['fired']} fired, {result['resolved']} resolved)")
+    if args.output:
+        commit, dirty = _git_commit()
+        with open(args.output, "w") as f:
+            json.dump({"meta": {"commit": commit, "dirty": dirty, "rules": args.rules, "ticks": args.ticks,
+                                "churn": args.churn}, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
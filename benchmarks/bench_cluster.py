@@ -0,0 +1,128 @@
+"""Bandwidth per agent and merge latency of ``netmonitor aggregate``.
+
+    python -m benchmarks.bench_cluster --agents 4 --processes 10000 --churn 0.05 --output cluster.json
+
+Starts ``--agents`` agents on localhost, each serving synthetic per-process
+byte totals of which a ``--churn`` share moves every tick, and one
+aggregator subscribed to all of them. Per tick the benchmark collects on
+every agent, waits for all their frames and merges them into ranked cluster
+rows. It reports the bytes an agent sends for its first (full) frame and
+per steady tick, against the daemon's every-row ``TickCodec`` frame for the
+same tick; the fan-in time from collection until the last agent's frame was
+decoded; and the merge time.
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+
+from benchmarks.bench_pipeline import _git_commit
+from benchmarks.synthproc import NAMES
+from netmonitor import core
+from netmonitor.cluster import AgentState, Cluster, make_agent_server
+from netmonitor.recording import TickCodec
+from netmonitor.records import ByteTotals
+
+
+class _Source:
+    """Cumulative totals of ``processes`` PIDs; ``churn`` of them move each call."""
+
+    def __init__(self, processes: int, churn: float, seed: int):
+        self.rng = random.Random(seed)
+        self.churn = churn
+        self.rows = {1000 + i: ByteTotals(NAMES[i % len(NAMES)], self.rng.randrange(1 << 30),
+                                          self.rng.randrange(1 << 30)) for i in range(processes)}
+        self.pids = list(self.rows)
+
+    def __call__(self):
+        for pid in self.rng.sample(self.pids, int(len(self.pids) * self.churn)):
+            old = self.rows[pid]
+            self.rows[pid] = ByteTotals(old.name, old.sent + self.rng.randrange(1 << 16),
+                                        old.recv + self.rng.randrange(1 << 16))
+        return dict(self.rows)
+
+
+def _median(values) -> float:
+    return round(statistics.median(values), 3) if values else 0.0
+
+
+def run(agents: int = 4, processes: int = 10000, ticks: int = 20, churn: float = 0.05, top_n: int = 15) -> dict:
+    servers, states, sources = [], [], []
+    for i in range(agents):
+        source = _Source(processes, churn, seed=i)
+        state = AgentState({"bandwidth": source}, interval=1.0)
+        server = make_agent_server(state, "127.0.0.1:0", hostname=f"agent{i}")
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        states.append(state)
+        sources.append(source)
+    addresses = [f"127.0.0.1:{server.server_address[1]}" for server in servers]
+    full_codec = TickCodec("bandwidth")
+    first = steady = None
+    frame_bytes, full_bytes, fan_in, merge_ms = [], [], [], []
+    try:
+        with Cluster(addresses) as cluster:
+            # Wait until every agent has a subscriber before collecting.
+            while not all(state.active_kinds() for state in states):
+                time.sleep(0.01)
+            merge = core._ClusterRows(cluster, top_n)
+            for tick in range(1, ticks + 1):
+                start = time.perf_counter()
+                for state in states:
+                    state.collect()
+                if not cluster.wait(tick, 10.0):
+                    raise RuntimeError("agents stopped streaming")
+                fan_in.append((time.perf_counter() - start) * 1000)
+                _, stats, timing = merge()
+                merge_ms.append(timing["merge_ms"])
+                sizes = [s["frame_bytes"] for s in stats]
+                if tick == 1:
+                    first = _median(sizes)
+                else:
+                    frame_bytes.extend(sizes)
+                # What the daemon's protocol would send for the same tick.
+                timestamp, rows = states[0].ticks["bandwidth"]
+                full = len(full_codec.encode(timestamp, rows)) + 5
+                if tick > 1:
+                    full_bytes.append(full)
+            steady = _median(frame_bytes)
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+    return {
+        "first_frame_bytes": first,
+        "steady_frame_bytes": steady,
+        "full_frame_bytes": _median(full_bytes),
+        "saving": round(_median(full_bytes) / steady, 1) if steady else None,
+        "fan_in_ms": {"median": _median(fan_in), "max": round(max(fan_in), 3)},
+        "merge_ms": {"median": _median(merge_ms), "max": round(max(merge_ms), 3)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=10000, help="Processes per agent.")
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.05, help="Share of processes that move bytes per tick.")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    result = run(args.agents, args.processes, args.ticks, args.churn, args.top)
+    print(f"per agent: first frame {result['first_frame_bytes']:,.0f} B, steady {result['steady_frame_bytes']:,.0f} B/tick "
+          f"(every-row frame {result['full_frame_bytes']:,.0f} B, {result['saving']}x less)")
+    print(f"fan-in {result['fan_in_ms']['median']:.2f} ms (max {result['fan_in_ms']['max']:.2f}), "
+          f"merge {result['merge_ms']['median']:.2f} ms (max {result['merge_ms']['max']:.2f})")
+    if args.output:
+        commit, dirty = _git_commit()
+        with open(args.output, "w") as f:
+            json.dump({"meta": {"commit": commit, "dirty": dirty, "agents": args.agents, "processes": args.processes,
+                                "ticks": args.ticks, "churn": args.churn}, "results": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Per-stage timings of the collection pipeline on a synthetic /proc tree.
+
+    python -m benchmarks.bench_pipeline --processes 10000 --sockets 200000 --output bench.json
+    python -m benchmarks.bench_pipeline --output new.json --compare bench.json
+    python -m benchmarks.bench_pipeline --workers 1,2,4,8
+    python -m benchmarks.bench_pipeline --memory
+
+Stages run in pipeline order on the same fixture: enumeration (cold and warm
+inode index refresh), socket table parsing, attribution, name lookup,
+aggregation, sort/top-N, Rich table build and render, and JSON/CSV export of
+every summary row. Results are written as JSON with the git commit so runs
+can be compared; ``--compare`` prints old/new ratios and exits non-zero if
+any stage got slower than ``--threshold``.
+
+``--memory`` also measures what one steady-state tick allocates at this
+scale: the peak of traced memory and the blocks still alive after the byte
+counter sample, the bandwidth ranking, the connection summary and a JSON
+export.
+
+``--workers`` additionally times the sharded collection path of
+:mod:`netmonitor.parallel` (threaded enumeration and name reads, process
+pool parse/attribute/aggregate) at each worker count against the serial
+path and reports the speedup.
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from rich.console import Console
+
+from benchmarks.synthproc import DEFAULT_STATES, make_proc_tree, parse_states
+from netmonitor import core, procnet, sockdiag
+from netmonitor.collector import ConnectionSnapshot, attribute_connections
+from netmonitor.inodes import InodeIndex
+from netmonitor.parallel import WorkerPool, aggregate_tables
+from netmonitor.records import ByteTotals, TcpSocket
+from netmonitor.sampler import Snapshot
+from netmonitor.sockdiag import process_name
+
+
+def timed(fn, repeat: int):
+    """Run ``fn`` ``repeat`` times; return ``(last result, [seconds])``."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def _git_commit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def run_stages(root: str, top_n: int = 15, repeat: int = 5) -> dict:
+    """Time every stage against the fixture at ``root``; return ``{stage: result}``."""
+    stages = {}
+
+    def record(name, fn, items, repeat=repeat):
+        # ``items`` is a count, or a function of the stage's result.
+        result, times = timed(fn, repeat)
+        items = items(result) if callable(items) else items
+        best = min(times)
+        stages[name] = {
+            "best_ms": round(best * 1000, 3),
+            "median_ms": round(statistics.median(times) * 1000, 3),
+            "items": items,
+            "items_per_s": round(items / best) if best > 0 else None,
+        }
+        return result
+
+    def cold():
+        index = InodeIndex(root)
+        index.refresh()
+        return index
+    # A cold refresh readlinks every fd, so it is only run a couple of times.
+    index = record("enumeration_cold", cold, lambda index: len(index.pids()), repeat=min(repeat, 2))
+    record("enumeration_warm", index.refresh, len(index.pids()))
+
+    net_root = os.path.join(root, "net")
+    tables = record("parse", lambda: procnet.read_tables("inet", net_root),
+                    lambda tables: sum(len(t) for t in tables.values()))
+    sockets = stages["parse"]["items"]
+    by_pid = record("attribution", lambda: attribute_connections(tables, index), sockets)
+    names = record("names", lambda: {pid: process_name(pid, root) for pid in by_pid}, len(by_pid))
+    snapshot = ConnectionSnapshot(dict(by_pid), names, time.time())
+    summary = record("aggregation", lambda: core.get_process_connection_summary(snapshot=snapshot), len(by_pid))
+
+    totals1 = {pid: ByteTotals(names[pid], 1000 * pid, 10 * pid) for pid in by_pid}
+    totals2 = {pid: ByteTotals(names[pid], 2000 * pid, 30 * pid) for pid in by_pid}
+    record("bandwidth_rows", lambda: core._bandwidth_rows(totals1, totals2), len(by_pid))
+    top = record("sort_top_n", lambda: sorted(summary, key=core._TOTAL, reverse=True)[:top_n], len(summary))
+
+    live = Snapshot(seq=1, timestamp=time.time(), monotonic=0.0, elapsed=1.0, duration=0.0, rows=tuple(summary),
+                    late=False, missed=0)
+    table = record("table_build", lambda: core._build_connections_table(live, top_n, 1.0), len(top))
+    console = Console(file=io.StringIO(), width=160, force_terminal=True)
+    record("table_render", lambda: console.print(table), len(top))
+
+    fields = core.CONNECTION_FIELDS
+    with tempfile.TemporaryDirectory(prefix="netmonitor-bench-") as workdir:
+        for fmt in ("json", "csv"):
+            path = os.path.join(workdir, f"export.{fmt}")
+            record(f"export_{fmt}", lambda: core._export_snapshot(summary, fmt, path, fields), len(summary))
+    return stages
+
+
+def run_workers(root: str, counts, repeat: int = 3) -> dict:
+    """Time the serial and sharded collection paths; return ``{workers: result}``.
+
+    Each result holds the best time in ms of a cold enumeration, of
+    parse/attribute/aggregate, of reading names and their sum, plus the
+    speedup of that sum over one worker (the serial path).
+    """
+    net_root = os.path.join(root, "net")
+    results = {}
+    for workers in counts:
+        pool = WorkerPool(workers) if workers > 1 else None
+
+        def cold():
+            index = InodeIndex(root, pool)
+            index.refresh()
+            return index
+        index, enumerate_times = timed(cold, min(repeat, 2))
+        if pool is None:
+            def aggregate():
+                by_pid = attribute_connections(procnet.read_tables("inet", net_root), index)
+                names = {pid: process_name(pid, root) for pid in by_pid}
+                return core._summarize_connections(snapshot=ConnectionSnapshot(dict(by_pid), names, 0.0))
+            pids = list(index.pids())
+            names = lambda: {pid: process_name(pid, root) for pid in pids}
+        else:
+            aggregate_tables(pool, procnet.KINDS["inet"], index, net_root)  # start the worker processes
+            aggregate = lambda: aggregate_tables(pool, procnet.KINDS["inet"], index, net_root)
+            pids = list(index.pids())
+            names = lambda: pool.map_threads(lambda shard: [process_name(pid, root) for pid in shard], pids)
+        _, aggregate_times = timed(aggregate, repeat)
+        _, name_times = timed(names, repeat)
+        if pool is not None:
+            pool.close()
+        best = [min(enumerate_times) * 1000, min(aggregate_times) * 1000, min(name_times) * 1000]
+        results[workers] = {
+            "enumeration_cold_ms": round(best[0], 3),
+            "aggregate_ms": round(best[1], 3),
+            "names_ms": round(best[2], 3),
+            "total_ms": round(sum(best), 3),
+        }
+    base = results[min(results)]["total_ms"]
+    for result in results.values():
+        result["speedup"] = round(base / result["total_ms"], 2) if result["total_ms"] else None
+    return results
+
+
+def measured(fn):
+    """Run ``fn`` once under tracemalloc; return ``(result, peak KiB, retained KiB, live blocks)``."""
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, round(peak / 1024, 1), round(current / 1024, 1), sys.getallocatedblocks() - blocks
+
+
+def run_memory(root: str, top_n: int = 15, ticks: int = 4, active: float = 0.1, seed: int = 0) -> dict:
+    """Memory of one steady-state tick per stage; return ``{stage: result}``.
+
+    ``bytes_sample`` runs :class:`~netmonitor.sockdiag.TcpByteCounter` on the
+    fixture's owned sockets in place of a netlink dump, with ``active`` of
+    them moving bytes every tick; ``bandwidth_tick`` ranks its totals as the
+    live view does. Each stage is measured on the last of ``ticks`` ticks.
+    """
+    rng = random.Random(seed)
+    index = InodeIndex(root)
+    index.refresh()
+    # [inode, local port, acked, received]; the dump builds fresh entries every tick, as the real one does.
+    dump = [[inode, 1024 + n % 60000, 0, 0] for n, (inode, _owner) in enumerate(index.owners())]
+
+    def dump_tcp_sockets(family, *args):
+        if family != socket.AF_INET:
+            return
+        for inode, port, acked, received in dump:
+            yield TcpSocket(inode, inode, "ESTABLISHED", 0, ("10.0.0.1", port), ("10.1.0.1", 443), acked, received)
+    real_dump = sockdiag.dump_tcp_sockets
+    sockdiag.dump_tcp_sockets = dump_tcp_sockets
+    stages = {}
+    try:
+        counter = sockdiag.TcpByteCounter(root, index)
+        rows = core._BandwidthRows(top_n, 1.0)
+        for tick in range(ticks):
+            for entry in rng.sample(dump, int(len(dump) * active)):
+                entry[2] += 1500
+                entry[3] += 200
+            last = tick == ticks - 1
+            totals, *sample = measured(counter.sample) if last else (counter.sample(),)
+            ranked, *rank = measured(lambda: rows(totals, float(tick), 1.0)) if last else (rows(totals, tick, 1.0),)
+        stages["bytes_sample"], stages["bandwidth_tick"] = sample, rank
+    finally:
+        sockdiag.dump_tcp_sockets = real_dump
+
+    net_root = os.path.join(root, "net")
+    by_pid = attribute_connections(procnet.read_tables("inet", net_root), index)
+    names = {pid: process_name(pid, root) for pid in by_pid}
+    snapshot = ConnectionSnapshot(dict(by_pid), names, time.time())
+    summary, *stages["connection_summary"] = measured(lambda: core._summarize_connections(snapshot=snapshot))
+    with tempfile.TemporaryDirectory(prefix="netmonitor-bench-") as workdir:
+        path = os.path.join(workdir, "export.json")
+        _, *stages["export_json"] = measured(lambda: core._export_snapshot(summary, "json", path,
+                                                                           core.CONNECTION_FIELDS))
+    return {stage: dict(zip(("peak_kib", "retained_kib", "blocks"), result)) for stage, result in stages.items()}
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    """Print per-stage ratios; return the stages slower than ``threshold``."""
+    regressions = []
+    print(f"{'stage':18} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for stage, result in new["stages"].items():
+        before = old["stages"].get(stage)
+        if before is None or not before["best_ms"]:
+            print(f"{stage:18} {'-':>10} {result['best_ms']:>10.2f}")
+            continue
+        ratio = result["best_ms"] / before["best_ms"]
+        flag = "  slower" if ratio > threshold else ""
+        print(f"{stage:18} {before['best_ms']:>10.2f} {result['best_ms']:>10.2f} {ratio:>6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(stage)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=10000)
+    parser.add_argument("--sockets", type=int, default=200000)
+    parser.add_argument("--states", type=parse_states, default=DEFAULT_STATES,
+                        help="TCP state mix, e.g. ESTABLISHED=60,TIME_WAIT=20,LISTEN=5")
+    parser.add_argument("--udp", type=float, default=0.1)
+    parser.add_argument("--ipv6", type=float, default=0.2)
+    parser.add_argument("--fixture", help="Directory to build (or reuse) the fake /proc tree in.")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", help="Previous results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Ratio above which a stage counts as slower.")
+    parser.add_argument("--workers", type=lambda v: [int(n) for n in v.split(",")],
+                        help="Also time sharded collection at these worker counts, e.g. 1,2,4,8.")
+    parser.add_argument("--memory", action="store_true", help="Also measure the memory of one steady-state tick.")
+    args = parser.parse_args(argv)
+
+    if args.fixture:
+        _run(args, args.fixture)
+        return
+    with tempfile.TemporaryDirectory(prefix="netmonitor-proc-") as fixture:
+        _run(args, fixture)
+
+
+def _run(args, fixture: str):
+    started = time.perf_counter()
+    manifest = make_proc_tree(fixture, args.processes, args.sockets, args.states, args.udp, args.ipv6)
+    print(f"fixture {fixture}: {args.processes} processes, {args.sockets} sockets "
+          f"({time.perf_counter() - started:.1f}s to prepare)")
+
+    stages = run_stages(fixture, args.top, args.repeat)
+    commit, dirty = _git_commit()
+    results = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "numpy": procnet.HAVE_NUMPY,
+            "repeat": args.repeat,
+            "fixture": manifest,
+            "cpus": os.cpu_count(),
+        },
+        "stages": stages,
+    }
+    for stage, result in stages.items():
+        rate = f"{result['items_per_s']:>14,}/s" if result["items_per_s"] is not None else ""
+        print(f"{stage:18} {result['best_ms']:>10.2f} ms  (median {result['median_ms']:.2f})  {rate}")
+    if args.workers:
+        results["workers"] = run_workers(fixture, sorted(set(args.workers) | {1}), args.repeat)
+        print(f"\n{'workers':>7} {'enumerate':>10} {'aggregate':>10} {'names':>8} {'total':>9} speedup")
+        for workers, result in results["workers"].items():
+            print(f"{workers:>7} {result['enumeration_cold_ms']:>10.1f} {result['aggregate_ms']:>10.1f} "
+                  f"{result['names_ms']:>8.1f} {result['total_ms']:>9.1f} {result['speedup']:>6.2f}x")
+    if args.memory:
+        results["memory"] = run_memory(fixture, args.top)
+        print(f"\n{'stage':18} {'peak KiB':>10} {'kept KiB':>10} {'blocks':>8}")
+        for stage, result in results["memory"].items():
+            print(f"{stage:18} {result['peak_kib']:>10,.1f} {result['retained_kib']:>10,.1f} {result['blocks']:>8,}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(json.load(f), results, args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
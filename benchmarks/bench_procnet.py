@@ -0,0 +1,72 @@
+"""Throughput of the /proc/net table parser on a synthetic fixture.
+
+    python -m benchmarks.bench_procnet --sockets 200000
+"""
+import argparse
+import random
+import socket
+import time
+
+from netmonitor import procnet
+from tests.fakeproc import net_table
+
+
+def make_fixture(count: int, family: int = socket.AF_INET, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    sockets = []
+    for i in range(count):
+        if family == socket.AF_INET:
+            lip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+            rip = f"172.16.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        else:
+            lip = f"2001:db8::{rng.randrange(1, 0xffff):x}"
+            rip = f"2001:db8:1::{rng.randrange(1, 0xffff):x}"
+        state = rng.choice((0x01, 0x01, 0x01, 0x06, 0x08, 0x0A))
+        sockets.append(((lip, rng.randrange(1024, 65535)), (rip, rng.choice((80, 443, 5432))),
+                        state, rng.randrange(1000, 1010), 100000 + i))
+    return net_table(sockets, family)
+
+
+def parse_naive(data: bytes, family: int):
+    """Reference: one namedtuple per socket, decoded field by field."""
+    rows = []
+    for line in data.splitlines()[1:]:
+        fields = line.split()
+        lhex, lport = fields[1].split(b":")
+        rhex, rport = fields[2].split(b":")
+        rows.append(procnet.Connection(
+            -1, family, socket.SOCK_STREAM,
+            procnet.Addr(socket.inet_ntop(family, procnet._swap_words(bytes.fromhex(lhex.decode()))), int(lport, 16)),
+            procnet.Addr(socket.inet_ntop(family, procnet._swap_words(bytes.fromhex(rhex.decode()))), int(rport, 16)),
+            procnet.TCP_STATES.get(int(fields[3], 16)), int(fields[9])))
+    return rows
+
+
+def bench(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sockets", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for family, label in ((socket.AF_INET, "tcp"), (socket.AF_INET6, "tcp6")):
+        data = make_fixture(args.sockets, family)
+        cases = {"naive": lambda: parse_naive(data, family),
+                 "python": lambda: procnet.parse_table(data, family, socket.SOCK_STREAM, "python")}
+        if procnet.HAVE_NUMPY:
+            cases["numpy"] = lambda: procnet.parse_table(data, family, socket.SOCK_STREAM, "numpy")
+        for name, fn in cases.items():
+            elapsed = bench(fn, args.repeat)
+            print(f"{label:5} {name:7} {args.sockets / elapsed:>14,.0f} sockets/s  ({elapsed * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Tick-to-paint latency of the live connections view at production scale.
+
+    python -m benchmarks.bench_render --processes 10000 --top 15 --top 5000 --output render.json
+
+Each tick a share of the synthetic per-process summary rows changes (``--churn``),
+then the rows pipeline (rank and history), the Rich table build and the render
+into an in-memory console are timed together. The ``full`` path sorts every
+row and formats every displayed row from scratch, as the live view did before
+the render engine; the ``viewport`` path ranks with a heap, formats only the
+rows inside a screen-sized viewport and reuses cached cells for unchanged rows.
+"""
+import argparse
+import io
+import json
+import random
+import statistics
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.bench_pipeline import _git_commit
+from benchmarks.synthproc import NAMES
+from netmonitor import core
+from netmonitor.history import HistoryStore
+from netmonitor.render import TableView, Viewport
+from netmonitor.sampler import Snapshot
+
+
+def make_summary(processes: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(processes):
+        tcp = int(2000 / (i + 1) ** 0.8) + rng.randrange(3)
+        rows.append({
+            "pid": 1000 + i, "name": NAMES[i % len(NAMES)], "total": tcp, "tcp": tcp, "udp": 0,
+            "remote_hosts": max(1, tcp // 3), "top_remote": f"172.16.{i % 256}.{i % 250 + 1}",
+            "status_summary": f"E:{tcp}",
+        })
+    return rows
+
+
+def churn(rows: list, share: float, rng: random.Random) -> list:
+    """A copy of ``rows`` where ``share`` of them have a new connection count."""
+    rows = [dict(row) for row in rows]
+    for row in rng.sample(rows, int(len(rows) * share)):
+        row["total"] = row["tcp"] = max(0, row["total"] + rng.choice((-2, -1, 1, 2)))
+        row["status_summary"] = f"E:{row['total']}"
+    return rows
+
+
+def _full_path(top_n: int):
+    """The pre-viewport pipeline: full sort, trend for every shown row, fresh cells."""
+    history = HistoryStore(capacity=60, kind="gauge")
+
+    def tick(data, ts, console):
+        data = sorted(data, key=lambda x: x["total"], reverse=True)
+        history.record(ts, {proc["pid"]: proc["total"] for proc in data})
+        for proc in data[:top_n]:
+            proc["trend"] = history.sparkline(proc["pid"])
+        table = Table(title="Active Network Connections (Live)", expand=True)
+        for column in core.CONNECTION_COLUMNS:
+            table.add_column(column.header, justify=column.justify)
+        for proc in data[:top_n]:
+            table.add_row(*(str(proc.get(c.key, "")) for c in core.CONNECTION_COLUMNS))
+        console.print(table)
+    return tick
+
+
+def _viewport_path(top_n: int, height: int):
+    viewport = Viewport(height)
+    rows = core._ConnectionRows(top_n, 1.0, viewport=viewport)
+    view = TableView(core.CONNECTION_COLUMNS, viewport)
+
+    def tick(data, ts, console):
+        published = rows(data, ts)
+        snapshot = Snapshot(1, ts, ts, 1.0, 0.0, tuple(published), False, 0)
+        console.print(core._build_connections_table(snapshot, top_n, 1.0, view=view))
+    return tick
+
+
+def run(processes: int, tops, ticks: int = 20, share: float = 0.05, height: int = 40) -> dict:
+    """Time both paths for every ``--top``; return ``{"top=N": {path: result}}``."""
+    rng = random.Random(1)
+    base = make_summary(processes)
+    frames = [base]
+    for _ in range(ticks):
+        frames.append(churn(frames[-1], share, rng))
+    results = {}
+    for top_n in tops:
+        results[f"top={top_n}"] = {}
+        for name, tick in (("full", _full_path(top_n)), ("viewport", _viewport_path(top_n, height))):
+            console = Console(file=io.StringIO(), width=160, height=height + 12, force_terminal=True)
+            times = []
+            for ts, frame in enumerate(frames):
+                data = [dict(row) for row in frame]  # the sampler hands over fresh rows each tick
+                console.file.seek(0)
+                console.file.truncate()
+                start = time.perf_counter()
+                tick(data, float(ts), console)
+                times.append(time.perf_counter() - start)
+            times = times[1:]  # the first tick warms caches and history
+            results[f"top={top_n}"][name] = {
+                "median_ms": round(statistics.median(times) * 1000, 3),
+                "p95_ms": round(sorted(times)[int(len(times) * 0.95) - 1] * 1000, 3),
+                "max_ms": round(max(times) * 1000, 3),
+            }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=10000)
+    parser.add_argument("--top", type=int, action="append", help="Rows to display (repeatable; default 15 and 5000).")
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.05, help="Share of rows that change per tick.")
+    parser.add_argument("--height", type=int, default=40, help="Viewport height in rows.")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    results = run(args.processes, args.top or [15, 5000], args.ticks, args.churn, args.height)
+    for top, paths in results.items():
+        full, fast = paths["full"], paths["viewport"]
+        print(f"{top:10} full {full['median_ms']:>9.2f} ms  viewport {fast['median_ms']:>8.2f} ms  "
+              f"({full['median_ms'] / fast['median_ms']:.1f}x, p95 {fast['p95_ms']:.2f} ms)")
+    if args.output:
+        commit, dirty = _git_commit()
+        with open(args.output, "w") as f:
+            json.dump({"meta": {"commit": commit, "dirty": dirty, "processes": args.processes, "ticks": args.ticks,
+                                "churn": args.churn, "height": args.height}, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Synthetic ``/proc`` trees at production scale for the benchmarks.
+
+    python -m benchmarks.synthproc /tmp/fakeproc --processes 10000 --sockets 200000
+
+Creates ``<root>/<pid>/{stat,comm,fd/}`` for every process and
+``<root>/net/{tcp,tcp6,udp,udp6}``. Sockets are spread over processes with a
+long-tailed distribution (a few busy servers, many idle processes), TCP
+states follow ``states`` and, as on a real host, ``TIME_WAIT`` sockets have
+no inode and therefore no owner.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+
+from tests.fakeproc import add_process, net_table
+
+DEFAULT_STATES = {"ESTABLISHED": 60, "TIME_WAIT": 20, "LISTEN": 5, "CLOSE_WAIT": 10, "SYN_SENT": 5}
+_STATE_CODES = {
+    "ESTABLISHED": 0x01, "SYN_SENT": 0x02, "SYN_RECV": 0x03, "FIN_WAIT1": 0x04, "FIN_WAIT2": 0x05,
+    "TIME_WAIT": 0x06, "CLOSE": 0x07, "CLOSE_WAIT": 0x08, "LAST_ACK": 0x09, "LISTEN": 0x0A, "CLOSING": 0x0B,
+}
+NAMES = ("nginx", "postgres", "python3", "java", "node", "envoy", "redis-server", "sshd", "chrome", "curl")
+_MANIFEST = "synthproc.json"
+
+
+def parse_states(spec: str) -> dict:
+    """Parse ``"ESTABLISHED=60,TIME_WAIT=20"`` into a weight mapping."""
+    states = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip().upper()
+        if name not in _STATE_CODES:
+            raise ValueError(f"unknown TCP state: {name}")
+        states[name] = float(weight or 1)
+    return states
+
+
+def make_proc_tree(root: str, processes: int = 10000, sockets: int = 200000, states: dict = None,
+                   udp: float = 0.1, ipv6: float = 0.2, unowned: float = 0.02, seed: int = 0) -> dict:
+    """Build the tree under ``root`` and return its manifest.
+
+    ``unowned`` is the share of sockets whose inode no process holds (other
+    users' sockets seen without privileges). Re-running with the same
+    parameters on an existing tree is a no-op.
+    """
+    params = {"processes": processes, "sockets": sockets, "states": states or DEFAULT_STATES,
+              "udp": udp, "ipv6": ipv6, "unowned": unowned, "seed": seed}
+    manifest_path = os.path.join(root, _MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest["params"] == params:
+            return manifest
+        raise FileExistsError(f"{root} holds a fixture built with different parameters")
+
+    rng = random.Random(seed)
+    pids = list(range(1000, 1000 + processes))
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(processes)]
+    state_names = list(params["states"])
+    state_weights = [params["states"][n] for n in state_names]
+    tables = {"tcp": [], "tcp6": [], "udp": [], "udp6": []}
+    owned = {pid: [] for pid in pids}
+    owners = rng.choices(pids, weights=weights, k=sockets)
+    counts = dict.fromkeys(state_names, 0)
+    for i in range(sockets):
+        inode = 100000 + i
+        v6 = rng.random() < ipv6
+        family = socket.AF_INET6 if v6 else socket.AF_INET
+        if v6:
+            lip, rip = f"2001:db8::{rng.randrange(1, 0xffff):x}", f"2001:db8:1::{rng.randrange(1, 0xffff):x}"
+        else:
+            lip, rip = f"10.0.{rng.randrange(256)}.{rng.randrange(1, 255)}", f"172.16.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        if rng.random() < udp:
+            name = "udp6" if v6 else "udp"
+            entry = ((lip, rng.randrange(1024, 65535)), ("::" if v6 else "0.0.0.0", 0), 0x07)
+        else:
+            name = "tcp6" if v6 else "tcp"
+            state = rng.choices(state_names, weights=state_weights)[0]
+            counts[state] += 1
+            remote = ("::" if v6 else "0.0.0.0", 0) if state == "LISTEN" else (rip, rng.choice((80, 443, 5432, 6379)))
+            entry = ((lip, rng.randrange(1024, 65535)), remote, _STATE_CODES[state])
+            if state == "TIME_WAIT":
+                inode = 0
+        tables[name].append(entry + (1000, inode))
+        if inode and rng.random() >= unowned:
+            owned[owners[i]].append(inode)
+
+    os.makedirs(os.path.join(root, "net"), exist_ok=True)
+    for name, rows in tables.items():
+        family = socket.AF_INET6 if name.endswith("6") else socket.AF_INET
+        with open(os.path.join(root, "net", name), "wb") as f:
+            f.write(net_table(rows, family))
+    for rank, pid in enumerate(pids):
+        add_process(root, pid, NAMES[rank % len(NAMES)], 1000 + pid, sockets=owned[pid],
+                    files=("/dev/null", "/dev/null", "/dev/null"))
+
+    manifest = {
+        "params": params,
+        "tables": {name: len(rows) for name, rows in tables.items()},
+        "owned_sockets": sum(len(v) for v in owned.values()),
+        "processes_with_sockets": sum(1 for v in owned.values() if v),
+        "tcp_states": counts,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root")
+    parser.add_argument("--processes", type=int, default=10000)
+    parser.add_argument("--sockets", type=int, default=200000)
+    parser.add_argument("--states", type=parse_states, default=DEFAULT_STATES,
+                        help="TCP state mix, e.g. ESTABLISHED=60,TIME_WAIT=20,LISTEN=5")
+    parser.add_argument("--udp", type=float, default=0.1)
+    parser.add_argument("--ipv6", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    manifest = make_proc_tree(args.root, args.processes, args.sockets, args.states, args.udp, args.ipv6,
+                              seed=args.seed)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""Threshold alerts evaluated on every tick, for ``netmonitor alert``.
+
+A rule reads::
+
+    [label:] <metric> <op> <value> [clear <value>] [for <ticks>] [cooldown <seconds>] [where <filter>]
+
+for example ``conns > 500``, ``close_wait >= 20 for 3 cooldown 5m`` or
+``hot: bytes > 50MB clear 40MB for 5 where name~^nginx``. Metrics are
+columns of the rows :mod:`netmonitor.core` already computes:
+
+* ``conns``, ``tcp``, ``udp``, ``remote_hosts``, ``close_wait`` - from the
+  connection summary
+* ``sent``, ``recv``, ``bytes`` - bytes per second, from the byte counter
+  (Linux); values take ``K``/``M``/``G`` suffixes (1024-based, as displayed)
+
+``op`` is ``>``, ``>=``, ``<`` or ``<=``. An alert fires once a process has
+been past ``value`` for ``for`` consecutive ticks (default 1) and resolves
+once it is back past ``clear`` (default ``value``), so a process hovering at
+the threshold does not flap. ``cooldown`` (``60``, ``30s``, ``5m``, ``1h``)
+holds back a rule from firing again for the same process that soon after
+it last fired. ``where`` is a :mod:`~netmonitor.filters` expression over
+``pid`` and ``name``.
+
+Rules are compiled once into one function that makes a single pass over
+each source's rows per tick, mostly a single comparison per row, keeping the
+rows that may be past a rule's clear level; each rule, and the hysteresis
+and cooldown bookkeeping, then only touches those and the alerts already
+firing, so a tick costs well under a millisecond at thousands of processes.
+
+Alerts go to sinks: ``stdout``, a file of JSON lines (``file:PATH`` or any
+path) or a webhook (``http://127.0.0.1:9000/hook``), which is posted one JSON
+document per tick from a background thread so a slow receiver never delays
+collection.
+"""
+import json
+import math
+import operator
+import queue
+import re
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from operator import attrgetter
+from typing import NamedTuple
+
+from netmonitor.filters import FilterError, compile_filter
+from netmonitor.utils import format_bytes
+
+# metric: (source, row attribute, takes byte suffixes)
+METRICS = {
+    "conns": ("connections", "total", False),
+    "tcp": ("connections", "tcp", False),
+    "udp": ("connections", "udp", False),
+    "remote_hosts": ("connections", "remote_hosts", False),
+    "close_wait": ("connections", "close_wait", False),
+    "sent": ("bandwidth", "sent", True),
+    "recv": ("bandwidth", "recv", True),
+    "bytes": ("bandwidth", "total", True),
+}
+
+_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+_RULE = re.compile(r"^\s*(?:(?P<label>[A-Za-z_][\w.-]*)\s*:\s*)?(?P<metric>\w+)\s*(?P<op>>=|<=|>|<)\s*"
+                   r"(?P<value>[^\s]+)(?P<rest>.*?)\s*$")
+_QUANTITY = re.compile(r"^(?P<number>\d+(?:\.\d+)?)\s*(?P<unit>[kmgt]?)(?:i?b)?(?:/s)?$", re.IGNORECASE)
+_NUMBER = re.compile(r"^(?P<number>\d+(?:\.\d+)?)(?P<unit>)$")
+_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+_DURATION = re.compile(r"^(?P<number>\d+(?:\.\d+)?)(?P<unit>[smh]?)$")
+_SECONDS = {"": 1, "s": 1, "m": 60, "h": 3600}
+
+
+class RuleError(ValueError):
+    """A rule that does not parse or names an unknown metric."""
+
+
+class Rule(NamedTuple):
+    """One compiled rule; see the module docstring for the syntax."""
+    text: str
+    label: str
+    metric: str
+    op: str
+    threshold: float
+    clear: float
+    ticks: int = 1
+    cooldown: float = 0.0
+    where: object = None
+
+    @property
+    def source(self) -> str:
+        return METRICS[self.metric][0]
+
+    @property
+    def attribute(self) -> str:
+        return METRICS[self.metric][1]
+
+
+def _quantity(metric: str, text: str) -> float:
+    match = _QUANTITY.match(text) if METRICS[metric][2] else _NUMBER.match(text)
+    if match is None:
+        raise RuleError(f"{metric} needs {'a rate' if METRICS[metric][2] else 'a number'}, got {text!r}")
+    return float(match["number"]) * _UNITS[match["unit"].lower()]
+
+
+def _duration(text: str) -> float:
+    match = _DURATION.match(text.lower())
+    if match is None:
+        raise RuleError(f"cooldown needs seconds (60, 30s, 5m, 1h), got {text!r}")
+    return float(match["number"]) * _SECONDS[match["unit"]]
+
+
+def parse_rule(text: str) -> Rule:
+    """Compile one rule; raises :class:`RuleError` saying what is wrong."""
+    body, where_text = text, ""
+    where_at = re.search(r"\s+where\s+", text, re.IGNORECASE)
+    if where_at is not None:
+        body, where_text = text[:where_at.start()], text[where_at.end():]
+    match = _RULE.match(body)
+    if match is None:
+        raise RuleError(f"expected '<metric> <op> <value>', got {text.strip()!r}")
+    metric = match["metric"].lower()
+    if metric not in METRICS:
+        raise RuleError(f"unknown metric {metric!r}; use one of {', '.join(METRICS)}")
+    op = match["op"]
+    threshold = clear = _quantity(metric, match["value"])
+    ticks, cooldown = 1, 0.0
+    words = match["rest"].split()
+    if len(words) % 2:
+        raise RuleError(f"{words[-1]!r} needs a value")
+    for keyword, value in zip(words[::2], words[1::2]):
+        keyword = keyword.lower()
+        if keyword == "clear":
+            clear = _quantity(metric, value)
+        elif keyword == "for":
+            if not value.isdigit() or int(value) < 1:
+                raise RuleError(f"for needs a number of ticks, got {value!r}")
+            ticks = int(value)
+        elif keyword == "cooldown":
+            cooldown = _duration(value)
+        else:
+            raise RuleError(f"unknown option {keyword!r}; use clear, for, cooldown or where")
+    # The clear level must sit on the quiet side of the threshold.
+    if (clear > threshold) if op in (">", ">=") else (clear < threshold):
+        raise RuleError(f"clear {clear:g} must be on the other side of {op} {threshold:g}")
+    where = None
+    if where_text.strip():
+        try:
+            where = compile_filter(where_text.strip())
+        except FilterError as exc:
+            raise RuleError(f"bad where: {exc}") from None
+        if where.fields - {"pid", "name"}:
+            raise RuleError("where can only test pid and name")
+    label = match["label"] or f"{metric}{op}{match['value']}"
+    return Rule(text.strip(), label, metric, op, threshold, clear, ticks, cooldown, where)
+
+
+def parse_rules(lines) -> list:
+    """Rules from ``lines`` (e.g. a rules file), skipping blanks and ``#`` comments."""
+    rules = []
+    for number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        try:
+            rules.append(parse_rule(line))
+        except RuleError as exc:
+            raise RuleError(f"line {number}: {exc}") from None
+    return rules
+
+
+_BATCH_TEMPLATE = """\
+def batch(connections, bandwidth):
+{candidates}
+    return (
+{comprehensions}
+    )
+"""
+
+
+def _test(attribute: str, op: str, level: float) -> str:
+    # Row values are ints, and comparing an int with an int literal is several
+    # times faster than with a float one: round the level to the equivalent int.
+    level = math.floor(level) if op in (">", "<=") else math.ceil(level)
+    return f"r.{attribute} {op} {level}"
+
+
+def _loosest(rules) -> str:
+    """A test every row past any of ``rules``' clear levels passes.
+
+    Every metric of a row is at most its ``total`` (a process's sockets, or
+    its bytes per second: the byte counter's totals only grow), so a single
+    ``total`` test at the lowest level covers all ``>``/``>=`` rules. Each
+    ``<``/``<=`` rule adds its own test.
+    """
+    levels = [math.floor(rule.clear) + 1 if rule.op == ">" else math.ceil(rule.clear)
+              for rule in rules if rule.op in (">", ">=")]
+    tests = [f"r.total >= {min(levels)}"] if levels else []
+    tests += [_test(rule.attribute, rule.op, rule.clear) for rule in rules if rule.op in ("<", "<=")]
+    return " or ".join(dict.fromkeys(tests))
+
+
+def _compile_batch(rules):
+    """``batch(connections, bandwidth)``: per rule, ``{pid: row}`` of the rows past its clear level.
+
+    Each source is scanned once, for the rows that may be past any of its
+    rules' clear levels (few, on a healthy host); the rules then only test
+    those.
+    """
+    namespace = {}
+    candidates = [f"    {source} = [r for r in {source} if {_loosest(group)}]"
+                  for source in ("connections", "bandwidth")
+                  for group in [[rule for rule in rules if rule.source == source]] if group]
+    lines = []
+    for i, rule in enumerate(rules):
+        test = _test(rule.attribute, rule.op, rule.clear)
+        if rule.where is not None:
+            namespace[f"_w{i}"] = rule.where.accepts_process
+            test += f" and _w{i}(r.pid, r.name)"
+        lines.append(f"        {{r.pid: r for r in {rule.source} if {test}}},")
+    source = _BATCH_TEMPLATE.format(candidates="\n".join(candidates), comprehensions="\n".join(lines))
+    exec(compile(source, "<netmonitor alert rules>", "exec"), namespace)
+    return namespace["batch"]
+
+
+class AlertEngine:
+    """Evaluate ``rules`` over each tick's rows and return the alerts that changed state.
+
+    :meth:`evaluate` returns event dicts: ``state`` is ``firing`` (with the
+    ``value`` that fired) or ``resolved``, with the rule, process, ``peak``
+    value while firing, threshold (the clear level once resolved) and
+    ``duration`` in seconds. Processes that disappear resolve their alerts.
+    ``last_ms``/``max_ms`` time the evaluation itself.
+    """
+
+    def __init__(self, rules, clock=time.time):
+        self.rules = list(rules)
+        self.sources = {rule.source for rule in self.rules}
+        self.clock = clock
+        self._batch = _compile_batch(self.rules)
+        self._values = [attrgetter(rule.attribute) for rule in self.rules]
+        self._armed = [_OPS[rule.op] for rule in self.rules]
+        self._worst = [max if rule.op in (">", ">=") else min for rule in self.rules]
+        self._streaks = [{} for _ in self.rules]
+        self._active = [{} for _ in self.rules]
+        self._fired = {}
+        self._fired_kept = 64
+        self.ticks = 0
+        self.fired = 0
+        self.resolved = 0
+        self.suppressed = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    @property
+    def firing(self) -> int:
+        return sum(len(active) for active in self._active)
+
+    def evaluate(self, connections=(), bandwidth=(), now: float = None) -> list:
+        started = time.perf_counter()
+        now = self.clock() if now is None else now
+        events = []
+        hits = self._batch(connections, bandwidth)
+        for i, rule in enumerate(self.rules):
+            past, value_of, armed, worst = hits[i], self._values[i], self._armed[i], self._worst[i]
+            active, streaks = self._active[i], self._streaks[i]
+            pending = {}
+            for pid, row in past.items():
+                value = value_of(row)
+                alert = active.get(pid)
+                if alert is not None:
+                    alert["peak"] = worst(alert["peak"], value)
+                    continue
+                if not armed(value, rule.threshold):
+                    continue
+                streak = streaks.get(pid, 0) + 1
+                if streak < rule.ticks:
+                    pending[pid] = streak
+                    continue
+                last = self._fired.get((i, pid))
+                if last is not None and now - last < rule.cooldown:
+                    self.suppressed += 1
+                    pending[pid] = streak
+                    continue
+                if rule.cooldown:
+                    self._fired[(i, pid)] = now
+                active[pid] = alert = {"pid": pid, "name": row.name, "since": now, "peak": value}
+                events.append(self._event("firing", rule, alert, now, value))
+                self.fired += 1
+            for pid in [pid for pid in active if pid not in past]:
+                alert = active.pop(pid)
+                events.append(self._event("resolved", rule, alert, now))
+                self.resolved += 1
+            self._streaks[i] = pending
+        if len(self._fired) > 2 * self._fired_kept:
+            # Forget firings whose cooldown is over, as PIDs come and go.
+            self._fired = {key: at for key, at in self._fired.items() if now - at < self.rules[key[0]].cooldown}
+            self._fired_kept = max(len(self._fired), 64)
+        self.ticks += 1
+        self.last_ms = (time.perf_counter() - started) * 1000
+        self.max_ms = max(self.max_ms, self.last_ms)
+        return events
+
+    @staticmethod
+    def _event(state: str, rule: Rule, alert: dict, now: float, value=None) -> dict:
+        return {
+            "time": datetime.fromtimestamp(now).isoformat(timespec="seconds"), "state": state,
+            "rule": rule.label, "metric": rule.metric, "pid": alert["pid"], "name": alert["name"],
+            "value": value, "peak": alert["peak"], "threshold": rule.threshold if state == "firing" else rule.clear,
+            "duration": round(now - alert["since"], 3),
+        }
+
+
+def format_event(event: dict) -> str:
+    """One human-readable line for an alert event."""
+    fmt = (lambda v: format_bytes(v) + "/s") if METRICS[event["metric"]][2] else "{:g}".format
+    line = f"{event['time']} {event['state'].upper():8} {event['rule']}: {event['name']} (pid {event['pid']}) "
+    if event["state"] == "firing":
+        return line + f"{event['metric']}={fmt(event['value'])}, threshold {fmt(event['threshold'])}"
+    return (line + f"{event['metric']} back to {fmt(event['threshold'])} after {event['duration']:g}s, "
+            f"peak {fmt(event['peak'])}")
+
+
+class StdoutSink:
+    """Print one line per alert."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, events: list):
+        stream = self.stream or sys.stdout
+        for event in events:
+            stream.write(format_event(event) + "\n")
+        stream.flush()
+
+    def close(self):
+        pass
+
+    def __str__(self):
+        return "stdout"
+
+
+class FileSink:
+    """Append alerts to ``path`` as JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def emit(self, events: list):
+        self._file.write("".join(json.dumps(event) + "\n" for event in events))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __str__(self):
+        return self.path
+
+
+class WebhookSink:
+    """POST ``{"alerts": [...]}`` per tick to ``url`` from a background thread.
+
+    At most ``backlog`` ticks wait for delivery; beyond that they are dropped
+    and counted, as are failed posts.
+    """
+
+    def __init__(self, url: str, timeout: float = 2.0, backlog: int = 100):
+        self.url = url
+        self.timeout = timeout
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.error = None
+        self._queue = queue.Queue(backlog)
+        self._thread = threading.Thread(target=self._run, name="netmonitor-webhook", daemon=True)
+        self._thread.start()
+
+    def emit(self, events: list):
+        try:
+            self._queue.put_nowait(json.dumps({"alerts": events}).encode("utf-8"))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            body = self._queue.get()
+            if body is None:
+                return
+            request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                self.sent += 1
+            except OSError as exc:
+                self.failed += 1
+                self.error = str(exc)
+
+    def close(self, timeout: float = None):
+        """Deliver what is queued (waiting up to ``timeout``) and stop."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def __str__(self):
+        return self.url
+
+
+def make_sink(text: str):
+    """A sink from ``stdout`` (or ``-``), an ``http(s)://`` URL, or ``file:PATH``/a path."""
+    if text in ("stdout", "-"):
+        return StdoutSink()
+    if text.startswith(("http://", "https://")):
+        return WebhookSink(text)
+    return FileSink(text[5:] if text.startswith("file:") else text)
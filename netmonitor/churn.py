@@ -0,0 +1,235 @@
+"""Connection churn: sockets opened and closed between ticks, and TIME_WAIT build-up.
+
+Every socket is reduced to a 64-bit hash of its 5-tuple (table, local and
+remote address and port), so a tick's socket set is a set of ints. The
+tracker keeps one key -> owner map, updated in place from each tick's keys,
+and only materializes the changes:
+
+* a key not seen last tick was **opened**;
+* a key that was open last tick and is gone or has moved to ``TIME_WAIT``
+  was **closed** by the process that owned it, which keeps owning the
+  ``TIME_WAIT`` entry (the kernel drops the inode, so ``/proc`` alone cannot
+  tell whose it is);
+* a key first seen already in ``TIME_WAIT`` was opened and closed within
+  one tick; it counts system-wide only.
+
+Sockets without a known owner (other users' processes) use PID 0 and only
+appear in the system-wide totals.
+
+The hash is a fixed 64-bit mix of the tuple's bytes, not the interpreter's
+randomized ``hash()``: the NumPy and pure-Python parsers, sock_diag dumps and
+separate processes all give a socket the same key.
+"""
+import socket
+import struct
+import time
+from collections import Counter
+from typing import Callable
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None
+
+TIME_WAIT = 0x06
+CHURN_FIELDS = ["opened_s", "closed_s", "time_wait"]
+
+_M1 = 0x9E3779B97F4A7C15
+_M2 = 0xBF58476D1CE4E5B9
+
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+# Address words as the NumPy path reads them: one native u32 for IPv4, two
+# native u64 for IPv6.
+_WORDS = {4: struct.Struct("=I"), 16: struct.Struct("=QQ")}
+
+
+def _mix_np(h, column):
+    h = (h ^ column) * np.uint64(_M2)
+    return h ^ (h >> np.uint64(31))
+
+
+def _table_id(family: int, type_: int, salt: int = 0) -> int:
+    return (salt << 8 | family << 4 | type_) & _MASK
+
+
+def _key(table_id: int, laddr_words, raddr_words, ports: int) -> int:
+    h = (table_id + 1) * _M1 & _MASK
+    for lword, rword in zip(laddr_words, raddr_words):
+        h = (h ^ lword) * _M2 & _MASK
+        h ^= h >> 31
+        h = (h ^ rword) * _M2 & _MASK
+        h ^= h >> 31
+    h = (h ^ ports) * _M2 & _MASK
+    return h ^ (h >> 31)
+
+
+def socket_key(family: int, type_: int, laddr: bytes, lport: int, raddr: bytes, rport: int, salt: int = 0) -> int:
+    """The :func:`table_keys` key of one socket from its packed network-order addresses."""
+    words = _WORDS[len(laddr)]
+    return _key(_table_id(family, type_, salt), words.unpack(laddr), words.unpack(raddr), lport << 16 | rport)
+
+
+def table_keys(table, salt: int = 0) -> list:
+    """Hashed 5-tuple keys for every row of a :class:`~netmonitor.procnet.SocketTable`.
+
+    The protocol part of the tuple is the table's family and type; ``salt``
+    (a network namespace inode) keeps equal tuples in different namespaces
+    apart. Both parser backends give the same keys.
+    """
+    n = len(table)
+    table_id = _table_id(table.family, table.type, salt)
+    if np is not None and isinstance(table.lport, np.ndarray):
+        words = table.width // 8 or 1
+        dtype = np.uint64 if table.width == 16 else np.uint32
+        laddr = np.frombuffer(table.laddr, dtype=dtype).reshape(n, words).astype(np.uint64)
+        raddr = np.frombuffer(table.raddr, dtype=dtype).reshape(n, words).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            h = np.full(n, (table_id + 1) * _M1 & _MASK, dtype=np.uint64)
+            for i in range(words):
+                h = _mix_np(h, laddr[:, i])
+                h = _mix_np(h, raddr[:, i])
+            ports = (table.lport.astype(np.uint64) << np.uint64(16)) | table.rport.astype(np.uint64)
+            h = _mix_np(h, ports)
+        return h.tolist()
+    words = _WORDS[table.width]
+    laddr, raddr = words.iter_unpack(bytes(table.laddr)), words.iter_unpack(bytes(table.raddr))
+    return [_key(table_id, lwords, rwords, lport << 16 | rport)
+            for lwords, rwords, lport, rport in zip(laddr, raddr, table.lport, table.rport)]
+
+
+def table_time_wait(table) -> list:
+    """Per-row flags: True where a TCP socket is in ``TIME_WAIT``."""
+    if table.type != socket.SOCK_STREAM:
+        return [False] * len(table)
+    if np is not None and isinstance(table.state, np.ndarray):
+        return (table.state == TIME_WAIT).tolist()
+    return [state == TIME_WAIT for state in table.state]
+
+
+class ChurnSample:
+    """What changed between two ticks; counts are per PID (0 = unknown owner)."""
+
+    __slots__ = ("elapsed", "opened", "closed", "time_wait", "sockets", "time_wait_total", "time_wait_delta")
+
+    def __init__(self, elapsed, opened, closed, time_wait, sockets, time_wait_total, time_wait_delta):
+        self.elapsed = elapsed
+        self.opened = opened
+        self.closed = closed
+        self.time_wait = time_wait
+        self.sockets = sockets
+        self.time_wait_total = time_wait_total
+        self.time_wait_delta = time_wait_delta
+
+    def row(self, *pids) -> dict:
+        """The churn columns for one process, or summed over several."""
+        per_s = 1 / self.elapsed if self.elapsed > 0 else 0.0
+        opened, closed, time_wait = self.opened.get, self.closed.get, self.time_wait.get
+        return {
+            "opened_s": round(sum(opened(pid, 0) for pid in pids) * per_s, 2),
+            "closed_s": round(sum(closed(pid, 0) for pid in pids) * per_s, 2),
+            "time_wait": sum(time_wait(pid, 0) for pid in pids),
+        }
+
+    def system(self) -> dict:
+        """System-wide rates, including sockets whose owner is unknown."""
+        per_s = 1 / self.elapsed if self.elapsed > 0 else 0.0
+        return {
+            "opened_s": sum(self.opened.values()) * per_s,
+            "closed_s": sum(self.closed.values()) * per_s,
+            "time_wait": self.time_wait_total,
+            "time_wait_s": self.time_wait_delta * per_s,
+            "sockets": self.sockets,
+        }
+
+    def caption(self) -> str:
+        s = self.system()
+        return (f"Churn: {s['opened_s']:,.1f}/s opened, {s['closed_s']:,.1f}/s closed, "
+                f"{s['time_wait']:,} TIME_WAIT ({s['time_wait_s']:+,.1f}/s) of {s['sockets']:,} sockets")
+
+
+class ChurnTracker:
+    """Diff successive socket sets; :meth:`update` returns a :class:`ChurnSample`.
+
+    The latest sample stays available as :attr:`last`, so collectors can feed
+    the tracker as a side effect and the display reads it afterwards.
+    """
+
+    def __init__(self, clock: Callable = time.monotonic):
+        self.clock = clock
+        self._live = {}  # key -> pid of sockets not in TIME_WAIT
+        self._closing = set()  # keys in TIME_WAIT
+        self._seen = {}  # key -> number of the last tick it was in
+        self._tw_owner = {}  # TIME_WAIT key -> pid that closed it
+        self._ticks = 0
+        self._stamp = None
+        self.last = None
+
+    def update(self, keys, pids, time_wait):
+        """Feed one tick of parallel ``keys``/``pids``/``time_wait`` sequences.
+
+        The socket state is updated in place and only changes are counted,
+        so a tick allocates in proportion to the churn, not to the number of
+        sockets. Returns None on the first tick, which only sets the baseline.
+        """
+        now = self.clock()
+        elapsed = now - self._stamp if self._stamp is not None else 0.0
+        self._stamp = now
+        self._ticks += 1
+        tick, baseline = self._ticks, self._ticks == 1
+        live, closing, seen, tw_owner = self._live, self._closing, self._seen, self._tw_owner
+        previous_closing = len(closing)
+        opened, closed = Counter(), Counter()
+        for key, pid, tw in zip(keys, pids, time_wait):
+            known = key in seen
+            seen[key] = tick
+            if tw:
+                if key in closing:
+                    continue
+                closing.add(key)
+                owner = live.pop(key, None)
+                if owner is not None:
+                    closed[owner] += 1
+                    if owner:
+                        tw_owner[key] = owner
+                elif not known and not baseline:
+                    # Opened and closed within one tick.
+                    opened[0] += 1
+                    closed[0] += 1
+            elif key in live:
+                live[key] = pid or 0
+            else:
+                live[key] = pid or 0
+                if key in closing:
+                    # The same 5-tuple reused out of TIME_WAIT.
+                    closing.discard(key)
+                    tw_owner.pop(key, None)
+                elif not baseline:
+                    opened[pid or 0] += 1
+        # Keys missing from this tick still carry an older tick number.
+        for key in [key for key, last in seen.items() if last != tick]:
+            del seen[key]
+            owner = live.pop(key, None)
+            if owner is not None:
+                closed[owner] += 1
+            else:
+                closing.discard(key)
+                tw_owner.pop(key, None)
+        if baseline:
+            return None
+        sample = ChurnSample(elapsed, opened, closed, Counter(tw_owner.values()), len(live) + len(closing),
+                             len(closing), len(closing) - previous_closing)
+        self.last = sample
+        return sample
+
+    def observe_tables(self, tables: dict, owner_of):
+        """Update from parsed ``/proc/net`` tables; ``owner_of(inode)`` gives ``(pid, start)`` or None.
+
+        Tables keyed ``(netns, name)`` are salted with their namespace.
+        """
+        keys, pids, time_wait = [], [], []
+        for name, table in tables.items():
+            keys += table_keys(table, name[0] if isinstance(name, tuple) else 0)
+            pids += [(owner or (0,))[0] for owner in map(owner_of, table.inode.tolist())]
+            time_wait += table_time_wait(table)
+        return self.update(keys, pids, time_wait)
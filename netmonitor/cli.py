@@ -1,8 +1,9 @@
+# Keep module-level imports light: `--version`, `--help` and health checks
+# must not pay for psutil, Rich Live/Table or the collectors. Each command
+# imports what it needs from netmonitor.core/monitor inside its body
+# (tests/test_startup.py enforces this and a startup-time budget).
 import typer
-from typing import Optional
-from rich.console import Console
-from netmonitor.monitor import show_top_processes, live_monitor
-from netmonitor import core
+from typing import List, Optional
 
 
 app = typer.Typer(
@@ -12,7 +13,6 @@ app = typer.Typer(
 )
 
 __version__ = "0.1.2"
-console = Console()
 
 
 @app.callback()
@@ -23,7 +23,7 @@ def main(
         "-v",
         help="Show version and exit.",
         is_eager=True,
-        callback=lambda v: (console.print(f"NetMonitor 🚀 v{__version__}") or raise_exit()) if v else None
+        callback=lambda v: (typer.echo(f"NetMonitor 🚀 v{__version__}") or raise_exit()) if v else None
     )
 ):
     pass
@@ -34,16 +34,26 @@ def raise_exit():
 
 @app.command(help="📊 Show top processes by bandwidth or connection count.")
 def top(
-    delay: float = typer.Option(1.0, "--delay", "-d", help="Sampling delay in seconds (for bandwidth mode).", show_default=True),
+    delay: float = typer.Option(1.0, "--delay", "-d", help="Sampling delay in seconds (rates and connection churn are measured over it).", show_default=True),
     top_n: int = typer.Option(10, "--top", "-t", help="Number of processes to display.", show_default=True),
     export: Optional[str] = typer.Option(None, "--export", "-e", help="Export format: json or csv."),
     output: Optional[str] = typer.Option(None, "--output", "-o", help="Output file path for export."),
     sort: Optional[str] = typer.Option("total", "--sort", "-s", help="Sort by field: total, recv, sent, count, etc."),
+    no_daemon: bool = typer.Option(False, "--no-daemon", help="Collect in-process even if a daemon is running."),
+    workers: int = typer.Option(1, "--workers", "-w", help="Shard /proc scanning across this many workers.", show_default=True),
+    group_by: str = typer.Option("process", "--group-by", "-g", help="Aggregate rows by process, netns or cgroup.", show_default=True),
+    filter_expr: Optional[str] = typer.Option(None, "--filter", "-f", help="Filter expression, e.g. \"proto==tcp and rport==443\"."),
 ):
     """One-shot snapshot of top network consumers."""
     if export and export.lower() not in ("json", "csv"):
         typer.echo("❌ Invalid export format. Use 'json' or 'csv'.")
         raise typer.Exit(code=1)
+    if workers < 1:
+        typer.echo("❌ --workers must be at least 1.")
+        raise typer.Exit(code=1)
+
+    group_by = _check_group_by(group_by)
+    _check_filter(filter_expr)
 
     from netmonitor.monitor import show_top_processes
     show_top_processes(
@@ -51,9 +61,29 @@ def top(
         top_n=top_n,
         export=export.lower() if export else None,
         output=output,
-        sort=sort.lower() if sort else "total"
+        sort=sort.lower() if sort else "total",
+        use_daemon=not no_daemon,
+        workers=workers,
+        group_by=group_by,
+        filter_expr=filter_expr,
     )
 
+
+def _check_filter(expression: Optional[str], status: str = None, protocol: str = None, process: str = None):
+    from netmonitor.filters import FilterError, combine
+    try:
+        combine(expression, status, protocol, process)
+    except FilterError as exc:
+        typer.echo(f"❌ Invalid filter: {exc}.")
+        raise typer.Exit(code=1)
+
+def _check_group_by(group_by: str) -> str:
+    from netmonitor.namespaces import GROUP_BY
+    if group_by.lower() not in GROUP_BY:
+        typer.echo(f"❌ Invalid --group-by. Use one of: {', '.join(GROUP_BY)}.")
+        raise typer.Exit(code=1)
+    return group_by.lower()
+
 @app.command(help="📡 Live monitor network activity with optional filters.")
 def live(
     refresh_interval: float = typer.Option(1.0, "--interval", "-i", help="Refresh interval (sec)", show_default=True),
@@ -63,12 +93,274 @@ def live(
     export: Optional[str] = typer.Option(None, "--export", "-e", help="Export format on exit: json or csv"),
     output: Optional[str] = typer.Option(None, "--output", "-o", help="Output filename (optional, auto-timestamped if omitted)"),
     protocol: Optional[str] = typer.Option(None, "--protocol", help="Filter by protocol: tcp or udp"),
+    stream: Optional[str] = typer.Option(None, "--stream", help="Write every tick while running: ndjson or csv"),
+    stream_output: Optional[str] = typer.Option(None, "--stream-output", help="Stream file path (auto-timestamped if omitted)"),
+    rotate_mb: Optional[float] = typer.Option(None, "--rotate-size", help="Start a new stream file after this many MB"),
+    rotate_seconds: Optional[float] = typer.Option(None, "--rotate-every", help="Start a new stream file every N seconds"),
+    gzip_stream: bool = typer.Option(False, "--gzip", help="Gzip-compress stream files"),
+    no_daemon: bool = typer.Option(False, "--no-daemon", help="Collect in-process even if a daemon is running"),
+    profile: bool = typer.Option(False, "--profile", help="Show per-stage timings in the caption and a summary on exit"),
+    profile_output: Optional[str] = typer.Option(None, "--profile-output", help="Write the profile on exit: *.json summary, else cProfile pstats (implies --profile)"),
+    workers: int = typer.Option(1, "--workers", "-w", help="Shard /proc scanning across this many workers", show_default=True),
+    no_resolve: bool = typer.Option(False, "--no-resolve", "-n", help="Show remote IPs without reverse DNS lookups"),
+    ifaces: bool = typer.Option(False, "--ifaces", help="Add a per-interface throughput panel below the table"),
+    iface_interval: float = typer.Option(0.1, "--iface-interval", help="Interface panel sampling interval (sec), independent of --interval", show_default=True),
+    group_by: str = typer.Option("process", "--group-by", "-g", help="Aggregate rows by process, netns or cgroup", show_default=True),
+    filter_expr: Optional[str] = typer.Option(None, "--filter", "-f", help="Filter expression, e.g. \"proto==tcp and status in (ESTABLISHED,SYN_SENT) and name~^nginx\""),
+    max_cpu: Optional[str] = typer.Option(None, "--max-cpu", help="CPU budget for collection, e.g. 2%; stretches --interval to stay within it"),
 ):
     """Live monitor network usage or active connections by process."""
+    if stream and stream.lower() not in ("ndjson", "csv"):
+        typer.echo("❌ Invalid stream format. Use 'ndjson' or 'csv'.")
+        raise typer.Exit(code=1)
+    if workers < 1:
+        typer.echo("❌ --workers must be at least 1.")
+        raise typer.Exit(code=1)
+    if ifaces and not MIN_IFACE_INTERVAL <= iface_interval <= MAX_IFACE_INTERVAL:
+        typer.echo(f"❌ --iface-interval must be between {MIN_IFACE_INTERVAL:g} and {MAX_IFACE_INTERVAL:g} seconds.")
+        raise typer.Exit(code=1)
+    group_by = _check_group_by(group_by)
+    _check_filter(filter_expr, status, protocol, process)
+    budget = None
+    if max_cpu is not None:
+        from netmonitor.scheduler import parse_budget
+        try:
+            budget = parse_budget(max_cpu)
+        except ValueError:
+            typer.echo(f"❌ Invalid --max-cpu '{max_cpu}'. Use a percentage between 0 and 100, e.g. 2%.")
+            raise typer.Exit(code=1)
+
     from netmonitor.monitor import live_monitor
-    live_monitor(refresh_interval, top_n, status, process, export, output, protocol)
+    live_monitor(refresh_interval, top_n, status, process, export, output, protocol,
+                 stream=stream.lower() if stream else None, stream_output=stream_output,
+                 rotate_mb=rotate_mb, rotate_seconds=rotate_seconds, gzip_stream=gzip_stream,
+                 use_daemon=not no_daemon, profile=profile, profile_output=profile_output, workers=workers,
+                 resolve=not no_resolve, iface_interval=iface_interval if ifaces else None, group_by=group_by,
+                 max_cpu=budget, filter_expr=filter_expr)
+
+
+MIN_IFACE_INTERVAL, MAX_IFACE_INTERVAL = 0.01, 10.0
+
+
+@app.command(help="🔌 Per-interface throughput sampled at high frequency (10-100 ms).")
+def ifaces(
+    interval: float = typer.Option(0.1, "--interval", "-i", help="Counter sampling interval (sec)", show_default=True),
+    refresh: float = typer.Option(0.25, "--refresh", "-r", help="Screen refresh interval (sec)", show_default=True),
+    once: bool = typer.Option(False, "--once", help="Sample for --duration, print the table and exit"),
+    duration: float = typer.Option(1.0, "--duration", "-d", help="Sampling time for --once (sec)", show_default=True),
+    export: Optional[str] = typer.Option(None, "--export", "-e", help="Export format on exit: json or csv"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output filename (optional, auto-timestamped if omitted)"),
+):
+    """Interface counters with rolling 1s/10s/60s rates and wrap handling."""
+    if export and export.lower() not in ("json", "csv"):
+        typer.echo("❌ Invalid export format. Use 'json' or 'csv'.")
+        raise typer.Exit(code=1)
+    if not MIN_IFACE_INTERVAL <= interval <= MAX_IFACE_INTERVAL or refresh <= 0:
+        typer.echo(f"❌ --interval must be between {MIN_IFACE_INTERVAL:g} and {MAX_IFACE_INTERVAL:g} seconds "
+                   "and --refresh positive.")
+        raise typer.Exit(code=1)
+    from netmonitor.core import ifaces_view
+    ifaces_view(interval, refresh, once, duration, export.lower() if export else None, output)
+
+
+@app.command(help="🌐 Top remote endpoints and subnets across all processes, in fixed memory.")
+def remotes(
+    refresh_interval: float = typer.Option(1.0, "--interval", "-i", help="Sampling interval (sec)", show_default=True),
+    top_n: int = typer.Option(15, "--top", "-t", help="Rows per table", show_default=True),
+    capacity: int = typer.Option(1000, "--capacity", "-k", help="Counters per table; counts are exact to within total/k", show_default=True),
+    v4_prefix: int = typer.Option(24, "--v4-prefix", help="IPv4 subnet prefix length", show_default=True),
+    v6_prefix: int = typer.Option(64, "--v6-prefix", help="IPv6 subnet prefix length", show_default=True),
+    once: bool = typer.Option(False, "--once", help="Sample once, print the tables and exit"),
+    export: Optional[str] = typer.Option(None, "--export", "-e", help="Export format on exit: json or csv"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output filename (optional, auto-timestamped if omitted)"),
+):
+    """Heavy-hitter remote endpoints tracked with Space-Saving counters."""
+    if export and export.lower() not in ("json", "csv"):
+        typer.echo("❌ Invalid export format. Use 'json' or 'csv'.")
+        raise typer.Exit(code=1)
+    if capacity < 1 or not 0 <= v4_prefix <= 32 or not 0 <= v6_prefix <= 128:
+        typer.echo("❌ --capacity must be at least 1 and prefixes within 0-32 (IPv4) / 0-128 (IPv6).")
+        raise typer.Exit(code=1)
+    from netmonitor.core import remotes_view
+    remotes_view(refresh_interval, top_n, capacity, v4_prefix, v6_prefix, once,
+                 export.lower() if export else None, output)
+
 
+@app.command(help="⏺️ Record every sample to compact segmented files for later replay.")
+def record(
+    directory: str = typer.Argument(..., help="Recording directory (created if missing)."),
+    refresh_interval: float = typer.Option(1.0, "--interval", "-i", help="Sampling interval (sec)", show_default=True),
+    duration: Optional[float] = typer.Option(None, "--duration", "-d", help="Stop after this many seconds."),
+    segment_mb: float = typer.Option(8.0, "--segment-size", help="Rotate segments at this size (MB).", show_default=True),
+):
+    """Append each collector tick to a recording directory."""
+    from netmonitor.core import record_session
+    try:
+        record_session(directory, refresh_interval, duration, segment_mb)
+    except ValueError as exc:
+        typer.echo(f"❌ Cannot record: {exc}.")
+        raise typer.Exit(code=1)
+
+@app.command(help="📈 Serve per-process metrics for Prometheus at /metrics.")
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Address to listen on.", show_default=True),
+    port: int = typer.Option(9180, "--port", help="Port to listen on.", show_default=True),
+    refresh_interval: float = typer.Option(5.0, "--interval", "-i", help="Collection interval (sec)", show_default=True),
+    top_n: int = typer.Option(20, "--top", "-t", help="PIDs exported individually; the rest are summed as pid=\"other\"", show_default=True),
+):
+    """Collect on a fixed schedule and serve cached metrics to scrapers."""
+    from netmonitor.core import serve_metrics
+    serve_metrics(host, port, refresh_interval, top_n)
 
+@app.command(help="🛰️ Run one shared collector that top/live attach to over a Unix socket.")
+def daemon(
+    socket_path: Optional[str] = typer.Option(None, "--socket", help="Socket path (default: $NETMONITOR_SOCKET or the runtime dir)."),
+    refresh_interval: float = typer.Option(1.0, "--interval", "-i", help="Collection interval (sec)", show_default=True),
+):
+    """Collect once for every local top/live client."""
+    from netmonitor.core import run_daemon
+    from netmonitor.daemon import DaemonError
+    try:
+        run_daemon(socket_path, refresh_interval)
+    except DaemonError as exc:
+        typer.echo(f"❌ {exc}")
+        raise typer.Exit(code=1)
+
+@app.command(help="📤 Stream this host's per-tick deltas over TCP to 'netmonitor aggregate'. "
+                  "Deltas list every process's connections in plain TCP: the agent only listens on loopback "
+                  "unless given a --token, which aggregators must then present.")
+def agent(
+    listen: str = typer.Option("127.0.0.1:9190", "--listen", "-l", help="host:port to serve on; a non-loopback address such as 0.0.0.0:9190 needs --token.", show_default=True),
+    refresh_interval: float = typer.Option(1.0, "--interval", "-i", help="Collection interval (sec)", show_default=True),
+    token: Optional[str] = typer.Option(None, "--token", envvar="NETMONITOR_TOKEN", help="Shared secret aggregators must prove they hold (sent as an HMAC, never in clear)."),
+):
+    """Collect locally and push changed rows to every subscribed aggregator."""
+    from netmonitor.cluster import is_loopback, parse_address
+    try:
+        host, _ = parse_address(listen)
+    except ValueError as exc:
+        typer.echo(f"❌ Invalid --listen: {exc}.")
+        raise typer.Exit(code=1)
+    if not token and not is_loopback(host):
+        typer.echo(f"❌ {host} is not a loopback address: set --token (or $NETMONITOR_TOKEN) to serve other hosts.")
+        raise typer.Exit(code=1)
+    from netmonitor.core import run_agent
+    try:
+        run_agent(listen, refresh_interval, token)
+    except OSError as exc:
+        typer.echo(f"❌ Cannot listen on {listen}: {exc.strerror or exc}.")
+        raise typer.Exit(code=1)
+
+@app.command(help="🧭 Merge many agents into one cluster-wide view with per-host columns.")
+def aggregate(
+    agents: List[str] = typer.Argument(..., help="Agents as host[:port] (default port 9190)."),
+    refresh_interval: float = typer.Option(1.0, "--interval", "-i", help="Merge and repaint interval (sec)", show_default=True),
+    top_n: int = typer.Option(15, "--top", "-t", help="Max number of rows", show_default=True),
+    kind: str = typer.Option("bandwidth", "--kind", "-k", help="What agents stream: bandwidth or connections.", show_default=True),
+    by_name: bool = typer.Option(False, "--by-name", help="One row per process name with a column per agent"),
+    once: bool = typer.Option(False, "--once", help="Wait for every agent, print one table and exit"),
+    timeout: float = typer.Option(5.0, "--timeout", help="Connect timeout, and how long --once waits (sec)", show_default=True),
+    export: Optional[str] = typer.Option(None, "--export", "-e", help="Export format on exit: json or csv"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output filename (optional, auto-timestamped if omitted)"),
+    token: Optional[str] = typer.Option(None, "--token", envvar="NETMONITOR_TOKEN", help="Shared secret of agents started with --token."),
+):
+    """Cluster-wide top/live over the deltas streamed by 'netmonitor agent'."""
+    if kind.lower() not in ("bandwidth", "connections"):
+        typer.echo("❌ Invalid --kind. Use 'bandwidth' or 'connections'.")
+        raise typer.Exit(code=1)
+    if export and export.lower() not in ("json", "csv"):
+        typer.echo("❌ Invalid export format. Use 'json' or 'csv'.")
+        raise typer.Exit(code=1)
+    from netmonitor.cluster import parse_address
+    try:
+        for address in agents:
+            parse_address(address)
+    except ValueError as exc:
+        typer.echo(f"❌ Invalid agent address: {exc}.")
+        raise typer.Exit(code=1)
+    from netmonitor.core import aggregate_view
+    aggregate_view(agents, refresh_interval, top_n, kind.lower(), by_name, once, timeout,
+                   export.lower() if export else None, output, token)
+
+@app.command(help="🚨 Raise alerts when processes cross connection or bandwidth thresholds.")
+def alert(
+    rules: Optional[List[str]] = typer.Argument(None, help="Rules, e.g. \"conns > 500\" or \"close_wait >= 20 for 3 cooldown 5m\"."),
+    rules_file: Optional[str] = typer.Option(None, "--rules", "-r", help="File with one rule per line (# comments)."),
+    sinks: Optional[List[str]] = typer.Option(None, "--sink", "-s", help="stdout, a JSON-lines file (file:PATH) or an http:// webhook; repeatable. Default: stdout."),
+    refresh_interval: float = typer.Option(1.0, "--interval", "-i", help="Evaluation interval (sec)", show_default=True),
+    duration: Optional[float] = typer.Option(None, "--duration", help="Stop after this many seconds"),
+    workers: int = typer.Option(1, "--workers", "-w", help="Shard /proc scanning across this many workers", show_default=True),
+):
+    """Evaluate threshold rules on every tick and emit firing/resolved alerts."""
+    from netmonitor.alerts import RuleError, parse_rule, parse_rules
+    try:
+        compiled = [parse_rule(rule) for rule in rules or ()]
+        if rules_file:
+            with open(rules_file, encoding="utf-8") as f:
+                compiled += parse_rules(f)
+    except RuleError as exc:
+        typer.echo(f"❌ Invalid rule: {exc}.")
+        raise typer.Exit(code=1)
+    except OSError as exc:
+        typer.echo(f"❌ Cannot read {rules_file}: {exc.strerror or exc}.")
+        raise typer.Exit(code=1)
+    if not compiled:
+        typer.echo("❌ No rules. Pass rules as arguments or with --rules FILE.")
+        raise typer.Exit(code=1)
+    if workers < 1:
+        typer.echo("❌ --workers must be at least 1.")
+        raise typer.Exit(code=1)
+    from netmonitor.utils import supports_per_process_network_io
+    if any(rule.source == "bandwidth" for rule in compiled) and not supports_per_process_network_io():
+        typer.echo("❌ sent/recv/bytes rules need per-process bandwidth, which this platform does not provide.")
+        raise typer.Exit(code=1)
+    from netmonitor.core import alert_monitor
+    try:
+        alert_monitor(compiled, sinks or ["stdout"], refresh_interval, duration, workers)
+    except OSError as exc:
+        typer.echo(f"❌ Cannot open sink: {exc.strerror or exc}.")
+        raise typer.Exit(code=1)
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        typer.echo(f"❌ Invalid time '{value}'. Use epoch seconds or ISO format (2024-05-01T12:00:00).")
+        raise typer.Exit(code=1)
+
+@app.command(help="⏯️ Replay a recording through the top or live tables.")
+def replay(
+    directory: str = typer.Argument(..., help="Recording directory written by 'netmonitor record'."),
+    mode: str = typer.Option("live", "--mode", "-m", help="Replay as 'live' (animated) or 'top' (one table).", show_default=True),
+    start: Optional[str] = typer.Option(None, "--start", help="Start time (epoch seconds or ISO format)."),
+    end: Optional[str] = typer.Option(None, "--end", help="End time (epoch seconds or ISO format)."),
+    speed: float = typer.Option(1.0, "--speed", help="Playback speed multiplier; 0 plays as fast as possible.", show_default=True),
+    top_n: int = typer.Option(15, "--top", "-t", help="Max number of processes", show_default=True),
+    export: Optional[str] = typer.Option(None, "--export", "-e", help="Export format for --mode top: json or csv."),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output file path for export."),
+    sort: Optional[str] = typer.Option(None, "--sort", "-s", help="Sort field for --mode top."),
+):
+    """Replay recorded samples without re-sampling the host."""
+    if mode not in ("live", "top"):
+        typer.echo("❌ Invalid mode. Use 'live' or 'top'.")
+        raise typer.Exit(code=1)
+    if export and export.lower() not in ("json", "csv"):
+        typer.echo("❌ Invalid export format. Use 'json' or 'csv'.")
+        raise typer.Exit(code=1)
+    from netmonitor.core import replay_session
+    try:
+        replay_session(directory, mode, _parse_time(start), _parse_time(end), speed, top_n,
+                       export.lower() if export else None, output, sort.lower() if sort else None)
+    except (OSError, ValueError) as exc:
+        typer.echo(f"❌ Cannot replay: {exc}.")
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,445 @@
+"""Multi-host fan-in: ``netmonitor agent`` streams, ``netmonitor aggregate`` merges.
+
+An agent collects on its own host and serves a TCP port. An aggregator
+connects to every agent, subscribes to one kind (``bandwidth`` or
+``connections``, as in :data:`~netmonitor.recording.SCHEMAS`) and is then
+pushed one frame per tick. Frames are framed as for the daemon (4-byte
+big-endian length, one type byte):
+
+* ``CHALLENGE`` (agent, on connect): a random nonce
+* ``SUBSCRIBE`` (aggregator): ``<kind>`` NUL ``<hex HMAC-SHA256 of the nonce>``
+  keyed with the shared token (empty without one)
+* ``HELLO`` (agent): ``<hostname>;<interval>;<kind>``, or ``ERROR``
+* ``DELTA`` (agent, every tick): ``<varint seq>`` then :class:`DeltaCodec`
+  records
+
+Unlike the daemon's :class:`~netmonitor.recording.TickCodec`, which sends
+every row of every tick, a delta only carries the rows that changed since
+the last frame on that connection, and the PIDs that went away. Integer
+columns are zigzag deltas against the last value sent and text columns are
+interned, so an idle process costs nothing and a busy one a few bytes. The
+first frame on a connection holds every row.
+
+An agent only collects the kinds someone is subscribed to.
+
+Frames are plain TCP and list every process's connections, so an agent
+binds to loopback unless it has a token (``--token`` / ``$NETMONITOR_TOKEN``);
+with a token it only serves aggregators that prove they hold it, and the
+token itself never crosses the wire.
+"""
+import hashlib
+import hmac
+import ipaddress
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from netmonitor.daemon import ERROR, CollectorState, DaemonError, _HEADER, recv_frame, send_frame
+from netmonitor.recording import SCHEMAS, STRING, _get_varint, _put_varint, _unzigzag, _zigzag
+from netmonitor.records import ByteTotals, ConnectionRow
+
+SUBSCRIBE = 0x10
+HELLO = 0x11
+DELTA = 0x12
+CHALLENGE = 0x13
+DEFAULT_PORT = 9190
+TOKEN_ENV = "NETMONITOR_TOKEN"
+# How long a new connection has to authenticate and subscribe.
+HANDSHAKE_TIMEOUT = 10.0
+# Codec record holding one tick's changed and removed rows.
+CHANGES = 0x03
+
+_MAKE_ROW = {
+    "bandwidth": lambda pid, sent, recv, name: ByteTotals(name, sent, recv),
+    "connections": lambda pid, total, tcp, udp, remote_hosts, name, top_remote, status_summary: ConnectionRow(
+        pid, name, total, tcp, udp, remote_hosts, top_remote, status_summary),
+}
+
+
+def parse_address(text: str, default_port: int = DEFAULT_PORT):
+    """``(host, port)`` from ``host``, ``host:port``, ``[v6]:port`` or a bare IPv6 address."""
+    text = text.strip()
+    if text.startswith("["):
+        host, _, rest = text[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else ""
+    elif text.count(":") == 1:
+        host, _, port = text.partition(":")
+    else:
+        host, port = text, ""
+    if not host:
+        raise ValueError(f"no host in {text!r}")
+    if not port:
+        return host, default_port
+    if not port.isdigit() or int(port) > 65535:
+        raise ValueError(f"bad port in {text!r}")
+    return host, int(port)
+
+
+def is_loopback(host: str) -> bool:
+    """True if every address ``host`` resolves to is a loopback address."""
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        pass
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except OSError:
+        return False
+    return bool(infos) and all(ipaddress.ip_address(info[4][0].split("%")[0]).is_loopback for info in infos)
+
+
+def _proof(token: str, nonce: bytes) -> bytes:
+    if not token:
+        return b""
+    return hmac.new(token.encode("utf-8"), nonce, hashlib.sha256).hexdigest().encode("ascii")
+
+
+class DeltaCodec:
+    """Changed-rows-only encoder/decoder for one agent connection.
+
+    The encoder remembers what it last sent per PID (the row object, for a
+    cheap identity check, and its values); the decoder the rows it built. A
+    decoded row is replaced, never updated, when it changes, so consecutive
+    decoded ticks share the objects of unchanged rows.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.ints, self.texts = SCHEMAS[kind]
+        self.strings = {}
+        self.string_list = []
+        self.sent = {}
+        self.values = {}
+        self.rows = {}
+        self.last_us = 0
+
+    def _intern(self, out: bytearray, text: str) -> int:
+        sid = self.strings.get(text)
+        if sid is None:
+            sid = self.strings[text] = len(self.strings)
+            data = text.encode("utf-8")
+            out.append(STRING)
+            _put_varint(out, len(data))
+            out += data
+        return sid
+
+    def encode(self, timestamp: float, rows: dict) -> bytearray:
+        """Encode the rows of ``rows`` (``{pid: row}``) that differ from the last call."""
+        ints, texts, sent = self.ints, self.texts, self.sent
+        changed = []
+        for pid, row in rows.items():
+            last = sent.get(pid)
+            if last is not None and last[0] is row:
+                continue
+            values = tuple(int(row[c]) for c in ints) + tuple(str(row.get(c, "")) for c in texts)
+            if last is None or last[1] != values:
+                changed.append((pid, values, last[1] if last is not None else None))
+            sent[pid] = (row, values)
+        removed = [pid for pid in sent if pid not in rows]
+        for pid in removed:
+            del sent[pid]
+
+        out = bytearray()
+        body = bytearray()
+        ts_us = int(timestamp * 1_000_000)
+        _put_varint(body, _zigzag(ts_us - self.last_us))
+        self.last_us = ts_us
+        _put_varint(body, len(changed))
+        prev_pid = 0
+        width = len(ints)
+        for pid, values, last in sorted(changed, key=lambda change: change[0]):
+            _put_varint(body, _zigzag(pid - prev_pid))
+            prev_pid = pid
+            for i in range(width):
+                _put_varint(body, _zigzag(values[i] - (last[i] if last else 0)))
+            for text in values[width:]:
+                _put_varint(body, self._intern(out, text))
+        _put_varint(body, len(removed))
+        prev_pid = 0
+        for pid in sorted(removed):
+            _put_varint(body, _zigzag(pid - prev_pid))
+            prev_pid = pid
+        out.append(CHANGES)
+        _put_varint(out, len(body))
+        out += body
+        return out
+
+    def decode(self, buf, pos: int, end: int):
+        """Yield ``(timestamp, {pid: row}, changed)`` for each tick in ``buf[pos:end]``."""
+        make, width = _MAKE_ROW[self.kind], len(self.ints)
+        while pos < end:
+            record = buf[pos]
+            length, start = _get_varint(buf, pos + 1)
+            if start + length > end:
+                raise DaemonError("truncated delta")
+            pos = start + length
+            if record == STRING:
+                self.string_list.append(bytes(buf[start:pos]).decode("utf-8"))
+                continue
+            if record != CHANGES:
+                raise DaemonError(f"unknown record type {record}")
+            p = start
+            delta, p = _get_varint(buf, p)
+            self.last_us += _unzigzag(delta)
+            count, p = _get_varint(buf, p)
+            pid = 0
+            for _ in range(count):
+                d, p = _get_varint(buf, p)
+                pid += _unzigzag(d)
+                last = self.values.get(pid)
+                values = []
+                for i in range(width):
+                    d, p = _get_varint(buf, p)
+                    values.append(_unzigzag(d) + (last[i] if last else 0))
+                for _ in self.texts:
+                    sid, p = _get_varint(buf, p)
+                    values.append(self.string_list[sid])
+                self.values[pid] = values
+                self.rows[pid] = make(pid, *values)
+            removed, p = _get_varint(buf, p)
+            pid = 0
+            for _ in range(removed):
+                d, p = _get_varint(buf, p)
+                pid += _unzigzag(d)
+                self.values.pop(pid, None)
+                self.rows.pop(pid, None)
+            yield self.last_us / 1_000_000, dict(self.rows), count
+
+
+class AgentState(CollectorState):
+    """A :class:`~netmonitor.daemon.CollectorState` that skips kinds nobody is subscribed to."""
+
+    def __init__(self, sources: dict, interval: float):
+        super().__init__(sources, interval)
+        self.subscribers = dict.fromkeys(sources, 0)
+        self._lock = threading.Lock()
+
+    def active_kinds(self):
+        return [kind for kind, count in self.subscribers.items() if count]
+
+    def subscribe(self, kind: str, delta: int = 1):
+        with self._lock:
+            self.subscribers[kind] += delta
+
+
+class _AgentHandler(socketserver.BaseRequestHandler):
+    state = None
+    hostname = None
+    token = None
+
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        state = self.state
+        try:
+            sock.settimeout(HANDSHAKE_TIMEOUT)
+            nonce = os.urandom(16)
+            send_frame(sock, CHALLENGE, nonce)
+            type_, payload = recv_frame(sock)
+            kind, _, proof = payload.partition(b"\0")
+            kind = kind.decode("ascii", "replace")
+            if type_ != SUBSCRIBE or not hmac.compare_digest(proof, _proof(self.token, nonce)):
+                send_frame(sock, ERROR, f"{self.hostname}: authentication failed".encode())
+                return
+            if kind not in state.sources:
+                send_frame(sock, ERROR, f"{self.hostname} does not collect '{kind}'".encode())
+                return
+            sock.settimeout(None)
+        except (ConnectionError, OSError, DaemonError, struct.error):
+            return
+        state.subscribe(kind)
+        try:
+            send_frame(sock, HELLO, f"{self.hostname};{state.interval:g};{kind}".encode())
+            codec = DeltaCodec(kind)
+            seq = 0
+            while True:
+                # A slow aggregator skips ticks; deltas are against what it was sent.
+                newer, ticks = state.wait_newer(seq, max(state.interval * 2, 1.0))
+                if newer == seq or kind not in ticks:
+                    continue
+                seq = newer
+                timestamp, rows = ticks[kind]
+                out = bytearray()
+                _put_varint(out, seq)
+                out += codec.encode(timestamp, rows)
+                send_frame(sock, DELTA, bytes(out))
+        except OSError:
+            return
+        finally:
+            state.subscribe(kind, -1)
+
+
+class _AgentServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_agent_server(state: AgentState, listen: str, hostname: str = None, token: str = None) -> _AgentServer:
+    """Bind the agent's TCP port (``host:port``, port 0 picks a free one).
+
+    Raises ValueError for a non-loopback address without a ``token``.
+    """
+    host, port = parse_address(listen)
+    if not token and not is_loopback(host):
+        raise ValueError(f"refusing to serve on non-loopback {host} without a token (--token or ${TOKEN_ENV})")
+    handler = type("Handler", (_AgentHandler,), {"state": state, "hostname": hostname or socket.gethostname(),
+                                                 "token": token or None})
+    server = type("Server", (_AgentServer,), {"address_family": socket.AF_INET6 if ":" in host else socket.AF_INET})
+    return server((host, port), handler)
+
+
+class AgentLink:
+    """One aggregator-side agent connection, read on its own thread.
+
+    Keeps the last two decoded ticks and link counters; reconnects every
+    ``retry`` seconds after an error, which stays in ``error`` until the
+    next frame arrives.
+    """
+
+    def __init__(self, address: str, kind: str, timeout: float = 5.0, retry: float = 2.0,
+                 clock=time.monotonic, on_frame=None, token: str = None):
+        self.address = address
+        self.host, self.port = parse_address(address)
+        self.kind = kind
+        self.token = token
+        self.timeout = timeout
+        self.retry = retry
+        self.clock = clock
+        self.on_frame = on_frame
+        self.hostname = None
+        self.interval = None
+        self.error = None
+        self.connected = False
+        self.prev = self.curr = None
+        self.frames = 0
+        self.changed = 0
+        self.frame_bytes = 0
+        self.bytes_received = 0
+        self.received_at = None
+        self._rate_mark = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sock = None
+        self._thread = threading.Thread(target=self._run, name=f"netmonitor-link-{address}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join(1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._stream()
+            except (OSError, DaemonError, struct.error, ValueError, IndexError) as exc:
+                self.error = str(exc) or type(exc).__name__
+            finally:
+                self.connected = False
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+            self._stop.wait(self.retry)
+
+    def _stream(self):
+        sock = self._sock = socket.create_connection((self.host, self.port), self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        type_, nonce = recv_frame(sock)
+        if type_ != CHALLENGE:
+            raise DaemonError(f"unexpected greeting type {type_}")
+        send_frame(sock, SUBSCRIBE, self.kind.encode("ascii") + b"\0" + _proof(self.token, nonce))
+        type_, payload = recv_frame(sock)
+        if type_ == ERROR:
+            raise DaemonError(payload.decode("utf-8", "replace"))
+        if type_ != HELLO:
+            raise DaemonError(f"unexpected reply type {type_}")
+        hostname, interval, _ = payload.decode("utf-8", "replace").split(";")
+        self.hostname, self.interval = hostname, float(interval)
+        self.connected = True
+        # A few missed ticks in a row means the agent is gone.
+        sock.settimeout(max(self.interval * 5, self.timeout))
+        codec = DeltaCodec(self.kind)
+        while not self._stop.is_set():
+            type_, payload = recv_frame(sock)
+            if type_ == ERROR:
+                raise DaemonError(payload.decode("utf-8", "replace"))
+            if type_ != DELTA:
+                raise DaemonError(f"unexpected frame type {type_}")
+            _seq, pos = _get_varint(payload, 0)
+            for timestamp, rows, changed in codec.decode(payload, pos, len(payload)):
+                with self._lock:
+                    self.prev, self.curr = self.curr, (timestamp, rows)
+                    self.changed = changed
+                    self.frames += 1
+                    self.frame_bytes = _HEADER.size + len(payload)
+                    self.bytes_received += self.frame_bytes
+                    self.received_at = self.clock()
+                    self.error = None
+            if self.on_frame is not None:
+                self.on_frame()
+
+    def snapshot(self):
+        """``(prev, curr, stats)``: the last two ``(timestamp, rows)`` ticks and the link's counters.
+
+        ``link_rate`` is the bytes per second received since the previous call.
+        """
+        now = self.clock()
+        with self._lock:
+            prev, curr = self.prev, self.curr
+            received, frames, changed, frame_bytes, at = (self.bytes_received, self.frames, self.changed,
+                                                          self.frame_bytes, self.received_at)
+        mark, self._rate_mark = self._rate_mark, (now, received)
+        rate = (received - mark[1]) / (now - mark[0]) if mark is not None and now > mark[0] else 0.0
+        status = "ok" if self.connected and self.error is None else (self.error or "connecting")
+        return prev, curr, {
+            "agent": self.address, "host": self.hostname or "", "status": status,
+            "rows": len(curr[1]) if curr else 0, "changed": changed, "frames": frames,
+            "frame_bytes": frame_bytes, "bytes": received, "link_rate": rate,
+            "age": now - at if at is not None else None,
+        }
+
+
+class Cluster:
+    """Links to every agent in ``addresses``, all streaming ``kind`` and authenticating with ``token``."""
+
+    def __init__(self, addresses, kind: str = "bandwidth", timeout: float = 5.0, retry: float = 2.0,
+                 clock=time.monotonic, token: str = None):
+        if kind not in SCHEMAS:
+            raise ValueError(f"unknown kind: {kind}")
+        self.kind = kind
+        self._frames = threading.Condition()
+        self.links = [AgentLink(address, kind, timeout, retry, clock, self._notify, token) for address in addresses]
+
+    def _notify(self):
+        with self._frames:
+            self._frames.notify_all()
+
+    def start(self):
+        for link in self.links:
+            link.start()
+
+    def close(self):
+        for link in self.links:
+            link.close()
+
+    def wait(self, frames: int, timeout: float) -> bool:
+        """Wait until every agent has sent ``frames`` frames; False on timeout."""
+        with self._frames:
+            return self._frames.wait_for(lambda: all(link.frames >= frames for link in self.links), timeout)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,225 @@
+"""System-wide connection collection: one socket-table dump per tick."""
+import os
+import socket
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import psutil
+
+from netmonitor.inodes import InodeIndex, default_index
+from netmonitor.namespaces import NamespaceIndex, default_namespaces
+from netmonitor.procnet import KINDS, read_tables
+from netmonitor.utils import get_platform
+
+PROC_NET = "/proc/net"
+
+
+class ConnectionSnapshot:
+    """Connections from a single system-wide socket-table dump, grouped by PID."""
+
+    def __init__(self, by_pid: dict, names: dict, timestamp: float):
+        self.by_pid = by_pid
+        self.names = names
+        self.timestamp = timestamp
+
+    def __iter__(self):
+        """Yield ``(pid, name, conns)`` for every process that owns a socket."""
+        for pid, conns in self.by_pid.items():
+            yield pid, self.names.get(pid, "unknown"), conns
+
+    def __len__(self):
+        return len(self.by_pid)
+
+
+_name_cache = {}
+
+
+def _process_name(pid: int) -> str:
+    # Names are cached per (pid, create_time) so a recycled PID is re-read.
+    try:
+        proc = psutil.Process(pid)
+        key = (pid, proc.create_time())
+    except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    name = _name_cache.get(key)
+    if name is None:
+        try:
+            name = _name_cache[key] = proc.name()
+        except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+    return name
+
+
+def _tick_names():
+    """``name_of(pid)`` reading each process name at most once per tick."""
+    return lru_cache(maxsize=None)(_process_name)
+
+
+def attribute_connections(tables: dict, index: InodeIndex, where=None, name_of=None) -> dict:
+    """Group the rows of parsed socket ``tables`` by owning PID via ``index``.
+
+    With a :class:`~netmonitor.filters.Filter` as ``where``, rows it rejects
+    are skipped before they become connections.
+    """
+    by_pid = defaultdict(list)
+    owner_of = index.owner
+    for table in tables.values():
+        match = where.table_predicate(table, name_of) if where is not None else None
+        for i, inode in enumerate(table.inode.tolist()):
+            owner = owner_of(inode)
+            if owner is not None and (match is None or match(i, owner[0])):
+                by_pid[owner[0]].append(table.connection(i, owner[0]))
+    return by_pid
+
+
+def _push_down(kind: str, index: InodeIndex, where) -> tuple:
+    """Point ``index`` at ``where``'s process predicate; return the tables to read for ``kind``."""
+    if where is None:
+        index.accept = None
+        return KINDS[kind]
+    index.accept = where.process_predicate(_process_name)
+    return where.tables(KINDS[kind])
+
+
+def read_namespace_tables(kind, namespaces: NamespaceIndex, net_root: str = PROC_NET) -> dict:
+    """``{(netns, name): SocketTable}``, reading each known network namespace once.
+
+    Each namespace is read through the first of its members whose ``net``
+    directory is still there (see :meth:`NamespaceIndex.table_dirs`).
+    """
+    tables = {}
+    for netns, dirs in namespaces.table_dirs(net_root):
+        for path in dirs:
+            found = read_tables(kind, path)
+            if found:
+                tables.update(((netns, name), table) for name, table in found.items())
+                break
+    return tables
+
+
+def _connections_from_proc(kind: str, index: InodeIndex, net_root: str = PROC_NET, churn=None,
+                           namespaces: NamespaceIndex = None, where=None) -> dict:
+    names = _push_down(kind, index, where)
+    index.refresh()
+    if namespaces is None:
+        tables = read_tables(names, net_root)
+    else:
+        namespaces.refresh(index)
+        tables = read_namespace_tables(names, namespaces, net_root)
+    index.claim(inode for table in tables.values() for inode in table.inode.tolist())
+    if churn is not None:
+        churn.observe_tables(tables, index.owner)
+    return attribute_connections(tables, index, where, _tick_names() if where is not None else None)
+
+
+def _connections_from_psutil(kind: str, where=None) -> dict:
+    by_pid = defaultdict(list)
+    match = where.connection_predicate(_tick_names()) if where is not None else None
+    for conn in psutil.net_connections(kind=kind):
+        if conn.pid is not None and (match is None or match(conn, conn.pid)):
+            by_pid[conn.pid].append(conn)
+    return by_pid
+
+
+def remote_endpoints(kind: str = "inet", net_root: str = PROC_NET) -> Counter:
+    """Count every socket with a remote end by ``(remote_ip, remote_port)``, system-wide.
+
+    Unlike :func:`collect_connections` this needs no owner, so sockets of
+    other users and in ``TIME_WAIT`` are included.
+    """
+    counts = Counter()
+    if net_root != PROC_NET or _proc_net_available():
+        for table in read_tables(kind, net_root).values():
+            w = table.width
+            raddr, rports = table.raddr, table.rport.tolist()
+            # Count raw address bytes first; only distinct ones are formatted.
+            raw = Counter((raddr[i * w:(i + 1) * w], port) for i, port in enumerate(rports) if port)
+            for (packed, port), n in raw.items():
+                counts[(socket.inet_ntop(table.family, packed), port)] += n
+        return counts
+    for conn in psutil.net_connections(kind=kind):
+        if conn.raddr:
+            counts[(conn.raddr.ip, conn.raddr.port)] += 1
+    return counts
+
+
+def _proc_net_available() -> bool:
+    return get_platform() == "linux" and os.path.exists(os.path.join(PROC_NET, "tcp"))
+
+
+def _resolve_names(pids, pool=None) -> dict:
+    """``{pid: name}`` for the PIDs still alive; names are read on ``pool``'s threads."""
+    pids = list(pids)
+    if pool is None:
+        names = {pid: _process_name(pid) for pid in pids}
+    else:
+        found = {}
+        for part in pool.map_threads(lambda shard: [(pid, _process_name(pid)) for pid in shard], pids):
+            found.update(part)
+        names = {pid: found[pid] for pid in pids}
+    names = {pid: name for pid, name in names.items() if name is not None}
+    for key in [k for k in _name_cache if k[0] not in names]:
+        del _name_cache[key]
+    return names
+
+
+def collect_connections(kind: str = "inet", index: InodeIndex = None, pool=None, churn=None,
+                        where=None) -> ConnectionSnapshot:
+    """Read the kernel socket tables once and group the result by PID.
+
+    On Linux the ``/proc/net`` tables are parsed in bulk by
+    :mod:`netmonitor.procnet` and attributed through the persistent
+    :class:`~netmonitor.inodes.InodeIndex`; elsewhere ``psutil.net_connections``
+    is used. Sockets whose owner cannot be determined (typically other users'
+    processes without privileges) are dropped, as are processes that exit
+    before their name can be read. With a
+    :class:`~netmonitor.parallel.WorkerPool` names are read on its threads.
+    A :class:`~netmonitor.churn.ChurnTracker` passed as ``churn`` is fed
+    every socket, owned or not (``/proc`` only). Every network namespace
+    the indexed processes live in is read once (see
+    :mod:`netmonitor.namespaces`).
+
+    A :class:`~netmonitor.filters.Filter` passed as ``where`` is pushed down:
+    tables it rules out are not read, processes it rules out are not
+    indexed and rows it rejects are dropped before they are grouped.
+    """
+    if _proc_net_available():
+        by_pid = _connections_from_proc(kind, index or default_index(), churn=churn, namespaces=default_namespaces(),
+                                        where=where)
+    else:
+        by_pid = _connections_from_psutil(kind, where)
+    names = _resolve_names(by_pid, pool)
+    return ConnectionSnapshot({pid: conns for pid, conns in by_pid.items() if pid in names}, names, time.time())
+
+
+def collect_aggregates(pool, kind: str = "inet", index: InodeIndex = None, status: str = None,
+                       type_: int = None, net_root: str = PROC_NET, churn=None, namespaces: NamespaceIndex = None,
+                       where=None):
+    """Per-process connection aggregates, computed on ``pool`` (Linux ``/proc`` only).
+
+    Returns ``[(pid, name, aggregate)]`` in the order :func:`collect_connections`
+    would yield them, where ``aggregate`` is
+    ``[first, tcp, udp, {status: [count, first]}, {remote_ip: [count, first]}]``
+    (see :func:`netmonitor.parallel.aggregate_shard`), or None when the
+    socket tables cannot be read from ``/proc``. ``status`` and ``type_``
+    filter sockets before they are counted; processes left with none are
+    dropped. ``churn`` is fed every socket before filtering. With
+    ``namespaces`` every network namespace is read once, as in
+    :func:`collect_connections`, and ``where`` is pushed down the same way.
+    """
+    from netmonitor.parallel import aggregate_tables
+    if net_root == PROC_NET and not _proc_net_available():
+        return None
+    index = index or default_index()
+    names = _push_down(kind, index, where)
+    index.refresh()
+    if namespaces is None and net_root == PROC_NET:
+        namespaces = default_namespaces()
+    if namespaces is not None:
+        namespaces.refresh(index)
+        net_root = namespaces.table_dirs(net_root)
+    aggregates = aggregate_tables(pool, names, index, net_root, status, type_, churn, where, _tick_names())
+    aggregates = {pid: aggregate for pid, aggregate in aggregates.items() if aggregate[1] + aggregate[2]}
+    resolved = _resolve_names(aggregates, pool)
+    return [(pid, resolved[pid], aggregate) for pid, aggregate in aggregates.items() if pid in resolved]
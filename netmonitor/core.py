@@ -1,289 +1,1267 @@
-import psutil
+import math
+import os
+import threading
 import time
 import socket
-from netmonitor.utils import supports_per_process_network_io, get_platform
+import json
+import csv
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from operator import attrgetter
 from rich.live import Live
-from rich.console import Console
+from rich.console import Console, Group
 from rich.table import Table
 from rich import print
-from collections import defaultdict
+from rich.markup import escape
+from netmonitor.utils import (
+    supports_per_process_network_io,
+    get_platform,
+    filter_process_name,
+    filter_connection_status,
+    format_bytes
+)
+from netmonitor.sockdiag import TcpByteCounter
+from netmonitor.churn import CHURN_FIELDS, ChurnTracker
+from netmonitor.filters import combine as combine_filters
+from netmonitor.collector import ConnectionSnapshot, collect_aggregates, collect_connections, remote_endpoints
+from netmonitor.heavyhitters import RemoteTracker
+from netmonitor.ifaces import IFACE_FIELDS, InterfaceRates
+from netmonitor.inodes import default_index
+from netmonitor.namespaces import default_namespaces
+from netmonitor.sampler import Sampler, Snapshot
+from netmonitor.scheduler import CpuBudget, budget_caption
+from netmonitor.history import HistoryStore
+from netmonitor.recording import Recorder, Recording
+from netmonitor.export import StreamExporter
+from netmonitor.metrics import MetricsCollector, make_server, serve_in_thread
+from netmonitor.profiling import NULL_PROFILER, Profiler
+from netmonitor.records import BandwidthRow, ByteTotals, ConnectionRow, TopConnectionRow, getter
+from netmonitor.render import Column, KeyReader, TableView, Viewport, top_rows
+from netmonitor.parallel import WorkerPool
+from netmonitor.resolver import HostResolver
+from netmonitor.daemon import CollectorState, attach as attach_daemon, make_server as make_daemon_server
+from netmonitor.cluster import AgentState, Cluster, make_agent_server
+from netmonitor.alerts import AlertEngine, make_sink
 
 console = Console()
 
-def _get_net_io_by_pid():
-    pid_net = defaultdict(lambda: {"sent": 0, "recv": 0})
+def show_top_processes(delay: float = 1.0, top_n: int = 10, export: str = None, output: str = None, sort: str = "total",
+                       use_daemon: bool = True, workers: int = 1, group_by: str = "process", filter_expr: str = None):
+    os_type = get_platform()
+    where = combine_filters(filter_expr)
+    # Daemon ticks are per process, unfiltered and carry no namespace or cgroup.
+    client = attach_daemon() if use_daemon and group_by == "process" and where is None else None
+    if client is not None:
+        with client:
+            _show_top_from_daemon(client, delay, top_n, os_type, export, output, sort)
+        return
+    collection = _Collection(workers, where)
+    try:
+        if supports_per_process_network_io():
+            _show_top_bandwidth(collection, delay, top_n, export, output, sort, group_by)
+        else:
+            _show_top_connections(collection, top_n, os_type, export, output, sort, delay, group_by)
+    finally:
+        collection.close()
 
-    for proc in psutil.process_iter(['pid', 'name']):
-        try:
-            cons = proc.connections(kind='inet')
-            for con in cons:
-                if con.status != psutil.CONN_ESTABLISHED:
-                    continue
-                pid_net[proc.pid]["name"] = proc.info['name']
-                pid_net[proc.pid]["sent"] += con.raddr and con.raddr.port or 0  # dummy weight
-                pid_net[proc.pid]["recv"] += con.laddr and con.laddr.port or 0  # dummy weight
-        except (psutil.AccessDenied, psutil.NoSuchProcess):
-            continue
+class _Collection:
+    """What in-process collection runs with, passed to every scan explicitly.
 
-    return pid_net
+    ``workers`` above 1 shards /proc scanning over a :class:`WorkerPool`;
+    ``where`` (a :class:`~netmonitor.filters.Filter`, or None) is pushed down
+    into the scans. The TCP byte counter is created on first use and kept, as
+    its totals are cumulative. :meth:`close` releases the pool.
+    """
 
-def show_top_processes(delay: float = 1.0, top_n: int = 10):
-    os_type = get_platform()
-    if supports_per_process_network_io():
-        _show_top_bandwidth(delay, top_n)
-    else:
-        _show_top_connections(top_n, os_type)
+    def __init__(self, workers: int = 1, where=None):
+        self.pool = WorkerPool(workers) if workers > 1 else None
+        self.where = where
+        self.counter = None
+        default_index().pool = self.pool
+
+    def net_io_by_pid(self) -> dict:
+        if self.counter is None:
+            self.counter = TcpByteCounter(index=default_index(), where=self.where)
+        return self.counter.sample()
 
+    def bandwidth_churn(self) -> ChurnTracker:
+        """Start tracking churn on the byte counter's dumps (from its next sample)."""
+        self.net_io_by_pid()
+        if self.counter.churn is None:
+            self.counter.churn = ChurnTracker()
+        return self.counter.churn
 
-def _show_top_bandwidth(delay: float, top_n: int):
+    def connection_summary(self):
+        return get_process_connection_summary(pool=self.pool, where=self.where)
+
+    def connection_rows_by_pid(self) -> dict:
+        return {row.pid: row for row in self.connection_summary()}
+
+    def cpu_time(self) -> float:
+        """CPU seconds of the calling (sampler) thread plus the scan threads it fans out to."""
+        return time.thread_time() + (self.pool.cpu_time if self.pool is not None else 0.0)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        default_index().pool = None
+
+def _add_churn(rows, churn):
+    """Fill the churn columns of ``rows`` from a :class:`~netmonitor.churn.ChurnSample`.
+
+    Grouped rows sum the churn of their member ``pids``.
+    """
+    if churn is not None:
+        for row in rows:
+            row.update(churn.row(*row.get("pids", (row["pid"],))))
+    return rows
+
+def _churn_caption(churn) -> str:
+    return f"\n[dim]{churn.caption()}[/dim]" if churn is not None else ""
+
+def _show_top_bandwidth(collection: _Collection, delay: float, top_n: int, export: str = None, output: str = None,
+                        sort: str = "total", group_by: str = "process"):
     print(f"[bold]Collecting network data for {delay} second(s)...[/bold]")
-    snapshot1 = _get_net_io_by_pid()
+    churn = collection.bandwidth_churn()
+    snapshot1 = _group_totals(collection.net_io_by_pid(), group_by)
     time.sleep(delay)
-    snapshot2 = _get_net_io_by_pid()
+    snapshot2 = _group_totals(collection.net_io_by_pid(), group_by)
+    results = _add_churn(_finish_groups(_bandwidth_rows(snapshot1, snapshot2), snapshot2, group_by), churn.last)
+    _render_top_bandwidth(results, top_n, export, output, sort, churn.last, group_by)
 
-    results = []
+GROUP_HEADERS = {"netns": "Netns", "cgroup": "Cgroup"}
 
-    for pid in snapshot2:
-        if pid not in snapshot1:
-            continue
-        name = snapshot2[pid].get("name", "unknown")
-        sent_delta = snapshot2[pid]["sent"] - snapshot1[pid]["sent"]
-        recv_delta = snapshot2[pid]["recv"] - snapshot1[pid]["recv"]
-        total = sent_delta + recv_delta
-        if total > 0:
-            results.append((pid, name, sent_delta, recv_delta, total))
+def _group_label(names) -> str:
+    """``"3× nginx, envoy"``: member count and the most common names."""
+    common = [name for name, _ in Counter(names).most_common(3)]
+    more = len(set(names)) - len(common)
+    return f"{len(names)}× " + ", ".join(common) + (f" +{more}" if more else "")
+
+def _group_members(pids, group_by: str) -> dict:
+    """``{group: [pids]}`` for ``group_by`` ``"netns"`` or ``"cgroup"``."""
+    namespaces = default_namespaces()
+    namespaces.refresh(default_index())
+    members = {}
+    for pid in pids:
+        members.setdefault(namespaces.group_of(pid, group_by), []).append(pid)
+    return members
+
+def _group_totals(totals: dict, group_by: str) -> dict:
+    """Sum cumulative ``{pid: ByteTotals}`` byte totals per group."""
+    if group_by == "process":
+        return totals
+    grouped = {}
+    for key, pids in _group_members(totals, group_by).items():
+        members = [totals[pid] for pid in pids]
+        grouped[key] = ByteTotals(_group_label([row.name for row in members]), sum(row.sent for row in members),
+                                  sum(row.recv for row in members), pids)
+    return grouped
+
+def _as_totals(totals: dict) -> dict:
+    """Decoded ``{pid: {"name", "sent", "recv"}}`` rows (daemon, recordings) as :class:`ByteTotals`."""
+    return {pid: row if isinstance(row, ByteTotals) else ByteTotals(row.get("name", "unknown"), row["sent"], row["recv"])
+            for pid, row in totals.items()}
+
+def _group_connections(snapshot, group_by: str, process_filter: str = None):
+    """Merge a :class:`ConnectionSnapshot`'s processes into one entry per group.
+
+    ``process_filter`` applies to member names, before grouping. Returns the
+    grouped snapshot (keyed by group) and ``{group: {"pids": [...]}}``.
+    """
+    pids = [pid for pid, name, _ in snapshot if not process_filter or filter_process_name(name, process_filter)]
+    by_group, names, members = {}, {}, {}
+    for key, group in _group_members(pids, group_by).items():
+        by_group[key] = [conn for pid in group for conn in snapshot.by_pid[pid]]
+        names[key] = _group_label([snapshot.names.get(pid, "unknown") for pid in group])
+        members[key] = {"pids": group}
+    return ConnectionSnapshot(by_group, names, snapshot.timestamp), members
 
-    results.sort(key=lambda x: x[-1], reverse=True)
+def _finish_groups(rows, members: dict, group_by: str):
+    """Add ``group``, ``processes`` and member ``pids`` to grouped rows (keyed by ``pid``)."""
+    if group_by != "process":
+        for row in rows:
+            pids = members[row["pid"]]["pids"]
+            row.update(group=row["pid"], processes=len(pids), pids=pids)
+    return rows
 
-    table = Table(title="Top Processes by Network Usage")
-    table.add_column("PID", justify="right")
-    table.add_column("Process")
+def _group_fields(fields, group_by: str) -> list:
+    if group_by == "process":
+        return fields
+    return ["group", "processes"] + [field for field in fields if field != "pid"]
+
+def _group_columns(columns, group_by: str) -> list:
+    if group_by == "process":
+        return columns
+    return [Column(GROUP_HEADERS[group_by], "pid", lambda v: escape(str(v))), Column("Processes", "name")] + columns[2:]
+
+def _show_top_from_daemon(client, delay: float, top_n: int, os_type: str, export: str = None, output: str = None, sort: str = "total"):
+    print(f"[dim]Using netmonitor daemon at {client.path}[/dim]")
+    if "bandwidth" in client.kinds:
+        print(f"[bold]Collecting network data for {delay} second(s)...[/bold]")
+        ts1, snapshot1 = client.fetch("bandwidth")
+        time.sleep(delay)
+        ts2, snapshot2 = client.fetch("bandwidth", wait=True)
+        # The daemon ticks on its own schedule; scale its deltas to the
+        # requested window so results match in-process sampling.
+        elapsed = (ts2 - ts1) / delay if delay > 0 and ts2 > ts1 else 1.0
+        _render_top_bandwidth(_bandwidth_rows(_as_totals(snapshot1), _as_totals(snapshot2), elapsed), top_n, export,
+                              output, sort)
+        return
+    print(f"[bold yellow]Per-process bandwidth is not supported on {os_type.upper()}.[/bold yellow]")
+    print("[bold green]Showing enriched process connection info instead.[/bold green]")
+    _, rows = client.fetch("connections")
+    _render_top_connections(_to_top_connection_rows(rows), top_n, export, output, sort)
+
+def _render_top_bandwidth(results, top_n: int, export: str = None, output: str = None, sort: str = "total",
+                          churn=None, group_by: str = "process"):
+    results = sorted(results, key=lambda x: x.get(sort, x["total"]), reverse=True)
+    if _export_top(results[:top_n], export, output, _group_fields(BANDWIDTH_FIELDS, group_by), group_by):
+        return
+
+    table = Table(title="Top Processes by Network Usage" + _group_title(group_by))
+    _add_name_columns(table, group_by)
     table.add_column("Bytes Sent")
     table.add_column("Bytes Recv")
     table.add_column("Total")
+    _add_churn_columns(table)
 
-    for pid, name, sent, recv, total in results[:top_n]:
-        table.add_row(str(pid), name, f"{sent} B", f"{recv} B", f"{total} B")
+    for row in results[:top_n]:
+        table.add_row(
+            escape(str(row["pid"])),
+            row["name"],
+            format_bytes(row["sent"]),
+            format_bytes(row["recv"]),
+            format_bytes(row["total"]),
+            *_churn_cells(row)
+        )
+    if churn is not None:
+        table.caption = f"[dim]{churn.caption()}[/dim]"
 
     print(table)
 
-def _show_top_connections(top_n: int, os_type: str):
-    print(f"[bold yellow]Per-process bandwidth is not supported on {os_type.upper()}.[/bold yellow]")
-    print("[bold green]Showing enriched process connection info instead.[/bold green]")
+def _group_title(group_by: str) -> str:
+    return f" (by {group_by})" if group_by != "process" else ""
 
-    connection_data = {}
+def _add_name_columns(table, group_by: str):
+    if group_by == "process":
+        table.add_column("PID", justify="right")
+        table.add_column("Process")
+    else:
+        table.add_column(GROUP_HEADERS[group_by])
+        table.add_column("Processes")
 
-    for proc in psutil.process_iter(['pid', 'name']):
-        try:
-            conns = proc.connections(kind='inet')
-            if not conns:
-                continue
+def _export_rows(rows, fields, group_by: str):
+    """Rows as exported by ``top``: whole rows per process, ``fields`` only when grouped."""
+    if group_by == "process":
+        return [dict(row) for row in rows]
+    return [{k: row.get(k, "") for k in fields} for row in rows]
 
-            protocols = {"TCP": 0, "UDP": 0}
-            remotes = set()
+def _export_top(rows, export: str, output: str, fields, group_by: str) -> bool:
+    """Write ``top`` rows as ``export`` (json or csv) to ``output``, or stdout without one.
 
-            for c in conns:
-                proto = "TCP" if c.type == socket.SOCK_STREAM else "UDP"
-                protocols[proto] += 1
-                if c.raddr:
-                    remotes.add(c.raddr.ip)
+    Returns False for any other format, leaving the table to the caller.
+    """
+    if export == "json":
+        content = json.dumps(_export_rows(rows, fields, group_by), indent=2)
+        if output:
+            with open(output, "w") as f:
+                f.write(content)
+        else:
+            print(content)
+    elif export == "csv":
+        with (open(output, "w", newline='') if output else nullcontext(console.file)) as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        return False
+    return True
 
-            connection_data[proc.pid] = {
-                "name": proc.info['name'],
-                "count": len(conns),
-                "tcp": protocols["TCP"],
-                "udp": protocols["UDP"],
-                "remotes": len(remotes)
-            }
+def _add_churn_columns(table):
+    table.add_column("Opened/s", justify="right")
+    table.add_column("Closed/s", justify="right")
+    table.add_column("TIME_WAIT", justify="right")
 
-        except (psutil.AccessDenied, psutil.NoSuchProcess):
-            continue
+def _churn_cells(row) -> tuple:
+    if "opened_s" not in row:
+        return "", "", ""
+    return f"{row['opened_s']:g}", f"{row['closed_s']:g}", str(row["time_wait"])
 
-    sorted_procs = sorted(connection_data.items(), key=lambda item: item[1]["count"], reverse=True)
+def _show_top_connections(collection: _Collection, top_n: int, os_type: str, export: str = None, output: str = None,
+                          sort: str = "count", delay: float = 1.0, group_by: str = "process"):
+    print(f"[bold yellow]Per-process bandwidth is not supported on {os_type.upper()}.[/bold yellow]")
+    print("[bold green]Showing enriched process connection info instead.[/bold green]")
+    print(f"[bold]Collecting connection churn for {delay} second(s)...[/bold]")
+    connection_data = []
+    churn = ChurnTracker()
 
-    table = Table(title="Top Processes by Active Connections")
-    table.add_column("PID", justify="right")
-    table.add_column("Process")
+    # The first scan only sets the churn baseline; its rows are discarded.
+    # Aggregates are per process, so grouping goes through full snapshots.
+    pool, where = collection.pool, collection.where
+    aggregates = None
+    if pool is not None and group_by == "process":
+        aggregates = collect_aggregates(pool, churn=churn, where=where)
+    if aggregates is not None:
+        time.sleep(delay)
+        aggregates = collect_aggregates(pool, churn=churn, where=where)
+        for pid, name, (_first, tcp, udp, _statuses, remotes) in aggregates:
+            connection_data.append(TopConnectionRow(pid, name, tcp + udp, tcp, udp, len(remotes)))
+        _add_churn(connection_data, churn.last)
+        _render_top_connections(connection_data, top_n, export, output, sort, churn.last)
+        return
+
+    collect_connections(pool=pool, churn=churn, where=where)
+    time.sleep(delay)
+    snapshot = collect_connections(pool=pool, churn=churn, where=where)
+    members = None
+    if group_by != "process":
+        snapshot, members = _group_connections(snapshot, group_by)
+    for pid, name, conns in snapshot:
+        protocols = {"TCP": 0, "UDP": 0}
+        remotes = set()
+        for c in conns:
+            proto = "TCP" if c.type == socket.SOCK_STREAM else "UDP"
+            protocols[proto] += 1
+            if c.raddr:
+                remotes.add(c.raddr.ip)
+        connection_data.append(TopConnectionRow(pid, name, len(conns), protocols["TCP"], protocols["UDP"], len(remotes)))
+
+    _add_churn(_finish_groups(connection_data, members, group_by), churn.last)
+    _render_top_connections(connection_data, top_n, export, output, sort, churn.last, group_by)
+
+TOP_CONNECTION_FIELDS = ["pid", "name", "count", "tcp", "udp", "remotes"] + CHURN_FIELDS
+
+def _render_top_connections(connection_data, top_n: int, export: str = None, output: str = None, sort: str = "count",
+                            churn=None, group_by: str = "process"):
+    sorted_data = sorted(connection_data, key=lambda item: item.get(sort, item["count"]), reverse=True)
+    if _export_top(sorted_data[:top_n], export, output, _group_fields(TOP_CONNECTION_FIELDS, group_by), group_by):
+        return
+
+    table = Table(title="Top Processes by Active Connections" + _group_title(group_by))
+    _add_name_columns(table, group_by)
     table.add_column("Conns")
     table.add_column("TCP", justify="right")
     table.add_column("UDP", justify="right")
     table.add_column("Remote Hosts", justify="right")
+    _add_churn_columns(table)
 
-    for pid, data in sorted_procs[:top_n]:
+    for row in sorted_data[:top_n]:
         table.add_row(
-            str(pid),
-            data["name"],
-            str(data["count"]),
-            str(data["tcp"]),
-            str(data["udp"]),
-            str(data["remotes"])
+            escape(str(row["pid"])), row["name"], str(row["count"]), str(row["tcp"]), str(row["udp"]), str(row["remotes"]),
+            *_churn_cells(row)
         )
+    if churn is not None:
+        table.caption = f"[dim]{churn.caption()}[/dim]"
 
     print(table)
 
+BANDWIDTH_FIELDS = ["pid", "name", "sent", "recv", "total"] + CHURN_FIELDS
+CONNECTION_FIELDS = ["pid", "name", "total", "tcp", "udp", "remote_hosts", "top_remote", "status_summary"] + CHURN_FIELDS
 
-
-def live_monitor(refresh_interval: float = 1.0, top_n: int = 10, status: str = None, process: str = None):
+def live_monitor(refresh_interval: float = 1.0, top_n: int = 10, status: str = None, process: str = None, export: str = None, output: str = None, protocol: str = None,
+                 stream: str = None, stream_output: str = None, rotate_mb: float = None, rotate_seconds: float = None, gzip_stream: bool = False,
+                 use_daemon: bool = True, profile: bool = False, profile_output: str = None, workers: int = 1,
+                 resolve: bool = True, iface_interval: float = None, group_by: str = "process", max_cpu: float = None,
+                 filter_expr: str = None):
     os_type = get_platform()
-    if supports_per_process_network_io():
-        _live_monitor_full(refresh_interval, top_n)
-    else:
-        _live_monitor_fallback(refresh_interval, top_n, os_type, status, process)
+    profiler = NULL_PROFILER
+    if profile or profile_output:
+        profiler = Profiler(cprofile=bool(profile_output) and not profile_output.endswith(".json"))
+    # --status/--process/--protocol are shorthands folded into the filter.
+    where = combine_filters(filter_expr, status, protocol, process)
+    # Daemon ticks are per process, unfiltered and carry no namespace or cgroup.
+    client = attach_daemon() if use_daemon and group_by == "process" and where is None else None
+    stream_factory = None
+    if stream:
+        def stream_factory(fieldnames):
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            return StreamExporter(
+                stream_output or f"netmonitor_stream_{timestamp}.{stream}", stream, fieldnames,
+                rotate_bytes=int(rotate_mb * 1024 * 1024) if rotate_mb else None,
+                rotate_seconds=rotate_seconds, compress=gzip_stream,
+            )
+    # A daemon collects on its own schedule; workers and the budget apply to in-process scans.
+    collection = _Collection(workers if client is None else 1, where)
+    scheduler = None
+    if client is None and max_cpu:
+        scheduler = CpuBudget(max_cpu, refresh_interval, index=default_index())
+    try:
+        if (client is not None and "bandwidth" in client.kinds) or (client is None and supports_per_process_network_io()):
+            _live_monitor_full(collection, refresh_interval, top_n, export, output, stream_factory, client, profiler,
+                               iface_interval, group_by, scheduler)
+        else:
+            _live_monitor_fallback(collection, refresh_interval, top_n, os_type, export, output, stream_factory, client,
+                                   profiler, resolve, iface_interval, group_by, scheduler)
+    finally:
+        if client is not None:
+            client.close()
+        collection.close()
+        default_index().max_skip = 0
+    if profiler.enabled:
+        _report_profile(profiler, profile_output)
+
+def _report_profile(profiler, output: str = None):
+    table = Table(title="Profile summary")
+    table.add_column("Stage")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total wall", justify="right")
+    table.add_column("Mean wall", justify="right")
+    table.add_column("Mean CPU", justify="right")
+    table.add_column("Mean net blocks", justify="right")
+    summary = profiler.summary()
+    for row in summary:
+        table.add_row(row["stage"], str(row["calls"]), f"{row['wall_total_s']:.2f}s", f"{row['wall_mean_ms']:.2f} ms",
+                      f"{row['cpu_mean_ms']:.2f} ms", f"{row['blocks_mean']:+,.0f}")
+    table.caption = " · ".join(f"{value:,} {name}" for name, value in profiler.counts.items()) + " (last tick)"
+    print(table)
+    if not output:
+        return
+    if output.endswith(".json"):
+        with open(output, "w") as f:
+            json.dump({"stages": summary, "counts": profiler.counts}, f, indent=2)
+    elif not profiler.dump_pstats(output):
+        print("[yellow]No cProfile data was collected.[/yellow]")
+        return
+    print(f"[green]Profile written to:[/green] {output}")
 
+def _export_snapshot(rows, export: str, output: str, fieldnames) -> str:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = output or f"netmonitor_snapshot_{timestamp}.{export}"
+    rows = [{k: row.get(k, "") for k in fieldnames} for row in rows]
+    if export == "json":
+        with open(filename, "w") as f:
+            json.dump(rows, f, indent=2)
+    elif export == "csv":
+        with open(filename, "w", newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    return filename
 
-def _live_monitor_full(refresh_interval: float, top_n: int):
-    console.clear()
-    print("[bold green]Starting full live network monitor (Linux/macOS)... Press Ctrl+C to stop.[/bold green]")
+def _streamed(collect, exporter, top_n: int):
+    """Wrap a sampler collect function so every tick's rows are also streamed."""
+    if exporter is None:
+        return collect
+
+    def collect_and_stream(elapsed):
+        rows = collect(elapsed)
+        exporter.submit(time.time(), rows[:top_n])
+        return rows
+    return collect_and_stream
+
+def _close_stream(exporter):
+    if exporter is None:
+        return
+    exporter.close()
+    if exporter.error is not None:
+        print(f"[red]Streaming export failed:[/red] {exporter.error}")
+    else:
+        print(f"[green]Streamed {exporter.written} tick(s) to:[/green] {', '.join(exporter.files) or '-'}")
+    if exporter.dropped:
+        print(f"[yellow]Dropped {exporter.dropped} tick(s) while the writer was busy.[/yellow]")
+
+def _sampling_caption(snapshot, interval: float, profiler=NULL_PROFILER) -> str:
+    interval = snapshot.interval or interval
+    caption = (
+        f"[dim]Sample #{snapshot.seq} every {interval:.3g}s, "
+        f"measured {snapshot.elapsed:.2f}s, collected in {snapshot.duration * 1000:.0f} ms[/dim]"
+    )
+    if snapshot.late:
+        caption += " [yellow]late[/yellow]"
+    if snapshot.missed:
+        caption += f" [red]missed {snapshot.missed} tick(s)[/red]"
+    if snapshot.budget is not None:
+        # Over budget even at the longest interval allowed.
+        style = "yellow" if snapshot.budget["usage"] > snapshot.budget["budget"] * 1.05 else "dim"
+        caption += f"\n[{style}]{budget_caption(snapshot.budget)}[/{style}]"
+    if profiler.enabled:
+        caption += f"\n[dim]{profiler.caption()}[/dim]"
+    return caption
 
-    def build_table(snapshot1, snapshot2):
-        ...
+def _run_live(sampler, build_table, render_rate: float = 4.0, profiler=NULL_PROFILER, viewport: Viewport = None,
+              panel=None):
+    """Render the newest sampler snapshot until Ctrl+C; return the last one shown.
 
+    Repaints happen at most ``render_rate`` times a second however fast the
+    sampler ticks. With a ``viewport``, scroll keys repaint the current
+    snapshot right away. ``panel`` is an optional ``(sampler, build)`` pair on
+    its own cadence whose output is shown below the table.
+    """
+    shown = None
+    table = None
+    panel_sampler, build_panel = panel or (None, None)
+    panel_shown = None
+    scrolled = threading.Event()
+    keys = KeyReader(viewport, on_key=scrolled.set) if viewport is not None else None
+    frame = poll = 1 / render_rate
+    next_paint = 0.0
+    sampler.start()
+    if panel_sampler is not None:
+        panel_sampler.start()
     try:
-        prev_snapshot = _get_net_io_by_pid()
-        with Live(refresh_per_second=1, screen=True) as live:
+        with Live(refresh_per_second=render_rate, screen=True) as live:
+            if keys is not None and keys.usable:
+                keys.start()
+                poll = min(poll, 0.05)
             while True:
-                time.sleep(refresh_interval)
-                curr_snapshot = _get_net_io_by_pid()
-                table = build_table(prev_snapshot, curr_snapshot)
-                live.update(table)
-                prev_snapshot = curr_snapshot
+                # A scroll key ends the wait early; sampler ticks do not.
+                scrolled.wait(max(next_paint - time.monotonic(), 0))
+                snapshot = sampler.wait_for(shown.seq if shown else 0, poll)
+                panel_snapshot = panel_sampler.latest() if panel_sampler is not None else None
+                if snapshot is None or (snapshot is shown and not scrolled.is_set()
+                                        and panel_snapshot is panel_shown):
+                    continue
+                if snapshot is not shown or scrolled.is_set():
+                    scrolled.clear()
+                    shown = snapshot
+                    if viewport is not None:
+                        # Title, header, borders, footer and caption take ~12 lines.
+                        spare = len(panel_snapshot.rows) + 6 if panel_snapshot is not None else 0
+                        viewport.height = max(live.console.size.height - 12 - spare, 5)
+                    with profiler.stage("table"):
+                        table = build_table(snapshot)
+                renderable = table
+                if panel_snapshot is not None:
+                    panel_shown = panel_snapshot
+                    renderable = Group(table, build_panel(panel_snapshot))
+                next_paint = time.monotonic() + frame
+                with profiler.stage("render"):
+                    live.update(renderable, refresh=True)
     except KeyboardInterrupt:
-        print("\n[bold yellow]Exiting live monitor.[/bold yellow]")
+        pass
+    finally:
+        if keys is not None:
+            keys.stop()
+        sampler.stop(timeout=1)
+        if panel_sampler is not None:
+            panel_sampler.stop(timeout=1)
+    return shown
 
-    def build_table(snapshot1, snapshot2):
-        results = []
+def _history_capacity(refresh_interval: float) -> int:
+    # Enough ticks for the 60s window and a 20-character sparkline.
+    return max(math.ceil(60 / refresh_interval) + 1, 21)
 
-        for pid in snapshot2:
-            if pid not in snapshot1:
-                continue
-            name = snapshot2[pid].get("name", "unknown")
-            sent_delta = snapshot2[pid]["sent"] - snapshot1[pid]["sent"]
-            recv_delta = snapshot2[pid]["recv"] - snapshot1[pid]["recv"]
-            total = sent_delta + recv_delta
-            if total > 0:
-                results.append((pid, name, sent_delta, recv_delta, total))
+_TOTAL = attrgetter("total")
 
-        results.sort(key=lambda x: x[-1], reverse=True)
+def _bandwidth_rows(snapshot1, snapshot2, elapsed: float = 1.0, limit: int = None):
+    """Rate rows for PIDs present in both snapshots, largest first.
 
-        table = Table(title="Live Network Usage", expand=True)
-        table.add_column("PID", justify="right")
-        table.add_column("Process")
-        table.add_column("Bytes Sent/s")
-        table.add_column("Bytes Recv/s")
-        table.add_column("Total/s")
+    With ``limit`` only the top rows are selected (partially, via a heap).
+    """
+    results = []
+    for pid, curr in snapshot2.items():
+        prev = snapshot1.get(pid)
+        # The byte counter hands an idle process the same totals every tick.
+        if prev is None or prev is curr:
+            continue
+        sent_delta = curr.sent - prev.sent
+        recv_delta = curr.recv - prev.recv
+        total = sent_delta + recv_delta
+        if total > 0:
+            results.append(BandwidthRow(pid, curr.name, int(sent_delta / elapsed), int(recv_delta / elapsed),
+                                        int(total / elapsed)))
+    return top_rows(results, limit, key=_TOTAL)
 
-        for pid, name, sent, recv, total in results[:top_n]:
-            table.add_row(str(pid), name, f"{sent}", f"{recv}", f"{total}")
+class _BandwidthRows:
+    """Turn successive cumulative byte snapshots into ranked rate rows with history."""
 
-        return table
+    def __init__(self, top_n: int, refresh_interval: float, profiler=NULL_PROFILER, viewport: Viewport = None,
+                 churn: ChurnTracker = None, group_by: str = "process"):
+        self.top_n = top_n
+        self.prev = None
+        self.history = HistoryStore(capacity=_history_capacity(refresh_interval))
+        self.profiler = profiler
+        self.viewport = viewport
+        self.churn = churn
+        self.group_by = group_by
 
-    try:
-        prev_snapshot = _get_net_io_by_pid()
-        with Live(refresh_per_second=1, screen=True) as live:
-            while True:
-                time.sleep(refresh_interval)
-                curr_snapshot = _get_net_io_by_pid()
-                table = build_table(prev_snapshot, curr_snapshot)
-                live.update(table)
-                prev_snapshot = curr_snapshot
-    except KeyboardInterrupt:
-        print("\n[bold yellow]Exiting live monitor.[/bold yellow]")
+    def __call__(self, curr, timestamp: float, elapsed: float):
+        history = self.history
+        profiler = self.profiler
+        if self.group_by != "process":
+            with profiler.stage("group"):
+                curr = _group_totals(curr, self.group_by)
+        profiler.count("processes", len(curr))
+        with profiler.stage("rank"):
+            results = (_bandwidth_rows(self.prev, curr, elapsed, limit=self.top_n)
+                       if self.prev is not None and elapsed > 0 else [])
+        self.prev = curr
+        with profiler.stage("history"):
+            history.record(timestamp, {pid: v.sent + v.recv for pid, v in curr.items()})
+            # History lookups happen here, on the sampler thread, so the
+            # published rows are self-contained for the renderer. Only rows
+            # on or near the screen get them.
+            start, stop = self.viewport.margin_window(len(results)) if self.viewport else (0, len(results))
+            for row in results[start:stop]:
+                pid = row.pid
+                row.rate_1s = int(history.rate(pid, 1.0))
+                row.rate_10s = int(history.rate(pid, 10.0))
+                row.rate_60s = int(history.rate(pid, 60.0))
+                row.peak = int(history.peak(pid))
+                row.trend = history.sparkline(pid)
+        _finish_groups(results, curr, self.group_by)
+        return _add_churn(results, self.churn.last if self.churn else None)
 
-from collections import Counter
-import socket
+BANDWIDTH_COLUMNS = [
+    Column("PID", "pid", str, "right"), Column("Process", "name"),
+    Column("Sent/s", "sent", format_bytes, "right"), Column("Recv/s", "recv", format_bytes, "right"),
+    Column("1s", "rate_1s", format_bytes, "right"), Column("10s", "rate_10s", format_bytes, "right"),
+    Column("60s", "rate_60s", format_bytes, "right"), Column("Peak", "peak", format_bytes, "right"),
+    Column("Opened/s", "opened_s", "{:g}".format, "right"), Column("Closed/s", "closed_s", "{:g}".format, "right"),
+    Column("TIME_WAIT", "time_wait", str, "right"), Column("Trend", "trend"),
+]
+
+def _build_bandwidth_table(snapshot, top_n: int, refresh_interval: float, title: str = "Live Network Usage",
+                           profiler=NULL_PROFILER, view: TableView = None, churn: ChurnTracker = None, where=None):
+    view = view or TableView(BANDWIDTH_COLUMNS)
+    caption = _sampling_caption(snapshot, refresh_interval, profiler)
+    if where is not None:
+        caption += f"\n[dim]Filter: {escape(where.text)}[/dim]"
+    return view.build(snapshot.rows[:top_n], title=title,
+                      caption=caption + _churn_caption(churn.last if churn else None))
+
+def _daemon_bandwidth(client, rows, profiler=NULL_PROFILER):
+    """Collect function feeding daemon ticks to ``rows``, timed by the daemon's clock."""
+    last = []
+
+    def collect(elapsed):
+        with profiler.stage("fetch"):
+            timestamp, totals = client.fetch("bandwidth", wait=True)
+        elapsed = timestamp - last[0] if last else 0.0
+        last[:] = [timestamp]
+        return rows(_as_totals(totals), timestamp, elapsed)
+    return collect
 
-def _live_monitor_fallback(refresh_interval: float, top_n: int, os_type: str, status: str = None, process_filter: str = None):
+def _live_monitor_full(collection: _Collection, refresh_interval: float, top_n: int, export: str = None,
+                       output: str = None, stream_factory=None, client=None, profiler=NULL_PROFILER,
+                       iface_interval: float = None, group_by: str = "process", scheduler: CpuBudget = None):
+    console.clear()
+    print("[bold green]Starting full live network monitor (Linux)... Press Ctrl+C to stop.[/bold green]")
+
+    viewport = Viewport()
+    view = TableView(_group_columns(BANDWIDTH_COLUMNS, group_by), viewport)
+    fields = _group_fields(BANDWIDTH_FIELDS, group_by)
+    # Daemon ticks carry byte totals only, so churn is tracked in-process.
+    churn = collection.bandwidth_churn() if client is None else None
+    rows = _BandwidthRows(top_n, refresh_interval, profiler, viewport, churn, group_by)
+    exporter = stream_factory(fields) if stream_factory else None
+    if client is not None:
+        collect = _daemon_bandwidth(client, rows, profiler)
+    else:
+        def collect(elapsed):
+            with profiler.stage("scan"):
+                curr = collection.net_io_by_pid()
+            profiler.count("sockets", collection.counter.sockets)
+            return rows(curr, time.monotonic(), elapsed)
+    collect = _streamed(collect, exporter, top_n)
+    snapshot = _run_live(Sampler(collect, refresh_interval, scheduler=scheduler, cpu_clock=collection.cpu_time),
+                         lambda snapshot: _build_bandwidth_table(snapshot, top_n, refresh_interval,
+                                                                 "Live Network Usage" + _group_title(group_by),
+                                                                 profiler=profiler, view=view, churn=churn,
+                                                                 where=collection.where),
+                         profiler=profiler, viewport=viewport, panel=_iface_panel(iface_interval) if iface_interval else None)
+    results = list(snapshot.rows) if snapshot else []
+    print("\n[bold yellow]Exiting live monitor.[/bold yellow]")
+    _close_stream(exporter)
+    if export in ("json", "csv"):
+        filename = _export_snapshot(results[:top_n], export, output, fields)
+        print(f"[green]Snapshot exported to:[/green] {filename}")
+
+def get_process_connection_summary(status: str = None, process_filter: str = None, protocol: str = None, snapshot=None,
+                                   pool: WorkerPool = None, where=None):
+    summary = _summarize_connections(status, process_filter, protocol, snapshot, pool=pool, where=where)
+    return sorted(summary, key=_TOTAL, reverse=True)
+
+def _summarize_connections(status: str = None, process_filter: str = None, protocol: str = None, snapshot=None,
+                           churn: ChurnTracker = None, pool: WorkerPool = None, where=None):
+    """Per-process summary rows in collection order (unsorted).
+
+    Without a ``snapshot`` one is scanned, sharded over ``pool`` and narrowed
+    by the ``where`` filter; ``churn`` is fed by the scan.
+    """
+    proto_type = None
+    if protocol:
+        proto_type = socket.SOCK_STREAM if protocol.lower() == "tcp" else socket.SOCK_DGRAM
+    if snapshot is None and pool is not None:
+        aggregates = collect_aggregates(pool, status=status, type_=proto_type, churn=churn, where=where)
+        if aggregates is not None:
+            return [_aggregate_row(pid, name, aggregate) for pid, name, aggregate in aggregates
+                    if not process_filter or filter_process_name(name, process_filter)]
+    if snapshot is None:
+        snapshot = collect_connections(pool=pool, churn=churn, where=where)
+    summary = []
+    for pid, name, conns in snapshot:
+        if process_filter and not filter_process_name(name, process_filter):
+            continue
+        if status:
+            conns = [c for c in conns if filter_connection_status(c.status, status)]
+        if proto_type is not None:
+            conns = [c for c in conns if c.type == proto_type]
+        if not conns:
+            continue
+        tcp_count = sum(1 for c in conns if c.type == socket.SOCK_STREAM)
+        udp_count = sum(1 for c in conns if c.type == socket.SOCK_DGRAM)
+        remotes = [c.raddr.ip for c in conns if c.raddr]
+        remote_counts = Counter(remotes)
+        most_common_remote = remote_counts.most_common(1)[0][0] if remote_counts else "-"
+        status_counts = Counter(c.status for c in conns)
+        status_summary = " ".join(f"{s[0]}:{count}" for s, count in status_counts.items())
+        row = ConnectionRow(pid, name, len(conns), tcp_count, udp_count, len(remote_counts),
+                            most_common_remote, status_summary)
+        row.close_wait = status_counts.get("CLOSE_WAIT", 0)
+        summary.append(row)
+    return summary
+
+def _aggregate_row(pid: int, name: str, aggregate) -> ConnectionRow:
+    """A summary row from a merged parallel aggregate, matching the serial one."""
+    _first, tcp, udp, statuses, remotes = aggregate
+    # Ties go to the earliest socket, as with Counter.most_common on the serial path.
+    top_remote = min(remotes.items(), key=lambda item: (-item[1][0], item[1][1]))[0] if remotes else "-"
+    ordered = sorted(statuses.items(), key=lambda item: item[1][1])
+    row = ConnectionRow(pid, name, tcp + udp, tcp, udp, len(remotes), top_remote,
+                        " ".join(f"{s[0]}:{count}" for s, (count, _) in ordered))
+    row.close_wait = statuses["CLOSE_WAIT"][0] if "CLOSE_WAIT" in statuses else 0
+    return row
+
+class _ConnectionRows:
+    """Rank summary rows and attach a connection-count sparkline to them.
+
+    With a ``resolver``, the top remote of each row on screen is shown by
+    name once the background lookup has answered.
+    """
+
+    def __init__(self, top_n: int, refresh_interval: float, profiler=NULL_PROFILER, viewport: Viewport = None,
+                 resolver: HostResolver = None, churn: ChurnTracker = None):
+        self.top_n = top_n
+        self.history = HistoryStore(capacity=_history_capacity(refresh_interval), kind="gauge")
+        self.profiler = profiler
+        self.viewport = viewport
+        self.resolver = resolver
+        self.churn = churn
+
+    def __call__(self, data, timestamp: float):
+        """Record every row's history and return the top ``top_n``, largest first."""
+        pid_of, total_of = getter(data, "pid"), getter(data, "total")
+        with self.profiler.stage("rank"):
+            ranked = top_rows(data, self.top_n, key=total_of)
+        with self.profiler.stage("history"):
+            self.history.record(timestamp, {pid_of(proc): total_of(proc) for proc in data})
+            start, stop = self.viewport.margin_window(len(ranked)) if self.viewport else (0, len(ranked))
+            for proc in ranked[start:stop]:
+                proc["trend"] = self.history.sparkline(proc["pid"])
+        with self.profiler.stage("resolve"):
+            for proc in ranked[start:stop]:
+                proc["remote_host"] = self.resolver.display(proc["top_remote"]) if self.resolver else proc["top_remote"]
+        return _add_churn(ranked, self.churn.last if self.churn else None)
+
+CONNECTION_COLUMNS = [
+    Column("PID", "pid", str, "right"), Column("Process", "name"), Column("Conns", "total", str, "right"),
+    Column("TCP", "tcp", str, "right"), Column("UDP", "udp", str, "right"),
+    Column("Remote Hosts", "remote_hosts", str, "right"), Column("Top Remote", "remote_host"),
+    Column("Status Summary", "status_summary"), Column("Opened/s", "opened_s", "{:g}".format, "right"),
+    Column("Closed/s", "closed_s", "{:g}".format, "right"), Column("TIME_WAIT", "time_wait", str, "right"),
+    Column("Trend", "trend"),
+]
+
+def _build_connections_table(snapshot, top_n: int, refresh_interval: float, title: str = "Active Network Connections (Live)",
+                             profiler=NULL_PROFILER, view: TableView = None, resolver: HostResolver = None,
+                             churn: ChurnTracker = None, where=None):
+    data = snapshot.rows[:top_n]
+    view = view or TableView(CONNECTION_COLUMNS)
+    footer = ("", "[bold]Total[/bold]", str(sum(proc["total"] for proc in data)),
+              "", "", "", f"{len(data)} processes", "", "", "", "", "")
+    filters = (f"Filter: {escape(where.text)}" if where is not None else
+               "Filters: Use --filter 'proto==tcp and rport==443', --status ESTABLISHED, --process chrome, --protocol tcp")
+    caption = (
+        "[dim]Legend: E=ESTABLISHED, T=TIME_WAIT, C=CLOSE_WAIT, S=SYN_SENT, F=FIN_WAIT\n"
+        f"{filters}\n"
+        + _sampling_caption(snapshot, refresh_interval, profiler)
+    )
+    if resolver is not None:
+        stats = resolver.stats()
+        caption += (f"\nReverse DNS: {stats['hit_rate']:.0%} cache hits, {stats['cached']} cached, "
+                    f"{stats['pending']} pending, {stats['failed']} without a name")
+    if churn is not None and churn.last is not None:
+        caption += "\n" + churn.last.caption()
+    return view.build(data, title=title, caption=caption, footer=footer)
+
+def _live_monitor_fallback(collection: _Collection, refresh_interval: float, top_n: int, os_type: str, export: str = None,
+                           output: str = None, stream_factory=None, client=None, profiler=NULL_PROFILER,
+                           resolve: bool = True, iface_interval: float = None, group_by: str = "process",
+                           scheduler: CpuBudget = None):
     print(f"[bold yellow]Per-process bandwidth is not supported on {os_type.upper()}.[/bold yellow]")
     print("[bold green]Showing real-time connection activity instead. Press Ctrl+C to stop.[/bold green]")
 
-    def get_process_connection_summary():
-        summary = []
+    viewport = Viewport()
+    view = TableView(_group_columns(CONNECTION_COLUMNS, group_by), viewport)
+    fields = _group_fields(CONNECTION_FIELDS, group_by)
+    resolver = HostResolver() if resolve else None
+    churn = ChurnTracker() if client is None else None
+    rows = _ConnectionRows(top_n, refresh_interval, profiler, viewport, resolver, churn)
+    exporter = stream_factory(fields) if stream_factory else None
+    pool, where = collection.pool, collection.where
 
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                if process_filter and process_filter.lower() not in proc.info['name'].lower():
-                    continue
+    def summary():
+        if client is not None:
+            with profiler.stage("fetch"):
+                return _from_daemon_rows(client.fetch("connections", wait=True)[1])
+        if group_by != "process":
+            with profiler.stage("scan"):
+                snapshot = collect_connections(pool=pool, churn=churn, where=where)
+            with profiler.stage("group"):
+                grouped, members = _group_connections(snapshot, group_by)
+            with profiler.stage("aggregate"):
+                return _finish_groups(_summarize_connections(snapshot=grouped), members, group_by)
+        if pool is not None:
+            with profiler.stage("scan"):
+                return _summarize_connections(churn=churn, pool=pool, where=where)
+        with profiler.stage("scan"):
+            snapshot = collect_connections(churn=churn, where=where)
+        if profiler.enabled:
+            profiler.count("processes", len(snapshot))
+            profiler.count("sockets", sum(len(conns) for conns in snapshot.by_pid.values()))
+        with profiler.stage("aggregate"):
+            return _summarize_connections(snapshot=snapshot)
+    collect = _streamed(lambda elapsed: rows(summary(), time.monotonic()), exporter, top_n)
+    snapshot = _run_live(Sampler(collect, refresh_interval, scheduler=scheduler, cpu_clock=collection.cpu_time),
+                         lambda snapshot: _build_connections_table(snapshot, top_n, refresh_interval,
+                                                                   "Active Network Connections (Live)" + _group_title(group_by),
+                                                                   profiler=profiler, view=view, resolver=resolver,
+                                                                   churn=churn, where=collection.where),
+                         profiler=profiler, viewport=viewport, panel=_iface_panel(iface_interval) if iface_interval else None)
+    if resolver is not None:
+        resolver.close()
+    print("\n[bold yellow]Exiting fallback monitor.[/bold yellow]")
+    _close_stream(exporter)
+    if export in ("json", "csv"):
+        # Export what was last sampled rather than scanning /proc again.
+        results = list(snapshot.rows) if snapshot else []
+        filename = _export_snapshot(results[:top_n], export, output, fields)
+        print(f"[green]Snapshot exported to:[/green] {filename}")
 
-                conns = proc.connections(kind='inet')
-                if not conns:
-                    continue
+REMOTE_FIELDS = ["kind", "remote", "count", "error", "share"]
+REMOTE_COLUMNS = [
+    Column("Remote", "remote", escape), Column("Socket-ticks", "count", lambda v: f"{v:,}", "right"),
+    Column("± max error", "error", lambda v: f"{v:,}", "right"), Column("Share", "share", lambda v: f"{v:.1%}", "right"),
+]
 
-                if status:
-                    conns = [c for c in conns if c.status.lower() == status.lower()]
-                    if not conns:
-                        continue
+def _remote_key(row):
+    return row["remote"]
 
-                tcp_count = sum(1 for c in conns if c.type == socket.SOCK_STREAM)
-                udp_count = sum(1 for c in conns if c.type == socket.SOCK_DGRAM)
-                remotes = [c.raddr.ip for c in conns if c.raddr]
-                remote_counts = Counter(remotes)
-                most_common_remote = remote_counts.most_common(1)[0][0] if remote_counts else "-"
+def _remote_views():
+    return TableView(REMOTE_COLUMNS, key=_remote_key), TableView(REMOTE_COLUMNS, key=_remote_key)
 
-                status_counts = Counter(c.status for c in conns)
-                status_summary = " ".join(f"{s[0]}:{count}" for s, count in status_counts.items())
+def _remotes_tick(tracker: RemoteTracker, top_n: int):
+    tracker.observe(remote_endpoints())
+    endpoints, subnets = tracker.rows(top_n)
+    return endpoints, subnets, tracker.stats()
 
-                summary.append({
-                    "pid": proc.pid,
-                    "name": proc.info['name'],
-                    "total": len(conns),
-                    "tcp": tcp_count,
-                    "udp": udp_count,
-                    "remote_hosts": len(set(remotes)),
-                    "top_remote": most_common_remote,
-                    "status_summary": status_summary,
-                })
+def _build_remotes_panel(rows, refresh_interval: float = None, snapshot=None, views=None):
+    endpoints, subnets, stats = rows
+    views = views or _remote_views()
+    caption = (
+        f"[dim]Space-Saving, {stats['capacity']:,} counters per table, {stats['ticks']} sample(s), "
+        f"{stats['total']:,} socket-ticks. Counts never undercount and overcount by at most the error column "
+        f"(≤ {stats['endpoint_error']:,} for endpoints, ≤ {stats['subnet_error']:,} for subnets); "
+        f"any remote above that is listed.[/dim]"
+    )
+    if snapshot is not None:
+        caption += "\n" + _sampling_caption(snapshot, refresh_interval)
+    return Group(
+        views[0].build(endpoints, title=f"Top Remote Endpoints ({stats['endpoints']:,} tracked)"),
+        views[1].build(subnets, title=f"Top Remote Subnets ({stats['subnets']:,} tracked)", caption=caption),
+    )
 
-            except (psutil.AccessDenied, psutil.NoSuchProcess):
-                continue
+def remotes_view(refresh_interval: float = 1.0, top_n: int = 15, capacity: int = 1000, v4_prefix: int = 24,
+                 v6_prefix: int = 64, once: bool = False, export: str = None, output: str = None):
+    """System-wide top remote endpoints and subnets in fixed memory."""
+    tracker = RemoteTracker(capacity, v4_prefix, v6_prefix)
+    if once:
+        rows = _remotes_tick(tracker, top_n)
+    else:
+        views = _remote_views()
+        sampler = Sampler(lambda elapsed: _remotes_tick(tracker, top_n), refresh_interval)
+        snapshot = _run_live(sampler, lambda snapshot: _build_remotes_panel(snapshot.rows, refresh_interval,
+                                                                            snapshot, views))
+        print("\n[bold yellow]Exiting remotes view.[/bold yellow]")
+        if snapshot is None:
+            return
+        rows = snapshot.rows
+    if export in ("json", "csv"):
+        filename = _export_snapshot(rows[0] + rows[1], export, output, REMOTE_FIELDS)
+        print(f"[green]Snapshot exported to:[/green] {filename}")
+    elif once:
+        print(_build_remotes_panel(rows))
 
-        return sorted(summary, key=lambda x: x["total"], reverse=True)
+_rate = lambda v: format_bytes(v) + "/s"
+IFACE_COLUMNS = [
+    Column("Interface", "iface", escape), Column("Sent now", "sent_now", _rate, "right"),
+    Column("Recv now", "recv_now", _rate, "right"), Column("Sent 1s", "sent_1s", _rate, "right"),
+    Column("Recv 1s", "recv_1s", _rate, "right"), Column("Sent 10s", "sent_10s", _rate, "right"),
+    Column("Recv 10s", "recv_10s", _rate, "right"), Column("Sent 60s", "sent_60s", _rate, "right"),
+    Column("Recv 60s", "recv_60s", _rate, "right"), Column("Pkts/s", "packets_1s", lambda v: f"{v:,.0f}", "right"),
+    Column("Errors", "errors", str, "right"), Column("Drops", "drops", str, "right"),
+]
 
+def _iface_key(row):
+    return row["iface"]
 
-    def build_table():
-        data = get_process_connection_summary()
-        table = Table(title="Active Network Connections (Live)", expand=True)
-        table.add_column("PID", justify="right")
-        table.add_column("Process")
-        table.add_column("Conns", justify="right")
-        table.add_column("TCP", justify="right")
-        table.add_column("UDP", justify="right")
-        table.add_column("Remote Hosts", justify="right")
-        table.add_column("Top Remote IP")
-        table.add_column("Status Summary")
-
-        for proc in data[:top_n]:
-            table.add_row(
-                str(proc["pid"]),
-                proc["name"],
-                str(proc["total"]),
-                str(proc["tcp"]),
-                str(proc["udp"]),
-                str(proc["remote_hosts"]),
-                proc["top_remote"],
-                proc["status_summary"]
-            )
+def _build_iface_table(snapshot, view: TableView = None, rates: InterfaceRates = None):
+    view = view or TableView(IFACE_COLUMNS, key=_iface_key)
+    caption = (f"[dim]Sample #{snapshot.seq}, collected in {snapshot.duration * 1000:.2f} ms"
+               + (f" every {rates.interval * 1000:g} ms; 'now' is the last {rates.now_ticks} samples"
+                  if rates is not None else ""))
+    if snapshot.missed:
+        caption += f", [red]missed {snapshot.missed} tick(s)[/red]"
+    wraps = sum(row["wraps"] for row in snapshot.rows)
+    if wraps:
+        caption += f", {wraps} counter wrap(s)/reset(s) corrected"
+    return view.build(list(snapshot.rows), title="Interfaces", caption=caption + "[/dim]")
 
-        table.add_row(
-            "", "[bold]Total[/bold]",
-            str(sum(proc["total"] for proc in data[:top_n])),
-            "", "", "",
-            f"{len(data[:top_n])} processes", ""
-        )
+def _iface_panel(interval: float):
+    """A ``(sampler, build)`` pair for :func:`_run_live`: NIC rates on their own fast cadence."""
+    rates = InterfaceRates(interval)
+    view = TableView(IFACE_COLUMNS, key=_iface_key)
+    return Sampler(rates.sample, interval), lambda snapshot: _build_iface_table(snapshot, view, rates)
 
-        table.caption = (
-            "[dim]Legend: E=ESTABLISHED, T=TIME_WAIT, C=CLOSE_WAIT, S=SYN_SENT, F=FIN_WAIT\n"
-            "Filters: Use --status ESTABLISHED or --process chrome"
-        )
+def ifaces_view(interval: float = 0.1, refresh_interval: float = 0.25, once: bool = False, duration: float = 1.0,
+                export: str = None, output: str = None):
+    """Per-interface throughput sampled every ``interval`` seconds, repainted every ``refresh_interval``."""
+    rates = InterfaceRates(interval)
+    sampler = Sampler(rates.sample, interval)
+    if once:
+        sampler.start()
+        time.sleep(duration)
+        sampler.stop(timeout=1)
+        snapshot = sampler.latest()
+    else:
+        view = TableView(IFACE_COLUMNS, key=_iface_key)
+        # Sampling runs at its own rate; repaints are capped at the render rate.
+        snapshot = _run_live(sampler, lambda snapshot: _build_iface_table(snapshot, view, rates),
+                             render_rate=1 / refresh_interval)
+        print("\n[bold yellow]Exiting interface view.[/bold yellow]")
+    if snapshot is None:
+        return
+    if export in ("json", "csv"):
+        filename = _export_snapshot(snapshot.rows, export, output, IFACE_FIELDS)
+        print(f"[green]Snapshot exported to:[/green] {filename}")
+    elif once:
+        print(_build_iface_table(snapshot, rates=rates))
 
-        return table
+def _from_daemon_rows(rows: dict):
+    """Turn a decoded ``{pid: row}`` connections tick back into (unsorted) summary rows."""
+    return [ConnectionRow.from_mapping(row, pid=pid) for pid, row in rows.items()]
 
+def _recording_source(collection: _Collection):
+    if supports_per_process_network_io():
+        return "bandwidth", collection.net_io_by_pid
+    return "connections", collection.connection_rows_by_pid
+
+def _collector_sources(collection: _Collection) -> dict:
+    """What a daemon or agent collects every tick: connections, and bandwidth where supported."""
+    sources = {"connections": collection.connection_rows_by_pid}
+    if supports_per_process_network_io():
+        sources["bandwidth"] = collection.net_io_by_pid
+    return sources
+
+def _run_until_stopped(sampler, server=None, name: str = None, duration: float = None, timeout: float = 1):
+    """Run ``sampler``, with ``server`` served alongside, until Ctrl+C, ``duration`` or a collection error.
+
+    However the wait ends, the server is shut down and closed and the sampler
+    stopped (waiting up to ``timeout``); a collection error is then re-raised.
+    """
+    started = time.monotonic()
+    sampler.start()
+    if server is not None:
+        serve_in_thread(server, name=name)
     try:
-        with Live(refresh_per_second=1, screen=True) as live:
-            while True:
-                table = build_table()
-                live.update(table)
-                time.sleep(refresh_interval)
+        while sampler.is_alive() and (duration is None or time.monotonic() - started < duration):
+            sampler.join(0.5)
+        sampler.latest()
     except KeyboardInterrupt:
-        print("\n[bold yellow]Exiting fallback monitor.[/bold yellow]")
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        sampler.stop(timeout=timeout)
 
+def record_session(directory: str, refresh_interval: float = 1.0, duration: float = None, segment_mb: float = 8.0):
+    kind, collect = _recording_source(_Collection())
+    recorder = Recorder(directory, kind, int(segment_mb * 1024 * 1024))
+    sampler = Sampler(lambda elapsed: recorder.append(time.time(), collect()) or [], refresh_interval)
+    print(f"[bold green]Recording {kind} samples every {refresh_interval:g}s to {directory}. Press Ctrl+C to stop.[/bold green]")
+    started = time.monotonic()
+    seq = 0
+    sampler.start()
+    try:
+        with Live(refresh_per_second=2, transient=True) as live:
+            while duration is None or time.monotonic() - started < duration:
+                snapshot = sampler.wait_for(seq, 0.5)
+                if snapshot is not None:
+                    seq = snapshot.seq
+                live.update(
+                    f"{recorder.ticks} ticks, {format_bytes(recorder.bytes_written)} written"
+                    + (f", [red]missed {snapshot.missed} tick(s)[/red]" if snapshot and snapshot.missed else "")
+                )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop(timeout=max(refresh_interval, 1))
+        recorder.close()
+    print(f"[green]Recorded {recorder.ticks} ticks ({format_bytes(recorder.bytes_written)}) to:[/green] {directory}")
+
+def serve_metrics(host: str = "127.0.0.1", port: int = 9180, refresh_interval: float = 5.0, top_n: int = 20):
+    collection = _Collection()
+    bandwidth = collection.net_io_by_pid if supports_per_process_network_io() else None
+    collector = MetricsCollector(collection.connection_summary, bandwidth, top_n)
+    # Publish one body before accepting scrapes so the first one is not empty.
+    collector.tick()
+    sampler = Sampler(collector.tick, refresh_interval)
+    server = make_server(collector, host, port)
+    print(f"[bold green]Serving metrics on http://{host}:{server.server_address[1]}/metrics "
+          f"(collecting every {refresh_interval:g}s). Press Ctrl+C to stop.[/bold green]")
+    _run_until_stopped(sampler, server, "netmonitor-metrics")
+    print(f"\n[bold yellow]Stopped after {collector.ticks} collections.[/bold yellow]")
+
+def run_daemon(socket_path: str = None, refresh_interval: float = 1.0):
+    sources = _collector_sources(_Collection())
+    state = CollectorState(sources, refresh_interval)
+    server = make_daemon_server(state, socket_path)
+    sampler = Sampler(state.collect, refresh_interval)
+    print(f"[bold green]Collector daemon listening on {server.server_address} "
+          f"({', '.join(sources)} every {refresh_interval:g}s). Press Ctrl+C to stop.[/bold green]")
+    try:
+        _run_until_stopped(sampler, server, "netmonitor-daemon")
+    finally:
+        os.unlink(server.server_address)
+    print(f"\n[bold yellow]Daemon stopped after {state.seq} collections.[/bold yellow]")
 
+def _to_top_connection_rows(rows: dict):
+    return [TopConnectionRow(pid, row["name"], row["total"], row["tcp"], row["udp"], row["remote_hosts"])
+            for pid, row in rows.items()]
+
+def replay_session(directory: str, mode: str = "live", start: float = None, end: float = None, speed: float = 1.0,
+                   top_n: int = 15, export: str = None, output: str = None, sort: str = None):
+    with Recording(directory) as recording:
+        if mode == "top":
+            first = last = None
+            for tick in recording.ticks(start, end):
+                first = first or tick
+                last = tick
+            if last is None:
+                print("[bold yellow]No samples in the requested time range.[/bold yellow]")
+                return
+            print(f"[bold]Replaying {datetime.fromtimestamp(first[0])} - {datetime.fromtimestamp(last[0])}[/bold]")
+            if recording.kind == "bandwidth":
+                _render_top_bandwidth(_bandwidth_rows(_as_totals(first[1]), _as_totals(last[1])), top_n, export, output,
+                                      sort or "total")
+            else:
+                _render_top_connections(_to_top_connection_rows(last[1]), top_n, export, output, sort or "count")
+            return
+        _replay_live(recording, start, end, speed, top_n)
+
+def _replay_live(recording, start: float, end: float, speed: float, top_n: int):
+    ticks = recording.ticks(start, end)
+    interval = 1.0
+    bandwidth = recording.kind == "bandwidth"
+    rows = _BandwidthRows(top_n, interval) if bandwidth else _ConnectionRows(top_n, interval)
+    view = TableView(BANDWIDTH_COLUMNS if bandwidth else CONNECTION_COLUMNS)
+    prev_ts = None
+    seq = 0
+    try:
+        with Live(refresh_per_second=4, screen=True) as live:
+            for ts, data in ticks:
+                elapsed = ts - prev_ts if prev_ts is not None else 0.0
+                if prev_ts is not None and speed > 0:
+                    time.sleep(elapsed / speed)
+                prev_ts = ts
+                seq += 1
+                if bandwidth:
+                    published = rows(_as_totals(data), ts, elapsed)
+                else:
+                    published = rows(_from_daemon_rows(data), ts)
+                snapshot = Snapshot(seq, ts, ts, elapsed, 0.0, tuple(published), False, 0)
+                title = f"Replay {datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')}"
+                build = _build_bandwidth_table if bandwidth else _build_connections_table
+                live.update(build(snapshot, top_n, elapsed or interval, title=title, view=view))
+    except KeyboardInterrupt:
+        pass
+    print("\n[bold yellow]Replay finished.[/bold yellow]")
+
+def run_agent(listen: str = "127.0.0.1:9190", refresh_interval: float = 1.0, token: str = None):
+    sources = _collector_sources(_Collection())
+    state = AgentState(sources, refresh_interval)
+    server = make_agent_server(state, listen, token=token)
+    sampler = Sampler(state.collect, refresh_interval)
+    host, port = server.server_address[:2]
+    print(f"[bold green]Agent streaming {', '.join(sources)} deltas on {host}:{port} "
+          f"(every {refresh_interval:g}s, collected only while an aggregator is subscribed"
+          f"{', token required' if token else ''}). Press Ctrl+C to stop.[/bold green]")
+    _run_until_stopped(sampler, server, "netmonitor-agent")
+    print(f"\n[bold yellow]Agent stopped after {state.seq} ticks.[/bold yellow]")
+
+CLUSTER_FIELDS = {
+    "bandwidth": ["host", "pid", "name", "sent", "recv", "total"],
+    "connections": ["host", "pid", "name", "total", "tcp", "udp", "remote_hosts", "top_remote", "status_summary"],
+}
+CLUSTER_COLUMNS = {
+    "bandwidth": [Column("Host", "host", escape), Column("PID", "pid", str, "right"), Column("Process", "name"),
+                  Column("Sent/s", "sent", format_bytes, "right"), Column("Recv/s", "recv", format_bytes, "right"),
+                  Column("Total/s", "total", format_bytes, "right")],
+    "connections": [Column("Host", "host", escape), Column("PID", "pid", str, "right"), Column("Process", "name"),
+                    Column("Conns", "total", str, "right"), Column("TCP", "tcp", str, "right"),
+                    Column("UDP", "udp", str, "right"), Column("Remote Hosts", "remote_hosts", str, "right"),
+                    Column("Top Remote", "top_remote"), Column("Status Summary", "status_summary")],
+}
+AGENT_COLUMNS = [
+    Column("Agent", "agent", escape), Column("Host", "host", escape), Column("Status", "status", escape),
+    Column("Rows", "rows", str, "right"), Column("Changed", "changed", str, "right"),
+    Column("Last frame", "frame_bytes", format_bytes, "right"), Column("Link", "link_rate", _rate, "right"),
+    Column("Total", "total", str, "right"), Column("Age", "age", "{:.1f}s".format, "right"),
+]
+
+def _host_key(row):
+    return row.get("host"), row.get("pid")
+
+def _name_key(row):
+    return row.get("name")
+
+def _cluster_pivot_columns(labels, kind: str) -> list:
+    """``--by-name``: one row per process name, a column per agent and the cluster sum."""
+    fmt = format_bytes if kind == "bandwidth" else str
+    return ([Column("Process", "name")] + [Column(label, label, fmt, "right") for label in labels]
+            + [Column("Cluster", "cluster", fmt, "right")])
+
+class _ClusterRows:
+    """Merge the latest tick of every agent into ranked cluster rows.
+
+    Returns ``(rows, agents, merge)``: the top ``top_n`` rows, each tagged
+    with its agent's ``host`` (or pivoted by name), one stats row per agent
+    (see :meth:`~netmonitor.cluster.AgentLink.snapshot`) and the merge's own
+    timing: ``merge_ms`` to build the rows and ``lag``, how long the newest
+    tick merged had been waiting.
+    """
+
+    def __init__(self, cluster: Cluster, top_n: int, by_name: bool = False, clock=time.monotonic):
+        self.cluster = cluster
+        self.top_n = top_n
+        self.by_name = by_name
+        self.clock = clock
+
+    def __call__(self, elapsed: float = 0.0):
+        started = time.perf_counter()
+        bandwidth = self.cluster.kind == "bandwidth"
+        merged, agents, lag = [], [], 0.0
+        for link in self.cluster.links:
+            prev, curr, stats = link.snapshot()
+            rows = []
+            if curr is not None and not bandwidth:
+                rows = list(curr[1].values())
+            elif curr is not None and prev is not None and curr[0] > prev[0]:
+                # Rates over the agent's own last interval, by its own clock.
+                rows = _bandwidth_rows(prev[1], curr[1], curr[0] - prev[0])
+            for row in rows:
+                row.host = link.address
+            merged.extend(rows)
+            total = sum(row.total for row in rows)
+            stats["total"] = format_bytes(total) + "/s" if bandwidth else f"{total:,} conns"
+            if stats["age"] is not None and stats["status"] == "ok":
+                lag = max(lag, stats["age"])
+            agents.append(stats)
+        if self.by_name:
+            pivot = {}
+            for row in merged:
+                entry = pivot.get(row.name)
+                if entry is None:
+                    entry = pivot[row.name] = {"name": row.name, "cluster": 0}
+                entry[row.host] = entry.get(row.host, 0) + row.total
+                entry["cluster"] += row.total
+            ranked = top_rows(list(pivot.values()), self.top_n, key=lambda entry: entry["cluster"])
+        else:
+            ranked = top_rows(merged, self.top_n, key=_TOTAL)
+        merge = {"rows": len(merged), "merge_ms": (time.perf_counter() - started) * 1000, "lag": lag}
+        return ranked, agents, merge
+
+def _build_cluster_view(snapshot, views, kind: str):
+    rows, agents, merge = snapshot.rows
+    connected = sum(agent["status"] == "ok" for agent in agents)
+    link = sum(agent["link_rate"] for agent in agents)
+    title = "Cluster " + ("Network Usage" if kind == "bandwidth" else "Connections")
+    caption = (f"[dim]Sample #{snapshot.seq}: {merge['rows']:,} rows from {connected} of {len(agents)} agents "
+               f"merged in {merge['merge_ms']:.1f} ms; newest tick waited {merge['lag'] * 1000:.0f} ms for the "
+               f"merge; agents send {format_bytes(link)}/s of deltas in total[/dim]")
+    return Group(views[0].build(list(rows), title=title, caption=caption),
+                 views[1].build(agents, title="Agents"))
+
+def aggregate_view(agents, refresh_interval: float = 1.0, top_n: int = 15, kind: str = "bandwidth",
+                   by_name: bool = False, once: bool = False, timeout: float = 5.0, export: str = None,
+                   output: str = None, token: str = None):
+    """Cluster-wide top/live over ``agents`` (``host:port`` of running ``netmonitor agent``s)."""
+    cluster = Cluster(agents, kind, timeout=timeout, token=token)
+    merge = _ClusterRows(cluster, top_n, by_name)
+    labels = [link.address for link in cluster.links]
+    if by_name:
+        columns, fields, key = _cluster_pivot_columns(labels, kind), ["name"] + labels + ["cluster"], _name_key
+    else:
+        columns, fields, key = CLUSTER_COLUMNS[kind], CLUSTER_FIELDS[kind], _host_key
+    views = (TableView(columns, key=key), TableView(AGENT_COLUMNS, key=lambda row: row["agent"]))
+    with cluster:
+        if once:
+            # Rates need two ticks from every agent.
+            if not cluster.wait(2 if kind == "bandwidth" else 1, timeout):
+                print("[yellow]Not every agent answered in time; showing what arrived.[/yellow]")
+            snapshot = Snapshot(1, time.time(), time.monotonic(), 0.0, 0.0, merge(), False, 0)
+        else:
+            snapshot = _run_live(Sampler(merge, refresh_interval),
+                                 lambda snapshot: _build_cluster_view(snapshot, views, kind))
+            print("\n[bold yellow]Exiting cluster view.[/bold yellow]")
+    if snapshot is None:
+        return
+    if export in ("json", "csv"):
+        filename = _export_snapshot(snapshot.rows[0], export, output, fields)
+        print(f"[green]Snapshot exported to:[/green] {filename}")
+    elif once:
+        print(_build_cluster_view(snapshot, views, kind))
+
+def _alert_collector(engine: AlertEngine, sinks, collection: _Collection):
+    """Collect function feeding each tick's rows to ``engine`` and its events to ``sinks``."""
+    last = []
+
+    def collect(elapsed):
+        connections = ()
+        if "connections" in engine.sources:
+            connections = _summarize_connections(pool=collection.pool, where=collection.where)
+        bandwidth = ()
+        if "bandwidth" in engine.sources:
+            curr = collection.net_io_by_pid()
+            if last and elapsed > 0:
+                bandwidth = _bandwidth_rows(last[0], curr, elapsed)
+            last[:] = [curr]
+        events = engine.evaluate(connections, bandwidth)
+        if events:
+            for sink in sinks:
+                sink.emit(events)
+        return events
+    return collect
+
+def alert_monitor(rules, sinks=("stdout",), refresh_interval: float = 1.0, duration: float = None, workers: int = 1):
+    """Evaluate alert ``rules`` every tick until Ctrl+C (or ``duration``) and emit to ``sinks``."""
+    engine = AlertEngine(rules)
+    sinks = [make_sink(sink) for sink in sinks]
+    collection = _Collection(workers)
+    sampler = Sampler(_alert_collector(engine, sinks, collection), refresh_interval)
+    print(f"[bold green]Evaluating {len(engine.rules)} alert rule(s) every {refresh_interval:g}s "
+          f"({', '.join(sorted(engine.sources))}) to {', '.join(map(str, sinks))}. "
+          f"Press Ctrl+C to stop.[/bold green]")
+    try:
+        _run_until_stopped(sampler, duration=duration, timeout=max(refresh_interval, 1))
+    finally:
+        for sink in sinks:
+            sink.close()
+        collection.close()
+    print(f"\n[bold yellow]Stopped after {engine.ticks} ticks: {engine.fired} fired, {engine.resolved} resolved, "
+          f"{engine.suppressed} held back by cooldowns, {engine.firing} still firing; "
+          f"evaluation took up to {engine.max_ms:.3f} ms.[/bold yellow]")
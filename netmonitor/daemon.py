@@ -0,0 +1,289 @@
+"""Shared collector daemon and its Unix-socket client.
+
+One ``netmonitor daemon`` owns the collector; ``top`` and ``live`` fetch its
+latest tick over a Unix domain socket instead of scanning ``/proc``
+themselves. Messages are framed as a 4-byte big-endian payload length and a
+one-byte type:
+
+* ``INFO`` request (empty) -> ``INFO`` reply: sampling interval and the
+  comma-separated kinds the daemon collects
+* ``FETCH`` request: ``<kind>`` NUL ``<varint seq>`` -> ``TICK`` reply:
+  ``<varint seq>`` followed by :class:`~netmonitor.recording.TickCodec`
+  records. The daemon waits for a tick newer than ``seq`` (0 = any).
+* ``ERROR`` reply: UTF-8 message
+
+Every connection keeps one codec per kind on both ends, so the first reply
+on a connection is a full snapshot and later ones are deltas against what
+that client already holds.
+
+The ticks list every process's connections, so the socket is private: it
+lives in a ``0700`` per-user directory (``$XDG_RUNTIME_DIR``, else
+``/tmp/netmonitor-<uid>``, whose owner and mode are checked after creating
+it), is created mode ``0600``, and clients only talk to a socket owned by
+their own user.
+"""
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+
+from netmonitor.recording import SCHEMAS, TickCodec, _get_varint, _put_varint
+
+INFO = 0x01
+FETCH = 0x02
+TICK = 0x03
+ERROR = 0x04
+_HEADER = struct.Struct(">IB")
+MAX_FRAME = 64 * 1024 * 1024
+SOCKET_ENV = "NETMONITOR_SOCKET"
+
+
+class DaemonError(Exception):
+    pass
+
+
+def default_socket_path() -> str:
+    """``$NETMONITOR_SOCKET``, else ``netmonitor.sock`` in a private per-user directory."""
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "netmonitor.sock")
+    return os.path.join("/tmp", f"netmonitor-{os.getuid()}", "netmonitor.sock")
+
+
+def _private_dir(path: str):
+    """Create ``path`` mode 0700 if missing; DaemonError unless it is our own private directory."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    except OSError as exc:
+        raise DaemonError(f"cannot create {path}: {exc}")
+    # lstat: a symlink planted by another user is not followed.
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise DaemonError(f"{path} must be a directory owned by uid {os.getuid()} with mode 0700")
+
+
+def _check_owner(path: str):
+    """DaemonError unless the socket at ``path`` belongs to us and cannot be swapped by another user."""
+    info = os.stat(path)
+    if info.st_uid != os.getuid():
+        raise DaemonError(f"{path} is owned by uid {info.st_uid}, not {os.getuid()}")
+    parent = os.stat(os.path.dirname(os.path.abspath(path)))
+    shared = parent.st_mode & 0o022 and not parent.st_mode & stat.S_ISVTX
+    if parent.st_uid not in (0, os.getuid()) or shared:
+        raise DaemonError(f"{os.path.dirname(path)} lets other users replace {path}")
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_frame(sock, type_: int, payload: bytes = b""):
+    sock.sendall(_HEADER.pack(len(payload), type_) + payload)
+
+
+def recv_frame(sock):
+    length, type_ = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if length > MAX_FRAME:
+        raise DaemonError(f"frame of {length} bytes exceeds limit")
+    return type_, _recv_exact(sock, length) if length else b""
+
+
+class CollectorState:
+    """Latest tick per kind, published by the daemon's sampler.
+
+    ``sources`` maps a kind from ``SCHEMAS`` to a function returning
+    ``{pid: row}``; :meth:`collect` is the sampler's collect function.
+    """
+
+    def __init__(self, sources: dict, interval: float):
+        unknown = set(sources) - set(SCHEMAS)
+        if unknown:
+            raise ValueError(f"unknown kinds: {', '.join(sorted(unknown))}")
+        self.sources = sources
+        self.interval = interval
+        self.seq = 0
+        self.ticks = {}
+        self._changed = threading.Condition()
+
+    def active_kinds(self):
+        """The kinds collected on the next tick: all of them here."""
+        return self.sources
+
+    def collect(self, elapsed: float = 0.0) -> list:
+        ticks = {kind: (time.time(), self.sources[kind]()) for kind in self.active_kinds()}
+        with self._changed:
+            self.ticks = ticks
+            self.seq += 1
+            self._changed.notify_all()
+        return []
+
+    def wait_newer(self, seq: int, timeout: float):
+        """Return ``(seq, ticks)`` once a tick newer than ``seq`` exists (or on timeout)."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.seq > seq, timeout)
+            return self.seq, self.ticks
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    state = None
+
+    def handle(self):
+        codecs = {}
+        sock = self.request
+        while True:
+            try:
+                type_, payload = recv_frame(sock)
+            except (ConnectionError, OSError, DaemonError, struct.error):
+                return
+            state = self.state
+            if type_ == INFO:
+                info = f"{state.interval:g};{','.join(state.sources)}"
+                send_frame(sock, INFO, info.encode("ascii"))
+                continue
+            if type_ != FETCH:
+                send_frame(sock, ERROR, f"unknown request type {type_}".encode())
+                continue
+            kind, _, rest = payload.partition(b"\0")
+            kind = kind.decode("ascii", "replace")
+            if kind not in state.sources:
+                send_frame(sock, ERROR, f"kind '{kind}' is not collected by this daemon".encode())
+                continue
+            after, _ = _get_varint(rest, 0) if rest else (0, 0)
+            seq, ticks = state.wait_newer(after, max(state.interval * 2, 1.0))
+            if kind not in ticks:
+                send_frame(sock, ERROR, b"no sample collected yet")
+                continue
+            codec = codecs.get(kind)
+            if codec is None:
+                codec = codecs[kind] = TickCodec(kind)
+            out = bytearray()
+            _put_varint(out, seq)
+            timestamp, rows = ticks[kind]
+            out += codec.encode(timestamp, rows)
+            send_frame(sock, TICK, bytes(out))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # Created 0600 from the start, not chmod-ed after a window under the default umask.
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, 0o600)
+
+
+def is_running(path: str = None) -> bool:
+    path = path or default_socket_path()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            probe.connect(path)
+        return True
+    except OSError:
+        return False
+
+
+def make_server(state: CollectorState, path: str = None) -> _Server:
+    """Bind the daemon socket, replacing a stale one left by a dead daemon.
+
+    The default path's directory is created private (see :func:`_private_dir`).
+    """
+    if path is None:
+        path = default_socket_path()
+        if not os.environ.get(SOCKET_ENV):
+            _private_dir(os.path.dirname(path))
+    if os.path.exists(path):
+        if is_running(path):
+            raise DaemonError(f"a daemon is already listening on {path}")
+        os.unlink(path)
+    handler = type("Handler", (_Handler,), {"state": state})
+    return _Server(path, handler)
+
+
+class DaemonClient:
+    """A connection to a running daemon; not thread-safe.
+
+    Refuses (DaemonError) a socket owned by another user, who could feed it
+    made-up ticks.
+    """
+
+    def __init__(self, path: str = None, timeout: float = 5.0):
+        self.path = path or default_socket_path()
+        _check_owner(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(self.path)
+            send_frame(self.sock, INFO)
+            type_, payload = recv_frame(self.sock)
+        except OSError:
+            self.sock.close()
+            raise
+        if type_ != INFO:
+            self.sock.close()
+            raise DaemonError("unexpected reply to INFO")
+        interval, _, kinds = payload.decode("ascii").partition(";")
+        self.interval = float(interval)
+        self.kinds = tuple(k for k in kinds.split(",") if k)
+        self.bytes_received = 0
+        self._codecs = {}
+        self._seq = {}
+
+    def fetch(self, kind: str, wait: bool = False):
+        """Return the daemon's latest ``(timestamp, {pid: row})`` for ``kind``.
+
+        With ``wait`` the call blocks until the daemon has a tick newer than
+        the one this client last received.
+        """
+        payload = bytearray(kind.encode("ascii") + b"\0")
+        _put_varint(payload, self._seq.get(kind, 0) if wait else 0)
+        send_frame(self.sock, FETCH, bytes(payload))
+        type_, reply = recv_frame(self.sock)
+        if type_ == ERROR:
+            raise DaemonError(reply.decode("utf-8", "replace"))
+        if type_ != TICK:
+            raise DaemonError(f"unexpected reply type {type_}")
+        self.bytes_received += _HEADER.size + len(reply)
+        seq, pos = _get_varint(reply, 0)
+        self._seq[kind] = seq
+        codec = self._codecs.get(kind)
+        if codec is None:
+            codec = self._codecs[kind] = TickCodec(kind)
+        ticks = list(codec.decode(reply, pos, len(reply)))
+        if not ticks:
+            raise DaemonError("truncated tick")
+        return ticks[-1]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(path: str = None, timeout: float = 5.0):
+    """Return a :class:`DaemonClient` if a daemon is running, else None."""
+    try:
+        return DaemonClient(path, timeout)
+    except (OSError, DaemonError):
+        return None
@@ -0,0 +1,135 @@
+"""Streaming per-tick export of live rows to NDJSON or CSV files.
+
+The sampler hands each tick's rows to :meth:`StreamExporter.submit`, which
+only enqueues them; a writer thread serializes them through a buffered file
+and handles size/time based rotation and optional gzip. If the writer falls
+behind, ticks are dropped (and counted) rather than stalling sampling.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+import time
+
+FORMATS = ("ndjson", "csv")
+
+
+class StreamExporter:
+    """Write ``(timestamp, rows)`` batches to rotating files in the background.
+
+    ``output`` is the file path; with rotation enabled, files are named
+    ``<stem>-0001<ext>``, ``<stem>-0002<ext>``, ... ``rotate_bytes`` counts
+    uncompressed bytes. ``fieldnames`` selects and orders the columns; a
+    leading ``timestamp`` column is always added.
+    """
+
+    def __init__(self, output: str, fmt: str, fieldnames, rotate_bytes: int = None, rotate_seconds: float = None,
+                 compress: bool = False, max_pending: int = 256, buffer_size: int = 1 << 16):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown stream format: {fmt}")
+        self.output = output
+        self.fmt = fmt
+        self.fieldnames = ["timestamp"] + list(fieldnames)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.files = []
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = queue.Queue(max_pending)
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="netmonitor-export", daemon=True)
+        self._thread.start()
+
+    def submit(self, timestamp: float, rows):
+        """Queue one tick for writing; never blocks."""
+        try:
+            self._queue.put_nowait((timestamp, rows))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending ticks and close the current file, waiting at most ``timeout`` seconds.
+
+        Never hangs on a writer that has died (see :attr:`error`) or stalled
+        with a full queue.
+        """
+        deadline = time.monotonic() + timeout
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put((None, None), timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(max(deadline - time.monotonic(), 0))
+
+    def _path(self) -> str:
+        path = self.output
+        if self.rotate_bytes or self.rotate_seconds:
+            stem, ext = os.path.splitext(self.output)
+            path = f"{stem}-{len(self.files) + 1:04d}{ext}"
+        if self.compress and not path.endswith(".gz"):
+            path += ".gz"
+        return path
+
+    def _open(self):
+        path = self._path()
+        if self.compress:
+            self._file = gzip.open(path, "wt", newline="")
+        else:
+            self._file = open(path, "w", newline="", buffering=self.buffer_size)
+        self.files.append(path)
+        self._opened = time.monotonic()
+        self._size = 0
+        if self.fmt == "csv":
+            csv.writer(self._file).writerow(self.fieldnames)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _should_rotate(self) -> bool:
+        if self.rotate_bytes and self._size >= self.rotate_bytes:
+            return True
+        return bool(self.rotate_seconds) and time.monotonic() - self._opened >= self.rotate_seconds
+
+    def _write(self, timestamp: float, rows):
+        if self._file is None:
+            self._open()
+        elif self._should_rotate():
+            self._close_file()
+            self._open()
+        # Each tick is serialized into one string and written in a single
+        # call so the file buffer sees large, regular writes.
+        fields = self.fieldnames[1:]
+        if self.fmt == "ndjson":
+            chunk = "".join(
+                json.dumps(dict({"timestamp": timestamp}, **{k: row.get(k) for k in fields})) + "\n"
+                for row in rows
+            )
+        else:
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerows([timestamp] + [row.get(k, "") for k in fields] for row in rows)
+            chunk = buf.getvalue()
+        self._file.write(chunk)
+        self._size += len(chunk)
+        self.written += 1
+
+    def _run(self):
+        try:
+            while True:
+                timestamp, rows = self._queue.get()
+                if rows is None:
+                    break
+                self._write(timestamp, rows)
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self._close_file()
@@ -0,0 +1,493 @@
+"""Filter expressions for ``top``/``live``, compiled once and pushed down into collection.
+
+An expression such as::
+
+    proto==tcp and status in (ESTABLISHED, SYN_SENT) and name~^nginx and rport==443
+
+is parsed once into a tree. Comparisons are ``==``/``=``, ``!=``, ``~``
+(regex search), ``!~``, ``in (a, b, ...)``, ``not in`` and, for numbers,
+``<``, ``<=``, ``>``, ``>=``; they combine with ``and``, ``or``, ``not`` and
+parentheses. Values are bare words or quoted with ``'`` or ``"`` (needed for
+regexes with spaces, parentheses or commas). Fields:
+
+* ``proto`` - ``tcp`` or ``udp``; ``family`` - ``4`` or ``6``
+* ``status`` - a TCP state (``NONE`` for UDP sockets)
+* ``laddr``, ``raddr`` - an address or CIDR network (``10.0.0.0/8``), or a regex
+* ``lport``, ``rport`` - ports (0 when there is no remote end)
+* ``pid``, ``name`` - the owning process
+
+The tree is evaluated three-valued wherever only some fields are known, so
+the filter is applied as early as it can decide anything:
+
+1. :meth:`Filter.tables` drops the socket tables (protocol and family) no
+   row of which can match, before they are read;
+2. :meth:`Filter.process_predicate` rules processes out on their PID and
+   name, before the :class:`~netmonitor.inodes.InodeIndex` walks their fds;
+3. :meth:`Filter.table_predicate` compiles what is left for one table into
+   Python source over its raw columns (states as codes, addresses as
+   integers), so rows are skipped before they are turned into connections
+   or aggregated. :meth:`Filter.connection_predicate` does the same for
+   psutil-style connection tuples.
+
+Filters pickle as their text, so worker processes compile their own copy.
+"""
+import ipaddress
+import re
+import socket
+from functools import lru_cache
+
+from netmonitor.procnet import TABLES, TCP_STATES
+
+FIELDS = ("proto", "family", "status", "laddr", "lport", "raddr", "rport", "pid", "name")
+STATUSES = tuple(TCP_STATES.values()) + ("NONE",)
+
+_NUMBERS = ("lport", "rport", "pid")
+_ADDRESSES = ("laddr", "raddr")
+_ORDERING = ("<", "<=", ">", ">=")
+_TOKEN = re.compile(r"""\s*(?:(?P<op>==|!=|!~|<=|>=|<|>|~|=)|(?P<punct>[(),])|'(?P<sq>[^']*)'|"(?P<dq>[^"]*)"|"""
+                    r"""(?P<word>[^\s(),=!<>~'"]+))""")
+_FAMILIES = {"4": 4, "6": 6, "ipv4": 4, "ipv6": 6, "inet": 4, "inet6": 6}
+
+
+class FilterError(ValueError):
+    """An expression that does not parse or compares a field with a bad value."""
+
+
+def _tokens(text: str) -> list:
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise FilterError(f"unexpected {text[pos:].strip()[:10]!r} at column {pos + 1}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        tokens.append(("value" if kind in ("sq", "dq") else kind, value, match.start(kind) + 1))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = _tokens(text)
+        self.pos = 0
+
+    def peek(self, kind: str = None, value: str = None):
+        if self.pos >= len(self.tokens):
+            return None
+        token = self.tokens[self.pos]
+        if kind is not None and token[0] != kind:
+            return None
+        if value is not None and token[1].lower() != value:
+            return None
+        return token
+
+    def take(self, kind: str = None, value: str = None, what: str = None):
+        token = self.peek(kind, value)
+        if token is None:
+            found = self.peek()
+            where = f"{found[1]!r} at column {found[2]}" if found else "end of expression"
+            raise FilterError(f"expected {what or value or kind}, found {where}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.either()
+        if self.peek() is not None:
+            token = self.peek()
+            raise FilterError(f"unexpected {token[1]!r} at column {token[2]}")
+        return node
+
+    def either(self):
+        nodes = [self.both()]
+        while self.peek("word", "or"):
+            self.pos += 1
+            nodes.append(self.both())
+        return nodes[0] if len(nodes) == 1 else ("or", tuple(nodes))
+
+    def both(self):
+        nodes = [self.negation()]
+        while self.peek("word", "and"):
+            self.pos += 1
+            nodes.append(self.negation())
+        return nodes[0] if len(nodes) == 1 else ("and", tuple(nodes))
+
+    def negation(self):
+        if self.peek("word", "not"):
+            self.pos += 1
+            return ("not", self.negation())
+        if self.peek("punct", "("):
+            self.pos += 1
+            node = self.either()
+            self.take("punct", ")")
+            return node
+        return self.comparison()
+
+    def comparison(self):
+        _, field, column = self.take("word", what="a field name")
+        field = field.lower()
+        if field not in FIELDS:
+            raise FilterError(f"unknown field {field!r} at column {column}; use one of {', '.join(FIELDS)}")
+        negate = False
+        if self.peek("word", "not"):
+            self.pos += 1
+            negate = True
+            self.take("word", "in")
+            op = "in"
+        elif self.peek("word", "in"):
+            self.pos += 1
+            op = "in"
+        else:
+            op = self.take("op", what="a comparison")[1]
+        if op == "in":
+            self.take("punct", "(")
+            values = [self.value()]
+            while self.peek("punct", ","):
+                self.pos += 1
+                values.append(self.value())
+            self.take("punct", ")")
+            node = _comparison(field, "in", values)
+        else:
+            if op in ("!=", "!~"):
+                negate, op = True, "==" if op == "!=" else "~"
+            node = _comparison(field, "==" if op == "=" else op, self.value())
+        return ("not", node) if negate else node
+
+    def value(self) -> str:
+        token = self.peek("value") or self.take("word", what="a value")
+        if token[0] == "value":
+            self.pos += 1
+        return token[1]
+
+
+def _regex(pattern: str):
+    try:
+        return re.compile(pattern)
+    except re.error as exc:
+        raise FilterError(f"bad regex {pattern!r}: {exc}") from None
+
+
+def _network(field: str, value: str):
+    try:
+        return ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        raise FilterError(f"{field} needs an address or network, got {value!r}") from None
+
+
+def _number(field: str, value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise FilterError(f"{field} needs a number, got {value!r}") from None
+
+
+def _comparison(field: str, op: str, value):
+    """A ``("cmp", field, op, value)`` node with ``value`` normalized for ``field``.
+
+    Fields with a small fixed domain (``proto``, ``family``, ``status``) are
+    resolved here into the set of values that match, whatever the operator.
+    """
+    if op in _ORDERING and field not in _NUMBERS:
+        raise FilterError(f"{field} cannot be compared with {op}")
+    if field in ("proto", "family", "status"):
+        domain = {"proto": ("tcp", "udp"), "family": (4, 6), "status": STATUSES}[field]
+        if op == "~":
+            pattern = _regex(value)
+            return ("cmp", field, "in", frozenset(v for v in domain if pattern.search(str(v))))
+        values = value if op == "in" else [value]
+        if field == "family":
+            keys = [_FAMILIES.get(v.lower()) for v in values]
+        else:
+            keys = [v.lower() if field == "proto" else v.upper() for v in values]
+        for raw, key in zip(values, keys):
+            if key not in domain:
+                raise FilterError(f"unknown {field} {raw!r}; use one of {', '.join(map(str, domain))}")
+        return ("cmp", field, "in", frozenset(keys))
+    if op == "~":
+        if field in _NUMBERS:
+            raise FilterError(f"{field} cannot be matched with ~")
+        return ("cmp", field, "~", _regex(value))
+    if field in _NUMBERS:
+        if op == "in":
+            return ("cmp", field, "in", frozenset(_number(field, v) for v in value))
+        return ("cmp", field, op, _number(field, value))
+    if field in _ADDRESSES:
+        return ("cmp", field, "in", tuple(_network(field, v) for v in (value if op == "in" else [value])))
+    return ("cmp", field, op, frozenset(value) if op == "in" else value)
+
+
+def _test(node, actual) -> bool:
+    """Evaluate one comparison against a known value of its field."""
+    _, field, op, value = node
+    if op == "in":
+        return actual in value
+    if op == "~":
+        return value.search(actual) is not None
+    if op == "==":
+        return actual == value
+    return {"<": actual < value, "<=": actual <= value, ">": actual > value, ">=": actual >= value}[op]
+
+
+def fold(node, env: dict):
+    """Partially evaluate ``node`` with the fields in ``env`` known.
+
+    Returns True or False when that decides it, else the remaining tree.
+    Fields missing from ``env`` (or None there) stay unknown.
+    """
+    if node is True or node is False:
+        return node
+    kind = node[0]
+    if kind == "cmp":
+        actual = env.get(node[1])
+        return node if actual is None else _test(node, actual)
+    if kind == "not":
+        inner = fold(node[1], env)
+        return (not inner) if isinstance(inner, bool) else ("not", inner)
+    stop = kind == "or"
+    rest = []
+    for child in node[1]:
+        result = fold(child, env)
+        if result is stop:
+            return stop
+        if result is not (not stop):
+            rest.append(result)
+    if not rest:
+        return not stop
+    return rest[0] if len(rest) == 1 else (kind, tuple(rest))
+
+
+def _fields(node) -> set:
+    if node is True or node is False:
+        return set()
+    if node[0] == "cmp":
+        return {node[1]}
+    if node[0] == "not":
+        return _fields(node[1])
+    return set().union(*map(_fields, node[1]))
+
+
+def _ipint(ip) -> int:
+    return int(ipaddress.ip_address(ip)) if ip else 0
+
+
+class _Emitter:
+    """Python source for a folded tree, over a table's columns or a connection tuple."""
+
+    def __init__(self, rows: bool, family: int):
+        self.rows = rows
+        self.family = family
+        self.consts = {}
+
+    def const(self, value) -> str:
+        name = f"_k{len(self.consts)}"
+        self.consts[name] = value
+        return name
+
+    def field(self, field: str) -> str:
+        if field == "pid":
+            return "pid"
+        if field == "name":
+            return "(name(pid) or '')"
+        if self.rows:
+            return {"lport": "lport[i]", "rport": "rport[i]",
+                    "laddr": "laddr[i * W:i * W + W]", "raddr": "raddr[i * W:i * W + W]"}[field]
+        zero = "'0.0.0.0'" if self.family == 4 else "'::'"
+        return {"lport": "c.laddr.port", "rport": "(c.raddr.port if c.raddr else 0)",
+                "laddr": "c.laddr.ip", "raddr": f"(c.raddr.ip if c.raddr else {zero})"}[field]
+
+    def emit(self, node) -> str:
+        if node is True or node is False:
+            return str(node)
+        kind = node[0]
+        if kind == "not":
+            return f"not ({self.emit(node[1])})"
+        if kind in ("and", "or"):
+            return f" {kind} ".join(f"({self.emit(child)})" for child in node[1])
+        _, field, op, value = node
+        if field == "status":
+            return self.status(value)
+        if field in _ADDRESSES:
+            return self.address(field, op, value)
+        source = self.field(field)
+        if op == "~":
+            return f"{self.const(value)}.search({source}) is not None"
+        return f"{source} {op} {self.const(value)}"
+
+    def status(self, matching) -> str:
+        # States outside TCP_STATES read as NONE, so NONE matches by exclusion.
+        if "NONE" in matching:
+            excluded = {code for code, name in TCP_STATES.items() if name not in matching}
+            if self.rows:
+                return f"state[i] not in {self.const(frozenset(excluded))}"
+            return f"c.status not in {self.const(frozenset(TCP_STATES[code] for code in excluded))}"
+        if self.rows:
+            return f"state[i] in {self.const(frozenset(c for c, n in TCP_STATES.items() if n in matching))}"
+        return f"c.status in {self.const(frozenset(matching))}"
+
+    def address(self, field: str, op: str, value) -> str:
+        source = self.field(field)
+        if op == "~":
+            if self.rows:
+                source = f"_ntop(family, {source})"
+            return f"{self.const(value)}.search({source}) is not None"
+        networks = [net for net in value if net.version == self.family]
+        if not networks:
+            return "False"
+        number = f"int.from_bytes({source}, 'big')" if self.rows else f"_ipint({source})"
+        tests = [f"_a & {int(net.netmask)} == {int(net.network_address)}" for net in networks]
+        tests[0] = tests[0].replace("_a", f"(_a := {number})", 1)
+        return " or ".join(tests)
+
+
+_TABLE_TEMPLATE = """\
+def bind(table, name):
+    W = table.width
+    family = table.family
+{columns}
+    def match(i, pid):
+        return {expression}
+    return match
+"""
+
+_CONNECTION_TEMPLATE = """\
+def bind(name):
+    def match(c, pid):
+        return {expression}
+    return match
+"""
+
+
+def _compile(node, rows: bool, family: int):
+    emitter = _Emitter(rows, family)
+    expression = emitter.emit(node)
+    namespace = dict(emitter.consts, _ntop=socket.inet_ntop, _ipint=_ipint)
+    if rows:
+        used = _fields(node)
+        columns = [f"    {column} = table.{column}.tolist()" for column, field in
+                   (("state", "status"), ("lport", "lport"), ("rport", "rport")) if field in used]
+        columns += [f"    {field} = table.{field}" for field in _ADDRESSES if field in used]
+        source = _TABLE_TEMPLATE.format(columns="\n".join(columns), expression=expression)
+    else:
+        source = _CONNECTION_TEMPLATE.format(expression=expression)
+    exec(compile(source, "<netmonitor filter>", "exec"), namespace)
+    return namespace["bind"]
+
+
+def _table_env(type_: int, family: int) -> dict:
+    env = {"proto": "tcp" if type_ == socket.SOCK_STREAM else "udp",
+           "family": 4 if family == socket.AF_INET else 6}
+    if env["proto"] == "udp":
+        env["status"] = "NONE"
+    return env
+
+
+class Filter:
+    """A compiled filter expression; see the module docstring for the syntax."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tree = _Parser(text).parse()
+        self.fields = _fields(self.tree)
+        self._binders = {}
+        self._process_predicates = {}
+
+    def __repr__(self):
+        return f"Filter({self.text!r})"
+
+    def __reduce__(self):
+        return compile_filter, (self.text,)
+
+    @property
+    def needs_name(self) -> bool:
+        return "name" in self.fields
+
+    def _folded(self, type_: int, family: int):
+        return fold(self.tree, _table_env(type_, family))
+
+    def tables(self, names) -> tuple:
+        """The ``/proc/net`` table names (``tcp``, ``udp6``, ...) whose rows can match."""
+        folded = {name: self._folded(TABLES[name][1], TABLES[name][0]) for name in names}
+        return tuple(name for name in names if folded[name] is not False)
+
+    def accepts_process(self, pid: int, name: str = None) -> bool:
+        """False only if no socket of this process can match."""
+        return fold(self.tree, {"pid": pid, "name": name}) is not False
+
+    def process_predicate(self, name_of):
+        """``accept(pid)`` for :attr:`InodeIndex.accept`, or None if PIDs cannot be ruled out.
+
+        ``name_of(pid)`` is only called when the expression uses ``name``.
+        The same callable is returned for the same ``name_of``.
+        """
+        if not self.fields & {"pid", "name"}:
+            return None
+        accept = self._process_predicates.get(name_of)
+        if accept is None:
+            needs_name = self.needs_name
+
+            def accept(pid):
+                return self.accepts_process(pid, name_of(pid) if needs_name else None)
+            self._process_predicates[name_of] = accept
+        return accept
+
+    def _binder(self, rows: bool, type_: int, family: int):
+        key = (rows, type_, family)
+        if key not in self._binders:
+            tree = self._folded(type_, family)
+            self._binders[key] = tree if isinstance(tree, bool) else _compile(
+                tree, rows, 4 if family == socket.AF_INET else 6)
+        return self._binders[key]
+
+    def table_predicate(self, table, name_of=None):
+        """``match(i, pid)`` over the rows of a :class:`~netmonitor.procnet.SocketTable`.
+
+        Returns None when every row matches. ``name_of(pid)`` supplies
+        process names if the expression uses them.
+        """
+        binder = self._binder(True, table.type, table.family)
+        if binder is True:
+            return None
+        if binder is False:
+            return lambda i, pid: False
+        return binder(table, name_of)
+
+    def connection_predicate(self, name_of=None):
+        """``match(conn, pid)`` over psutil-style connection tuples."""
+        bound = {}
+
+        def match(conn, pid):
+            key = (conn.type, conn.family)
+            check = bound.get(key)
+            if check is None:
+                binder = self._binder(False, *key)
+                check = bound[key] = binder if isinstance(binder, bool) else binder(name_of)
+            return check if isinstance(check, bool) else check(conn, pid)
+        return match
+
+
+@lru_cache(maxsize=64)
+def compile_filter(text: str) -> Filter:
+    """Parse ``text`` once; raises :class:`FilterError` with the position of a mistake."""
+    if not text or not text.strip():
+        raise FilterError("empty filter expression")
+    return Filter(text)
+
+
+def _quote(value: str) -> str:
+    return f'"{value}"' if "'" in value else f"'{value}'"
+
+
+def combine(expression: str = None, status: str = None, protocol: str = None, process: str = None):
+    """One :class:`Filter` for ``--filter`` and the older ``--status``/``--protocol``/``--process``.
+
+    ``process`` keeps its case-insensitive substring match. Returns None
+    when nothing filters.
+    """
+    parts = [f"({expression})"] if expression else []
+    if status:
+        parts.append(f"status=={_quote(status)}")
+    if protocol:
+        parts.append(f"proto=={_quote(protocol)}")
+    if process:
+        parts.append(f"name~{_quote('(?i)' + re.escape(process))}")
+    return compile_filter(" and ".join(parts)) if parts else None
@@ -0,0 +1,151 @@
+"""Bounded-memory heavy-hitter tracking of remote endpoints and subnets.
+
+:class:`SpaceSaving` implements the Space-Saving algorithm (Metwally,
+Agrawal and El Abbadi, 2005) with weighted updates. With ``k`` counters
+after a stream of total weight ``N``:
+
+* memory is fixed at ``k`` counters, whatever the number of distinct keys;
+* a reported count never underestimates, and overestimates by at most the
+  key's recorded ``error``, which is at most the smallest counter and so at
+  most ``N / k``;
+* every key whose true weight exceeds ``N / k`` is being tracked.
+
+:class:`RemoteTracker` feeds per-tick socket observations into two
+sketches, one keyed by ``(ip, port)`` and one by subnet.
+"""
+import heapq
+import socket
+from collections import Counter
+
+
+class SpaceSaving:
+    """Top-k counters with bounded overestimation (see the module docstring)."""
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}  # key -> [count, error]
+        # One (count, key) entry per tracked key. Counts only grow, so an
+        # entry can lag behind its key and is refreshed when it surfaces.
+        self._heap = []
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, key):
+        return key in self._counts
+
+    def update(self, key, weight: int = 1):
+        self.total += weight
+        entry = self._counts.get(key)
+        if entry is not None:
+            entry[0] += weight
+            return
+        if len(self._counts) < self.capacity:
+            self._counts[key] = [weight, 0]
+            heapq.heappush(self._heap, (weight, key))
+            return
+        floor, victim = self._pop_min()
+        del self._counts[victim]
+        self._counts[key] = [floor + weight, floor]
+        heapq.heappush(self._heap, (floor + weight, key))
+
+    def update_many(self, counts: dict):
+        """Apply ``{key: weight}``, heaviest first so light keys do not evict heavy ones."""
+        for key, weight in sorted(counts.items(), key=lambda item: item[1], reverse=True):
+            self.update(key, weight)
+
+    def _pop_min(self):
+        heap = self._heap
+        while True:
+            count, key = heap[0]
+            current = self._counts[key][0]
+            if current == count:
+                return heapq.heappop(heap)
+            heapq.heapreplace(heap, (current, key))
+
+    def min_count(self) -> int:
+        """The smallest tracked count: 0 until all counters are in use."""
+        if len(self._counts) < self.capacity:
+            return 0
+        count, key = self._pop_min()
+        heapq.heappush(self._heap, (count, key))
+        return count
+
+    def error_bound(self) -> int:
+        """Largest possible overestimate of any reported count (``<= total / capacity``)."""
+        return self.min_count()
+
+    def top(self, n: int = None) -> list:
+        """``[(key, count, error)]`` for the ``n`` largest counters, largest first.
+
+        The true weight of ``key`` lies in ``[count - error, count]``.
+        """
+        key = lambda item: item[1][0]
+        if n is None:
+            items = sorted(self._counts.items(), key=key, reverse=True)
+        else:
+            items = heapq.nlargest(n, self._counts.items(), key=key)
+        return [(key, count, error) for key, (count, error) in items]
+
+
+def subnet_of(ip: str, v4_prefix: int = 24, v6_prefix: int = 64) -> str:
+    """The ``/v4_prefix`` or ``/v6_prefix`` network containing ``ip``, as text."""
+    if ip.startswith("::ffff:") and "." in ip:
+        ip = ip[7:]  # IPv4-mapped IPv6
+    family, prefix, bits = (socket.AF_INET6, v6_prefix, 128) if ":" in ip else (socket.AF_INET, v4_prefix, 32)
+    packed = socket.inet_pton(family, ip)
+    shift = bits - prefix
+    network = (int.from_bytes(packed, "big") >> shift << shift).to_bytes(len(packed), "big")
+    return f"{socket.inet_ntop(family, network)}/{prefix}"
+
+
+class RemoteTracker:
+    """System-wide heavy hitters over remote endpoints and their subnets.
+
+    Each :meth:`observe` call adds one tick of ``{(ip, port): sockets}``;
+    a key's weight is therefore socket-ticks (sockets open to it, summed
+    over samples), so long-lived and busy endpoints rank highest. Memory is
+    bounded by ``capacity`` counters per sketch plus one tick's counts.
+    """
+
+    def __init__(self, capacity: int = 1000, v4_prefix: int = 24, v6_prefix: int = 64):
+        self.endpoints = SpaceSaving(capacity)
+        self.subnets = SpaceSaving(capacity)
+        self.v4_prefix = v4_prefix
+        self.v6_prefix = v6_prefix
+        self.ticks = 0
+
+    def observe(self, endpoints: dict):
+        self.ticks += 1
+        self.endpoints.update_many(endpoints)
+        subnets = Counter()
+        for (ip, _port), weight in endpoints.items():
+            subnets[subnet_of(ip, self.v4_prefix, self.v6_prefix)] += weight
+        self.subnets.update_many(subnets)
+
+    def rows(self, n: int) -> tuple:
+        """``(endpoint_rows, subnet_rows)`` as dicts ready for display or export."""
+        def rows(kind, sketch, describe):
+            total = sketch.total or 1
+            return [{"kind": kind, "remote": describe(key), "count": count, "error": error, "share": count / total}
+                    for key, count, error in sketch.top(n)]
+        return (rows("endpoint", self.endpoints, format_endpoint), rows("subnet", self.subnets, str))
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "capacity": self.endpoints.capacity,
+            "total": self.endpoints.total,
+            "endpoints": len(self.endpoints),
+            "subnets": len(self.subnets),
+            "endpoint_error": self.endpoints.error_bound(),
+            "subnet_error": self.subnets.error_bound(),
+        }
+
+
+def format_endpoint(key) -> str:
+    ip, port = key
+    return f"[{ip}]:{port}" if ":" in ip else f"{ip}:{port}"
@@ -0,0 +1,166 @@
+"""Bounded per-PID history for the live views.
+
+All series share one ring of tick timestamps; each PID owns a fixed-size
+``array('d')`` of values aligned with it. The number of series is capped
+from a byte budget, arrays of evicted PIDs are recycled, and a PID that is
+missing from a tick is evicted immediately, so memory stays flat no matter
+how many processes come and go.
+"""
+import math
+from array import array
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+NAN = float("nan")
+
+
+class _Series:
+    __slots__ = ("values", "last_active")
+
+    def __init__(self, values, tick):
+        self.values = values
+        self.last_active = tick
+
+
+def sparkline(values, width: int = None) -> str:
+    """Render ``values`` (NaN = gap) as a unicode sparkline."""
+    values = list(values)[-width:] if width else list(values)
+    finite = [v for v in values if not math.isnan(v)]
+    if not finite:
+        return ""
+    low, high = min(finite), max(finite)
+    span = (high - low) or 1.0
+    top = len(SPARK_CHARS) - 1
+    return "".join(
+        " " if math.isnan(v) else SPARK_CHARS[int((v - low) / span * top) if high != low else 0]
+        for v in values
+    )
+
+
+class HistoryStore:
+    """Fixed-size ring buffers of one value per PID per tick.
+
+    ``kind="counter"`` treats values as monotonic totals (bytes) and derives
+    rates from them; ``kind="gauge"`` stores instantaneous values (connection
+    counts) as-is. At most ``max_bytes`` worth of value arrays are held; when
+    a new PID arrives at the cap it takes over the longest-idle series, or is
+    left untracked (counted in ``rejected``) if every series is active.
+    """
+
+    def __init__(self, capacity: int = 120, max_bytes: int = 8 * 1024 * 1024, kind: str = "counter"):
+        self.capacity = capacity
+        self.kind = kind
+        self.max_series = max(1, max_bytes // (capacity * 8))
+        self._blank = array("d", [NAN]) * capacity
+        self._times = array("d", self._blank)
+        self._series = {}
+        self._free = []
+        self._head = -1
+        self._ticks = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, pid):
+        return pid in self._series
+
+    def memory_bytes(self) -> int:
+        """Bytes held by value and timestamp arrays, including recycled ones."""
+        arrays = len(self._series) + len(self._free) + 2
+        return arrays * self.capacity * self._times.itemsize
+
+    def _evict(self, pid):
+        series = self._series.pop(pid)
+        self._free.append(series.values)
+        self.evictions += 1
+
+    def _new_series(self):
+        values = self._free.pop() if self._free else array("d", [NAN]) * self.capacity
+        values[:] = self._blank
+        return _Series(values, self._ticks)
+
+    def record(self, timestamp: float, values: dict):
+        """Append one tick: ``values`` maps every currently live PID to its value."""
+        self._head = (self._head + 1) % self.capacity
+        self._ticks += 1
+        self._times[self._head] = timestamp
+        for pid in [pid for pid in self._series if pid not in values]:
+            self._evict(pid)
+        head = self._head
+        idle = None
+        for pid, value in values.items():
+            series = self._series.get(pid)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    # At the cap a newcomer may only replace a series that
+                    # has not changed for a whole ring; otherwise it is not
+                    # tracked this tick.
+                    if idle is None:
+                        cutoff = self._ticks - self.capacity
+                        idle = sorted((p for p, s in self._series.items() if s.last_active <= cutoff),
+                                      key=lambda p: self._series[p].last_active, reverse=True)
+                    if not idle:
+                        self.rejected += 1
+                        continue
+                    self._evict(idle.pop())
+                series = self._series[pid] = self._new_series()
+            prev = series.values[(head - 1) % self.capacity]
+            if value != prev and not (self.kind == "counter" and math.isnan(prev)):
+                series.last_active = self._ticks
+            series.values[head] = value
+
+    def _indices(self, count: int):
+        """Ring indices of the last ``count`` ticks, oldest first."""
+        count = min(count, self._ticks, self.capacity)
+        return [(self._head - k) % self.capacity for k in range(count - 1, -1, -1)]
+
+    def rate(self, pid, window: float) -> float:
+        """Average rate of a counter over the last ``window`` seconds (or 0.0).
+
+        Uses the newest sample and the latest sample at or before
+        ``now - window``; if history is shorter than the window, the oldest
+        sample available is used instead.
+        """
+        series = self._series.get(pid)
+        if series is None or self._ticks < 2:
+            return 0.0
+        head = self._head
+        now = self._times[head]
+        latest = series.values[head]
+        base = None
+        for k in range(1, min(self._ticks, self.capacity)):
+            i = (head - k) % self.capacity
+            if math.isnan(series.values[i]):
+                break
+            base = i
+            if self._times[i] <= now - window:
+                break
+        if base is None:
+            return 0.0
+        elapsed = now - self._times[base]
+        delta = latest - series.values[base]
+        return max(delta / elapsed, 0.0) if elapsed > 0 else 0.0
+
+    def samples(self, pid, count: int = None):
+        """Per-tick values for ``pid``, oldest first: rates for counters, raw for gauges."""
+        series = self._series.get(pid)
+        if series is None:
+            return []
+        count = count or self.capacity
+        if self.kind == "gauge":
+            return [series.values[i] for i in self._indices(count)]
+        out = []
+        indices = self._indices(count + 1)
+        for prev, curr in zip(indices, indices[1:]):
+            dt = self._times[curr] - self._times[prev]
+            dv = series.values[curr] - series.values[prev]
+            out.append(max(dv / dt, 0.0) if dt > 0 and not math.isnan(dv) else NAN)
+        return out
+
+    def peak(self, pid) -> float:
+        finite = [v for v in self.samples(pid) if not math.isnan(v)]
+        return max(finite) if finite else 0.0
+
+    def sparkline(self, pid, width: int = 20) -> str:
+        return sparkline(self.samples(pid, width))
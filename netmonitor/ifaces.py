@@ -0,0 +1,181 @@
+"""High-frequency per-interface throughput from the kernel's NIC counters.
+
+Interface counters (``psutil.net_io_counters(pernic=True)``, one read of
+``/proc/net/dev`` on Linux) are exact and cheap, so they can be sampled every
+10-100 ms on their own :class:`~netmonitor.sampler.Sampler`, independent of
+the much costlier per-process scan.
+
+Raw counters are turned into monotonic totals here rather than by psutil's
+``nowrap`` cache: a counter that goes backwards from below 2**32 wrapped
+(32-bit counters on some drivers and platforms) and the modulus is added
+back; a larger counter going backwards was reset (the interface was
+re-created), and its new value is taken as the delta. Each interface keeps a
+fixed ring of ``(time, totals)`` samples covering the longest window, and
+rates over any shorter window are found by binary search on the ring.
+"""
+import math
+import time
+from array import array
+from typing import Callable
+
+import psutil
+
+FIELDS = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv", "errin", "errout", "dropin", "dropout")
+WRAP_32 = 2 ** 32
+WINDOWS = (1.0, 10.0, 60.0)
+IFACE_FIELDS = ["iface", "sent_now", "recv_now", "sent_1s", "recv_1s", "sent_10s", "recv_10s", "sent_60s",
+                "recv_60s", "packets_1s", "errors", "drops", "wraps"]
+
+_SENT, _RECV, _PSENT, _PRECV = 0, 1, 2, 3
+
+
+def read_counters() -> dict:
+    """``{nic: tuple of FIELDS}`` as the kernel reports them (may wrap)."""
+    return {nic: tuple(counters) for nic, counters in psutil.net_io_counters(pernic=True, nowrap=False).items()}
+
+
+def counter_delta(prev: int, curr: int):
+    """``(delta, wrapped)`` between two raw readings of one counter."""
+    if curr >= prev:
+        return curr - prev, False
+    if prev < WRAP_32:
+        return curr + WRAP_32 - prev, True
+    return curr, True
+
+
+class _Ring:
+    """Fixed ring of sample times and unwrapped totals for one interface."""
+
+    __slots__ = ("capacity", "times", "values", "head", "count", "raw", "totals", "wraps")
+
+    def __init__(self, capacity: int, raw: tuple, now: float):
+        self.capacity = capacity
+        self.times = array("d", [math.nan]) * capacity
+        self.values = array("d", [0.0]) * (capacity * len(FIELDS))
+        self.head = -1
+        self.count = 0
+        self.raw = raw
+        self.totals = [0] * len(FIELDS)
+        self.wraps = 0
+        self.append(now)
+
+    def update(self, raw: tuple, now: float):
+        totals = self.totals
+        for i, (prev, curr) in enumerate(zip(self.raw, raw)):
+            delta, wrapped = counter_delta(prev, curr)
+            totals[i] += delta
+            self.wraps += wrapped
+        self.raw = raw
+        self.append(now)
+
+    def append(self, now: float):
+        self.head = head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.times[head] = now
+        n = len(FIELDS)
+        self.values[head * n:(head + 1) * n] = array("d", self.totals)
+
+    def _index(self, k: int) -> int:
+        """Ring index of the ``k``-th newest sample (0 = newest)."""
+        return (self.head - k) % self.capacity
+
+    def base(self, window: float) -> int:
+        """Ring index of the newest sample at least ``window`` old, else the oldest."""
+        target = self.times[self.head] - window
+        lo, hi = 1, self.count - 1  # k values, newest to oldest: times decrease with k
+        if hi < lo:
+            return self.head
+        if self.times[self._index(hi)] > target:
+            return self._index(hi)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[self._index(mid)] <= target:
+                hi = mid
+            else:
+                lo = mid + 1
+        return self._index(lo)
+
+    def rate(self, field: int, window: float) -> float:
+        base = self.base(window)
+        elapsed = self.times[self.head] - self.times[base]
+        if elapsed <= 0:
+            return 0.0
+        n = len(FIELDS)
+        return (self.values[self.head * n + field] - self.values[base * n + field]) / elapsed
+
+    def rate_since(self, field: int, ticks: int) -> float:
+        if self.count < 2:
+            return 0.0
+        base = self._index(min(ticks, self.count - 1))
+        elapsed = self.times[self.head] - self.times[base]
+        n = len(FIELDS)
+        return (self.values[self.head * n + field] - self.values[base * n + field]) / elapsed if elapsed > 0 else 0.0
+
+
+class InterfaceRates:
+    """Rolling per-interface rates over ``windows`` seconds.
+
+    Call :meth:`sample` every ``interval`` seconds (it is a valid
+    :class:`~netmonitor.sampler.Sampler` collect function); each call reads
+    the counters once and returns one row per interface. ``sent_now`` and
+    ``recv_now`` are averaged over the last ``now_ticks`` samples, ``errors``
+    and ``drops`` count since the interface was first seen, and ``wraps``
+    counts counter wraps and resets that were corrected.
+    """
+
+    def __init__(self, interval: float = 0.1, windows=WINDOWS, now_ticks: int = 5, read: Callable = read_counters,
+                 clock: Callable = time.monotonic):
+        self.interval = interval
+        self.windows = tuple(windows)
+        self.now_ticks = now_ticks
+        self.read = read
+        self.clock = clock
+        # Enough slots to cover the longest window even if ticks come early.
+        self.capacity = math.ceil(max(self.windows) / interval) + 2
+        self._rings = {}
+        self.samples = 0
+
+    def __len__(self):
+        return len(self._rings)
+
+    def memory_bytes(self) -> int:
+        return sum(r.times.itemsize * r.capacity * (1 + len(FIELDS)) for r in self._rings.values())
+
+    def sample(self, elapsed: float = None) -> list:
+        counters = self.read()
+        now = self.clock()
+        self.samples += 1
+        rings = self._rings
+        for nic in [nic for nic in rings if nic not in counters]:
+            del rings[nic]
+        for nic, raw in counters.items():
+            ring = rings.get(nic)
+            if ring is None:
+                rings[nic] = _Ring(self.capacity, raw, now)
+            else:
+                ring.update(raw, now)
+        return self.rows()
+
+    def rate(self, nic: str, field: str, window: float) -> float:
+        ring = self._rings.get(nic)
+        return ring.rate(FIELDS.index(field), window) if ring is not None else 0.0
+
+    def rows(self) -> list:
+        """One dict per interface, busiest (1s window) first."""
+        rows = []
+        for nic, ring in self._rings.items():
+            row = {"iface": nic,
+                   "sent_now": int(ring.rate_since(_SENT, self.now_ticks)),
+                   "recv_now": int(ring.rate_since(_RECV, self.now_ticks))}
+            for window in self.windows:
+                suffix = f"{window:g}s"
+                row["sent_" + suffix] = int(ring.rate(_SENT, window))
+                row["recv_" + suffix] = int(ring.rate(_RECV, window))
+            row["packets_1s"] = round(ring.rate(_PSENT, 1.0) + ring.rate(_PRECV, 1.0), 1)
+            totals = ring.totals
+            row["errors"] = totals[4] + totals[5]
+            row["drops"] = totals[6] + totals[7]
+            row["wraps"] = ring.wraps
+            rows.append(row)
+        rows.sort(key=lambda row: row.get("sent_1s", 0) + row.get("recv_1s", 0), reverse=True)
+        return rows
@@ -0,0 +1,191 @@
+"""Prometheus / OpenMetrics exposition for ``netmonitor serve``.
+
+:class:`MetricsCollector` runs on the sampler's schedule and renders the
+complete response body once per tick; the HTTP handler only hands out the
+cached bytes, so scrapes never touch ``/proc`` and cost the same no matter
+how many scrapers there are. Only the top-N PIDs get their own series; the
+rest are summed into a ``pid="other"`` bucket to bound cardinality. For the
+byte counters the top N are the PIDs that moved the most since the last tick.
+Each byte is counted in exactly one series: a PID's counter accumulates only
+the bytes it moved while listed, and ``other`` the bytes PIDs moved while
+outside the top N. No counter goes down as PIDs move in and out of the top N
+or exit, and a PID that comes back does not bring the bytes ``other`` already
+counted with it. Label strings are rendered once per ``(pid, name)`` and
+reused across ticks.
+"""
+import heapq
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+OTHER = "other"
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsCollector:
+    """Collect once per tick and cache the rendered exposition bodies.
+
+    ``bandwidth`` returns ``{pid: {"name", "sent", "recv"}}`` with monotonic
+    byte totals (or is None where per-process bytes are unavailable);
+    ``connections`` returns summary rows as produced by
+    :func:`netmonitor.core.get_process_connection_summary`.
+    """
+
+    def __init__(self, connections: Callable[[], list], bandwidth: Optional[Callable[[], dict]] = None,
+                 top_n: int = 20):
+        self.connections = connections
+        self.bandwidth = bandwidth
+        self.top_n = top_n
+        self.ticks = 0
+        self._labels = {}
+        self._previous = {}
+        self._listed = {}
+        self._other_sent = 0
+        self._other_recv = 0
+        self._bodies = {PROMETHEUS_TYPE: b"", OPENMETRICS_TYPE: b"# EOF\n"}
+
+    def body(self, openmetrics: bool = False) -> bytes:
+        # A single attribute read of an immutable value: safe from any thread.
+        return self._bodies[OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE]
+
+    def _label(self, pid, name: str, used: dict) -> str:
+        key = (pid, name)
+        label = self._labels.get(key)
+        if label is None:
+            label = f'pid="{pid}",name="{escape_label(name)}"'
+        used[key] = label
+        return label
+
+    def tick(self, elapsed: float = 0.0) -> list:
+        """Collect, render and publish; return the connection rows."""
+        started = time.perf_counter()
+        used = {}
+        # (name, type, help, [(labels, value)]); counters are named without
+        # the _total suffix, which is added per format when rendering.
+        families = []
+
+        rows = self.connections()
+        top = rows[:self.top_n]
+        rest = rows[self.top_n:]
+        conn_samples, proto_samples, remote_samples = [], [], []
+        for row in top:
+            label = self._label(row["pid"], row["name"], used)
+            conn_samples.append((label, row["total"]))
+            proto_samples.append((label + ',proto="tcp"', row["tcp"]))
+            proto_samples.append((label + ',proto="udp"', row["udp"]))
+            remote_samples.append((label, row["remote_hosts"]))
+        if rest:
+            label = f'pid="{OTHER}",name="{OTHER}"'
+            conn_samples.append((label, sum(r["total"] for r in rest)))
+            proto_samples.append((label + ',proto="tcp"', sum(r["tcp"] for r in rest)))
+            proto_samples.append((label + ',proto="udp"', sum(r["udp"] for r in rest)))
+            remote_samples.append((label, sum(r["remote_hosts"] for r in rest)))
+        families.append(("netmonitor_process_connections", "gauge",
+                         "Open sockets per process.", conn_samples))
+        families.append(("netmonitor_process_protocol_connections", "gauge",
+                         "Open sockets per process and protocol.", proto_samples))
+        families.append(("netmonitor_process_remote_hosts", "gauge",
+                         "Distinct remote hosts per process.", remote_samples))
+        families.append(("netmonitor_processes", "gauge",
+                         "Processes with at least one open socket.", [("", len(rows))]))
+
+        if self.bandwidth is not None:
+            totals = self.bandwidth()
+            previous, deltas = self._previous, {}
+            for pid, value in totals.items():
+                sent, recv = value["sent"], value["recv"]
+                last_sent, last_recv = previous.get(pid, (0, 0))
+                # A total below the last one is a new process on a reused PID.
+                deltas[pid] = (sent - last_sent if sent >= last_sent else sent,
+                               recv - last_recv if recv >= last_recv else recv)
+            self._previous = {pid: (value["sent"], value["recv"]) for pid, value in totals.items()}
+            top_pids = heapq.nlargest(self.top_n, totals, key=lambda p: (sum(deltas[p]),
+                                                                         totals[p]["sent"] + totals[p]["recv"]))
+            # Bytes moved while listed, kept while the PID is alive so its
+            # series resumes where it left off when it is listed again.
+            listed = {pid: self._listed[pid] for pid in totals if pid in self._listed}
+            sent_samples, recv_samples = [], []
+            for pid in top_pids:
+                sent, recv = listed.get(pid, (0, 0))
+                listed[pid] = sent, recv = sent + deltas[pid][0], recv + deltas[pid][1]
+                label = self._label(pid, totals[pid]["name"], used)
+                sent_samples.append((label, sent))
+                recv_samples.append((label, recv))
+            self._listed = listed
+            if len(totals) > len(top_pids):
+                chosen = set(top_pids)
+                self._other_sent += sum(d[0] for p, d in deltas.items() if p not in chosen)
+                self._other_recv += sum(d[1] for p, d in deltas.items() if p not in chosen)
+            if len(totals) > len(top_pids) or self._other_sent or self._other_recv:
+                label = f'pid="{OTHER}",name="{OTHER}"'
+                sent_samples.append((label, self._other_sent))
+                recv_samples.append((label, self._other_recv))
+            families.append(("netmonitor_process_sent_bytes", "counter",
+                             "TCP bytes sent per process.", sent_samples))
+            families.append(("netmonitor_process_received_bytes", "counter",
+                             "TCP bytes received per process.", recv_samples))
+
+        self._labels = used
+        self.ticks += 1
+        families.append(("netmonitor_collect_duration_seconds", "gauge",
+                         "Time spent in the last collection.", [("", time.perf_counter() - started)]))
+        families.append(("netmonitor_collect_timestamp_seconds", "gauge",
+                         "Unix time of the last collection.", [("", time.time())]))
+        self._bodies = {
+            PROMETHEUS_TYPE: _render(families, openmetrics=False),
+            OPENMETRICS_TYPE: _render(families, openmetrics=True),
+        }
+        return rows
+
+
+def _render(families, openmetrics: bool) -> bytes:
+    lines = []
+    for name, type_, help_, samples in families:
+        sample_name = name + "_total" if type_ == "counter" else name
+        family = name if openmetrics else sample_name
+        lines.append(f"# HELP {family} {help_}")
+        lines.append(f"# TYPE {family} {type_}")
+        for labels, value in samples:
+            lines.append(f"{sample_name}{{{labels}}} {value}" if labels else f"{sample_name} {value}")
+    if openmetrics:
+        lines.append("# EOF")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    collector = None
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = self.collector.body(openmetrics)
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(collector: MetricsCollector, host: str = "127.0.0.1", port: int = 9180) -> ThreadingHTTPServer:
+    """Return a threaded HTTP server exposing ``collector`` at ``/metrics``."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"collector": collector})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_thread(server, name: str = "netmonitor-metrics") -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,136 @@
+"""Network namespace and cgroup membership of processes, from ``/proc/<pid>``.
+
+Every network namespace has its own socket tables, visible to any of its
+members as ``/proc/<pid>/net/{tcp,udp,...}``; ``/proc/net`` only shows the
+reader's own namespace. On a container host many PIDs share a handful of
+namespaces, so the collector groups PIDs by namespace (the inode behind
+``/proc/<pid>/ns/net``) and reads each namespace's tables once, through one
+of its members. Socket inodes are unique host-wide, so rows are still
+attributed through the shared :class:`~netmonitor.inodes.InodeIndex`.
+
+Lookups are cached per ``(pid, start_time)``; a tick only reads the links of
+processes that are new since the last one.
+"""
+import os
+
+GROUP_BY = ("process", "netns", "cgroup")
+
+
+def read_netns(pid, proc_root: str = "/proc"):
+    """The network namespace inode of ``pid``, or None if it cannot be read."""
+    try:
+        target = os.readlink(os.path.join(proc_root, str(pid), "ns", "net"))
+    except OSError:
+        return None
+    # "net:[4026531840]"
+    try:
+        return int(target[target.index("[") + 1:-1])
+    except ValueError:
+        return None
+
+
+def read_cgroup(pid, proc_root: str = "/proc"):
+    """The cgroup path of ``pid`` (the v2 unified entry, else the systemd or first v1 one)."""
+    try:
+        with open(os.path.join(proc_root, str(pid), "cgroup")) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    paths = {}
+    for line in lines:
+        hierarchy, _, rest = line.partition(":")
+        controllers, _, path = rest.partition(":")
+        paths.setdefault("" if hierarchy == "0" and not controllers else controllers, path)
+    for key in ("", "name=systemd"):
+        if key in paths:
+            return paths[key]
+    return next(iter(paths.values()), None)
+
+
+class _Entry:
+    __slots__ = ("start_time", "netns", "cgroup")
+
+    def __init__(self, start_time, netns):
+        self.start_time = start_time
+        self.netns = netns
+        self.cgroup = False  # read on first use
+
+
+class NamespaceIndex:
+    """Which network namespace (and cgroup) each indexed process belongs to."""
+
+    def __init__(self, proc_root: str = "/proc"):
+        self.proc_root = proc_root
+        self._entries = {}
+        self._own = False  # read on first use
+        self.groups = {}
+        self.reads = 0
+
+    @property
+    def own(self):
+        """The reader's own network namespace (None if it cannot be read)."""
+        if self._own is False:
+            self._own = read_netns("self", self.proc_root)
+        return self._own
+
+    def refresh(self, index) -> dict:
+        """Update from ``index``'s processes and return ``{netns: [pids]}``.
+
+        Processes whose namespace link cannot be read are left out.
+        """
+        entries = self._entries
+        for pid in [pid for pid in entries if pid not in index]:
+            del entries[pid]
+        groups = {}
+        for pid in index.pids():
+            start_time = index.start_time(pid)
+            entry = entries.get(pid)
+            if entry is None or entry.start_time != start_time:
+                entry = entries[pid] = _Entry(start_time, read_netns(pid, self.proc_root))
+                self.reads += 1
+            if entry.netns is not None:
+                groups.setdefault(entry.netns, []).append(pid)
+        self.groups = groups
+        return groups
+
+    def netns(self, pid):
+        entry = self._entries.get(pid)
+        return entry.netns if entry is not None else read_netns(pid, self.proc_root)
+
+    def cgroup(self, pid):
+        entry = self._entries.get(pid)
+        if entry is None:
+            return read_cgroup(pid, self.proc_root)
+        if entry.cgroup is False:
+            entry.cgroup = read_cgroup(pid, self.proc_root)
+        return entry.cgroup
+
+    def group_of(self, pid, group_by: str):
+        """The group key of ``pid`` for ``group_by`` (``"?"`` when unknown)."""
+        if group_by == "process":
+            return pid
+        key = self.netns(pid) if group_by == "netns" else self.cgroup(pid)
+        return "?" if key is None else key
+
+    def table_dirs(self, net_root: str) -> list:
+        """``[(netns, [dirs])]``: one entry per namespace, its members' ``net`` dirs to try in order.
+
+        With no namespace known, or only the reader's own, ``net_root`` is
+        used, as without namespace support. A single other namespace (all
+        other processes filtered out, say) is read through its members.
+        """
+        if not self.groups or (len(self.groups) == 1 and self.own in (None, *self.groups)):
+            return [(next(iter(self.groups), 0), [net_root])]
+        return [(netns, [os.path.join(self.proc_root, str(pid), "net") for pid in sorted(pids)])
+                for netns, pids in sorted(self.groups.items())]
+
+
+_default_namespaces = None
+
+
+def default_namespaces() -> NamespaceIndex:
+    """Return the process-wide namespace index shared by all collectors."""
+    global _default_namespaces
+    if _default_namespaces is None:
+        _default_namespaces = NamespaceIndex()
+    return _default_namespaces
@@ -0,0 +1,258 @@
+"""Sharded collection across a worker pool for hosts with very many PIDs.
+
+The scan phases are split by where the GIL is released:
+
+* Walking ``/proc/<pid>`` (``stat``, ``fd`` listings, ``readlink``) and
+  reading process names are syscalls that release the GIL, with little
+  Python work around them. They run on **threads**, one strided PID shard
+  per worker, and the partial results are merged into the
+  :class:`~netmonitor.inodes.InodeIndex` on the calling thread.
+* Parsing the ``/proc/net`` tables, attributing rows to PIDs and counting
+  statuses/remotes per process is bytecode that holds the GIL. It runs in
+  worker **processes**: each one parses a contiguous run of a table's rows,
+  looks owners up in a compact inode -> PID array pair and returns partial
+  per-PID aggregates, which :func:`merge_partials` combines.
+
+Partial aggregates remember the position of the first row that contributed
+to each status and remote address, so merged results order and break ties
+exactly like the serial path in :mod:`netmonitor.core`.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from netmonitor.churn import table_keys, table_time_wait
+from netmonitor.procnet import TABLES, parse_table
+from netmonitor.utils import filter_connection_status
+
+# Tables with fewer rows than this are parsed by a single task.
+MIN_SHARD_ROWS = 2048
+
+
+def shard(items, shards: int) -> list:
+    """Split ``items`` into at most ``shards`` strided, non-empty lists."""
+    items = list(items)
+    return [items[i::shards] for i in range(min(shards, len(items)))]
+
+
+class WorkerPool:
+    """A thread pool for syscall-bound phases and a process pool for GIL-bound ones.
+
+    The process pool is started on first use with ``forkserver`` (``spawn``
+    where that is unavailable), since forking a process that already runs
+    sampler threads is unsafe.
+
+    ``cpu_time`` accumulates the thread CPU seconds spent in
+    :meth:`map_threads` tasks, for callers that budget their own CPU.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.cpu_time = 0.0
+        self._threads = ThreadPoolExecutor(workers, thread_name_prefix="netmonitor-scan")
+        self._processes = None
+        self._lock = threading.Lock()
+
+    def map_threads(self, fn, items) -> list:
+        """Apply ``fn`` to each strided shard of ``items`` on the thread pool."""
+        def timed(items):
+            cpu = time.thread_time()
+            try:
+                return fn(items)
+            finally:
+                cpu = time.thread_time() - cpu
+                with self._lock:
+                    self.cpu_time += cpu
+        return list(self._threads.map(timed, shard(items, self.workers)))
+
+    def map_processes(self, fn, tasks) -> list:
+        """Run ``fn(*task)`` for every task on the process pool."""
+        if self._processes is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._processes = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+        futures = [self._processes.submit(fn, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self._threads.shutdown(wait=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=True, cancel_futures=True)
+            self._processes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def owner_arrays(index) -> tuple:
+    """The index's inode -> PID map as two flat arrays (cheap to pickle)."""
+    owners = index.owners()
+    return array("Q", (inode for inode, _ in owners)), array("q", (owner[0] for _, owner in owners))
+
+
+def aggregate_shard(chunk: bytes, name: str, table_pos: int, first_row: int, inodes, pids, status: str = None,
+                    type_: int = None, churn: bool = False, netns: int = 0, where=None, names=None):
+    """Parse a run of rows of one table and aggregate them per owning PID.
+
+    Returns ``(partials, unowned, columns)``. ``partials`` is
+    ``{pid: [first, tcp, udp, {status: [count, first]}, {ip: [count, first]}]}``
+    where ``first`` is the ``(table_pos, row)`` of the PID's first socket
+    (filtered or not) and each count entry keeps the first row it counted.
+    Sockets not matching ``status``, ``type_`` or the
+    :class:`~netmonitor.filters.Filter` ``where`` are not counted; ``names``
+    (parallel to ``pids``) are the process names ``where`` may need.
+    ``unowned`` lists the socket inodes no PID owns, for
+    :meth:`~netmonitor.inodes.InodeIndex.claim`.
+
+    With ``churn``, ``columns`` is ``(keys, pids, time_wait)``, the per-row
+    columns a :class:`~netmonitor.churn.ChurnTracker` consumes (keys are
+    salted with ``netns``); otherwise it is None.
+    """
+    family, table_type = TABLES[name]
+    # parse_table skips the first line, which is the header in a full table.
+    table = parse_table(b"\n" + chunk, family, table_type)
+    owner_of = dict(zip(inodes, pids)).get
+    tcp = table_type == TABLES["tcp"][1]
+    skip_table = type_ is not None and type_ != table_type
+    match = None
+    if where is not None:
+        match = where.table_predicate(table, dict(zip(pids, names)).get if names is not None else None)
+    partials = {}
+    unowned = []
+    for i, inode in enumerate(table.inode.tolist()):
+        pid = owner_of(inode)
+        if pid is None:
+            if inode:
+                unowned.append(inode)
+            continue
+        pos = (table_pos, first_row + i)
+        partial = partials.get(pid)
+        if partial is None:
+            partial = partials[pid] = [pos, 0, 0, {}, {}]
+        if skip_table or (match is not None and not match(i, pid)):
+            continue
+        state = table.status(i)
+        if status and not filter_connection_status(state, status):
+            continue
+        partial[1 if tcp else 2] += 1
+        _count(partial[3], state, pos)
+        if table.rport[i]:
+            _count(partial[4], table.remote_ip(i), pos)
+    if churn:
+        return partials, unowned, (table_keys(table, netns), [owner_of(inode, 0) for inode in table.inode.tolist()],
+                                   table_time_wait(table))
+    return partials, unowned, None
+
+
+def split_rows(data: bytes, parts: int):
+    """Split a table's rows into ``parts`` contiguous byte runs.
+
+    Yields ``(chunk, first_row)``; the header line is dropped. Cutting on
+    byte offsets avoids splitting the whole table into lines here.
+    """
+    start = data.find(b"\n") + 1
+    if start == 0:
+        return
+    row = 0
+    step = max(1, (len(data) - start) // parts)
+    while start < len(data):
+        end = data.find(b"\n", min(start + step, len(data) - 1))
+        end = len(data) if end < 0 else end + 1
+        yield data[start:end], row
+        row += data.count(b"\n", start, end)
+        start = end
+
+
+def _count(counts: dict, key, pos):
+    entry = counts.get(key)
+    if entry is None:
+        counts[key] = [1, pos]
+    else:
+        entry[0] += 1
+
+
+def _merge_counts(into: dict, other: dict):
+    for key, (count, pos) in other.items():
+        entry = into.get(key)
+        if entry is None:
+            into[key] = [count, pos]
+        else:
+            entry[0] += count
+            entry[1] = min(entry[1], pos)
+
+
+def merge_partials(partials) -> dict:
+    """Combine per-shard aggregates into one ``{pid: aggregate}``, in first-row order."""
+    merged = {}
+    for part in partials:
+        for pid, (pos, tcp, udp, statuses, remotes) in part.items():
+            into = merged.get(pid)
+            if into is None:
+                merged[pid] = [pos, tcp, udp, statuses, remotes]
+                continue
+            into[0] = min(into[0], pos)
+            into[1] += tcp
+            into[2] += udp
+            _merge_counts(into[3], statuses)
+            _merge_counts(into[4], remotes)
+    return dict(sorted(merged.items(), key=lambda item: item[1][0]))
+
+
+def _read_namespace(dirs, names) -> list:
+    """``[(name, data)]`` from the first of ``dirs`` that has any of the ``names`` tables."""
+    for path in dirs:
+        found = []
+        for name in names:
+            try:
+                with open(os.path.join(path, name), "rb") as f:
+                    found.append((name, f.read()))
+            except OSError:
+                continue
+        if found:
+            return found
+    return []
+
+
+def aggregate_tables(pool: WorkerPool, names, index, net_root, status: str = None, type_: int = None,
+                     churn=None, where=None, name_of=None) -> dict:
+    """Aggregate the ``names`` tables per owning PID on ``pool``'s processes.
+
+    ``net_root`` is a directory of tables, or ``[(netns, [dirs])]`` as from
+    :meth:`~netmonitor.namespaces.NamespaceIndex.table_dirs` to read every
+    namespace once. Each table is read once here, so every shard sees the
+    same snapshot of it, and handed to the workers as contiguous row runs.
+    The workers also hash every row for ``churn`` (a
+    :class:`~netmonitor.churn.ChurnTracker`) when one is given. ``where`` (a
+    :class:`~netmonitor.filters.Filter`) is sent to the workers as its text,
+    with the owners' names from ``name_of`` if it filters on them.
+    """
+    sources = [(0, [net_root])] if isinstance(net_root, str) else net_root
+    inodes, pids = owner_arrays(index)
+    owner_names = [name_of(pid) for pid in pids] if where is not None and where.needs_name else None
+    tasks = []
+    table_pos = 0
+    for netns, dirs in sources:
+        for name, data in _read_namespace(dirs, names):
+            # Rows are ~150 bytes; small tables are not worth splitting.
+            parts = max(1, min(pool.workers, len(data) // 150 // MIN_SHARD_ROWS))
+            tasks += [(chunk, name, table_pos, row, inodes, pids, status, type_, churn is not None, netns, where,
+                       owner_names)
+                      for chunk, row in split_rows(data, parts)]
+            table_pos += 1
+    results = pool.map_processes(aggregate_shard, tasks)
+    # Rows are attributed in the workers, so a socket the index missed is
+    # picked up from the next tick on.
+    index.claim(inode for _, unowned, _ in results for inode in unowned)
+    if churn is not None:
+        keys, owners, time_wait = [], [], []
+        for _, _, (k, o, t) in results:
+            keys += k
+            owners += o
+            time_wait += t
+        churn.update(keys, owners, time_wait)
+    return merge_partials(partials for partials, _, _ in results)
@@ -0,0 +1,188 @@
+"""Bulk, columnar parser for ``/proc/net/{tcp,tcp6,udp,udp6}``.
+
+Each table is read in one go and its hex address/port fields are decoded in
+batches: all addresses of a column are joined and passed through a single
+``bytes.fromhex`` call, then split into fixed-width records. NumPy is used
+for the strided column work when it is installed; otherwise the same steps
+run on :mod:`array` in pure Python.
+"""
+import gc
+import os
+import socket
+import sys
+from array import array
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None
+
+HAVE_NUMPY = np is not None
+
+TABLES = {
+    "tcp": (socket.AF_INET, socket.SOCK_STREAM),
+    "tcp6": (socket.AF_INET6, socket.SOCK_STREAM),
+    "udp": (socket.AF_INET, socket.SOCK_DGRAM),
+    "udp6": (socket.AF_INET6, socket.SOCK_DGRAM),
+}
+
+KINDS = {
+    "inet": ("tcp", "tcp6", "udp", "udp6"),
+    "inet4": ("tcp", "udp"),
+    "inet6": ("tcp6", "udp6"),
+    "tcp": ("tcp", "tcp6"),
+    "tcp4": ("tcp",),
+    "tcp6": ("tcp6",),
+    "udp": ("udp", "udp6"),
+    "udp4": ("udp",),
+    "udp6": ("udp6",),
+}
+
+# Status names match psutil's CONN_* constants.
+TCP_STATES = {
+    0x01: "ESTABLISHED", 0x02: "SYN_SENT", 0x03: "SYN_RECV", 0x04: "FIN_WAIT1",
+    0x05: "FIN_WAIT2", 0x06: "TIME_WAIT", 0x07: "CLOSE", 0x08: "CLOSE_WAIT",
+    0x09: "LAST_ACK", 0x0A: "LISTEN", 0x0B: "CLOSING",
+}
+
+Addr = namedtuple("Addr", "ip port")
+# Same fields as psutil's ``sconn`` so views can consume either.
+Connection = namedtuple("Connection", "fd family type laddr raddr status pid")
+
+
+class SocketTable:
+    """Columns of one ``/proc/net`` table.
+
+    ``laddr``/``raddr`` are packed network-order address bytes of ``width``
+    bytes per socket; ``lport``, ``rport``, ``state``, ``uid`` and ``inode``
+    are ``array.array`` (or NumPy arrays with the NumPy backend).
+    """
+
+    __slots__ = ("family", "type", "width", "laddr", "lport", "raddr", "rport", "state", "uid", "inode")
+
+    def __init__(self, family, type_, laddr, lport, raddr, rport, state, uid, inode):
+        self.family = family
+        self.type = type_
+        self.width = 4 if family == socket.AF_INET else 16
+        self.laddr = laddr
+        self.lport = lport
+        self.raddr = raddr
+        self.rport = rport
+        self.state = state
+        self.uid = uid
+        self.inode = inode
+
+    def __len__(self):
+        return len(self.inode)
+
+    def local_ip(self, i: int) -> str:
+        w = self.width
+        return socket.inet_ntop(self.family, self.laddr[i * w:(i + 1) * w])
+
+    def remote_ip(self, i: int) -> str:
+        w = self.width
+        return socket.inet_ntop(self.family, self.raddr[i * w:(i + 1) * w])
+
+    def status(self, i: int) -> str:
+        if self.type == socket.SOCK_DGRAM:
+            return "NONE"
+        return TCP_STATES.get(int(self.state[i]), "NONE")
+
+    def connection(self, i: int, pid=None) -> Connection:
+        """Materialize row ``i`` as a psutil-compatible connection tuple."""
+        rport = int(self.rport[i])
+        raddr = Addr(self.remote_ip(i), rport) if rport else ()
+        return Connection(-1, self.family, self.type, Addr(self.local_ip(i), int(self.lport[i])),
+                          raddr, self.status(i), pid)
+
+
+def _swap_words(blob: bytes) -> bytes:
+    # /proc prints each 32-bit address word in host byte order.
+    if sys.byteorder != "little":
+        return blob
+    words = array("I")
+    words.frombytes(blob)
+    words.byteswap()
+    return words.tobytes()
+
+
+def _split_endpoints_py(column, width: int):
+    hex_width = width * 2
+    addrs = _swap_words(bytes.fromhex(b"".join(c[:hex_width] for c in column).decode("ascii")))
+    ports = array("H", [int(c[hex_width + 1:], 16) for c in column])
+    return addrs, ports
+
+
+def _split_endpoints_np(column, width: int):
+    raw = bytes.fromhex(b"".join(column).replace(b":", b"").decode("ascii"))
+    rec = np.frombuffer(raw, dtype=np.uint8).reshape(-1, width + 2)
+    addr = rec[:, :width]
+    if sys.byteorder == "little":
+        addr = addr.reshape(-1, width // 4, 4)[:, :, ::-1]
+    ports = (rec[:, width].astype(np.uint16) << 8) | rec[:, width + 1]
+    return np.ascontiguousarray(addr).tobytes(), ports
+
+
+def parse_table(data: bytes, family: int, type_: int, backend: str = None) -> SocketTable:
+    """Parse the raw contents of one ``/proc/net`` socket table.
+
+    ``backend`` is ``"numpy"`` or ``"python"``; by default NumPy is used when
+    available.
+    """
+    if backend is None:
+        backend = "numpy" if HAVE_NUMPY else "python"
+    width = 4 if family == socket.AF_INET else 16
+    # Only the first ten fields are needed; the tail of each line stays one
+    # token. The cyclic GC is paused because the split allocates millions of
+    # short-lived tuples/bytes on large tables and would otherwise trigger
+    # repeated full collections.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        rows = [line.split(None, 10) for line in data.splitlines()[1:]]
+        columns = list(zip(*rows))[:10]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    if not rows:
+        empty = b""
+        if backend == "numpy":
+            z = np.zeros(0, dtype=np.uint16)
+            return SocketTable(family, type_, empty, z, empty, z, np.zeros(0, np.uint8),
+                               np.zeros(0, np.uint32), np.zeros(0, np.uint64))
+        return SocketTable(family, type_, empty, array("H"), empty, array("H"), array("B"),
+                           array("I"), array("Q"))
+
+    _sl, local, remote, st, _q, _t, _r, uid, _to, inode = columns
+    if backend == "numpy":
+        laddr, lport = _split_endpoints_np(local, width)
+        raddr, rport = _split_endpoints_np(remote, width)
+        state = np.frombuffer(bytes.fromhex(b"".join(st).decode("ascii")), dtype=np.uint8)
+        uids = np.array(uid).astype(np.uint32)
+        inodes = np.array(inode).astype(np.uint64)
+    else:
+        laddr, lport = _split_endpoints_py(local, width)
+        raddr, rport = _split_endpoints_py(remote, width)
+        state = array("B", bytes.fromhex(b"".join(st).decode("ascii")))
+        uids = array("I", map(int, uid))
+        inodes = array("Q", map(int, inode))
+    return SocketTable(family, type_, laddr, lport, raddr, rport, state, uids, inodes)
+
+
+def read_tables(kind: str = "inet", net_root: str = "/proc/net", backend: str = None) -> dict:
+    """Read every table needed for ``kind`` and return ``{name: SocketTable}``.
+
+    ``kind`` is a key of :data:`KINDS` or a sequence of table names. Missing
+    tables (for example ``tcp6`` on a host without IPv6) are skipped.
+    """
+    tables = {}
+    for name in KINDS[kind] if isinstance(kind, str) else kind:
+        try:
+            with open(os.path.join(net_root, name), "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        family, type_ = TABLES[name]
+        tables[name] = parse_table(data, family, type_, backend)
+    return tables
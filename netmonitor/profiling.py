@@ -0,0 +1,148 @@
+"""Lightweight per-stage self-profiling for ``live --profile``.
+
+Stages are wrapped in ``with profiler.stage("scan"):`` blocks. A
+:class:`Profiler` records wall time, CPU time of the calling thread and the
+net change in allocated memory blocks per stage, plus counts such as
+processes and sockets handled in the last tick; optionally every stage also
+runs under :mod:`cProfile` (one profile per thread, merged on dump).
+
+When profiling is off, callers use :data:`NULL_PROFILER`, whose ``stage``
+returns one shared no-op context manager, so the instrumented code pays a
+method call and nothing else.
+"""
+import cProfile
+import contextlib
+import pstats
+import sys
+import threading
+import time
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class _NullProfiler:
+    enabled = False
+
+    def stage(self, name: str):
+        return _NULL_STAGE
+
+    def count(self, name: str, value: int):
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+class _StageStats:
+    __slots__ = ("calls", "wall", "cpu", "blocks", "last_wall", "last_cpu", "last_blocks")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = self.cpu = 0.0
+        self.blocks = 0
+        self.last_wall = self.last_cpu = 0.0
+        self.last_blocks = 0
+
+
+class Profiler:
+    """Accumulate per-stage timings from any thread.
+
+    ``cprofile=True`` additionally runs each outermost stage under a
+    per-thread :class:`cProfile.Profile`; :meth:`dump_pstats` merges them.
+    """
+
+    enabled = True
+
+    def __init__(self, cprofile: bool = False):
+        self.cprofile = cprofile
+        self.stages = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        profile = None
+        if self.cprofile and depth == 0:
+            profile = getattr(local, "profile", None)
+            if profile is None:
+                profile = local.profile = cProfile.Profile()
+                with self._lock:
+                    self._profiles.append(profile)
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per process; a
+                # stage overlapping another thread's is timed but not traced.
+                profile = None
+        local.depth = depth + 1
+        blocks = sys.getallocatedblocks()
+        cpu = time.thread_time()
+        wall = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            blocks = sys.getallocatedblocks() - blocks
+            local.depth = depth
+            if profile is not None:
+                profile.disable()
+            with self._lock:
+                stats = self.stages.get(name)
+                if stats is None:
+                    stats = self.stages[name] = _StageStats()
+                stats.calls += 1
+                stats.wall += wall
+                stats.cpu += cpu
+                stats.blocks += blocks
+                stats.last_wall, stats.last_cpu, stats.last_blocks = wall, cpu, blocks
+
+    def count(self, name: str, value: int):
+        """Record a per-tick quantity such as processes or sockets handled."""
+        self.counts[name] = value
+
+    def caption(self) -> str:
+        """One line with the latest tick's numbers, for the live table caption."""
+        with self._lock:
+            parts = [
+                f"{name} {s.last_wall * 1000:.1f}/{s.last_cpu * 1000:.1f}ms {s.last_blocks:+,}blk"
+                for name, s in self.stages.items()
+            ]
+        parts += [f"{value:,} {name}" for name, value in self.counts.items()]
+        return "Profile (wall/cpu, net blocks): " + " · ".join(parts)
+
+    def summary(self) -> list:
+        """Per-stage totals and means as a list of dicts."""
+        with self._lock:
+            return [
+                {
+                    "stage": name,
+                    "calls": s.calls,
+                    "wall_total_s": s.wall,
+                    "wall_mean_ms": s.wall / s.calls * 1000,
+                    "cpu_mean_ms": s.cpu / s.calls * 1000,
+                    "blocks_mean": s.blocks / s.calls,
+                }
+                for name, s in self.stages.items()
+            ]
+
+    def dump_pstats(self, path: str) -> bool:
+        """Write the merged cProfile data to ``path``; False if none was collected."""
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return False
+        stats = None
+        for profile in profiles:
+            try:
+                stats = pstats.Stats(profile) if stats is None else stats.add(profile)
+            except TypeError:
+                continue  # a thread that never finished a stage has no data
+        if stats is None:
+            return False
+        stats.dump_stats(path)
+        return True
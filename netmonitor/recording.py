@@ -0,0 +1,341 @@
+"""Compact append-only recordings of collector ticks.
+
+A recording is a directory of segment files plus an ``index.bin`` time-range
+index. Every segment is self-contained so replay can start at any of them:
+
+* header: ``b"NMREC"``, format version, recording kind
+* ``STRING`` records intern process names and other text columns; later
+  rows refer to them by id
+* ``TICK`` records hold the timestamp (zigzag delta from the previous tick,
+  in microseconds) and one row per PID, sorted by PID. PIDs are delta
+  encoded, integer columns are zigzag deltas against the same PID's value in
+  the previous tick, so steady counters cost one or two bytes each.
+
+``index.bin`` gets one fixed-size ``(segment, first_us, last_us, ticks)``
+entry whenever a segment is closed; segments missing from it (for example
+after a crash) are scanned on open.
+"""
+import mmap
+import os
+import struct
+
+MAGIC = b"NMREC"
+VERSION = 1
+STRING = 0x01
+TICK = 0x02
+
+# Integer columns are delta encoded, text columns interned.
+SCHEMAS = {
+    "bandwidth": (("sent", "recv"), ("name",)),
+    "connections": (("total", "tcp", "udp", "remote_hosts"), ("name", "top_remote", "status_summary")),
+}
+_KIND_IDS = {"bandwidth": 0, "connections": 1}
+_KIND_NAMES = {v: k for k, v in _KIND_IDS.items()}
+_INDEX_ENTRY = struct.Struct("<Iqql")
+INDEX_FILE = "index.bin"
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 63)
+
+
+def _unzigzag(n: int) -> int:
+    return (n >> 1) ^ -(n & 1)
+
+
+def _put_varint(out: bytearray, n: int):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, pos: int):
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _segment_name(number: int) -> str:
+    return f"{number:08d}.seg"
+
+
+def _header_kind(header: bytes, path: str) -> str:
+    """The recording kind in a segment ``header``; ValueError if it is not one this version writes."""
+    if len(header) < len(MAGIC) + 2 or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path}: not a netmonitor recording segment")
+    if header[len(MAGIC)] != VERSION:
+        raise ValueError(f"{path}: unsupported recording version {header[len(MAGIC)]}")
+    kind = _KIND_NAMES.get(header[len(MAGIC) + 1])
+    if kind is None:
+        raise ValueError(f"{path}: unknown recording kind {header[len(MAGIC) + 1]}")
+    return kind
+
+
+class TickCodec:
+    """Stateful encoder/decoder for ``STRING``/``TICK`` records.
+
+    Holds the string table and each PID's previous values; an encoder and
+    the decoder reading its output must see the same sequence of ticks.
+    Recordings use one codec per segment, the daemon one per client stream.
+    """
+
+    def __init__(self, kind: str):
+        self.ints, self.texts = SCHEMAS[kind]
+        self.strings = {}
+        self.string_list = []
+        self.prev = {}
+        self.last_us = 0
+
+    def encode(self, timestamp: float, rows: dict) -> bytearray:
+        """Encode one tick, preceded by ``STRING`` records for new text."""
+        out = bytearray()
+        body = bytearray()
+        ts_us = int(timestamp * 1_000_000)
+        _put_varint(body, _zigzag(ts_us - self.last_us))
+        _put_varint(body, len(rows))
+        prev_pid = 0
+        prev = self.prev
+        current = {}
+        for pid in sorted(rows):
+            row = rows[pid]
+            _put_varint(body, _zigzag(pid - prev_pid))
+            prev_pid = pid
+            last = prev.get(pid)
+            values = tuple(int(row[c]) for c in self.ints)
+            for i, value in enumerate(values):
+                _put_varint(body, _zigzag(value - (last[i] if last else 0)))
+            current[pid] = values
+            for column in self.texts:
+                text = str(row.get(column, ""))
+                sid = self.strings.get(text)
+                if sid is None:
+                    sid = self.strings[text] = len(self.strings)
+                    data = text.encode("utf-8")
+                    out.append(STRING)
+                    _put_varint(out, len(data))
+                    out += data
+                _put_varint(body, sid)
+        self.prev = current
+        self.last_us = ts_us
+        out.append(TICK)
+        _put_varint(out, len(body))
+        out += body
+        return out
+
+    def decode(self, buf, pos: int, end: int):
+        """Yield ``(timestamp, rows)`` for each complete tick in ``buf[pos:end]``.
+
+        A record cut off at ``end`` (a torn write) ends the iteration.
+        """
+        ints, texts = self.ints, self.texts
+        while pos < end:
+            record = buf[pos]
+            try:
+                length, start = _get_varint(buf, pos + 1)
+            except IndexError:
+                return
+            if start + length > end:
+                return
+            pos = start + length
+            if record == STRING:
+                self.string_list.append(bytes(buf[start:pos]).decode("utf-8"))
+                continue
+            if record != TICK:
+                raise ValueError(f"unknown record type {record}")
+            p = start
+            delta, p = _get_varint(buf, p)
+            self.last_us += _unzigzag(delta)
+            count, p = _get_varint(buf, p)
+            rows = {}
+            pid = 0
+            current = {}
+            for _ in range(count):
+                d, p = _get_varint(buf, p)
+                pid += _unzigzag(d)
+                last = self.prev.get(pid)
+                values = []
+                for i in range(len(ints)):
+                    d, p = _get_varint(buf, p)
+                    values.append(_unzigzag(d) + (last[i] if last else 0))
+                current[pid] = values
+                row = dict(zip(ints, values))
+                for column in texts:
+                    sid, p = _get_varint(buf, p)
+                    row[column] = self.string_list[sid]
+                rows[pid] = row
+            self.prev = current
+            yield self.last_us / 1_000_000, rows
+
+
+class Recorder:
+    """Append ticks to segmented files under ``directory``.
+
+    ``rows`` passed to :meth:`append` map PID to a dict holding the columns
+    of the recording's kind (see ``SCHEMAS``). An existing recording is
+    appended to only if its newest segment has the same kind and format
+    version; otherwise ValueError.
+    """
+
+    def __init__(self, directory: str, kind: str, segment_bytes: int = 8 * 1024 * 1024):
+        if kind not in SCHEMAS:
+            raise ValueError(f"unknown recording kind: {kind}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.kind = kind
+        self.segment_bytes = segment_bytes
+        numbers = sorted(int(n[:-4]) for n in os.listdir(directory) if n.endswith(".seg"))
+        self._number = numbers[-1] if numbers else 0
+        for number in reversed(numbers):
+            path = os.path.join(directory, _segment_name(number))
+            with open(path, "rb") as f:
+                header = f.read(len(MAGIC) + 2)
+            # A crash can leave the newest segment empty; the one before tells.
+            if header:
+                existing = _header_kind(header, path)
+                if existing != kind:
+                    raise ValueError(f"{directory} holds a {existing} recording, not {kind}")
+                break
+        self._file = None
+        self.bytes_written = 0
+        self.ticks = 0
+
+    def _open_segment(self):
+        self._number += 1
+        self._file = open(os.path.join(self.directory, _segment_name(self._number)), "wb")
+        self._file.write(MAGIC + bytes((VERSION, _KIND_IDS[self.kind])))
+        self._codec = TickCodec(self.kind)
+        self._size = len(MAGIC) + 2
+        self._first_us = None
+        self._seg_ticks = 0
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if self._seg_ticks:
+            with open(os.path.join(self.directory, INDEX_FILE), "ab") as f:
+                f.write(_INDEX_ENTRY.pack(self._number, self._first_us, self._codec.last_us, self._seg_ticks))
+
+    def append(self, timestamp: float, rows: dict):
+        if self._file is None:
+            self._open_segment()
+        out = self._codec.encode(timestamp, rows)
+        self._file.write(out)
+        self._file.flush()
+        self._size += len(out)
+        self.bytes_written += len(out)
+        self.ticks += 1
+        self._seg_ticks += 1
+        if self._first_us is None:
+            self._first_us = self._codec.last_us
+        if self._size >= self.segment_bytes:
+            self._close_segment()
+
+    def close(self):
+        self._close_segment()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Segment:
+    """A memory-mapped segment file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.kind = _header_kind(bytes(self._buf[:len(MAGIC) + 2]), path)
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def ticks(self):
+        """Yield ``(timestamp, rows)`` for every complete tick in the segment."""
+        try:
+            # A torn write at the tail of an active segment is skipped.
+            yield from TickCodec(self.kind).decode(self._buf, len(MAGIC) + 2, len(self._buf))
+        except ValueError as exc:
+            raise ValueError(f"{self.path}: {exc}") from None
+
+
+class Recording:
+    """Read access to a recording directory with time-range seeking."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        numbers = sorted(int(n[:-4]) for n in os.listdir(directory) if n.endswith(".seg"))
+        if not numbers:
+            raise FileNotFoundError(f"no recording segments in {directory}")
+        ranges = {}
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % _INDEX_ENTRY.size
+            for number, first_us, last_us, count in _INDEX_ENTRY.iter_unpack(data[:usable]):
+                ranges[number] = (first_us / 1_000_000, last_us / 1_000_000, count)
+        self.segments = []
+        self.kind = None
+        for number in numbers:
+            path = os.path.join(directory, _segment_name(number))
+            # A recorder killed before its first flush leaves an empty segment.
+            if os.path.getsize(path) == 0:
+                continue
+            segment = Segment(path)
+            self.kind = self.kind or segment.kind
+            if number not in ranges:
+                stamps = [ts for ts, _ in segment.ticks()]
+                if not stamps:
+                    segment.close()
+                    continue
+                ranges[number] = (stamps[0], stamps[-1], len(stamps))
+            self.segments.append((ranges[number], segment))
+
+    def close(self):
+        for _, segment in self.segments:
+            segment.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def start(self) -> float:
+        return self.segments[0][0][0] if self.segments else None
+
+    @property
+    def end(self) -> float:
+        return self.segments[-1][0][1] if self.segments else None
+
+    def ticks(self, start: float = None, end: float = None):
+        """Yield ``(timestamp, rows)`` within ``[start, end]``.
+
+        Segments entirely outside the range are skipped through the index
+        without being decoded.
+        """
+        for (first, last, _count), segment in self.segments:
+            if start is not None and last < start:
+                continue
+            if end is not None and first > end:
+                break
+            for ts, rows in segment.ticks():
+                if start is not None and ts < start:
+                    continue
+                if end is not None and ts > end:
+                    return
+                yield ts, rows
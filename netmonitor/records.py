@@ -0,0 +1,179 @@
+"""Slotted records for the rows every tick produces.
+
+A row used to be a dict per process (and one per socket in a sock_diag
+dump). At 10,000 processes and 200,000 sockets those dicts, their
+per-instance hash tables and the string-keyed lookups into them were most of
+what a tick allocated. Records keep their values in fixed ``__slots__``
+instead: no per-instance dict, a fraction of the memory, and attribute reads
+(``row.total``) for the code that ranks and diffs them.
+
+Everything else keeps treating rows as mappings: ``row["pid"]``,
+``row.get("trend")``, ``"opened_s" in row``, ``row.update(...)`` and
+``dict(row)`` all work, so :class:`~netmonitor.render.TableView`, the
+exporters, the recording codec and callers passing plain dicts share one code
+path. A slot that was never set is a missing key.
+"""
+from operator import attrgetter, itemgetter
+
+
+class Record:
+    """Base class: a fixed set of fields, readable as attributes or as a mapping."""
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # A subclass's own fields come first, so they lead in dict(row) and exports.
+        cls.FIELDS = tuple(cls.__dict__.get("__slots__", ())) + cls.FIELDS
+
+    @classmethod
+    def from_mapping(cls, mapping, **extra):
+        """A record with the fields of ``mapping`` (and ``extra``) set; other keys are an error."""
+        record = cls.__new__(cls)
+        record.update(mapping, **extra)
+        return record
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(f"{type(self).__name__} has no field {key!r}")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.FIELDS and hasattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def keys(self) -> list:
+        return [key for key in self.FIELDS if hasattr(self, key)]
+
+    def values(self) -> list:
+        return [getattr(self, key) for key in self.keys()]
+
+    def items(self) -> list:
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def update(self, other=(), **kwargs):
+        for key, value in (other.items() if hasattr(other, "items") else other):
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.items() == other.items()
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.items())})"
+
+
+def getter(rows, name: str):
+    """A key function reading ``name`` from ``rows``: by attribute for records, by key for dicts."""
+    return attrgetter(name) if rows and isinstance(rows[0], Record) else itemgetter(name)
+
+
+class TcpSocket(Record):
+    """One socket of a sock_diag dump (see :func:`~netmonitor.sockdiag.dump_tcp_sockets`)."""
+
+    __slots__ = ("cookie", "inode", "state", "uid", "laddr", "raddr", "bytes_acked", "bytes_received")
+
+    def __init__(self, cookie: int, inode: int, state: str, uid: int, laddr: tuple, raddr: tuple,
+                 bytes_acked: int, bytes_received: int):
+        self.cookie = cookie
+        self.inode = inode
+        self.state = state
+        self.uid = uid
+        self.laddr = laddr
+        self.raddr = raddr
+        self.bytes_acked = bytes_acked
+        self.bytes_received = bytes_received
+
+
+class ByteTotals(Record):
+    """Cumulative bytes of a process, or of a group of them (``pids``).
+
+    The byte counter replaces a process's totals when they change rather
+    than updating them, so an earlier sample stays valid and an idle
+    process has the very same object in consecutive samples.
+    """
+
+    __slots__ = ("name", "sent", "recv", "pids")
+
+    def __init__(self, name: str, sent: int = 0, recv: int = 0, pids: list = None):
+        self.name = name
+        self.sent = sent
+        self.recv = recv
+        if pids is not None:
+            self.pids = pids
+
+
+class _GroupFields(Record):
+    """Per-row extras: churn (see :meth:`~netmonitor.churn.ChurnSample.row`), ``--group-by`` membership
+    and the agent a cluster row came from."""
+
+    __slots__ = ("opened_s", "closed_s", "time_wait", "group", "processes", "pids", "host")
+
+
+class BandwidthRow(_GroupFields):
+    """Per-process byte rates, with history columns for the rows on screen."""
+
+    __slots__ = ("pid", "name", "sent", "recv", "total", "rate_1s", "rate_10s", "rate_60s", "peak", "trend")
+
+    def __init__(self, pid, name: str, sent: int, recv: int, total: int):
+        self.pid = pid
+        self.name = name
+        self.sent = sent
+        self.recv = recv
+        self.total = total
+
+
+class ConnectionRow(_GroupFields):
+    """Per-process connection summary of the live fallback view."""
+
+    __slots__ = ("pid", "name", "total", "tcp", "udp", "remote_hosts", "top_remote", "status_summary",
+                 "close_wait", "remote_host", "trend")
+
+    def __init__(self, pid, name: str, total: int, tcp: int, udp: int, remote_hosts: int, top_remote: str,
+                 status_summary: str):
+        self.pid = pid
+        self.name = name
+        self.total = total
+        self.tcp = tcp
+        self.udp = udp
+        self.remote_hosts = remote_hosts
+        self.top_remote = top_remote
+        self.status_summary = status_summary
+
+
+class TopConnectionRow(_GroupFields):
+    """Per-process connection counts of ``top`` without per-process bandwidth."""
+
+    __slots__ = ("pid", "name", "count", "tcp", "udp", "remotes")
+
+    def __init__(self, pid, name: str, count: int, tcp: int, udp: int, remotes: int):
+        self.pid = pid
+        self.name = name
+        self.count = count
+        self.tcp = tcp
+        self.udp = udp
+        self.remotes = remotes
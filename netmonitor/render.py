@@ -0,0 +1,214 @@
+"""Incremental, virtualized rendering of the live tables.
+
+* :func:`top_rows` picks the N largest rows with a heap instead of sorting
+  everything when N is small relative to the input.
+* :class:`Viewport` is a scroll window over the ranked rows; only rows inside
+  it are formatted, so ``--top 5000`` costs the same to paint as a screenful.
+* :class:`TableView` keeps each PID's formatted cells together with the
+  values they were formatted from and reuses them while those values do not
+  change.
+* :class:`KeyReader` turns arrow/page keys into viewport scrolling on POSIX
+  terminals.
+"""
+import heapq
+import os
+import select
+import sys
+import threading
+from typing import Callable, NamedTuple
+
+from rich.table import Table
+
+try:
+    import termios
+    import tty
+except ImportError:  # pragma: no cover - Windows
+    termios = tty = None
+
+
+def top_rows(rows, n: int, key: Callable) -> list:
+    """The ``n`` largest rows by ``key``, largest first."""
+    if n is None or n >= len(rows):
+        return sorted(rows, key=key, reverse=True)
+    # heapq.nlargest is O(len * log n) and beats a full sort until n is a
+    # sizeable fraction of the input.
+    if n * 4 < len(rows):
+        return heapq.nlargest(n, rows, key=key)
+    return sorted(rows, key=key, reverse=True)[:n]
+
+
+class Viewport:
+    """A scrollable window of ``height`` rows over a ranked list.
+
+    ``offset`` and ``height`` are plain ints, so the sampler thread can read
+    them to decide which rows need per-row extras without locking.
+    """
+
+    def __init__(self, height: int = 20):
+        self.offset = 0
+        self.height = max(1, height)
+        self.total = 0
+
+    def window(self, total: int = None):
+        """Return ``(start, stop)`` for ``total`` rows, clamping the offset."""
+        if total is not None:
+            self.total = total
+        self.offset = max(0, min(self.offset, self.total - self.height))
+        return self.offset, min(self.offset + self.height, self.total)
+
+    def scroll(self, delta: int):
+        self.offset = max(0, min(self.offset + delta, self.total - self.height))
+
+    def page(self, pages: int):
+        self.scroll(pages * self.height)
+
+    def home(self):
+        self.offset = 0
+
+    def end(self):
+        self.offset = max(0, self.total - self.height)
+
+    def margin_window(self, total: int):
+        """The visible window widened by one page each way (prefetch range)."""
+        start, stop = self.offset, self.offset + self.height
+        return max(0, start - self.height), min(total, stop + self.height)
+
+
+class Column(NamedTuple):
+    header: str
+    key: str
+    format: Callable = str
+    justify: str = "left"
+
+
+def _pid(row):
+    return row.get("pid")
+
+
+class TableView:
+    """Build Rich tables from ranked rows, formatting only the visible ones.
+
+    Cached cells are keyed by ``key(row)``, the row's PID unless given.
+    """
+
+    def __init__(self, columns, viewport: Viewport = None, key: Callable = None):
+        self.columns = list(columns)
+        self.viewport = viewport
+        self.key = key or _pid
+        self._keys = tuple(c.key for c in self.columns)
+        self._cache = {}
+        self.formatted = 0
+        self.reused = 0
+
+    def cells(self, row: dict) -> tuple:
+        """Formatted cells for ``row``, reused while its values are unchanged."""
+        values = tuple(row.get(k) for k in self._keys)
+        pid = self.key(row)
+        cached = self._cache.get(pid)
+        if cached is not None and cached[0] == values:
+            self.reused += 1
+            return cached[1]
+        cells = tuple(c.format(v) if v is not None else "" for c, v in zip(self.columns, values))
+        self._cache[pid] = (values, cells)
+        self.formatted += 1
+        return cells
+
+    def build(self, rows, title: str = None, caption: str = None, footer=None) -> Table:
+        table = Table(title=title, expand=True)
+        for column in self.columns:
+            table.add_column(column.header, justify=column.justify)
+        start, stop = self.viewport.window(len(rows)) if self.viewport else (0, len(rows))
+        visible = rows[start:stop]
+        for row in visible:
+            table.add_row(*self.cells(row))
+        if footer is not None:
+            table.add_row(*footer)
+        # Only visible PIDs stay cached, so memory follows the screen size.
+        if len(self._cache) > 2 * len(visible) + 64:
+            keep = {self.key(row) for row in visible}
+            self._cache = {pid: v for pid, v in self._cache.items() if pid in keep}
+        if self.viewport and len(rows) > self.viewport.height:
+            scroll = f"[dim]Rows {start + 1}-{stop} of {len(rows)} (↑/↓ PgUp/PgDn Home/End to scroll)[/dim]"
+            caption = f"{caption}\n{scroll}" if caption else scroll
+        table.caption = caption
+        return table
+
+
+_KEYS = {
+    "\x1b[A": ("scroll", -1), "k": ("scroll", -1),
+    "\x1b[B": ("scroll", 1), "j": ("scroll", 1),
+    "\x1b[5~": ("page", -1), "b": ("page", -1),
+    "\x1b[6~": ("page", 1), " ": ("page", 1),
+    "\x1b[H": ("home",), "\x1b[1~": ("home",), "g": ("home",),
+    "\x1b[F": ("end",), "\x1b[4~": ("end",), "G": ("end",),
+}
+
+
+def apply_key(viewport: Viewport, key: str) -> bool:
+    """Apply one key sequence to ``viewport``; False if it is not a scroll key."""
+    action = _KEYS.get(key)
+    if action is None:
+        return False
+    getattr(viewport, action[0])(*action[1:])
+    return True
+
+
+class KeyReader(threading.Thread):
+    """Read scroll keys from a terminal stdin in cbreak mode.
+
+    Signals stay enabled, so Ctrl+C still interrupts. Does nothing when
+    stdin is not a terminal or termios is unavailable.
+    """
+
+    def __init__(self, viewport: Viewport, on_key: Callable = None, stream=None):
+        super().__init__(name="netmonitor-keys", daemon=True)
+        self.viewport = viewport
+        self.on_key = on_key
+        self.stream = stream or sys.stdin
+        self._stop_event = threading.Event()
+        self._saved = None
+
+    @property
+    def usable(self) -> bool:
+        try:
+            return termios is not None and self.stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def start(self):
+        if not self.usable:
+            return
+        fd = self.stream.fileno()
+        self._saved = termios.tcgetattr(fd)
+        tty.setcbreak(fd)
+        super().start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(0.5)
+        if self._saved is not None:
+            termios.tcsetattr(self.stream.fileno(), termios.TCSADRAIN, self._saved)
+            self._saved = None
+
+    def run(self):
+        fd = self.stream.fileno()
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([fd], [], [], 0.1)
+            if not ready:
+                continue
+            data = os.read(fd, 32).decode("utf-8", "ignore")
+            # Split a burst into escape sequences and single characters.
+            i = 0
+            while i < len(data):
+                if data[i] == "\x1b":
+                    j = i + 1
+                    if j < len(data) and data[j] == "[":
+                        j += 1
+                        while j < len(data) and not (data[j].isalpha() or data[j] == "~"):
+                            j += 1
+                    key, i = data[i:j + 1], j + 1
+                else:
+                    key, i = data[i], i + 1
+                if apply_key(self.viewport, key) and self.on_key:
+                    self.on_key()
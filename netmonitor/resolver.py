@@ -0,0 +1,136 @@
+"""Background reverse-DNS resolution for remote IPs.
+
+:meth:`HostResolver.lookup` never blocks: it answers from an LRU cache and,
+on a miss or an expired entry, queues the address for a bounded pool of
+resolver threads (``gethostbyaddr`` blocks in libc and releases the GIL).
+Successful answers are cached for ``ttl`` seconds and failures for
+``negative_ttl`` seconds, so an address without a PTR record is not
+re-queried every tick. An expired name keeps being returned while it is
+refreshed in the background.
+
+The resolve function is injectable, so tests and benchmarks can use a
+local stand-in instead of the system resolver.
+"""
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+def system_resolve(ip: str):
+    """Reverse-resolve ``ip`` with the system resolver; None if it has no name."""
+    try:
+        return socket.gethostbyaddr(ip)[0]
+    except (socket.herror, socket.gaierror, OSError, UnicodeError):
+        return None
+
+
+class _Entry:
+    __slots__ = ("name", "expires")
+
+    def __init__(self, name, expires: float):
+        self.name = name
+        self.expires = expires
+
+
+class HostResolver:
+    """Non-blocking, cached reverse DNS.
+
+    Counters, available through :meth:`stats`:
+
+    * ``hits`` / ``misses`` - lookups answered from a fresh cache entry or not
+    * ``negative_hits`` - hits on a cached failure (included in ``hits``)
+    * ``stale`` - lookups that returned an expired name while it refreshes
+    * ``resolved`` / ``failed`` - completed background resolutions
+    * ``dropped`` - misses not queued because ``max_pending`` were in flight
+    * ``evictions`` - entries dropped to stay within ``capacity``
+    """
+
+    def __init__(self, resolve: Callable = system_resolve, max_workers: int = 4, capacity: int = 4096,
+                 ttl: float = 300.0, negative_ttl: float = 60.0, max_pending: int = 256,
+                 clock: Callable = time.monotonic):
+        self.resolve = resolve
+        self.capacity = capacity
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_pending = max_pending
+        self.clock = clock
+        self._cache = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="netmonitor-dns")
+        self.hits = self.misses = self.negative_hits = self.stale = 0
+        self.resolved = self.failed = self.dropped = self.evictions = 0
+
+    def lookup(self, ip: str):
+        """Return the cached name for ``ip`` (None if unknown), scheduling a refresh if needed."""
+        if not ip or ip == "-":
+            return None
+        now = self.clock()
+        with self._lock:
+            entry = self._cache.get(ip)
+            if entry is not None:
+                self._cache.move_to_end(ip)
+                if entry.expires > now:
+                    self.hits += 1
+                    if entry.name is None:
+                        self.negative_hits += 1
+                    return entry.name
+                self.stale += 1
+            self.misses += 1
+            if ip not in self._pending:
+                if len(self._pending) >= self.max_pending:
+                    self.dropped += 1
+                else:
+                    self._pending.add(ip)
+                    self._pool.submit(self._resolve, ip)
+        return entry.name if entry is not None else None
+
+    def display(self, ip: str) -> str:
+        """``ip``'s name once resolved, else ``ip`` itself."""
+        return self.lookup(ip) or ip
+
+    def _resolve(self, ip: str):
+        try:
+            name = self.resolve(ip)
+        except Exception:
+            name = None
+        expires = self.clock() + (self.ttl if name else self.negative_ttl)
+        with self._lock:
+            self._pending.discard(ip)
+            if name:
+                self.resolved += 1
+            else:
+                self.failed += 1
+            self._cache[ip] = _Entry(name or None, expires)
+            self._cache.move_to_end(ip)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "stale": self.stale,
+                "resolved": self.resolved,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "evictions": self.evictions,
+                "pending": len(self._pending),
+                "cached": len(self._cache),
+                "hit_rate": self.hit_rate,
+            }
+
+    def close(self):
+        """Stop resolving; queued lookups are abandoned."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,123 @@
+"""Fixed-cadence background sampling for the live views.
+
+A :class:`Sampler` thread calls a collect function on a monotonic schedule
+and publishes each result as an immutable :class:`Snapshot`. Renderers read
+:meth:`Sampler.latest` at their own rate, so a slow ``/proc`` scan never
+freezes the screen and the sampling period does not drift by the collection
+time. With a scheduler (see :mod:`netmonitor.scheduler`) the period itself
+adapts to the CPU time each collection takes.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    seq: int
+    timestamp: float
+    monotonic: float
+    elapsed: float
+    duration: float
+    rows: tuple
+    late: bool
+    missed: int
+    interval: float = None
+    budget: dict = None
+
+
+class Sampler(threading.Thread):
+    """Run ``collect(elapsed)`` every ``interval`` seconds in the background.
+
+    ``elapsed`` is the measured time since the previous sample (0.0 on the
+    first one) so that callers can turn counter deltas into true rates. When
+    a collection overruns its slot the skipped deadlines are counted in
+    ``missed`` and the next snapshot is flagged ``late``.
+
+    With a ``scheduler``, its ``update(cpu)`` is called with the CPU seconds
+    each collection took on ``cpu_clock`` and returns the interval to the next
+    one; each snapshot records the interval that follows it and
+    ``scheduler.stats()``. The default clock is this thread's CPU time, so
+    the render, resolver and exporter threads do not count against it.
+    """
+
+    def __init__(self, collect: Callable[[float], list], interval: float, clock: Callable[[], float] = time.monotonic,
+                 scheduler=None, cpu_clock: Callable[[], float] = time.thread_time):
+        super().__init__(name="netmonitor-sampler", daemon=True)
+        self.collect = collect
+        self.interval = interval
+        self.clock = clock
+        self.scheduler = scheduler
+        self.cpu_clock = cpu_clock
+        self.missed = 0
+        self.error = None
+        self._latest = None
+        self._stop_event = threading.Event()
+        self._published = threading.Condition()
+
+    def latest(self) -> Optional[Snapshot]:
+        # Attribute reads are atomic; the snapshot itself is never mutated.
+        if self.error is not None:
+            raise self.error
+        return self._latest
+
+    def wait_for(self, seq: int, timeout: float = None) -> Optional[Snapshot]:
+        """Block until a snapshot newer than ``seq`` is published."""
+        with self._published:
+            self._published.wait_for(
+                lambda: self.error is not None or (self._latest is not None and self._latest.seq > seq),
+                timeout,
+            )
+        return self.latest()
+
+    def stop(self, timeout: float = None):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        seq = 0
+        prev = None
+        late = False
+        deadline = self.clock()
+        while not self._stop_event.is_set():
+            started = self.clock()
+            cpu = self.cpu_clock()
+            try:
+                rows = self.collect(started - prev if prev is not None else 0.0)
+            except Exception as exc:
+                self.error = exc
+                with self._published:
+                    self._published.notify_all()
+                return
+            finished = self.clock()
+            budget = None
+            if self.scheduler is not None:
+                self.interval = self.scheduler.update(self.cpu_clock() - cpu)
+                budget = self.scheduler.stats()
+            seq += 1
+            snapshot = Snapshot(
+                seq=seq,
+                timestamp=time.time(),
+                monotonic=started,
+                elapsed=started - prev if prev is not None else 0.0,
+                duration=finished - started,
+                rows=tuple(rows),
+                late=late,
+                missed=self.missed,
+                interval=self.interval,
+                budget=budget,
+            )
+            with self._published:
+                self._latest = snapshot
+                self._published.notify_all()
+            prev = started
+
+            deadline += self.interval
+            late = finished > deadline
+            if late:
+                skipped = int((finished - deadline) // self.interval) + 1
+                self.missed += skipped
+                deadline += skipped * self.interval
+            self._stop_event.wait(max(deadline - self.clock(), 0))
@@ -0,0 +1,85 @@
+"""CPU-budgeted sampling intervals for the collectors.
+
+A full ``/proc`` scan costs roughly the same CPU time whatever the interval,
+so the share of a core the monitor uses is about ``cost / interval``. With a
+budget, :class:`CpuBudget` measures the CPU time of every tick and picks the
+next interval as ``cost / budget``, never below the requested interval: a
+busy host with many sockets is sampled less often instead of taking more than
+its share, and the interval shrinks back once the host quietens down.
+
+The cost is smoothed, growth is applied at once (to get back under budget on
+the next tick) and shrinking is limited per tick, so one cheap tick does not
+bring the old cost straight back.
+
+Idle processes are also probed less often: with an ``index``, the
+:class:`~netmonitor.inodes.InodeIndex` backs off processes whose sockets did
+not change (see its ``max_skip``), and the number skipped is reported.
+"""
+IDLE_MAX_SKIP = 8
+SHRINK = 0.25
+
+
+def parse_budget(value) -> float:
+    """A CPU share from ``"2%"``, ``"2"`` (percent) or a number; ValueError if not in (0, 100]."""
+    text = str(value).strip()
+    percent = float(text[:-1] if text.endswith("%") else text)
+    if not 0 < percent <= 100:
+        raise ValueError(f"CPU budget must be between 0 and 100%, got {value!r}")
+    return percent / 100
+
+
+class CpuBudget:
+    """Pick each next sampling interval so collection stays within ``budget`` of one CPU.
+
+    Pass it to a :class:`~netmonitor.sampler.Sampler`, which calls
+    :meth:`update` with the CPU seconds of every tick and sleeps for the
+    returned interval. ``max_interval`` (default 30 times ``interval``) caps
+    the stretch; beyond it the budget is overrun, and :attr:`usage` shows by
+    how much.
+    """
+
+    def __init__(self, budget: float, interval: float, max_interval: float = None, smoothing: float = 0.5,
+                 index=None, max_skip: int = IDLE_MAX_SKIP):
+        self.budget = budget
+        self.base = interval
+        self.max_interval = max_interval or interval * 30
+        self.smoothing = smoothing
+        self.interval = interval
+        self.cost = None
+        self.ticks = 0
+        self.index = index
+        if index is not None:
+            index.max_skip = max_skip
+
+    @property
+    def usage(self) -> float:
+        """Share of one CPU the collector is using at the current interval."""
+        return self.cost / self.interval if self.cost is not None else 0.0
+
+    def update(self, cpu: float) -> float:
+        """Record one tick's CPU seconds and return the interval until the next."""
+        self.ticks += 1
+        self.cost = cpu if self.cost is None else self.cost + self.smoothing * (cpu - self.cost)
+        target = self.cost / self.budget
+        if target < self.interval:
+            target = max(target, self.interval * (1 - SHRINK))
+        self.interval = min(max(target, self.base), self.max_interval)
+        return self.interval
+
+    def stats(self) -> dict:
+        stats = {"interval": self.interval, "base": self.base, "budget": self.budget, "usage": self.usage,
+                 "cost": self.cost or 0.0, "skipped": 0, "processes": 0}
+        if self.index is not None:
+            stats["skipped"] = self.index.skipped
+            stats["processes"] = len(self.index)
+        return stats
+
+
+def budget_caption(stats: dict) -> str:
+    """One line describing :meth:`CpuBudget.stats`, as published with each snapshot."""
+    caption = (f"Adaptive: every {stats['interval']:.2f}s (at least {stats['base']:g}s), "
+               f"collector CPU {stats['usage']:.1%} of a {stats['budget']:.1%} budget "
+               f"({stats['cost'] * 1000:.0f} ms/tick)")
+    if stats["processes"]:
+        caption += f", {stats['skipped']:,} of {stats['processes']:,} idle processes not probed this tick"
+    return caption
@@ -0,0 +1,231 @@
+"""Per-process TCP byte counters on Linux via NETLINK_SOCK_DIAG.
+
+One INET_DIAG dump per address family returns every TCP socket together with
+its ``tcp_info``, so a tick costs a couple of netlink round trips instead of
+one ``/proc`` parse per process.
+"""
+import os
+import socket
+import struct
+
+from netmonitor.churn import socket_key
+from netmonitor.inodes import InodeIndex
+from netmonitor.procnet import Addr, Connection
+from netmonitor.records import ByteTotals, TcpSocket
+
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+INET_DIAG_INFO = 2
+ALL_STATES = 0xFFFFFFFF
+
+_NLMSGHDR = struct.Struct("=LHHLL")
+# inet_diag_req_v2 followed by an all-zero inet_diag_sockid (wildcard).
+_REQ_V2 = struct.Struct("=BBBxI48x")
+# inet_diag_msg: family, state, timer, retrans, sockid (48 bytes), expires,
+# rqueue, wqueue, uid, inode.
+_DIAG_MSG = struct.Struct("=BBBB2s2s16s16sI8sLLLLL")
+_RTATTR = struct.Struct("=HH")
+# tcpi_bytes_acked / tcpi_bytes_received live right after the 8 single-byte
+# fields, 24 u32 fields and two u64 pacing rates of struct tcp_info.
+_TCPI_BYTES = struct.Struct("=QQ")
+_TCPI_BYTES_OFFSET = 120
+
+TCP_STATES = {
+    1: "ESTABLISHED", 2: "SYN_SENT", 3: "SYN_RECV", 4: "FIN_WAIT1",
+    5: "FIN_WAIT2", 6: "TIME_WAIT", 7: "CLOSE", 8: "CLOSE_WAIT",
+    9: "LAST_ACK", 10: "LISTEN", 11: "CLOSING",
+}
+
+
+def is_available() -> bool:
+    """Return True if the kernel lets us open a sock_diag netlink socket."""
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_SOCK_DIAG)
+    except (AttributeError, OSError):
+        return False
+    sock.close()
+    return True
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _parse_tcp_info(payload: bytes, offset: int, end: int):
+    while offset + _RTATTR.size <= end:
+        rta_len, rta_type = _RTATTR.unpack_from(payload, offset)
+        if rta_len < _RTATTR.size:
+            break
+        if rta_type == INET_DIAG_INFO and rta_len >= _RTATTR.size + _TCPI_BYTES_OFFSET + _TCPI_BYTES.size:
+            return _TCPI_BYTES.unpack_from(payload, offset + _RTATTR.size + _TCPI_BYTES_OFFSET)
+        offset += _align(rta_len)
+    return 0, 0
+
+
+def dump_tcp_sockets(family: int = socket.AF_INET, states: int = ALL_STATES):
+    """Yield one :class:`~netmonitor.records.TcpSocket` per TCP socket of ``family`` using a single netlink dump.
+
+    Each carries ``cookie``, ``inode``, ``state``, ``uid``, the local and
+    remote address tuples and the ``bytes_acked``/``bytes_received`` counters.
+    """
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_SOCK_DIAG)
+    try:
+        sock.bind((0, 0))
+        req = _REQ_V2.pack(family, socket.IPPROTO_TCP, 1 << (INET_DIAG_INFO - 1), states)
+        hdr = _NLMSGHDR.pack(_NLMSGHDR.size + len(req), SOCK_DIAG_BY_FAMILY,
+                             NLM_F_REQUEST | NLM_F_DUMP, 1, 0)
+        sock.send(hdr + req)
+        addr_len = 4 if family == socket.AF_INET else 16
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + _NLMSGHDR.size <= len(data):
+                msg_len, msg_type, _flags, _seq, _pid = _NLMSGHDR.unpack_from(data, offset)
+                if msg_len < _NLMSGHDR.size:
+                    return
+                if msg_type == NLMSG_DONE:
+                    return
+                if msg_type == NLMSG_ERROR:
+                    errno = -struct.unpack_from("=i", data, offset + _NLMSGHDR.size)[0]
+                    if errno:
+                        raise OSError(errno, os.strerror(errno))
+                    return
+                body = offset + _NLMSGHDR.size
+                (_fam, state, _timer, _retrans, sport, dport, src, dst, _if, cookie,
+                 _expires, _rq, _wq, uid, inode) = _DIAG_MSG.unpack_from(data, body)
+                acked, received = _parse_tcp_info(data, body + _DIAG_MSG.size, offset + msg_len)
+                yield TcpSocket(
+                    cookie, inode, TCP_STATES.get(state, str(state)), uid,
+                    (socket.inet_ntop(family, src[:addr_len]), int.from_bytes(sport, "big")),
+                    (socket.inet_ntop(family, dst[:addr_len]), int.from_bytes(dport, "big")),
+                    acked, received,
+                )
+                offset += _align(msg_len)
+    finally:
+        sock.close()
+
+
+def process_name(pid: int, proc_root: str = "/proc") -> str:
+    try:
+        with open(os.path.join(proc_root, str(pid), "comm")) as f:
+            return f.read().rstrip("\n")
+    except OSError:
+        return "unknown"
+
+
+class TcpByteCounter:
+    """Cumulative per-process TCP byte counters built from sock_diag dumps.
+
+    Every :meth:`sample` diffs each socket's ``tcp_info`` counters against the
+    previous dump (keyed by the kernel socket cookie) and adds the delta to its
+    owning process. A socket that closes between two ticks simply stops
+    contributing, so the per-process totals never go backwards. A socket is
+    only diffed once the index knows its owner, so one a skipped process
+    opened is counted from zero when that process is next probed.
+
+    A :class:`~netmonitor.churn.ChurnTracker` passed as ``churn`` is fed
+    every TCP socket of each dump, keyed by its hashed address 4-tuple as
+    :func:`~netmonitor.churn.table_keys` keys ``/proc/net`` rows (a socket
+    moving to ``TIME_WAIT`` gets a new cookie, so cookies cannot be used to
+    follow it).
+
+    With a :class:`~netmonitor.filters.Filter` as ``where``, families it
+    rules out are not dumped, processes it rules out are not indexed and
+    only matching sockets count towards the totals.
+    """
+
+    def __init__(self, proc_root: str = "/proc", index: InodeIndex = None, churn=None, where=None):
+        self.proc_root = proc_root
+        self.index = index or InodeIndex(proc_root)
+        self.churn = churn
+        self.where = where
+        self._last = {}
+        self._totals = {}
+        self.sockets = 0
+
+    def sample(self) -> dict:
+        """Return ``{pid: ByteTotals}`` with monotonic byte totals.
+
+        Only processes whose bytes moved get a new :class:`~netmonitor.records.ByteTotals`;
+        the others keep the one from the previous sample.
+        """
+        where, families = self.where, (socket.AF_INET, socket.AF_INET6)
+        match = None
+        if where is not None:
+            families = [family for family, name in zip(families, ("tcp", "tcp6")) if where.tables((name,))]
+            match = where.connection_predicate(self._process_name)
+        self.index.accept = where.process_predicate(self._process_name) if where is not None else None
+        self.index.refresh()
+        last, totals, owner_of = self._last, self._totals, self.index.owner
+        seen = {}
+        moved = {}
+        unowned = []
+        sockets = 0
+        churn = ([], [], []) if self.churn is not None else None
+        inet_pton = socket.inet_pton
+        for family in families:
+            try:
+                # Streamed, so only one dumped socket is alive at a time.
+                for s in dump_tcp_sockets(family):
+                    if churn is not None:
+                        churn[0].append(socket_key(family, socket.SOCK_STREAM, inet_pton(family, s.laddr[0]),
+                                                   s.laddr[1], inet_pton(family, s.raddr[0]), s.raddr[1]))
+                        churn[1].append(self.index.pid_of(s.inode) or 0)
+                        churn[2].append(s.state == "TIME_WAIT")
+                    if not s.inode:
+                        continue
+                    sockets += 1
+                    owner = owner_of(s.inode)
+                    # No baseline for a socket without a known owner yet (a
+                    # process the index skipped or has not probed): once it
+                    # is attributed, its bytes count from zero.
+                    if owner is None:
+                        unowned.append(s.inode)
+                        continue
+                    prev = curr = last.get(s.cookie)
+                    # An idle socket keeps the counter tuple it had.
+                    if prev is None or prev[0] != s.bytes_acked or prev[1] != s.bytes_received:
+                        curr = (s.bytes_acked, s.bytes_received)
+                    seen[s.cookie] = curr
+                    if curr is prev and owner in totals:
+                        continue
+                    if match is not None and not match(_connection(family, s), owner[0]):
+                        continue
+                    prev = prev or (0, 0)
+                    sent, recv = max(curr[0] - prev[0], 0), max(curr[1] - prev[1], 0)
+                    delta = moved.get(owner)
+                    moved[owner] = (sent, recv) if delta is None else (delta[0] + sent, delta[1] + recv)
+            except OSError:
+                continue
+        self._last = seen
+        self.sockets = sockets
+        # Sockets the fd listing missed are attributed from the next sample on.
+        self.index.claim(unowned)
+        if churn is not None:
+            self.churn.update(*churn)
+
+        for owner, (sent, recv) in moved.items():
+            row = totals.get(owner)
+            if row is None:
+                totals[owner] = ByteTotals(process_name(owner[0], self.proc_root), sent, recv)
+            elif sent or recv:
+                totals[owner] = ByteTotals(row.name, row.sent + sent, row.recv + recv)
+        # Totals are keyed by (pid, start_time): a process keeps them while it
+        # is alive, even with no open sockets left, and a recycled PID starts
+        # from zero.
+        for key in [key for key in totals if self.index.start_time(key[0]) != key[1]]:
+            del totals[key]
+        return {key[0]: row for key, row in totals.items()}
+
+    def _process_name(self, pid: int) -> str:
+        return process_name(pid, self.proc_root)
+
+
+def _connection(family: int, s: TcpSocket) -> Connection:
+    """A dumped socket as a psutil-style connection tuple, for filtering."""
+    raddr = Addr(*s.raddr) if s.raddr[1] else ()
+    return Connection(-1, family, socket.SOCK_STREAM, Addr(*s.laddr), raddr, s.state, None)
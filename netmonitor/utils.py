@@ -14,8 +14,11 @@ def get_platform() -> str:
 
 
 def supports_per_process_network_io() -> bool:
-    """Return True if per-process network usage is supported."""
-    return get_platform() in ("linux", "macos")
+    """Return True if per-process network usage is supported (Linux sock_diag)."""
+    if get_platform() != "linux":
+        return False
+    from netmonitor.sockdiag import is_available
+    return is_available()
 
 
 def format_bytes(size: int) -> str:
@@ -9,6 +9,9 @@ setup(
         'psutil',
         'rich',
     ],
+    extras_require={
+        'fast': ['numpy'],
+    },
     entry_points={
         'console_scripts': [
             'netmonitor=netmonitor.cli:app',
@@ -0,0 +1,86 @@
+"""Helpers that build synthetic ``/proc`` trees for tests and benchmarks."""
+import os
+import shutil
+
+
+def stat_line(pid: int, name: str, start_time: int) -> str:
+    # 52 fields as in proc(5); only the command name and starttime matter here.
+    fields = ["S", "1"] + ["0"] * 17 + [str(start_time)] + ["0"] * 30
+    return f"{pid} ({name}) " + " ".join(fields) + "\n"
+
+
+def add_process(root, pid: int, name: str = "proc", start_time: int = 100, sockets=(), files=(), netns: int = None,
+                cgroup: str = None):
+    """Create ``<root>/<pid>`` with ``stat``, ``comm`` and an ``fd`` directory.
+
+    ``sockets`` are inode numbers linked as ``socket:[inode]``; ``files`` are
+    plain paths. ``netns`` links ``ns/net`` to ``net:[netns]`` and ``cgroup``
+    writes a cgroup v2 ``cgroup`` file. Returns the fd directory path.
+    """
+    proc_dir = os.path.join(str(root), str(pid))
+    fd_dir = os.path.join(proc_dir, "fd")
+    os.makedirs(fd_dir, exist_ok=True)
+    with open(os.path.join(proc_dir, "stat"), "w") as f:
+        f.write(stat_line(pid, name, start_time))
+    with open(os.path.join(proc_dir, "comm"), "w") as f:
+        f.write(name + "\n")
+    if netns is not None:
+        os.makedirs(os.path.join(proc_dir, "ns"), exist_ok=True)
+        os.symlink(f"net:[{netns}]", os.path.join(proc_dir, "ns", "net"))
+    if cgroup is not None:
+        with open(os.path.join(proc_dir, "cgroup"), "w") as f:
+            f.write(f"0::{cgroup}\n")
+    fd = len(os.listdir(fd_dir))
+    for target in [f"socket:[{inode}]" for inode in sockets] + list(files):
+        os.symlink(target, os.path.join(fd_dir, str(fd)))
+        fd += 1
+    return fd_dir
+
+
+def add_socket(root, pid: int, inode: int) -> str:
+    fd_dir = os.path.join(str(root), str(pid), "fd")
+    fd = str(max((int(x) for x in os.listdir(fd_dir)), default=-1) + 1)
+    os.symlink(f"socket:[{inode}]", os.path.join(fd_dir, fd))
+    return fd
+
+
+def remove_process(root, pid: int):
+    shutil.rmtree(os.path.join(str(root), str(pid)))
+
+
+TCP_HEADER = ("  sl  local_address rem_address   st tx_queue rx_queue tr tm->when "
+              "retrnsmt   uid  timeout inode\n")
+
+
+def _hex_addr(ip: str, family: int) -> str:
+    import socket
+    import sys
+    packed = socket.inet_pton(family, ip)
+    words = [packed[i:i + 4] for i in range(0, len(packed), 4)]
+    if sys.byteorder == "little":
+        words = [w[::-1] for w in words]
+    return b"".join(words).hex().upper()
+
+
+def net_table_line(sl: int, laddr, raddr, state: int, uid: int, inode: int, family) -> str:
+    local = f"{_hex_addr(laddr[0], family)}:{laddr[1]:04X}"
+    remote = f"{_hex_addr(raddr[0], family)}:{raddr[1]:04X}"
+    return (f"{sl:4d}: {local} {remote} {state:02X} 00000000:00000000 00:00000000 "
+            f"00000000 {uid:5d}        0 {inode} 1 0000000000000000 100 0 0 10 0\n")
+
+
+def net_table(sockets, family) -> bytes:
+    """Render ``(laddr, raddr, state, uid, inode)`` tuples as a /proc/net table."""
+    lines = [TCP_HEADER]
+    for sl, (laddr, raddr, state, uid, inode) in enumerate(sockets):
+        lines.append(net_table_line(sl, laddr, raddr, state, uid, inode, family))
+    return "".join(lines).encode("ascii")
+
+
+def write_net_tables(root, pid: int, tables: dict):
+    """Write ``{name: (family, sockets)}`` as ``<root>/<pid>/net/<name>`` (a namespace's view)."""
+    net_dir = os.path.join(str(root), str(pid), "net")
+    os.makedirs(net_dir, exist_ok=True)
+    for name, (family, sockets) in tables.items():
+        with open(os.path.join(net_dir, name), "wb") as f:
+            f.write(net_table(sockets, family))
@@ -0,0 +1,154 @@
+import io
+import json
+import operator
+import socket
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from netmonitor import core
+from netmonitor.alerts import (AlertEngine, FileSink, RuleError, StdoutSink, WebhookSink, _compile_batch, format_event,
+                               make_sink, parse_rule, parse_rules)
+from netmonitor.records import BandwidthRow, ConnectionRow
+
+
+def _conns(**counts) -> list:
+    """One summary row per ``name=(conns, close_wait)``, PIDs in argument order."""
+    rows = []
+    for pid, (name, (total, close_wait)) in enumerate(counts.items(), 1):
+        row = ConnectionRow(pid, name, total, total, 0, 1, "10.0.0.1", f"E:{total}")
+        row.close_wait = close_wait
+        rows.append(row)
+    return rows
+
+
+def test_parse_rule():
+    rule = parse_rule("hot: bytes > 50MB clear 40MB for 5 cooldown 2m where name~^nginx")
+    assert (rule.label, rule.metric, rule.op, rule.ticks, rule.cooldown) == ("hot", "bytes", ">", 5, 120.0)
+    assert (rule.threshold, rule.clear) == (50 * 1024 ** 2, 40 * 1024 ** 2)
+    assert rule.where.accepts_process(1, "nginx") and not rule.where.accepts_process(1, "curl")
+    assert parse_rule("close_wait>=20").label == "close_wait>=20"
+    assert parse_rule("sent < 1.5k/s").threshold == 1536
+    for bad, message in [("foo > 1", "unknown metric"), ("conns > 5k", "needs a number"),
+                         ("conns > 5 clear 9", "other side"), ("conns < 5 clear 1", "other side"),
+                         ("conns > 5 for 0", "number of ticks"), ("conns > 5 cooldown soon", "cooldown"),
+                         ("conns > 5 every 3", "unknown option"), ("conns > 5 where rport==443", "pid and name"),
+                         ("conns", "expected")]:
+        with pytest.raises(RuleError, match=message):
+            parse_rule(bad)
+    assert [r.metric for r in parse_rules(["# limits", "", "conns > 5  # per process", "udp > 1"])] == ["conns", "udp"]
+    with pytest.raises(RuleError, match="line 2"):
+        parse_rules(["conns > 5", "conns >"])
+
+
+def test_hysteresis_and_for():
+    engine = AlertEngine([parse_rule("close_wait > 10 clear 5 for 2")])
+    ticks = [12, 12, 9, 6, 4, 11, 3, 12, 12]
+    states = []
+    for now, close_wait in enumerate(ticks):
+        events = engine.evaluate(_conns(web=(50, close_wait), idle=(1, 0)), now=float(now))
+        states.append([(e["state"], e["name"]) for e in events])
+    assert states == [[], [("firing", "web")], [], [], [("resolved", "web")], [], [], [], [("firing", "web")]]
+    assert engine.firing == 1 and (engine.fired, engine.resolved) == (2, 1)
+
+
+def test_cooldown_holds_back_refiring():
+    engine = AlertEngine([parse_rule("conns > 100 cooldown 60")])
+    fired = []
+    for now, conns in [(0, 150), (1, 50), (10, 150), (20, 50), (61, 150), (62, 150)]:
+        fired += [(now, e["state"]) for e in engine.evaluate(_conns(api=(conns, 0)), now=float(now))]
+    assert fired == [(0, "firing"), (1, "resolved"), (61, "firing")]
+    assert engine.suppressed == 1
+
+
+def test_events_report_value_peak_and_exits():
+    engine = AlertEngine([parse_rule("busy: bytes >= 1M"), parse_rule("conns > 3 where name~^ng")])
+    rows = [BandwidthRow(7, "nginx", 1 << 20, 0, 1 << 20), BandwidthRow(8, "curl", 10, 0, 10)]
+    conns = _conns(nginx=(5, 0), ngrep=(2, 0), curl=(9, 0))
+    first = engine.evaluate(conns, rows, now=0.0)
+    assert [(e["rule"], e["pid"], e["value"]) for e in first] == [("busy", 7, 1 << 20), ("conns>3", 1, 5)]
+    engine.evaluate(conns, [BandwidthRow(7, "nginx", 3 << 20, 0, 3 << 20)], now=1.0)
+    # nginx exits: both its alerts resolve.
+    resolved = engine.evaluate([], [], now=3.0)
+    assert [(e["state"], e["peak"], e["duration"]) for e in resolved] == [("resolved", 3 << 20, 3.0),
+                                                                          ("resolved", 5, 3.0)]
+    assert "peak 3.0 MB/s" in format_event(resolved[0]) and "threshold 1.0 MB/s" in format_event(first[0])
+
+
+def test_batch_matches_every_rule_on_its_own():
+    rules = [parse_rule(text) for text in ("conns > 400", "close_wait > 50.5 clear 20.5", "tcp >= 300",
+                                           "remote_hosts < 2", "udp <= 0.5", "conns > 5 where name~7$")]
+    rows = _conns(**{f"proc{i}": (i % 500, min(i % 500, i % 60)) for i in range(5000)})
+    for i, row in enumerate(rows):
+        row.remote_hosts, row.udp = i % 7, i % 3
+    ops = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+    def past(rule, level):
+        return {row.pid for row in rows if ops[rule.op](getattr(row, rule.attribute), level)
+                and (rule.where is None or rule.where.accepts_process(row.pid, row.name))}
+    hits = _compile_batch(rules)(rows, [])
+    for rule, hit in zip(rules, hits):
+        assert set(hit) == past(rule, rule.clear) and hit, rule.text
+    engine = AlertEngine(rules)
+    engine.evaluate(rows, now=0.0)
+    assert engine.firing == sum(len(past(rule, rule.threshold)) for rule in rules)
+
+
+def test_summary_rows_count_close_wait():
+    Conn = namedtuple("Conn", "fd family type laddr raddr status")
+    remote = namedtuple("Addr", "ip port")("10.0.0.9", 443)
+    conns = [Conn(-1, socket.AF_INET, socket.SOCK_STREAM, None, remote, status)
+             for status in ("ESTABLISHED", "CLOSE_WAIT", "CLOSE_WAIT")]
+    row, = core._summarize_connections(snapshot=[(9, "web", conns)])
+    assert row.close_wait == 2 and row.status_summary == "E:1 C:2"
+    merged = core._aggregate_row(9, "web", ((0, 0), 3, 0, {"ESTABLISHED": [1, 0], "CLOSE_WAIT": [2, 1]}, {}))
+    assert merged.close_wait == 2
+
+
+def test_alert_collector_feeds_sinks(monkeypatch):
+    monkeypatch.setattr(core, "_summarize_connections", lambda **_: _conns(web=(5, 4)))
+    out = io.StringIO()
+    collect = core._alert_collector(AlertEngine([parse_rule("close_wait > 3")]), [StdoutSink(out)], core._Collection())
+    assert len(collect(0.0)) == 1 and collect(1.0) == []
+    assert "FIRING   close_wait>3: web (pid 1) close_wait=4, threshold 3" in out.getvalue()
+
+
+def test_file_and_webhook_sinks(tmp_path):
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    events = AlertEngine([parse_rule("conns > 1")]).evaluate(_conns(a=(2, 0), b=(3, 0)), now=0.0)
+    try:
+        webhook = make_sink(f"http://127.0.0.1:{server.server_address[1]}/hook")
+        assert isinstance(webhook, WebhookSink)
+        webhook.emit(events)
+        webhook.close(timeout=5)
+        assert received == [{"alerts": events}] and webhook.sent == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    path = tmp_path / "alerts.jsonl"
+    sink = make_sink(f"file:{path}")
+    assert isinstance(sink, FileSink)
+    sink.emit(events)
+    sink.emit(events[:1])
+    sink.close()
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["a", "b", "a"]
+
+    dead = WebhookSink("http://127.0.0.1:1/hook", timeout=0.5)
+    dead.emit(events)
+    dead.close(timeout=5)
+    assert dead.failed == 1 and dead.error
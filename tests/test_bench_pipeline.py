@@ -0,0 +1,78 @@
+import pytest
+
+from benchmarks.bench_pipeline import compare, run_stages
+from benchmarks.synthproc import make_proc_tree, parse_states
+from netmonitor import procnet
+from netmonitor.inodes import InodeIndex
+
+
+def test_fixture_matches_manifest(tmp_path):
+    manifest = make_proc_tree(str(tmp_path), processes=40, sockets=600,
+                              states={"ESTABLISHED": 1, "TIME_WAIT": 1}, udp=0.2, ipv6=0.5)
+    tables = procnet.read_tables("inet", str(tmp_path / "net"))
+    assert {name: len(t) for name, t in tables.items()} == manifest["tables"]
+    # TIME_WAIT sockets carry no inode, like on a real host.
+    tcp = tables["tcp"]
+    assert all(int(tcp.inode[i]) == 0 for i in range(len(tcp)) if tcp.status(i) == "TIME_WAIT")
+    index = InodeIndex(str(tmp_path))
+    index.refresh()
+    assert len(index) == manifest["owned_sockets"]
+    # Same parameters reuse the tree, different ones refuse to.
+    assert make_proc_tree(str(tmp_path), processes=40, sockets=600,
+                          states={"ESTABLISHED": 1, "TIME_WAIT": 1}, udp=0.2, ipv6=0.5) == manifest
+    with pytest.raises(FileExistsError):
+        make_proc_tree(str(tmp_path), processes=41, sockets=600)
+
+
+def test_run_stages_and_compare(tmp_path, capsys):
+    make_proc_tree(str(tmp_path), processes=30, sockets=300)
+    stages = run_stages(str(tmp_path), top_n=5, repeat=1)
+    assert list(stages) == [
+        "enumeration_cold", "enumeration_warm", "parse", "attribution", "names", "aggregation",
+        "bandwidth_rows", "sort_top_n", "table_build", "table_render", "export_json", "export_csv",
+    ]
+    assert stages["parse"]["items"] == 300
+    old = {"stages": {name: dict(r, best_ms=r["best_ms"] or 1.0) for name, r in stages.items()}}
+    new = {"stages": {name: dict(r, best_ms=r["best_ms"] * 2 if name == "parse" else r["best_ms"])
+                      for name, r in old["stages"].items()}}
+    assert compare(old, new, 1.25) == ["parse"]
+
+
+def test_parse_states():
+    assert parse_states("established=3,listen") == {"ESTABLISHED": 3.0, "LISTEN": 1.0}
+    with pytest.raises(ValueError):
+        parse_states("BOGUS=1")
+
+
+def test_render_bench_runs_both_paths():
+    from benchmarks.bench_render import run
+    results = run(processes=300, tops=[10, 200], ticks=3, height=20)
+    assert set(results) == {"top=10", "top=200"}
+    assert all(set(paths) == {"full", "viewport"} for paths in results.values())
+
+
+def test_run_workers_reports_speedup(tmp_path):
+    from benchmarks.bench_pipeline import run_workers
+    make_proc_tree(str(tmp_path), processes=20, sockets=200)
+    results = run_workers(str(tmp_path), [1, 2], repeat=1)
+    assert list(results) == [1, 2] and results[1]["speedup"] == 1.0
+
+
+def test_run_memory_reports_every_stage(tmp_path):
+    from benchmarks.bench_pipeline import run_memory
+    make_proc_tree(str(tmp_path), processes=20, sockets=200)
+    results = run_memory(str(tmp_path), top_n=5, ticks=2)
+    assert list(results) == ["bytes_sample", "bandwidth_tick", "connection_summary", "export_json"]
+    assert all(result["peak_kib"] >= result["retained_kib"] for result in results.values())
+
+
+def test_cluster_bench_sends_less_than_full_frames():
+    from benchmarks.bench_cluster import run
+    result = run(agents=2, processes=500, ticks=3, churn=0.05)
+    assert result["steady_frame_bytes"] < result["full_frame_bytes"] < result["first_frame_bytes"]
+
+
+def test_alert_bench_fires_and_resolves():
+    from benchmarks.bench_alerts import run
+    result = run(processes=500, rules=8, ticks=5)
+    assert result["fired"] > 0 and result["median_ms"] <= result["max_ms"]
@@ -0,0 +1,132 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.synthproc import make_proc_tree
+from netmonitor import parallel, procnet
+from netmonitor.churn import TIME_WAIT, ChurnTracker, socket_key, table_keys
+from netmonitor.collector import _connections_from_proc
+from netmonitor.inodes import InodeIndex
+from tests.fakeproc import add_process, add_socket, net_table
+
+BACKENDS = ["python"] + (["numpy"] if procnet.HAVE_NUMPY else [])
+ESTABLISHED = 0x01
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_tracker_counts_opens_closes_and_time_wait_owner():
+    clock = Clock()
+    churn = ChurnTracker(clock)
+    assert churn.update([1, 2, 3], [10, 10, 20], [False] * 3) is None
+
+    clock.now = 2.0
+    # 2 closes into TIME_WAIT, 3 disappears, 4 and 5 are new, 6 lived and died within the tick.
+    sample = churn.update([1, 2, 4, 5, 6], [10, 0, 10, 0, 0], [False, True, False, False, True])
+    assert sample.opened == {10: 1, 0: 2} and sample.closed == {10: 1, 20: 1, 0: 1}
+    assert sample.time_wait == {10: 1}
+    assert sample.row(10) == {"opened_s": 0.5, "closed_s": 0.5, "time_wait": 1}
+    assert sample.row(99) == {"opened_s": 0.0, "closed_s": 0.0, "time_wait": 0}
+    system = sample.system()
+    assert system["opened_s"] == 1.5 and system["closed_s"] == 1.5
+    assert (system["time_wait"], system["time_wait_s"], system["sockets"]) == (2, 1.0, 5)
+
+    clock.now = 3.0
+    # The kernel reaps the TIME_WAIT entry: its owner stops counting it, nothing new closes.
+    sample = churn.update([1, 4, 5, 6], [10, 10, 0, 0], [False, False, False, True])
+    assert sample.time_wait == {} and not sample.opened and not sample.closed
+    assert churn.last is sample and sample.time_wait_delta == -1
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_keys_follow_the_five_tuple_not_state_or_inode(backend):
+    sockets = [
+        (("10.0.0.1", 5000), ("10.0.0.2", 443), ESTABLISHED, 0, 1001),
+        (("10.0.0.1", 5001), ("10.0.0.2", 443), ESTABLISHED, 0, 1002),
+        (("10.0.0.2", 443), ("10.0.0.1", 5000), ESTABLISHED, 0, 1003),
+    ]
+    closing = [sockets[0][:2] + (TIME_WAIT, 0, 0)] + sockets[1:]
+    parse = lambda rows, family=socket.AF_INET, type_=socket.SOCK_STREAM: procnet.parse_table(
+        net_table(rows, family), family, type_, backend)
+    keys = table_keys(parse(sockets))
+    assert len(set(keys)) == 3
+    assert table_keys(parse(closing)) == keys
+    assert set(table_keys(parse(sockets, type_=socket.SOCK_DGRAM))).isdisjoint(keys)
+    v6 = [(("::1", 5000), ("::2", 443), ESTABLISHED, 0, 1), (("::1", 5000), ("::3", 443), ESTABLISHED, 0, 2)]
+    assert len(set(table_keys(parse(v6, socket.AF_INET6)))) == 2
+
+
+@pytest.mark.skipif(not procnet.HAVE_NUMPY, reason="numpy not installed")
+def test_keys_are_stable_across_backends_and_processes():
+    v4 = [(("10.0.0.1", 5000), ("10.0.0.2", 443), ESTABLISHED, 0, 1), (("0.0.0.0", 80), ("0.0.0.0", 0), 0x0A, 0, 2)]
+    v6 = [(("::1", 5000), ("2001:db8::2", 443), ESTABLISHED, 0, 3)]
+    for family, rows in ((socket.AF_INET, v4), (socket.AF_INET6, v6)):
+        data = net_table(rows, family)
+        keys = table_keys(procnet.parse_table(data, family, socket.SOCK_STREAM, "numpy"), salt=7)
+        assert table_keys(procnet.parse_table(data, family, socket.SOCK_STREAM, "python"), salt=7) == keys
+        (laddr, lport), (raddr, rport) = rows[0][:2]
+        assert socket_key(family, socket.SOCK_STREAM, socket.inet_pton(family, laddr), lport,
+                          socket.inet_pton(family, raddr), rport, salt=7) == keys[0]
+    # Not the interpreter's randomized hash(): other processes agree.
+    call = "socket_key(2, 1, bytes([10, 0, 0, 1]), 5000, bytes([10, 0, 0, 2]), 443, salt=7)"
+    expected = socket_key(2, 1, bytes([10, 0, 0, 1]), 5000, bytes([10, 0, 0, 2]), 443, salt=7)
+    for seed in ("1", "2"):
+        out = subprocess.run([sys.executable, "-c", f"from netmonitor.churn import socket_key; print({call})"],
+                             capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONHASHSEED=seed))
+        assert int(out.stdout) == expected
+
+
+def _write_tcp(net_root, sockets):
+    with open(os.path.join(net_root, "tcp"), "wb") as f:
+        f.write(net_table(sockets, socket.AF_INET))
+
+
+def test_proc_collection_attributes_churn(tmp_path):
+    net_root = tmp_path / "net"
+    net_root.mkdir()
+    add_process(tmp_path, 10, "client", sockets=[1001, 1002])
+    add_process(tmp_path, 20, "server", sockets=[2001])
+    listen = (("0.0.0.0", 80), ("0.0.0.0", 0), 0x0A, 0, 2001)
+    first = (("10.0.0.1", 5000), ("10.0.0.2", 80), ESTABLISHED, 0, 1001)
+    second = (("10.0.0.1", 5001), ("10.0.0.2", 80), ESTABLISHED, 0, 1002)
+    _write_tcp(net_root, [listen, first, second])
+    index, churn = InodeIndex(str(tmp_path)), ChurnTracker()
+    _connections_from_proc("tcp4", index, str(net_root), churn)
+
+    # The client closes its second connection (left in TIME_WAIT without an
+    # inode) and opens a third; another user's socket opens too.
+    add_socket(tmp_path, 10, 1003)
+    os.unlink(os.path.join(tmp_path, "10", "fd", "1"))
+    third = (("10.0.0.1", 5002), ("10.0.0.2", 80), ESTABLISHED, 0, 1003)
+    foreign = (("10.0.0.9", 6000), ("10.0.0.2", 80), ESTABLISHED, 0, 9999)
+    _write_tcp(net_root, [listen, first, second[:2] + (TIME_WAIT, 0, 0), third, foreign])
+    by_pid = _connections_from_proc("tcp4", index, str(net_root), churn)
+
+    sample = churn.last
+    assert len(by_pid[10]) == 2
+    assert (sample.opened, sample.closed, sample.time_wait) == ({10: 1, 0: 1}, {10: 1}, {10: 1})
+    assert sample.system()["time_wait"] == 1 and sample.time_wait_delta == 1
+
+
+def test_sharded_churn_matches_serial(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel, "MIN_SHARD_ROWS", 100)
+    root = str(tmp_path)
+    make_proc_tree(root, processes=20, sockets=1000, udp=0.2, ipv6=0.3)
+    index = InodeIndex(root)
+    index.refresh()
+    net_root = os.path.join(root, "net")
+    serial, sharded = ChurnTracker(), ChurnTracker()
+    serial.observe_tables(procnet.read_tables("inet", net_root), index.owner)
+    with parallel.WorkerPool(3) as pool:
+        parallel.aggregate_tables(pool, procnet.KINDS["inet"], index, net_root, churn=sharded)
+    assert len(serial._live) > 500
+    assert serial._live == sharded._live and serial._closing == sharded._closing
@@ -0,0 +1,188 @@
+import json
+import threading
+from contextlib import ExitStack
+
+import pytest
+
+from netmonitor import core
+from netmonitor.cluster import AgentState, Cluster, DeltaCodec, is_loopback, make_agent_server, parse_address
+from netmonitor.recording import TickCodec
+from netmonitor.records import ByteTotals
+
+
+def _bandwidth(n: int, tick: int, busy: int = 0) -> dict:
+    """``n`` processes; the first ``busy`` of them move bytes every tick."""
+    return {pid: ByteTotals(f"proc{pid % 50}", 1000 * pid + (tick * 4096 if pid <= busy else 0), 10 * pid)
+            for pid in range(1, n + 1)}
+
+
+def test_parse_address():
+    assert parse_address("db1") == ("db1", 9190)
+    assert parse_address("db1:7000") == ("db1", 7000)
+    assert parse_address("[::1]:7000") == ("::1", 7000)
+    assert parse_address("::1") == ("::1", 9190)
+    for bad in ("", ":80", "db1:http", "db1:70000", "db1:-1"):
+        with pytest.raises(ValueError):
+            parse_address(bad)
+
+
+def test_delta_carries_only_changed_rows():
+    encoder, decoder = DeltaCodec("bandwidth"), DeltaCodec("bandwidth")
+    first = encoder.encode(1.0, _bandwidth(1000, 0))
+    (_, rows, changed), = decoder.decode(first, 0, len(first))
+    assert changed == 1000 and rows[7] == ByteTotals("proc7", 7000, 70)
+
+    # Same values in new objects: nothing to send but the header.
+    idle = encoder.encode(2.0, _bandwidth(1000, 0))
+    assert len(idle) < 10
+    (_, idle_rows, changed), = decoder.decode(idle, 0, len(idle))
+    assert changed == 0 and idle_rows[7] is rows[7]
+
+    tick = _bandwidth(1000, 1, busy=50)
+    del tick[999]
+    delta = encoder.encode(3.0, tick)
+    assert len(delta) < len(first) / 10
+    full = TickCodec("bandwidth").encode(3.0, tick)
+    assert len(delta) < len(full) / 10
+    (ts, rows, changed), = decoder.decode(delta, 0, len(delta))
+    assert (ts, changed) == (3.0, 50) and 999 not in rows and len(rows) == 999
+    assert rows[50].sent == 50_000 + 4096 and rows[51] is idle_rows[51]
+
+    # A new name is interned once.
+    tick[2000] = ByteTotals("newcomer", 1, 1)
+    delta = encoder.encode(4.0, tick)
+    assert delta.count(b"newcomer") == 1
+    (_, rows, _), = decoder.decode(delta, 0, len(delta))
+    assert rows[2000].name == "newcomer"
+
+
+class _Source:
+    def __init__(self, busy: int):
+        self.calls = 0
+        self.busy = busy
+
+    def __call__(self):
+        self.calls += 1
+        return _bandwidth(200, self.calls, self.busy)
+
+
+@pytest.fixture
+def agents():
+    """Three agents on localhost; ``tick()`` collects on all of them."""
+    started = []
+    for i, busy in enumerate((10, 20, 0)):
+        source = _Source(busy)
+        state = AgentState({"bandwidth": source}, interval=0.05)
+        server = make_agent_server(state, "127.0.0.1:0", hostname=f"node{i}")
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        started.append((server, state, source))
+
+    def tick():
+        for _, state, _ in started:
+            state.collect()
+    tick.addresses = [f"127.0.0.1:{server.server_address[1]}" for server, _, _ in started]
+    tick.states = [state for _, state, _ in started]
+    tick.sources = [source for _, _, source in started]
+    yield tick
+    for server, _, _ in started:
+        server.shutdown()
+        server.server_close()
+
+
+def _tick_until(cluster, tick, frames):
+    for _ in range(50):
+        tick()
+        if cluster.wait(frames, 0.1):
+            return
+    raise AssertionError("agents did not stream")
+
+
+def test_agents_collect_only_while_subscribed(agents):
+    agents()
+    assert [source.calls for source in agents.sources] == [0, 0, 0]
+    with Cluster(agents.addresses[:1]) as cluster:
+        _tick_until(cluster, agents, 1)
+        assert agents.sources[0].calls >= 1 and agents.sources[1].calls == 0
+    assert agents.states[0].subscribers["bandwidth"] in (0, 1)
+
+
+def test_aggregate_merges_agents_with_host_column(agents):
+    with Cluster(agents.addresses) as cluster:
+        _tick_until(cluster, agents, 3)
+        merge = core._ClusterRows(cluster, top_n=100)
+        rows, stats, timing = merge()
+    hosts = {row.host for row in rows}
+    assert hosts == set(agents.addresses[:2])
+    # Agent 0 has 10 busy processes, agent 1 has 20, agent 2 is idle.
+    assert len(rows) == 30 and all(row.sent > 0 and row.recv == 0 for row in rows)
+    assert [s["host"] for s in stats] == ["node0", "node1", "node2"]
+    assert all(s["status"] == "ok" and s["rows"] == 200 and s["bytes"] > 0 for s in stats)
+    # After the first full frame an idle agent's frames are a few bytes.
+    assert stats[2]["changed"] == 0 and stats[2]["frame_bytes"] < 20
+    assert stats[1]["changed"] == 20
+    assert timing["rows"] == 30 and timing["merge_ms"] >= 0
+
+    table = core._build_cluster_view(
+        core.Snapshot(1, 0.0, 0.0, 0.0, 0.0, (rows, stats, timing), False, 0),
+        (core.TableView(core.CLUSTER_COLUMNS["bandwidth"], key=core._host_key),
+         core.TableView(core.AGENT_COLUMNS, key=lambda row: row["agent"])), "bandwidth")
+    assert table is not None
+
+
+def test_aggregate_by_name_pivots_per_host(agents):
+    with Cluster(agents.addresses[:2]) as cluster:
+        _tick_until(cluster, agents, 3)
+        rows, _, _ = core._ClusterRows(cluster, top_n=100, by_name=True)()
+    first, second = agents.addresses[:2]
+    by_name = {row["name"]: row for row in rows}
+    # proc1..proc10 are busy on both agents, proc11..proc20 only on the second.
+    assert by_name["proc5"]["cluster"] == by_name["proc5"][first] + by_name["proc5"][second]
+    assert first not in by_name["proc15"] and by_name["proc15"][second] > 0
+
+
+def test_unknown_kind_and_dead_agent_are_reported(agents):
+    with Cluster([agents.addresses[0], "127.0.0.1:1"], kind="connections", timeout=0.5, retry=0.05) as cluster:
+        for _ in range(50):
+            _, _, refused = cluster.links[0].snapshot()
+            _, _, dead = cluster.links[1].snapshot()
+            if refused["status"] != "connecting" and dead["status"] != "connecting":
+                break
+            threading.Event().wait(0.05)
+    assert "does not collect 'connections'" in refused["status"]
+    assert dead["status"] != "ok" and dead["rows"] == 0
+
+
+def test_aggregate_once_exports_json(agents, tmp_path):
+    threading.Thread(target=lambda: [agents() or threading.Event().wait(0.05) for _ in range(20)],
+                     daemon=True).start()
+    out = tmp_path / "cluster.json"
+    core.aggregate_view(agents.addresses, top_n=5, once=True, timeout=2.0, export="json", output=str(out))
+    rows = json.loads(out.read_text())
+    assert len(rows) == 5 and list(rows[0]) == core.CLUSTER_FIELDS["bandwidth"]
+    assert {row["host"] for row in rows} <= set(agents.addresses)
+
+
+def test_token_handshake_and_loopback_only_without_one():
+    assert is_loopback("127.0.0.1") and is_loopback("::1") and not is_loopback("0.0.0.0")
+    with pytest.raises(ValueError, match="without a token"):
+        make_agent_server(AgentState({"bandwidth": _Source(1)}, 0.05), "0.0.0.0:0")
+
+    state = AgentState({"bandwidth": _Source(1)}, interval=0.05)
+    server = make_agent_server(state, "0.0.0.0:0", hostname="secure", token="s3cret")
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    address = f"127.0.0.1:{server.server_address[1]}"
+    try:
+        with ExitStack() as stack:
+            links = [stack.enter_context(Cluster([address], retry=0.05, timeout=1.0, token=token)).links[0]
+                     for token in (None, "s3cret", "wrong")]
+            for _ in range(50):
+                state.collect()
+                if links[1].frames and links[0].error and links[2].error:
+                    break
+                threading.Event().wait(0.05)
+            stats = [link.snapshot()[2] for link in links]
+        assert stats[1]["status"] == "ok" and stats[1]["rows"] == 200
+        assert all("authentication failed" in s["status"] and s["rows"] == 0 for s in (stats[0], stats[2]))
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,47 @@
+import os
+import socket
+from collections import namedtuple
+
+from netmonitor import core
+from netmonitor.collector import ConnectionSnapshot, collect_connections
+
+Addr = namedtuple("Addr", "ip port")
+Conn = namedtuple("Conn", "fd family type laddr raddr status pid")
+
+
+def _conn(pid, status="ESTABLISHED", type_=socket.SOCK_STREAM, rip="10.0.0.1"):
+    return Conn(-1, socket.AF_INET, type_, Addr("127.0.0.1", 1234), Addr(rip, 443) if rip else (), status, pid)
+
+
+def test_collect_connections_groups_by_pid():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    try:
+        snapshot = collect_connections()
+        ports = [c.laddr.port for c in snapshot.by_pid.get(os.getpid(), [])]
+        assert server.getsockname()[1] in ports
+        assert snapshot.names[os.getpid()]
+    finally:
+        server.close()
+
+
+def test_summary_applies_filters_to_snapshot():
+    snapshot = ConnectionSnapshot(
+        {
+            1: [_conn(1), _conn(1, "TIME_WAIT"), _conn(1, "NONE", socket.SOCK_DGRAM, None)],
+            2: [_conn(2, rip="10.0.0.2")],
+        },
+        {1: "nginx", 2: "curl"},
+        0.0,
+    )
+    rows = core.get_process_connection_summary(snapshot=snapshot)
+    assert [r["pid"] for r in rows] == [1, 2]
+    assert rows[0]["tcp"] == 2 and rows[0]["udp"] == 1
+    assert rows[0]["top_remote"] == "10.0.0.1"
+
+    rows = core.get_process_connection_summary(status="established", protocol="tcp", snapshot=snapshot)
+    assert [(r["pid"], r["total"]) for r in rows] == [(1, 1), (2, 1)]
+
+    rows = core.get_process_connection_summary(process_filter="NGI", snapshot=snapshot)
+    assert [r["name"] for r in rows] == ["nginx"]
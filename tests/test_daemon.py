@@ -0,0 +1,133 @@
+import json
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from netmonitor import core
+from netmonitor.daemon import (CollectorState, DaemonClient, DaemonError, _private_dir, attach, default_socket_path,
+                               is_running, make_server)
+
+
+class _Counters:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {pid: {"name": f"proc{pid}", "sent": 1000 * pid * self.calls, "recv": 10 * self.calls}
+                for pid in range(1, 201)}
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    counters = _Counters()
+    state = CollectorState({"bandwidth": counters}, interval=0.05)
+    state.collect()
+    path = str(tmp_path / "nm.sock")
+    server = make_server(state, path)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield path, state, counters
+    server.shutdown()
+    server.server_close()
+
+
+def test_snapshot_then_deltas(daemon):
+    path, state, counters = daemon
+    with DaemonClient(path) as client:
+        assert client.kinds == ("bandwidth",)
+        ts1, rows1 = client.fetch("bandwidth")
+        full = client.bytes_received
+        assert rows1[7] == {"name": "proc7", "sent": 7000, "recv": 10}
+        state.collect()
+        ts2, rows2 = client.fetch("bandwidth", wait=True)
+        assert rows2[7]["sent"] == 14000 and ts2 >= ts1
+        # Names are already interned and counters sent as small deltas.
+        assert client.bytes_received - full < full / 2
+
+
+def test_wait_blocks_until_next_tick(daemon):
+    path, state, _ = daemon
+    with DaemonClient(path) as client:
+        client.fetch("bandwidth")
+        threading.Timer(0.1, state.collect).start()
+        client.fetch("bandwidth", wait=True)
+        assert state.seq == 2
+
+
+def test_unknown_kind_is_an_error(daemon):
+    path, _, _ = daemon
+    with DaemonClient(path) as client:
+        with pytest.raises(DaemonError):
+            client.fetch("connections")
+
+
+def test_many_clients_share_one_collector(daemon):
+    path, _, counters = daemon
+    clients = [DaemonClient(path) for _ in range(8)]
+    for client in clients:
+        client.fetch("bandwidth")
+        client.close()
+    assert counters.calls == 1
+
+
+def test_attach_and_stale_socket(tmp_path):
+    path = str(tmp_path / "stale.sock")
+    assert attach(path) is None
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    assert not is_running(path)
+    server = make_server(CollectorState({}, 1.0), path)
+    try:
+        with pytest.raises(DaemonError):
+            make_server(CollectorState({}, 1.0), path)
+    finally:
+        server.server_close()
+
+
+def test_top_attaches_to_daemon(daemon, tmp_path, monkeypatch):
+    path, state, _ = daemon
+    monkeypatch.setenv("NETMONITOR_SOCKET", path)
+    threading.Timer(0.05, state.collect).start()
+    out = tmp_path / "top.json"
+    core.show_top_processes(delay=0.01, top_n=3, export="json", output=str(out))
+    rows = json.loads(out.read_text())
+    assert [row["pid"] for row in rows] == [200, 199, 198]
+
+
+def test_socket_is_private_and_owner_checked(tmp_path, monkeypatch):
+    path = str(tmp_path / "nm.sock")
+    server = make_server(CollectorState({}, 1.0), path)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    try:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        attach(path).close()
+        # Another user's socket (or one in a directory they can write to) is refused.
+        monkeypatch.setattr(os, "getuid", lambda: os.stat(path).st_uid + 1)
+        with pytest.raises(DaemonError, match="owned by uid"):
+            DaemonClient(path)
+        assert attach(path) is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fallback_directory_must_be_private(tmp_path, monkeypatch):
+    monkeypatch.delenv("NETMONITOR_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    assert default_socket_path() == f"/tmp/netmonitor-{os.getuid()}/netmonitor.sock"
+    private = tmp_path / "private"
+    _private_dir(str(private))
+    assert stat.S_IMODE(os.stat(private).st_mode) == 0o700
+    _private_dir(str(private))
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o755)
+    os.chmod(shared, 0o755)
+    planted = tmp_path / "planted"
+    planted.symlink_to(private)
+    for path in (shared, planted):
+        with pytest.raises(DaemonError, match="mode 0700"):
+            _private_dir(str(path))
@@ -0,0 +1,120 @@
+import csv
+import gzip
+import json
+import threading
+import time
+
+import pytest
+
+from netmonitor.core import _streamed
+from netmonitor.export import StreamExporter
+
+FIELDS = ["pid", "name", "sent", "recv", "total"]
+
+
+def _rows(t):
+    return [{"pid": 100, "name": "nginx", "sent": 10 * t, "recv": 5 * t, "total": 15 * t, "trend": "▁"},
+            {"pid": 200, "name": "curl", "sent": t, "recv": 0, "total": t, "trend": "▂"}]
+
+
+def test_ndjson_one_line_per_row(tmp_path):
+    out = tmp_path / "live.ndjson"
+    exporter = StreamExporter(str(out), "ndjson", FIELDS)
+    for t in range(3):
+        exporter.submit(1000.0 + t, _rows(t))
+    exporter.close()
+    assert exporter.error is None
+    assert exporter.files == [str(out)]
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    assert len(lines) == 6
+    assert lines[2] == {"timestamp": 1001.0, "pid": 100, "name": "nginx", "sent": 10, "recv": 5, "total": 15}
+
+
+def test_csv_rotation_by_size_writes_header_per_file(tmp_path):
+    exporter = StreamExporter(str(tmp_path / "live.csv"), "csv", FIELDS, rotate_bytes=100)
+    for t in range(10):
+        exporter.submit(float(t), _rows(t))
+    exporter.close()
+    assert len(exporter.files) > 1
+    assert exporter.files[0].endswith("live-0001.csv")
+    total = 0
+    for path in exporter.files:
+        with open(path, newline="") as f:
+            records = list(csv.DictReader(f))
+        assert set(records[0]) == {"timestamp"} | set(FIELDS)
+        total += len(records)
+    assert total == 20
+
+
+def test_rotation_by_time(tmp_path):
+    exporter = StreamExporter(str(tmp_path / "live.ndjson"), "ndjson", FIELDS, rotate_seconds=0.05)
+    exporter.submit(0.0, _rows(0))
+    time.sleep(0.2)
+    exporter.submit(1.0, _rows(1))
+    exporter.close()
+    assert len(exporter.files) == 2
+
+
+def test_gzip(tmp_path):
+    exporter = StreamExporter(str(tmp_path / "live.ndjson"), "ndjson", FIELDS, compress=True)
+    exporter.submit(0.0, _rows(1))
+    exporter.close()
+    assert exporter.files == [str(tmp_path / "live.ndjson.gz")]
+    with gzip.open(exporter.files[0], "rt") as f:
+        assert [json.loads(line)["pid"] for line in f] == [100, 200]
+
+
+class _StalledExporter(StreamExporter):
+    def __init__(self, *args, **kwargs):
+        self.release = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _write(self, timestamp, rows):
+        self.release.wait()
+        super()._write(timestamp, rows)
+
+
+def test_submit_never_blocks_on_slow_disk(tmp_path):
+    exporter = _StalledExporter(str(tmp_path / "live.ndjson"), "ndjson", FIELDS, max_pending=4)
+    started = time.perf_counter()
+    for t in range(50):
+        exporter.submit(float(t), _rows(t))
+    assert time.perf_counter() - started < 0.5
+    assert exporter.dropped >= 50 - 4 - 1
+    exporter.release.set()
+    exporter.close()
+    assert exporter.written + exporter.dropped == 50
+
+
+def test_streamed_collect_submits_top_rows(tmp_path):
+    exporter = StreamExporter(str(tmp_path / "live.ndjson"), "ndjson", FIELDS)
+    collect = _streamed(lambda elapsed: _rows(2), exporter, top_n=1)
+    assert len(collect(1.0)) == 2
+    exporter.close()
+    assert [json.loads(line)["pid"] for line in open(exporter.files[0])] == [100]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        StreamExporter(str(tmp_path / "x"), "xml", FIELDS)
+
+
+def test_close_after_writer_failure_with_full_queue(tmp_path):
+    exporter = StreamExporter(str(tmp_path / "missing" / "live.ndjson"), "ndjson", FIELDS, max_pending=2)
+    exporter.submit(0.0, _rows(0))
+    # The writer fails on its first write and exits; later ticks fill the queue.
+    exporter._thread.join(2)
+    for t in range(1, 5):
+        exporter.submit(float(t), _rows(t))
+    assert isinstance(exporter.error, OSError) and exporter._queue.full()
+    started = time.perf_counter()
+    exporter.close(timeout=1)
+    assert time.perf_counter() - started < 0.5
+
+    stalled = _StalledExporter(str(tmp_path / "live.ndjson"), "ndjson", FIELDS, max_pending=1)
+    for t in range(3):
+        stalled.submit(float(t), _rows(t))
+    started = time.perf_counter()
+    stalled.close(timeout=0.2)
+    assert time.perf_counter() - started < 1
+    stalled.release.set()
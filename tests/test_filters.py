@@ -0,0 +1,160 @@
+import json
+import os
+import pickle
+import socket
+
+import pytest
+
+from netmonitor import collector, core, parallel, procnet
+from netmonitor.filters import FilterError, combine, compile_filter
+from netmonitor.inodes import InodeIndex
+from netmonitor.namespaces import NamespaceIndex
+from netmonitor.sockdiag import process_name
+from tests.fakeproc import add_process, net_table, write_net_tables
+
+BACKENDS = ["python"] + (["numpy"] if procnet.HAVE_NUMPY else [])
+ESTABLISHED, SYN_SENT, TIME_WAIT, LISTEN, NEW_SYN_RECV = 0x01, 0x02, 0x06, 0x0A, 0x0C
+HOST, POD = 4026531840, 4026532201
+
+
+@pytest.mark.parametrize("text,error", [
+    ("", "empty"), ("port==80", "unknown field 'port'"), ("proto==icmp", "unknown proto"),
+    ("rport~^44", "cannot be matched"), ("name>a", "cannot be compared"), ("rport==https", "needs a number"),
+    ("raddr==nowhere", "needs an address"), ("name~'('", "bad regex"), ("(proto==tcp", r"expected \)"),
+    ("proto==tcp or", "expected a field name"), ("rport==1 rport==2", "unexpected 'rport' at column 10"),
+])
+def test_bad_expressions_say_what_is_wrong(text, error):
+    with pytest.raises(FilterError, match=error):
+        compile_filter(text)
+
+
+def test_pushdown_decisions():
+    where = compile_filter("proto==tcp and status in (ESTABLISHED,syn_sent) and name~^nginx and family!=6")
+    assert where.tables(procnet.KINDS["inet"]) == ("tcp",)
+    assert where.accepts_process(1, "nginx") and not where.accepts_process(1, "curl")
+    # Without the name, nothing can be ruled out.
+    assert where.accepts_process(1, None)
+    # A socket field on the other side of an "or" keeps every process in.
+    either = compile_filter("name==curl or rport==443")
+    assert either.process_predicate(str) is not None and either.accepts_process(1, "nginx")
+    assert compile_filter("rport==443").process_predicate(str) is None
+    assert compile_filter("status==LISTEN").tables(procnet.KINDS["inet"]) == ("tcp", "tcp6")
+    assert compile_filter("status==NONE").tables(procnet.KINDS["inet"]) == procnet.KINDS["inet"]
+    assert pickle.loads(pickle.dumps(where)) is where
+
+
+def test_combine_folds_in_the_legacy_options():
+    assert combine() is None
+    where = combine("rport==443", status="established", protocol="TCP", process="Chr")
+    assert where.text == "(rport==443) and status=='established' and proto=='TCP' and name~'(?i)Chr'"
+    assert where.accepts_process(1, "chrome") and not where.accepts_process(1, "firefox")
+
+
+ROWS = [
+    (("10.0.0.1", 5000), ("10.0.0.2", 443), ESTABLISHED, 0, 1),
+    (("10.0.0.1", 5001), ("192.168.1.7", 443), SYN_SENT, 0, 2),
+    (("0.0.0.0", 80), ("0.0.0.0", 0), LISTEN, 0, 3),
+    (("10.0.0.1", 5002), ("10.0.0.2", 80), NEW_SYN_RECV, 0, 4),
+    (("10.0.0.1", 5003), ("10.9.0.2", 8443), TIME_WAIT, 0, 5),
+]
+EXPRESSIONS = [
+    "rport==443", "raddr==10.0.0.0/8", "raddr in (192.168.0.0/16, 10.0.0.2)", "status==NONE",
+    "status!=LISTEN and lport<5002", "raddr~^192", "name~web or rport>8000", "proto==udp", "status~WAIT|LISTEN",
+    "not (rport in (80, 443) or pid==3)", "family==6 or laddr==0.0.0.0", "status not in (LISTEN) and name!=db",
+]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_row_predicates_agree_with_connection_predicates(backend, text):
+    table = procnet.parse_table(net_table(ROWS, socket.AF_INET), socket.AF_INET, socket.SOCK_STREAM, backend)
+    name_of = {1: "web", 2: "db", 3: "web", 4: "db", 5: "cron"}.get
+    where = compile_filter(text)
+    rows = where.table_predicate(table, name_of)
+    conns = where.connection_predicate(name_of)
+    expected = [conns(table.connection(i, pid), pid) for i, pid in enumerate(range(1, 6))]
+    assert [rows is None or rows(i, pid) for i, pid in enumerate(range(1, 6))] == expected
+    assert 0 < sum(expected) < 5 or text in ("proto==udp", "family==6 or laddr==0.0.0.0")
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """web and curl in a pod on TCP; dns next to the reader, on UDP."""
+    root = str(tmp_path)
+    add_process(root, "self", netns=HOST)
+    add_process(root, 10, "web", sockets=[101, 102], netns=POD)
+    add_process(root, 11, "curl", sockets=[103], netns=POD)
+    add_process(root, 12, "dns", sockets=[104], netns=HOST)
+    pod = {"tcp": (socket.AF_INET, [(("0.0.0.0", 80), ("0.0.0.0", 0), LISTEN, 0, 101),
+                                    (("10.0.0.1", 80), ("10.0.0.9", 5000), ESTABLISHED, 0, 102),
+                                    (("10.0.0.1", 5001), ("10.0.0.3", 443), SYN_SENT, 0, 103)])}
+    host = {"tcp": (socket.AF_INET, []), "udp": (socket.AF_INET, [(("0.0.0.0", 53), ("0.0.0.0", 0), 0x07, 0, 104)])}
+    for pid in (10, 11):
+        write_net_tables(root, pid, pod)
+    write_net_tables(root, 12, host)
+    write_net_tables(root, "self", host)
+    return root
+
+
+def test_collection_reads_only_what_the_filter_needs(tree, monkeypatch):
+    reads = []
+    read_tables = collector.read_tables
+    monkeypatch.setattr(collector, "read_tables", lambda kind, path: reads.append(kind) or read_tables(kind, path))
+    monkeypatch.setattr(collector, "_process_name", lambda pid: process_name(pid, tree))
+    listed = []
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: listed.append(path) or listdir(path))
+    index, namespaces = InodeIndex(tree), NamespaceIndex(tree)
+    net_root = os.path.join(tree, "self", "net")
+
+    where = compile_filter("name==web and rport==0")
+    by_pid = collector._connections_from_proc("inet", index, net_root, namespaces=namespaces, where=where)
+    assert {pid: [c.laddr.port for c in conns] for pid, conns in by_pid.items()} == {10: [80]}
+    # Only web's fds were listed (curl and dns were rejected on their name),
+    # and only web's namespace was read, through web, though it is not ours.
+    assert [path for path in listed if str(path).endswith("fd")] == [os.path.join(tree, "10", "fd")]
+    assert index.rejected == 2
+    assert reads == [procnet.KINDS["inet"]] and namespaces.table_dirs(net_root)[0][0] == POD
+
+    reads.clear()
+    by_pid = collector._connections_from_proc("inet", index, net_root, namespaces=namespaces,
+                                              where=compile_filter("proto==udp"))
+    assert set(reads) == {("udp", "udp6")} and list(by_pid) == [12]
+    by_pid = collector._connections_from_proc("inet", index, net_root, namespaces=namespaces)
+    assert sorted(by_pid) == [10, 11, 12] and index.rejected == 0
+
+
+def test_sharded_aggregates_match_serial_with_a_filter(tree, monkeypatch):
+    monkeypatch.setattr(collector, "_process_name", lambda pid: process_name(pid, tree))
+    where = compile_filter("name!=curl or status==SYN_SENT")
+    index = InodeIndex(tree)
+    index.refresh()
+    net_root = os.path.join(tree, "10", "net")
+    serial = collector.attribute_connections(procnet.read_tables("inet", net_root), index, where,
+                                             collector._process_name)
+    with parallel.WorkerPool(2) as pool:
+        merged = parallel.aggregate_tables(pool, procnet.KINDS["inet"], index, net_root, where=where,
+                                           name_of=collector._process_name)
+    assert {pid: len(conns) for pid, conns in serial.items()} == {10: 2, 11: 1}
+    assert {pid: aggregate[1] + aggregate[2] for pid, aggregate in merged.items()} == {10: 2, 11: 1}
+    where = compile_filter("name==curl and status!=SYN_SENT")
+    with parallel.WorkerPool(2) as pool:
+        merged = parallel.aggregate_tables(pool, procnet.KINDS["inet"], index, net_root, where=where,
+                                           name_of=collector._process_name)
+    assert {pid: aggregate[1] + aggregate[2] for pid, aggregate in merged.items()} == {10: 0, 11: 0}
+
+
+def test_top_exports_filtered_rows(tree, monkeypatch, tmp_path):
+    index, namespaces = InodeIndex(tree), NamespaceIndex(tree)
+    for module in (collector, core):
+        monkeypatch.setattr(module, "default_index", lambda: index)
+        monkeypatch.setattr(module, "default_namespaces", lambda: namespaces)
+    monkeypatch.setattr(collector, "_proc_net_available", lambda: True)
+    monkeypatch.setattr(collector, "_process_name", lambda pid: process_name(pid, tree))
+    monkeypatch.setattr(core, "supports_per_process_network_io", lambda: False)
+    out = tmp_path / "top.json"
+    core.show_top_processes(delay=0, top_n=5, export="json", output=str(out), use_daemon=False,
+                            filter_expr="proto==tcp and status in (ESTABLISHED, SYN_SENT)")
+    with open(out) as f:
+        rows = json.load(f)
+    assert sorted((row["name"], row["count"]) for row in rows) == [("curl", 1), ("web", 1)]
@@ -0,0 +1,68 @@
+import os
+import random
+import socket
+from collections import Counter
+
+import pytest
+
+from netmonitor.collector import remote_endpoints
+from netmonitor.heavyhitters import RemoteTracker, SpaceSaving, subnet_of
+from tests.fakeproc import net_table
+
+
+def test_space_saving_is_exact_below_capacity():
+    sketch = SpaceSaving(10)
+    for key, weight in [("a", 3), ("b", 1), ("a", 2), ("c", 7)]:
+        sketch.update(key, weight)
+    assert sketch.top() == [("c", 7, 0), ("a", 5, 0), ("b", 1, 0)]
+    assert sketch.error_bound() == 0
+    with pytest.raises(ValueError):
+        SpaceSaving(0)
+
+
+def test_space_saving_error_bounds_hold_on_a_long_tailed_stream():
+    rng = random.Random(7)
+    keys = [f"10.0.{i // 256}.{i % 256}" for i in range(5000)]
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(keys))]
+    truth = Counter()
+    sketch = SpaceSaving(100)
+    for _ in range(20):
+        tick = Counter(rng.choices(keys, weights=weights, k=2000))
+        truth.update(tick)
+        sketch.update_many(tick)
+    assert len(sketch) == 100 and sketch.total == sum(truth.values())
+    bound = sketch.error_bound()
+    assert 0 < bound <= sketch.total / sketch.capacity
+    for key, count, error in sketch.top():
+        assert count - error <= truth[key] <= count and error <= bound
+    # Every key heavier than N/k is tracked.
+    assert all(key in sketch for key, n in truth.items() if n > sketch.total / sketch.capacity)
+    assert [key for key, _, _ in sketch.top(5)] == [key for key, _ in truth.most_common(5)]
+
+
+def test_subnet_of():
+    assert subnet_of("192.168.7.42") == "192.168.7.0/24"
+    assert subnet_of("192.168.7.42", v4_prefix=16) == "192.168.0.0/16"
+    assert subnet_of("2001:db8:1:2:3::9") == "2001:db8:1:2::/64"
+    assert subnet_of("::ffff:10.1.2.3") == "10.1.2.0/24"
+
+
+def test_remote_endpoints_and_tracker_rows(tmp_path):
+    os.makedirs(tmp_path / "net")
+    rows = [(("10.0.0.1", 5000), ("172.16.0.9", 443), 0x01, 0, 11),
+            (("10.0.0.1", 5001), ("172.16.0.9", 443), 0x06, 0, 0),  # TIME_WAIT, no owner: still counted
+            (("10.0.0.1", 5002), ("172.16.0.7", 80), 0x01, 0, 12),
+            (("0.0.0.0", 22), ("0.0.0.0", 0), 0x0A, 0, 13)]  # LISTEN has no remote end
+    (tmp_path / "net" / "tcp").write_bytes(net_table(rows, socket.AF_INET))
+    (tmp_path / "net" / "tcp6").write_bytes(
+        net_table([(("2001:db8::1", 4000), ("2001:db8:5::1", 443), 0x01, 0, 14)], socket.AF_INET6))
+    endpoints = remote_endpoints("inet", str(tmp_path / "net"))
+    assert endpoints == {("172.16.0.9", 443): 2, ("172.16.0.7", 80): 1, ("2001:db8:5::1", 443): 1}
+
+    tracker = RemoteTracker(capacity=8)
+    tracker.observe(endpoints)
+    tracker.observe(endpoints)
+    top, subnets = tracker.rows(2)
+    assert [(r["remote"], r["count"]) for r in top] == [("172.16.0.9:443", 4), ("172.16.0.7:80", 2)]
+    assert [(r["remote"], r["count"], r["share"]) for r in subnets][0] == ("172.16.0.0/24", 6, 0.75)
+    assert tracker.stats()["total"] == 8
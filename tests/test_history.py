@@ -0,0 +1,57 @@
+import math
+
+from netmonitor.history import HistoryStore, sparkline
+
+
+def test_rates_over_windows():
+    store = HistoryStore(capacity=100)
+    for t in range(0, 61):
+        # pid 1 sends 100 B/s for the first 50s, then 1000 B/s.
+        total = 100 * min(t, 50) + 1000 * max(t - 50, 0)
+        store.record(float(t), {1: total})
+    assert store.rate(1, 1.0) == 1000
+    assert store.rate(1, 10.0) == 1000
+    assert math.isclose(store.rate(1, 60.0), (5000 + 10000) / 60)
+    assert store.peak(1) == 1000
+    assert store.rate(2, 10.0) == 0.0
+
+
+def test_rate_uses_available_history_when_shorter_than_window():
+    store = HistoryStore(capacity=10)
+    store.record(0.0, {1: 0})
+    store.record(2.0, {1: 500})
+    assert store.rate(1, 60.0) == 250
+
+
+def test_exited_pids_are_evicted_and_arrays_recycled():
+    store = HistoryStore(capacity=8)
+    store.record(0.0, {1: 0, 2: 0})
+    store.record(1.0, {2: 10})
+    assert 1 not in store and 2 in store
+    assert store.evictions == 1
+    store.record(2.0, {2: 20, 3: 5})
+    assert store.samples(3)[-1] != store.samples(3)[-1]  # NaN: no previous value
+    assert store.samples(2)[-2:] == [10.0, 10.0]
+
+
+def test_memory_stays_flat_under_churn():
+    store = HistoryStore(capacity=60, max_bytes=60 * 8 * 50)
+    assert store.max_series == 50
+    sizes = []
+    for tick in range(2000):
+        # 200 processes alive at any time, 20 replaced every tick.
+        live = {pid: tick * pid for pid in range(tick * 20, tick * 20 + 200)}
+        store.record(float(tick), live)
+        sizes.append(store.memory_bytes())
+    assert len(store) <= 50
+    assert store.rejected > 0
+    assert max(sizes) == sizes[-1] <= 53 * 60 * 8
+
+
+def test_gauge_samples_and_sparkline():
+    store = HistoryStore(capacity=5, kind="gauge")
+    for t, v in enumerate([1, 2, 3, 4, 5, 6]):
+        store.record(float(t), {9: v})
+    assert store.samples(9) == [2, 3, 4, 5, 6]
+    assert store.sparkline(9) == "▁▂▄▆█"
+    assert sparkline([1, float("nan"), 1]) == "▁ ▁"
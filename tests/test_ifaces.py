@@ -0,0 +1,79 @@
+import random
+
+from netmonitor.ifaces import FIELDS, WRAP_32, InterfaceRates, _Ring, counter_delta
+
+
+class FakeNics:
+    """Counter source and clock for :class:`InterfaceRates`."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.counters = {}
+
+    def set(self, nic, sent, recv, packets=0):
+        self.counters[nic] = (sent, recv, packets, packets, 0, 0, 0, 0)
+
+    def read(self):
+        return dict(self.counters)
+
+    def clock(self):
+        return self.now
+
+
+def test_counter_delta_handles_wraps_and_resets():
+    assert counter_delta(10, 25) == (15, False)
+    assert counter_delta(WRAP_32 - 100, 50) == (150, True)
+    assert counter_delta(2 ** 40, 300) == (300, True)
+
+
+def test_rates_over_rolling_windows():
+    nics = FakeNics()
+    rates = InterfaceRates(interval=0.5, windows=(1.0, 10.0), now_ticks=1, read=nics.read, clock=nics.clock)
+    # 1000 B/s sent for 10s, then 5000 B/s for the last 2s.
+    sent = 0
+    for tick in range(25):
+        nics.now = tick * 0.5
+        nics.set("eth0", sent, 0)
+        rows = rates.sample()
+        sent += 500 if tick < 20 else 2500
+    row = rows[0]
+    assert row["iface"] == "eth0"
+    assert row["sent_now"] == row["sent_1s"] == 5000
+    assert row["sent_10s"] == (8 * 1000 + 2 * 5000) // 10
+    assert rates.capacity == 22
+
+
+def test_wrapped_counter_keeps_rates_positive():
+    nics = FakeNics()
+    rates = InterfaceRates(interval=0.1, windows=(1.0,), read=nics.read, clock=nics.clock)
+    nics.set("eth0", WRAP_32 - 1000, 0)
+    rates.sample()
+    nics.now = 1.0
+    nics.set("eth0", 1000, 0)
+    (row,) = rates.sample()
+    assert row["sent_1s"] == 2000 and row["wraps"] == 1
+
+
+def test_interfaces_come_and_go():
+    nics = FakeNics()
+    rates = InterfaceRates(interval=0.1, read=nics.read, clock=nics.clock)
+    nics.set("eth0", 0, 0)
+    nics.set("tun0", 0, 0)
+    rates.sample()
+    del nics.counters["tun0"]
+    nics.now = 0.1
+    assert [row["iface"] for row in rates.sample()] == ["eth0"] and len(rates) == 1
+
+
+def test_ring_search_matches_linear_scan():
+    rng = random.Random(7)
+    ring = _Ring(50, (0,) * len(FIELDS), 0.0)
+    now = 0.0
+    for _ in range(120):
+        now += rng.uniform(0.005, 0.2)
+        ring.update((0,) * len(FIELDS), now)
+    times = [ring.times[ring._index(k)] for k in range(ring.count)]
+    for window in (0.0, 0.01, 0.5, 1.0, 3.0, 100.0):
+        older = [k for k in range(1, ring.count) if times[k] <= times[0] - window]
+        expected = ring._index(older[0] if older else ring.count - 1)
+        assert ring.base(window) == expected
@@ -0,0 +1,80 @@
+import os
+
+from netmonitor.inodes import InodeIndex, read_start_time
+from tests.fakeproc import add_process, add_socket, remove_process
+
+
+def test_read_start_time_handles_odd_names(tmp_path):
+    add_process(tmp_path, 7, name="a) b (c", start_time=4242)
+    assert read_start_time(7, str(tmp_path)) == 4242
+    assert read_start_time(8, str(tmp_path)) is None
+
+
+def test_index_maps_inodes_and_counts_hits(tmp_path):
+    add_process(tmp_path, 1, sockets=[100, 101], files=["/dev/null"])
+    add_process(tmp_path, 2, sockets=[200])
+    index = InodeIndex(str(tmp_path))
+
+    index.refresh()
+    assert index.owner(100) == (1, 100)
+    assert index.pid_of(200) == 2
+    assert index.stats()["misses"] == 2
+
+    index.refresh()
+    stats = index.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 0)
+    assert stats["sockets"] == 3
+
+
+def test_index_rescans_only_changed_processes(tmp_path):
+    add_process(tmp_path, 1, sockets=[100])
+    add_process(tmp_path, 2, sockets=[200])
+    index = InodeIndex(str(tmp_path))
+    index.refresh()
+
+    add_socket(tmp_path, 2, 201)
+    index.refresh()
+    assert index.pid_of(201) == 2
+    assert (index.hits, index.misses) == (1, 3)
+
+
+def test_index_evicts_dead_and_reused_pids(tmp_path):
+    add_process(tmp_path, 1, sockets=[100])
+    add_process(tmp_path, 2, sockets=[200], start_time=500)
+    index = InodeIndex(str(tmp_path))
+    index.refresh()
+
+    remove_process(tmp_path, 1)
+    remove_process(tmp_path, 2)
+    add_process(tmp_path, 2, sockets=[300], start_time=900)
+    index.refresh()
+
+    assert 1 not in index
+    assert index.owner(100) is None
+    assert index.owner(200) is None
+    assert index.owner(300) == (2, 900)
+    assert index.evictions == 2
+
+
+def test_index_follows_a_reused_fd_number(tmp_path):
+    fd_dir = add_process(tmp_path, 1, sockets=[100, 101])
+    index = InodeIndex(str(tmp_path))
+    index.refresh()
+
+    # fd 0 closes and the next socket the process opens gets the same number:
+    # the fd listing is unchanged, but the socket tables show an unowned inode.
+    os.remove(os.path.join(fd_dir, "0"))
+    os.symlink("socket:[102]", os.path.join(fd_dir, "0"))
+    index.refresh()
+    assert index.hits == 1 and index.owner(102) is None
+    assert index.claim([101, 102, 0])
+    assert index.owner(102) == (1, 100)
+    assert index.owner(100) is None
+    assert index.owner(101) == (1, 100)
+    assert len(index) == 2
+
+    # A socket nobody indexed owns (another user's) costs one pass, not one per tick.
+    assert index.claim([101, 102, 900])
+    index.refresh()
+    assert not index.claim([101, 102, 900])
+    assert index.stats()["relinks"] == 2
@@ -0,0 +1,157 @@
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from netmonitor.metrics import MetricsCollector, make_server, serve_in_thread
+
+
+def _connection_rows(count):
+    return [
+        {"pid": pid, "name": f"proc{pid}", "total": 100 - pid, "tcp": 100 - pid, "udp": 0,
+         "remote_hosts": 1, "top_remote": "10.0.0.1", "status_summary": "E:1"}
+        for pid in range(1, count + 1)
+    ]
+
+
+class _Source:
+    def __init__(self, count=50):
+        self.count = count
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return _connection_rows(self.count)
+
+
+def _samples(body: bytes, metric: str):
+    return [line for line in body.decode().splitlines() if line.startswith(metric + "{")]
+
+
+def test_top_n_plus_other_bucket():
+    collector = MetricsCollector(_Source(50), top_n=5)
+    collector.tick()
+    samples = _samples(collector.body(), "netmonitor_process_connections")
+    assert len(samples) == 6
+    assert samples[0] == 'netmonitor_process_connections{pid="1",name="proc1"} 99'
+    assert samples[-1] == 'netmonitor_process_connections{pid="other",name="other"} ' + str(sum(range(50, 95)))
+    assert "netmonitor_processes 50" in collector.body().decode()
+
+
+def test_bandwidth_counters_and_openmetrics():
+    totals = {10: {"name": "nginx", "sent": 500, "recv": 100}, 11: {"name": "curl", "sent": 5, "recv": 1},
+              12: {"name": "sshd", "sent": 1, "recv": 1}}
+    collector = MetricsCollector(_Source(1), bandwidth=lambda: totals, top_n=1)
+    collector.tick()
+    text = collector.body().decode()
+    assert "# TYPE netmonitor_process_sent_bytes_total counter" in text
+    assert 'netmonitor_process_sent_bytes_total{pid="10",name="nginx"} 500' in text
+    assert 'netmonitor_process_received_bytes_total{pid="other",name="other"} 2' in text
+    om = collector.body(openmetrics=True).decode()
+    assert "# TYPE netmonitor_process_sent_bytes counter" in om
+    assert om.endswith("# EOF\n")
+
+
+def test_label_values_are_escaped_and_cached():
+    rows = [{"pid": 1, "name": 'we"ird\\name', "total": 1, "tcp": 1, "udp": 0, "remote_hosts": 0}]
+    collector = MetricsCollector(lambda: rows)
+    collector.tick()
+    assert 'name="we\\"ird\\\\name"' in collector.body().decode()
+    label = collector._labels[(1, 'we"ird\\name')]
+    collector.tick()
+    assert collector._labels[(1, 'we"ird\\name')] is label
+
+
+@pytest.fixture
+def server():
+    source = _Source(500)
+    collector = MetricsCollector(source, top_n=20)
+    collector.tick()
+    srv = make_server(collector, "127.0.0.1", 0)
+    serve_in_thread(srv)
+    yield srv, source
+    srv.shutdown()
+    srv.server_close()
+
+
+def _get(url, accept=None):
+    request = urllib.request.Request(url, headers={"Accept": accept} if accept else {})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, response.headers["Content-Type"], response.read()
+
+
+def test_concurrent_scrapes_never_collect(server):
+    srv, source = server
+    url = f"http://127.0.0.1:{srv.server_address[1]}/metrics"
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(lambda _: _get(url), range(200)))
+    assert source.calls == 1
+    bodies = {body for status, _, body in results}
+    assert len(bodies) == 1 and all(status == 200 for status, _, _ in results)
+    assert len(_samples(bodies.pop(), "netmonitor_process_connections")) == 21
+
+
+def test_openmetrics_negotiation_and_404(server):
+    srv, _ = server
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    _, content_type, body = _get(base + "/metrics", accept="application/openmetrics-text; version=1.0.0")
+    assert content_type.startswith("application/openmetrics-text")
+    assert body.endswith(b"# EOF\n")
+    with pytest.raises(urllib.error.HTTPError) as err:
+        _get(base + "/other")
+    assert err.value.code == 404
+
+
+def test_other_counter_never_decreases():
+    totals = {pid: {"name": f"proc{pid}", "sent": 1000, "recv": 0} for pid in range(1, 5)}
+    collector = MetricsCollector(_Source(1), bandwidth=lambda: totals, top_n=2)
+
+    def tick():
+        collector.tick()
+        sent = dict((line.split("{")[1].split('"')[1], int(line.rsplit(" ", 1)[1]))
+                    for line in _samples(collector.body(), "netmonitor_process_sent_bytes_total"))
+        return set(sent) - {"other"}, sent["other"]
+
+    others = []
+    top, other = tick()
+    others.append(other)
+    # PID 4 goes busy and enters the top N; then it goes idle and PID 3 takes
+    # its place; then a busy PID in the top N exits.
+    for busy in (4, 4, 3, 3):
+        totals[busy]["sent"] += 5000
+        for pid in totals:
+            totals[pid]["sent"] += 10
+        top, other = tick()
+        assert busy in {int(p) for p in top}
+        others.append(other)
+    del totals[3]
+    top, other = tick()
+    others.append(other)
+    assert others == sorted(others) and others[-1] > others[0]
+    # A long-lived process that has gone idle no longer holds a slot.
+    totals[1]["sent"] += 1 << 30
+    tick()
+    totals[2]["sent"] += 100
+    totals[4]["sent"] += 100
+    top, _ = tick()
+    assert top == {"2", "4"}
+
+
+def test_bytes_are_counted_once_as_pids_leave_and_reenter_the_top_n():
+    totals = {pid: {"name": f"proc{pid}", "sent": 100 * pid, "recv": 0} for pid in range(1, 4)}
+    collector = MetricsCollector(_Source(1), bandwidth=lambda: totals, top_n=1)
+    last = {}
+    # PID 1 is busiest, then PID 2 takes its place, then PID 1 comes back.
+    for busy in (None, 1, 2, 2, 1, 3, 1):
+        if busy is not None:
+            totals[busy]["sent"] += 1000 * busy
+            for pid in totals:
+                totals[pid]["sent"] += 7
+        collector.tick()
+        for line in _samples(collector.body(), "netmonitor_process_sent_bytes_total"):
+            series, value = line.rsplit(" ", 1)
+            assert int(value) >= last.get(series, 0)
+            last[series] = int(value)
+    # The last value of every series (listed or not any more) adds up to the
+    # bytes really moved.
+    assert sum(last.values()) == sum(row["sent"] for row in totals.values())
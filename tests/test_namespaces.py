@@ -0,0 +1,111 @@
+import json
+import os
+import socket
+
+import pytest
+
+from netmonitor import collector, core, parallel, procnet
+from netmonitor.inodes import InodeIndex
+from netmonitor.namespaces import NamespaceIndex, read_cgroup
+from netmonitor.sockdiag import process_name
+from tests.fakeproc import add_process, write_net_tables
+
+HOST, POD = 4026531840, 4026532201
+LISTEN, ESTABLISHED = 0x0A, 0x01
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Two web replicas share a pod namespace; the host runs sshd and a client."""
+    root = str(tmp_path)
+    add_process(root, 10, "sshd", sockets=[101], netns=HOST, cgroup="/system.slice/sshd.service")
+    add_process(root, 11, "curl", sockets=[102], netns=HOST, cgroup="/user.slice")
+    add_process(root, 20, "web", sockets=[201, 202], netns=POD, cgroup="/kubepods/pod-a")
+    add_process(root, 21, "web", sockets=[203], netns=POD, cgroup="/kubepods/pod-a")
+    add_process(root, 22, "sidecar", sockets=[204], netns=POD, cgroup="/kubepods/pod-a/sidecar")
+    # Both namespaces listen on port 80 and hold the same 5-tuple.
+    same = (("10.0.0.1", 5000), ("10.0.0.2", 80), ESTABLISHED, 0)
+    host = {"tcp": (socket.AF_INET, [(("0.0.0.0", 22), ("0.0.0.0", 0), LISTEN, 0, 101), same + (102,)])}
+    pod = {"tcp": (socket.AF_INET, [(("0.0.0.0", 80), ("0.0.0.0", 0), LISTEN, 0, 201), same + (202,),
+                                    (("10.0.0.1", 5001), ("10.0.0.3", 443), ESTABLISHED, 0, 203),
+                                    (("127.0.0.1", 15000), ("127.0.0.1", 80), ESTABLISHED, 0, 204)])}
+    for pid in (10, 11):
+        write_net_tables(root, pid, host)
+    for pid in (20, 21, 22):
+        write_net_tables(root, pid, pod)
+    return root
+
+
+def test_namespace_index_groups_and_caches(tree):
+    index, namespaces = InodeIndex(tree), NamespaceIndex(tree)
+    index.refresh()
+    assert namespaces.refresh(index) == {HOST: [10, 11], POD: [20, 21, 22]}
+    assert namespaces.refresh(index) and namespaces.reads == 5
+    assert [netns for netns, _ in namespaces.table_dirs("/unused")] == [HOST, POD]
+    assert namespaces.group_of(21, "cgroup") == "/kubepods/pod-a" and namespaces.group_of(21, "process") == 21
+
+
+def test_read_cgroup_prefers_unified_then_systemd(tmp_path):
+    add_process(tmp_path, 5)
+    with open(tmp_path / "5" / "cgroup", "w") as f:
+        f.write("12:cpu,cpuacct:/docker/abc\n1:name=systemd:/docker/def\n")
+    assert read_cgroup(5, str(tmp_path)) == "/docker/def"
+    with open(tmp_path / "5" / "cgroup", "a") as f:
+        f.write("0::/docker/ghi\n")
+    assert read_cgroup(5, str(tmp_path)) == "/docker/ghi"
+    assert read_cgroup(6, str(tmp_path)) is None
+
+
+def test_each_namespace_is_read_once(tree, monkeypatch):
+    reads = []
+    read_tables = collector.read_tables
+    monkeypatch.setattr(collector, "read_tables", lambda kind, path: reads.append(path) or read_tables(kind, path))
+    index, namespaces = InodeIndex(tree), NamespaceIndex(tree)
+    by_pid = collector._connections_from_proc("tcp4", index, os.path.join(tree, "net"), namespaces=namespaces)
+    assert reads == [os.path.join(tree, "10", "net"), os.path.join(tree, "20", "net")]
+    assert {pid: len(conns) for pid, conns in by_pid.items()} == {10: 1, 11: 1, 20: 2, 21: 1, 22: 1}
+    assert by_pid[11][0].laddr == by_pid[20][1].laddr
+
+
+def test_sharded_namespace_aggregates_match_serial(tree):
+    index, namespaces = InodeIndex(tree), NamespaceIndex(tree)
+    index.refresh()
+    namespaces.refresh(index)
+    serial = collector.attribute_connections(collector.read_namespace_tables("inet", namespaces), index)
+    with parallel.WorkerPool(2) as pool:
+        merged = parallel.aggregate_tables(pool, procnet.KINDS["inet"], index, namespaces.table_dirs("/unused"))
+    assert list(merged) == list(serial)
+    assert {pid: aggregate[1] for pid, aggregate in merged.items()} == {pid: len(c) for pid, c in serial.items()}
+
+
+@pytest.fixture
+def host(tree, monkeypatch):
+    """Point the default collectors at the fixture tree."""
+    index, namespaces = InodeIndex(tree), NamespaceIndex(tree)
+    for module in (collector, core):
+        monkeypatch.setattr(module, "default_index", lambda: index)
+        monkeypatch.setattr(module, "default_namespaces", lambda: namespaces)
+    monkeypatch.setattr(collector, "_proc_net_available", lambda: True)
+    monkeypatch.setattr(collector, "_process_name", lambda pid: process_name(pid, tree))
+    return tree
+
+
+@pytest.mark.parametrize("group_by,expected", [
+    ("netns", {HOST: (2, 2, "2× sshd, curl"), POD: (3, 4, "3× web, sidecar")}),
+    ("cgroup", {"/system.slice/sshd.service": (1, 1, "1× sshd"), "/user.slice": (1, 1, "1× curl"),
+                "/kubepods/pod-a": (2, 3, "2× web"), "/kubepods/pod-a/sidecar": (1, 1, "1× sidecar")}),
+])
+def test_top_groups_rows(host, tmp_path, group_by, expected):
+    out = tmp_path / "top.json"
+    core._show_top_connections(core._Collection(), 10, "linux", "json", str(out), delay=0, group_by=group_by)
+    with open(out) as f:
+        rows = json.load(f)
+    assert {row["group"]: (row["processes"], row["count"], row["name"]) for row in rows} == expected
+    assert set(rows[0]) == set(core._group_fields(core.TOP_CONNECTION_FIELDS, group_by))
+
+
+def test_live_summary_groups_and_filters_members(host):
+    snapshot = collector.collect_connections("tcp4")
+    grouped, members = core._group_connections(snapshot, "netns", process_filter="web")
+    rows = core._finish_groups(core._summarize_connections(snapshot=grouped), members, "netns")
+    assert [(row["group"], row["total"], row["pids"]) for row in rows] == [(POD, 3, [20, 21])]
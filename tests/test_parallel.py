@@ -0,0 +1,57 @@
+import os
+import socket
+
+import pytest
+
+from benchmarks.synthproc import make_proc_tree
+from netmonitor import core, parallel, procnet
+from netmonitor.collector import ConnectionSnapshot, attribute_connections
+from netmonitor.inodes import InodeIndex
+from netmonitor.sockdiag import process_name
+
+
+@pytest.fixture(scope="module")
+def tree(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("proc"))
+    make_proc_tree(root, processes=60, sockets=3000, udp=0.2, ipv6=0.3)
+    return root
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with parallel.WorkerPool(3) as pool:
+        yield pool
+
+
+def test_split_rows_covers_every_row_once():
+    data = b"header\n" + b"".join(b"row %d\n" % i for i in range(10))
+    for parts in (1, 3, 4, 20):
+        chunks = list(parallel.split_rows(data, parts))
+        assert b"".join(chunk for chunk, _ in chunks) == data[len(b"header\n"):]
+        assert [row for _, row in chunks] == [sum(c.count(b"\n") for c, _ in chunks[:i]) for i in range(len(chunks))]
+
+
+def test_threaded_refresh_matches_serial(tree, pool):
+    serial, threaded = InodeIndex(tree), InodeIndex(tree, pool)
+    serial.refresh()
+    threaded.refresh()
+    assert dict(threaded.owners()) == dict(serial.owners())
+    threaded.refresh()
+    assert (threaded.hits, threaded.misses) == (len(threaded.pids()), serial.misses)
+
+
+@pytest.mark.parametrize("status,protocol", [(None, None), ("established", None), (None, "tcp"), (None, "udp")])
+def test_sharded_aggregates_match_serial_summary(tree, pool, monkeypatch, status, protocol):
+    monkeypatch.setattr(parallel, "MIN_SHARD_ROWS", 100)  # split even this small fixture
+    index = InodeIndex(tree)
+    index.refresh()
+    net_root = os.path.join(tree, "net")
+    by_pid = attribute_connections(procnet.read_tables("inet", net_root), index)
+    names = {pid: process_name(pid, tree) for pid in by_pid}
+    serial = core._summarize_connections(status, None, protocol, ConnectionSnapshot(dict(by_pid), names, 0.0))
+
+    type_ = {"tcp": socket.SOCK_STREAM, "udp": socket.SOCK_DGRAM}.get(protocol)
+    merged = parallel.aggregate_tables(pool, procnet.KINDS["inet"], index, net_root, status, type_)
+    rows = [core._aggregate_row(pid, names[pid], aggregate) for pid, aggregate in merged.items()
+            if aggregate[1] + aggregate[2]]
+    assert rows == serial and len(rows) > 10
@@ -0,0 +1,69 @@
+import os
+import socket
+
+import pytest
+
+from netmonitor import procnet
+from tests.fakeproc import net_table
+
+BACKENDS = ["python"] + (["numpy"] if procnet.HAVE_NUMPY else [])
+
+SOCKETS_V4 = [
+    (("127.0.0.1", 22), ("0.0.0.0", 0), 0x0A, 0, 1001),
+    (("10.1.2.3", 51000), ("93.184.216.34", 443), 0x01, 1000, 1002),
+    (("192.168.0.5", 65535), ("8.8.8.8", 53), 0x06, 65534, 2 ** 40),
+]
+SOCKETS_V6 = [
+    (("::1", 8080), ("::", 0), 0x0A, 0, 2001),
+    (("2001:db8::5", 40000), ("::ffff:127.0.0.1", 443), 0x08, 1000, 2002),
+]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_ipv4_table(backend):
+    table = procnet.parse_table(net_table(SOCKETS_V4, socket.AF_INET), socket.AF_INET, socket.SOCK_STREAM, backend)
+    assert len(table) == 3
+    assert [table.local_ip(i) for i in range(3)] == ["127.0.0.1", "10.1.2.3", "192.168.0.5"]
+    assert list(table.lport) == [22, 51000, 65535]
+    assert table.remote_ip(1) == "93.184.216.34" and table.rport[1] == 443
+    assert [table.status(i) for i in range(3)] == ["LISTEN", "ESTABLISHED", "TIME_WAIT"]
+    assert list(table.uid) == [0, 1000, 65534]
+    assert list(table.inode) == [1001, 1002, 2 ** 40]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_ipv6_table_and_connection(backend):
+    table = procnet.parse_table(net_table(SOCKETS_V6, socket.AF_INET6), socket.AF_INET6, socket.SOCK_STREAM, backend)
+    assert table.local_ip(0) == "::1"
+    assert table.remote_ip(1) == "::ffff:127.0.0.1"
+    conn = table.connection(1, pid=42)
+    assert conn.laddr == ("2001:db8::5", 40000)
+    assert conn.raddr.port == 443
+    assert conn.status == "CLOSE_WAIT" and conn.pid == 42
+    assert table.connection(0).raddr == ()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_empty_table(backend):
+    table = procnet.parse_table(net_table([], socket.AF_INET), socket.AF_INET, socket.SOCK_DGRAM, backend)
+    assert len(table) == 0
+
+
+def test_udp_status_is_none():
+    table = procnet.parse_table(net_table(SOCKETS_V4[:1], socket.AF_INET), socket.AF_INET, socket.SOCK_DGRAM)
+    assert table.status(0) == "NONE"
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/net/tcp"), reason="needs Linux /proc/net")
+def test_read_tables_finds_live_socket():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    try:
+        table = procnet.read_tables("tcp4")["tcp"]
+        inode = os.fstat(server.fileno()).st_ino
+        i = table.inode.tolist().index(inode)
+        assert table.lport[i] == server.getsockname()[1]
+        assert table.status(i) == "LISTEN"
+    finally:
+        server.close()
@@ -0,0 +1,59 @@
+import pstats
+import threading
+import time
+
+from netmonitor.profiling import NULL_PROFILER, Profiler
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_stage_records_wall_cpu_and_counts():
+    profiler = Profiler()
+    with profiler.stage("scan"):
+        _busy(0.02)
+    with profiler.stage("scan"):
+        data = [object() for _ in range(5000)]
+    profiler.count("sockets", 1234)
+    stats = profiler.stages["scan"]
+    assert stats.calls == 2
+    assert stats.wall >= 0.02 and stats.cpu >= 0.01
+    assert stats.last_blocks >= 5000
+    caption = profiler.caption()
+    assert "scan" in caption and "1,234 sockets" in caption
+    assert profiler.summary()[0]["calls"] == 2
+    del data
+
+
+def test_stages_from_several_threads_and_pstats(tmp_path):
+    profiler = Profiler(cprofile=True)
+
+    def work():
+        for _ in range(3):
+            with profiler.stage("collect"):
+                _busy(0.002)
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+    with profiler.stage("render"):
+        _busy(0.002)
+    assert profiler.stages["collect"].calls == 3
+    path = tmp_path / "live.pstats"
+    assert profiler.dump_pstats(str(path))
+    functions = {func[2] for func in pstats.Stats(str(path)).stats}
+    assert "_busy" in functions
+
+
+def test_null_profiler_is_nearly_free():
+    assert not NULL_PROFILER.enabled
+    assert NULL_PROFILER.stage("a") is NULL_PROFILER.stage("b")
+    n = 100_000
+    start = time.perf_counter()
+    for _ in range(n):
+        with NULL_PROFILER.stage("scan"):
+            pass
+    per_call = (time.perf_counter() - start) / n
+    assert per_call < 5e-6
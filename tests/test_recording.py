@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from netmonitor.recording import INDEX_FILE, Recorder, Recording
+
+
+def _bandwidth_tick(t):
+    return {
+        100: {"name": "nginx", "sent": 1_000_000 + 1500 * t, "recv": 2_000_000 + 800 * t},
+        4242: {"name": "curl", "sent": 10 * t, "recv": 0},
+    }
+
+
+def test_round_trip_and_compact_encoding(tmp_path):
+    with Recorder(str(tmp_path), "bandwidth") as rec:
+        for t in range(100):
+            rec.append(1_700_000_000 + t, _bandwidth_tick(t))
+    # Steady counters and interned names: a handful of bytes per row.
+    assert rec.bytes_written / 100 < 40
+
+    with Recording(str(tmp_path)) as recording:
+        ticks = list(recording.ticks())
+        assert recording.kind == "bandwidth"
+    assert len(ticks) == 100
+    ts, rows = ticks[37]
+    assert ts == 1_700_000_037
+    assert rows == {pid: dict(row) for pid, row in _bandwidth_tick(37).items()}
+
+
+def test_connections_kind_and_pid_churn(tmp_path):
+    ticks = [
+        {1: {"name": "a", "total": 3, "tcp": 2, "udp": 1, "remote_hosts": 1, "top_remote": "10.0.0.1", "status_summary": "E:2"}},
+        {2: {"name": "b", "total": 1, "tcp": 1, "udp": 0, "remote_hosts": 0, "top_remote": "-", "status_summary": "L:1"}},
+        {},
+    ]
+    with Recorder(str(tmp_path), "connections") as rec:
+        for t, rows in enumerate(ticks):
+            rec.append(float(t), rows)
+    with Recording(str(tmp_path)) as recording:
+        assert [rows for _, rows in recording.ticks()] == ticks
+
+
+def test_segments_rotate_and_index_seeks(tmp_path):
+    with Recorder(str(tmp_path), "bandwidth", segment_bytes=200) as rec:
+        for t in range(200):
+            rec.append(1000.0 + t, _bandwidth_tick(t))
+    segments = [n for n in os.listdir(tmp_path) if n.endswith(".seg")]
+    assert len(segments) > 5
+    assert os.path.getsize(tmp_path / INDEX_FILE) == 24 * len(segments)
+
+    with Recording(str(tmp_path)) as recording:
+        assert (recording.start, recording.end) == (1000.0, 1199.0)
+        window = list(recording.ticks(start=1150.0, end=1152.5))
+    assert [ts for ts, _ in window] == [1150.0, 1151.0, 1152.0]
+    # Every segment restarts its delta state, so a mid-recording seek decodes
+    # the same absolute values.
+    assert window[0][1][100]["sent"] == 1_000_000 + 1500 * 150
+
+
+def test_unindexed_segment_with_torn_tail_is_readable(tmp_path):
+    rec = Recorder(str(tmp_path), "bandwidth")
+    for t in range(5):
+        rec.append(float(t), _bandwidth_tick(t))
+    rec._file.close()  # simulate a crash: no index entry written
+    path = tmp_path / "00000001.seg"
+    with open(path, "ab") as f:
+        f.write(b"\x02\x7f\x01")
+    with Recording(str(tmp_path)) as recording:
+        assert [ts for ts, _ in recording.ticks()] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_rejects_foreign_files(tmp_path):
+    (tmp_path / "00000001.seg").write_bytes(b"not a segment")
+    with pytest.raises(ValueError):
+        Recording(str(tmp_path))
+
+
+def test_empty_newest_segment_is_skipped(tmp_path):
+    with Recorder(str(tmp_path), "bandwidth") as rec:
+        rec.append(1.0, _bandwidth_tick(1))
+    # Killed before the first tick of a new segment was flushed.
+    open(tmp_path / "00000002.seg", "wb").close()
+    with Recording(str(tmp_path)) as recording:
+        assert recording.kind == "bandwidth"
+        assert [ts for ts, _ in recording.ticks()] == [1.0]
+    with Recorder(str(tmp_path), "bandwidth") as rec:
+        rec.append(2.0, _bandwidth_tick(2))
+    with Recording(str(tmp_path)) as recording:
+        assert [ts for ts, _ in recording.ticks()] == [1.0, 2.0]
+
+
+def test_appending_requires_the_same_kind_and_version(tmp_path):
+    with Recorder(str(tmp_path), "bandwidth") as rec:
+        rec.append(1.0, _bandwidth_tick(1))
+    with pytest.raises(ValueError, match="holds a bandwidth recording, not connections"):
+        Recorder(str(tmp_path), "connections")
+    # A crash-truncated newest segment does not hide the kind.
+    open(tmp_path / "00000002.seg", "wb").close()
+    with pytest.raises(ValueError, match="not connections"):
+        Recorder(str(tmp_path), "connections")
+    with Recorder(str(tmp_path), "bandwidth") as rec:
+        rec.append(2.0, _bandwidth_tick(2))
+    assert max(n for n in os.listdir(tmp_path) if n.endswith(".seg")) == "00000003.seg"
+
+    old = tmp_path / "old"
+    old.mkdir()
+    (old / "00000001.seg").write_bytes(b"NMREC\x00\x00")
+    with pytest.raises(ValueError, match="unsupported recording version 0"):
+        Recorder(str(old), "bandwidth")
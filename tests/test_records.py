@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+import socket
+
+import pytest
+
+from netmonitor import core, sockdiag
+from netmonitor.records import BandwidthRow, ByteTotals, ConnectionRow, TcpSocket, getter
+from tests.fakeproc import add_process, remove_process
+
+
+def test_records_read_as_mappings():
+    row = ConnectionRow(7, "curl", 3, 2, 1, 1, "10.0.0.1", "E:3")
+    assert row["total"] == row.total == 3 and row.get("trend") is None and "trend" not in row
+    row["trend"] = "▁▂"
+    row.update({"opened_s": 1.5}, closed_s=0.0)
+    assert "trend" in row and row.get("opened_s") == 1.5
+    assert list(dict(row))[:3] == ["pid", "name", "total"] and len(row) == 11
+    with pytest.raises(KeyError):
+        row["sent"]
+    with pytest.raises(KeyError, match="no field 'sent'"):
+        row["sent"] = 1
+    # Method names are not fields.
+    assert row.get("keys") is None and "update" not in row
+    assert row == ConnectionRow.from_mapping(dict(row)) and row == dict(row)
+    assert row != ConnectionRow(7, "curl", 3, 2, 1, 1, "10.0.0.1", "E:3")
+    assert not hasattr(row, "__dict__")
+    assert getter([row], "total")(row) == getter([dict(row)], "total")(dict(row)) == 3
+
+
+def test_top_exports_records(tmp_path):
+    rows = [BandwidthRow(1, "nginx", 10, 5, 15), BandwidthRow(2, "curl", 1, 0, 1)]
+    rows[0].update(opened_s=2.0, closed_s=1.0, time_wait=3)
+    out = tmp_path / "top.json"
+    core._render_top_bandwidth(rows, 5, "json", str(out))
+    assert json.loads(out.read_text())[0] == {"pid": 1, "name": "nginx", "sent": 10, "recv": 5, "total": 15,
+                                              "opened_s": 2.0, "closed_s": 1.0, "time_wait": 3}
+    core._render_top_bandwidth(rows, 5, "csv", str(out))
+    with open(out) as f:
+        assert [row["closed_s"] for row in csv.DictReader(f)] == ["1.0", ""]
+
+
+@pytest.fixture
+def dump(monkeypatch):
+    """A stand-in for the netlink dump: ``{inode: [acked, received]}``, one IPv4 socket each."""
+    counters = {}
+
+    def dump_tcp_sockets(family, *args):
+        for inode, (acked, received) in list(counters.items()) if family == socket.AF_INET else ():
+            yield TcpSocket(inode, inode, "ESTABLISHED", 0, ("10.0.0.1", inode), ("10.0.0.2", 443), acked, received)
+    monkeypatch.setattr(sockdiag, "dump_tcp_sockets", dump_tcp_sockets)
+    return counters
+
+
+def test_byte_counter_reuses_idle_totals(tmp_path, dump):
+    add_process(tmp_path, 1, "web", sockets=[101, 102])
+    add_process(tmp_path, 2, "idle", sockets=[201])
+    dump.update({101: [100, 10], 102: [50, 0], 201: [7, 7]})
+    counter = sockdiag.TcpByteCounter(str(tmp_path))
+    first = counter.sample()
+    assert first == {1: ByteTotals("web", 150, 10), 2: ByteTotals("idle", 7, 7)}
+
+    dump[102][0] += 1000
+    second = counter.sample()
+    assert second[2] is first[2] and second[1] is not first[1]
+    assert (first[1].sent, second[1].sent) == (150, 1150)
+    rows = core._bandwidth_rows(first, second, elapsed=2.0)
+    assert rows == [BandwidthRow(1, "web", 500, 0, 500)]
+
+    # A closed socket stops contributing; an exited process is dropped.
+    del dump[101]
+    remove_process(tmp_path, 2)
+    del dump[201]
+    assert counter.sample() == {1: ByteTotals("web", 1150, 10)}
@@ -0,0 +1,95 @@
+import io
+
+from rich.console import Console
+
+from netmonitor import core
+from netmonitor.render import Column, TableView, Viewport, apply_key, top_rows
+from netmonitor.sampler import Snapshot
+
+
+def _rows(n):
+    return [{"pid": pid, "name": f"p{pid}", "total": (pid * 7919) % 1000} for pid in range(n)]
+
+
+def test_top_rows_matches_full_sort():
+    rows = _rows(500)
+    key = lambda r: r["total"]
+    expected = sorted(rows, key=key, reverse=True)
+    for n in (1, 10, 200, 500, 1000, None):
+        assert [key(r) for r in top_rows(rows, n, key)] == [key(r) for r in expected[:n]]
+
+
+def test_viewport_clamps_and_scrolls():
+    viewport = Viewport(height=10)
+    assert viewport.window(25) == (0, 10)
+    viewport.page(1)
+    assert viewport.window() == (10, 20)
+    viewport.page(1)
+    assert viewport.window() == (15, 25)
+    assert apply_key(viewport, "\x1b[A") and viewport.offset == 14
+    assert apply_key(viewport, "g") and viewport.offset == 0
+    assert apply_key(viewport, "\x1b[F") and viewport.window() == (15, 25)
+    assert not apply_key(viewport, "x")
+    # The list shrinking under the viewport pulls it back into range.
+    assert viewport.window(12) == (2, 12)
+    assert viewport.margin_window(100) == (0, 22)
+
+
+def test_table_view_formats_visible_rows_once():
+    calls = []
+
+    def fmt(value):
+        calls.append(value)
+        return f"<{value}>"
+    viewport = Viewport(height=5)
+    view = TableView([Column("PID", "pid"), Column("Total", "total", fmt)], viewport)
+    rows = top_rows(_rows(1000), None, key=lambda r: r["total"])
+    view.build(rows)
+    assert len(calls) == 5 and view.formatted == 5
+    view.build(rows)
+    assert len(calls) == 5 and view.reused == 5
+    rows[1] = dict(rows[1], total=rows[1]["total"] + 1)
+    table = view.build(rows, caption="c")
+    assert len(calls) == 6 and view.reused == 9
+    assert table.row_count == 5 and "Rows 1-5 of 1000" in table.caption
+
+
+def test_live_connections_table_renders_through_viewport():
+    data = [dict(row, tcp=row["total"], udp=0, remote_hosts=1, top_remote="10.0.0.1", status_summary="E:1")
+            for row in _rows(300)]
+    viewport = Viewport(height=20)
+    rows = core._ConnectionRows(200, 1.0, viewport=viewport)
+    ranked = rows(data, 1.0)
+    assert len(ranked) == 200 and ranked[0]["total"] == max(r["total"] for r in data)
+    # Trends are only computed for the visible rows and one page around them.
+    assert "trend" in ranked[39] and "trend" not in ranked[40]
+    snapshot = Snapshot(1, 1.0, 1.0, 1.0, 0.0, tuple(ranked), False, 0)
+    view = core.TableView(core.CONNECTION_COLUMNS, viewport)
+    table = core._build_connections_table(snapshot, 200, 1.0, view=view)
+    assert table.row_count == 21  # 20 visible rows and the Total footer
+    console = Console(file=io.StringIO(), width=200)
+    console.print(table)
+    assert "Rows 1-20 of 200" in console.file.getvalue()
+
+
+def test_remote_views_reuse_cells_per_remote():
+    endpoints = [{"kind": "endpoint", "remote": f"10.0.0.{i}:443", "count": 10 - i, "error": 0, "share": 0.1}
+                 for i in range(5)]
+    subnets = [{"kind": "subnet", "remote": "10.0.0.0/24", "count": 40, "error": 0, "share": 1.0}]
+    stats = {"capacity": 100, "ticks": 1, "total": 40, "endpoint_error": 0, "subnet_error": 0,
+             "endpoints": 5, "subnets": 1}
+    views = core._remote_views()
+    for _ in range(2):
+        core._build_remotes_panel((endpoints, subnets, stats), views=views)
+    assert (views[0].formatted, views[0].reused) == (5, 5)
+    assert (views[1].formatted, views[1].reused) == (1, 1)
+
+
+def test_iface_view_reuses_cells_per_interface():
+    rows = tuple({"iface": name, "sent_now": 1, "recv_now": 2, "errors": 0, "drops": 0, "wraps": 0}
+                 for name in ("lo", "eth0", "eth1"))
+    view = core.TableView(core.IFACE_COLUMNS, key=core._iface_key)
+    snapshot = Snapshot(1, 1.0, 1.0, 0.1, 0.0, rows, False, 0)
+    for _ in range(2):
+        core._build_iface_table(snapshot, view)
+    assert (view.formatted, view.reused) == (3, 3)
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from netmonitor import core
+from netmonitor.resolver import HostResolver
+
+
+class StandIn:
+    """A local resolver that records concurrency and can be held open."""
+
+    def __init__(self, names):
+        self.names = names
+        self.calls = []
+        self.active = self.peak = 0
+        self.release = threading.Event()
+        self.release.set()
+        self._lock = threading.Lock()
+
+    def __call__(self, ip):
+        with self._lock:
+            self.calls.append(ip)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        self.release.wait(5)
+        with self._lock:
+            self.active -= 1
+        if ip == "10.9.9.9":
+            raise OSError("resolver exploded")
+        return self.names.get(ip)
+
+
+def _settle(resolver):
+    deadline = time.monotonic() + 5
+    while resolver.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_lookup_is_non_blocking_and_caches_names_and_failures():
+    stand_in = StandIn({"10.0.0.1": "db.internal"})
+    stand_in.release.clear()
+    resolver = HostResolver(stand_in, max_workers=2)
+    assert resolver.lookup("10.0.0.1") is None  # returns at once while the lookup is held
+    assert resolver.display("10.0.0.2") == "10.0.0.2"
+    stand_in.release.set()
+    _settle(resolver)
+
+    assert resolver.display("10.0.0.1") == "db.internal"
+    assert resolver.lookup("10.0.0.2") is None
+    assert resolver.lookup("10.0.0.2") is None
+    assert stand_in.calls.count("10.0.0.2") == 1  # the failure is cached
+    stats = resolver.stats()
+    assert (stats["resolved"], stats["failed"], stats["negative_hits"]) == (1, 1, 2)
+    assert stats["hits"] == 3 and stats["misses"] == 2 and resolver.hit_rate == 0.6
+    resolver.close()
+
+
+def test_concurrency_is_bounded_and_in_flight_lookups_are_deduplicated():
+    stand_in = StandIn({})
+    stand_in.release.clear()
+    resolver = HostResolver(stand_in, max_workers=3, max_pending=10)
+    for _ in range(3):
+        for i in range(12):
+            resolver.lookup(f"10.1.0.{i}")
+    assert resolver.stats()["pending"] == 10 and resolver.dropped == 6
+    stand_in.release.set()
+    _settle(resolver)
+    assert stand_in.peak <= 3
+    assert sorted(stand_in.calls) == sorted(f"10.1.0.{i}" for i in range(10))
+    resolver.close()
+
+
+def test_ttl_expiry_serves_stale_names_and_lru_evicts():
+    now = [0.0]
+    names = {"10.0.0.1": "a.example", "10.0.0.9": None}
+    stand_in = StandIn(names)
+    resolver = HostResolver(stand_in, capacity=2, ttl=10, negative_ttl=2, clock=lambda: now[0])
+    for ip in ("10.0.0.1", "10.0.0.9", "10.9.9.9"):
+        resolver.lookup(ip)
+        _settle(resolver)
+    assert resolver.evictions == 1 and resolver.stats()["cached"] == 2  # 10.0.0.1 was least recent
+    assert resolver.stats()["failed"] == 2  # no PTR record, and a resolver error
+
+    resolver.lookup("10.0.0.1")
+    _settle(resolver)
+    names["10.0.0.1"] = "b.example"
+    now[0] = 11
+    assert resolver.lookup("10.0.0.1") == "a.example"  # stale while refreshing
+    _settle(resolver)
+    assert resolver.lookup("10.0.0.1") == "b.example"
+    assert resolver.stale == 1
+    resolver.close()
+
+
+def test_connection_rows_show_resolved_remote():
+    resolver = HostResolver(StandIn({"10.0.0.1": "api.example"}))
+    rows = core._ConnectionRows(5, 1.0, resolver=resolver)
+    data = [{"pid": 1, "name": "curl", "total": 1, "top_remote": "10.0.0.1"},
+            {"pid": 2, "name": "nc", "total": 1, "top_remote": "-"}]
+    assert [r["remote_host"] for r in rows(data, 0.0)] == ["10.0.0.1", "-"]
+    _settle(resolver)
+    assert [r["remote_host"] for r in rows([dict(r) for r in data], 1.0)] == ["api.example", "-"]
+    resolver.close()
@@ -0,0 +1,53 @@
+import time
+
+from netmonitor.sampler import Sampler
+
+
+def test_sampler_publishes_snapshots_with_measured_elapsed():
+    calls = []
+    sampler = Sampler(lambda elapsed: calls.append(elapsed) or [len(calls)], interval=0.02)
+    sampler.start()
+    try:
+        snapshot = sampler.wait_for(3, timeout=2)
+    finally:
+        sampler.stop(timeout=1)
+    assert snapshot.seq >= 4
+    assert snapshot.rows == (snapshot.seq,)
+    assert calls[0] == 0.0
+    assert all(0.01 < e < 0.5 for e in calls[1:])
+    assert snapshot.elapsed == calls[snapshot.seq - 1]
+
+
+def test_sampler_keeps_cadence_and_counts_missed_ticks():
+    def collect(elapsed):
+        time.sleep(0.05 if collect.n == 1 else 0)
+        collect.n += 1
+        return []
+    collect.n = 0
+
+    sampler = Sampler(collect, interval=0.02)
+    sampler.start()
+    try:
+        snapshot = sampler.wait_for(2, timeout=2)
+    finally:
+        sampler.stop(timeout=1)
+    # The second collection overran two-plus slots; the skipped deadlines are
+    # counted rather than queued up as a burst of back-to-back samples.
+    assert snapshot.missed >= 2
+    assert snapshot.seq >= 3
+
+
+def test_sampler_surfaces_collector_errors():
+    def collect(elapsed):
+        raise RuntimeError("boom")
+
+    sampler = Sampler(collect, interval=0.01)
+    sampler.start()
+    try:
+        sampler.wait_for(0, timeout=2)
+    except RuntimeError as exc:
+        assert str(exc) == "boom"
+    else:
+        raise AssertionError("collector error was not re-raised")
+    finally:
+        sampler.stop(timeout=1)
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from netmonitor.inodes import InodeIndex
+from netmonitor.parallel import WorkerPool
+from netmonitor.sampler import Sampler
+from netmonitor.scheduler import CpuBudget, budget_caption, parse_budget
+from tests.fakeproc import add_process, add_socket
+
+
+@pytest.mark.parametrize("value,expected", [("2%", 0.02), ("2", 0.02), (" 0.5% ", 0.005), (100, 1.0)])
+def test_parse_budget(value, expected):
+    assert parse_budget(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", ["0%", "150", "two"])
+def test_parse_budget_rejects(value):
+    with pytest.raises(ValueError):
+        parse_budget(value)
+
+
+def test_budget_stretches_at_once_and_shrinks_gradually():
+    budget = CpuBudget(0.02, interval=1.0, smoothing=1.0)
+    # 10 ms per tick fits in 2% of a 1s interval.
+    assert budget.update(0.01) == 1.0 and budget.usage == pytest.approx(0.01)
+    # 80 ms needs 4s to stay at 2%.
+    assert budget.update(0.08) == pytest.approx(4.0) and budget.usage == pytest.approx(0.02)
+    # The host quietens: back down by at most a quarter per tick, never below the base.
+    intervals = [budget.update(0.001) for _ in range(6)]
+    assert intervals[:2] == pytest.approx([3.0, 2.25])
+    assert intervals[-1] == 1.0
+    # The cap wins over the budget, which is then overrun.
+    assert budget.update(10.0) == 30.0 and budget.usage > budget.budget
+
+
+def test_idle_processes_are_probed_less_often(tmp_path):
+    add_process(tmp_path, 1, sockets=[100])
+    add_process(tmp_path, 2, sockets=[200])
+    index = InodeIndex(str(tmp_path), max_skip=2)
+    skipped = []
+    for tick in range(9):
+        # Process 2 opens a socket every tick; process 1 stays idle.
+        add_socket(tmp_path, 2, 201 + tick)
+        index.refresh()
+        skipped.append(index.skipped)
+    # Process 1 backs off to every third tick; process 2 is probed every tick.
+    assert skipped == [0, 0, 1, 0, 1, 1, 0, 1, 1]
+    assert index.pid_of(209) == 2
+
+    # A skipped process's new socket is picked up on its next probe, which
+    # puts it back on every tick.
+    index.refresh()
+    add_socket(tmp_path, 1, 101)
+    index.refresh()
+    index.refresh()
+    assert index.pid_of(101) is None
+    index.refresh()
+    assert index.pid_of(101) == 1
+    add_socket(tmp_path, 1, 102)
+    index.refresh()
+    assert index.pid_of(102) == 1
+
+
+def test_sampler_applies_scheduler_interval(tmp_path):
+    add_process(tmp_path, 1, sockets=[100])
+    index = InodeIndex(str(tmp_path))
+    cpu = [0.0]
+
+    def collect(elapsed):
+        cpu[0] += 0.002  # 2 ms of CPU per tick
+        index.refresh()
+        return []
+
+    budget = CpuBudget(0.1, interval=0.005, index=index)
+    sampler = Sampler(collect, 0.005, scheduler=budget, cpu_clock=lambda: cpu[0])
+    sampler.start()
+    try:
+        snapshot = sampler.wait_for(2, timeout=2)
+    finally:
+        sampler.stop(timeout=1)
+    # 2 ms at 10% of a CPU: one tick every 20 ms.
+    assert snapshot.interval == pytest.approx(0.02)
+    assert snapshot.budget["usage"] == pytest.approx(0.1) and snapshot.budget["processes"] == 1
+    assert index.max_skip > 0
+    assert budget_caption(snapshot.budget).startswith("Adaptive: every 0.02s (at least 0.005s), collector CPU 10.0%")
+
+
+def test_budget_counts_the_sampler_thread_only():
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            pass
+    # Another thread burning CPU (a renderer, say) is not the collector's cost.
+    threading.Thread(target=spin, daemon=True).start()
+    budget = CpuBudget(0.5, interval=0.01)
+    sampler = Sampler(lambda elapsed: time.sleep(0.02) or [], 0.01, scheduler=budget)
+    sampler.start()
+    try:
+        snapshot = sampler.wait_for(3, timeout=5)
+    finally:
+        sampler.stop(timeout=1)
+        stop.set()
+    assert snapshot.budget["usage"] < 0.2
+
+    with WorkerPool(2) as pool:
+        pool.map_threads(lambda items: sum(i * i for i in range(200_000)), range(4))
+        assert pool.cpu_time > 0
@@ -0,0 +1,50 @@
+"""Startup-cost regression tests for the CLI entry point.
+
+``netmonitor --version`` and ``--help`` run from scripts and health checks, so
+they must not import the collectors (psutil, Rich Live, numpy, ...) and must
+stay inside an import-time budget measured with ``python -X importtime``.
+The budget can be relaxed on slow machines with NETMONITOR_STARTUP_BUDGET_MS.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative import time of netmonitor.cli, Typer included.
+BUDGET_MS = float(os.environ.get("NETMONITOR_STARTUP_BUDGET_MS", 250))
+# Self time of netmonitor's own modules, which this repo controls.
+OWN_BUDGET_MS = 25
+HEAVY = ("psutil", "numpy", "rich.live", "netmonitor.core", "netmonitor.monitor", "netmonitor.collector",
+         "netmonitor.procnet", "netmonitor.sockdiag", "netmonitor.sampler")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def importtime(*args):
+    """Run the CLI under ``-X importtime``; return ``{module: (self_us, cumulative_us)}`` and stdout."""
+    # Same as the ``netmonitor`` console script: import the module, call app().
+    script = "from netmonitor.cli import app; app(prog_name='netmonitor')"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script, *args], cwd=ROOT,
+                          capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(own), int(cumulative))
+    return modules, proc.stdout
+
+
+@pytest.mark.parametrize("args", [("--version",), ("--help",)])
+def test_cli_startup_stays_light(args):
+    # The first run warms the bytecode and filesystem caches.
+    importtime(*args)
+    modules, stdout = min((importtime(*args) for _ in range(3)), key=lambda r: r[0]["netmonitor.cli"][1])
+    assert "netmonitor" in stdout.lower()
+    loaded = [name for name in HEAVY if name in modules]
+    assert not loaded, f"{' '.join(args)} imports {loaded}"
+    total_ms = modules["netmonitor.cli"][1] / 1000
+    own_ms = sum(own for name, (own, _) in modules.items() if name.split(".")[0] == "netmonitor") / 1000
+    assert total_ms < BUDGET_MS, f"netmonitor.cli took {total_ms:.1f} ms to import (budget {BUDGET_MS} ms)"
+    assert own_ms < OWN_BUDGET_MS, f"netmonitor modules took {own_ms:.1f} ms (budget {OWN_BUDGET_MS} ms)"